@@ -0,0 +1,350 @@
+# alerts.py - Warnungen über Muster in den gespeicherten Events
+#
+# Eine Regel prüft eine Bedingung auf einem Feld der Events eines Typs und löst
+# aus, wenn sie in genügend Zeitabschnitten (Stunden oder Tagen) innerhalb
+# eines gleitenden Fensters erfüllt war, z.B. "Birkenpollen ≥ 3 an drei Tagen
+# hintereinander" oder "Gewitter an 3 von 7 Tagen". Pro Regel wird nur eine
+# Deque der zutreffenden Zeitabschnitte im Fenster gespeichert (Tabelle
+# 'alert_state'); jedes neue Event aktualisiert sie in amortisiert O(1).
+# Neue Events werden über die zuletzt gelesene Event-ID gefunden, es wird also
+# nie die ganze Tabelle gelesen. Ausgelöste Warnungen werden als Events vom
+# Typ 'alert' gespeichert; eine Regel löst erst wieder aus, nachdem sie nicht
+# mehr erfüllt war.
+#
+# Aktualisierte Events mit natürlichem Schlüssel (z.B. geänderte Vorhersagen)
+# behalten ihre ID und werden deshalb nicht erneut ausgewertet.
+
+import json
+import logging
+import operator
+import os
+import re
+import sqlite3
+from bisect import insort
+from collections import deque, namedtuple
+from datetime import datetime
+
+import database
+import partitions
+import settings
+
+logger = logging.getLogger(__name__)
+
+ALERT_EVENT_TYPE = "alert"
+SOURCE_MODULE = "alerts"
+
+# Optionen in [Alerts], die keine Regeln sind
+_OPTIONS = {"enabled"}
+
+_COMPARISONS = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+    "<": operator.lt,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+_WINDOW = re.compile(r"^(\d+)(?:\s+in\s+(\d+))?\s+(hours?|days?)$")
+
+AlertRule = namedtuple("AlertRule", "name event_type path predicate required window unit message")
+
+def _parse_codes(text):
+    codes = set()
+    for part in text.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = (int(bound) for bound in part.split("-", 1))
+            codes.update(range(first, last + 1))
+        elif part:
+            codes.add(int(part))
+    return frozenset(codes)
+
+def parse_rule(name, text):
+    """
+    Liest eine Regel im Format
+    "<event_type> | <Pfad> <Operator> <Wert> | <Anzahl> [in <Fenster>] <hours|days> | <Meldung>".
+
+    Beispiel: "pollen_forecast_daily | value.pollen_types.birch.level_numeric >= 3 | 3 days | ..."
+    löst aus, wenn die Bedingung an 3 aufeinanderfolgenden Tagen erfüllt war,
+    "... | 3 in 7 days | ..." an mindestens 3 von 7 Tagen. Statt eines
+    Vergleichs prüft "<Pfad> in 95-99, 45" auf eine Menge von (WMO-)Codes.
+
+    Args:
+        name (str): Der Name der Regel.
+        text (str): Die Regel aus config.ini.
+
+    Returns:
+        AlertRule: Die übersetzte Regel.
+
+    Raises:
+        ValueError: Wenn die Regel nicht gelesen werden kann.
+    """
+    parts = [part.strip() for part in text.split("|", 3)]
+    if len(parts) != 4:
+        raise ValueError(f"Warnregel '{name}' braucht vier durch '|' getrennte Teile.")
+    event_type, condition, window_text, message = parts
+    condition_parts = condition.split(None, 2)
+    if len(condition_parts) != 3:
+        raise ValueError(f"Ungültige Bedingung in Warnregel '{name}': {condition!r}")
+    path, op, operand = condition_parts
+    if op == "in":
+        codes = _parse_codes(operand)
+        def predicate(value):
+            return value in codes
+    elif op in _COMPARISONS:
+        compare, threshold = _COMPARISONS[op], float(operand)
+        def predicate(value):
+            return isinstance(value, (int, float)) and not isinstance(value, bool) and compare(value, threshold)
+    else:
+        raise ValueError(f"Unbekannter Operator {op!r} in Warnregel '{name}'.")
+    match = _WINDOW.match(window_text)
+    if not match:
+        raise ValueError(f"Ungültiges Fenster in Warnregel '{name}': {window_text!r}")
+    required = int(match.group(1))
+    window = int(match.group(2) or required)
+    if required < 1 or window < required:
+        raise ValueError(f"Ungültiges Fenster in Warnregel '{name}': {window_text!r}")
+    unit = "hour" if match.group(3).startswith("hour") else "day"
+    return AlertRule(name, event_type, path.split("."), predicate, required, window, unit, message)
+
+def load_rules():
+    """
+    Returns:
+        list: Die Regeln aus [Alerts] in config.ini (ungültige werden übersprungen).
+    """
+    config = settings.get_config()
+    rules = []
+    if not config.has_section('Alerts'):
+        return rules
+    for name, text in config.items('Alerts'):
+        if name in _OPTIONS:
+            continue
+        try:
+            rules.append(parse_rule(name, text))
+        except ValueError as e:
+            logger.warning("Ungültige Warnregel wird übersprungen: %s", e)
+    return rules
+
+def init_alert_store(db_path):
+    """
+    Erstellt die Tabelle 'alert_state' mit dem Fensterzustand jeder Regel.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS alert_state (
+                rule TEXT PRIMARY KEY,
+                buckets TEXT NOT NULL, -- JSON-Liste der zutreffenden Zeitabschnitte im Fenster
+                active INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT
+            )
+        ''')
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Anlegen der Tabelle 'alert_state': %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+class RuleState:
+    """
+    Der Zustand einer Regel: Die zutreffenden Zeitabschnitte im Fenster
+    (aufsteigend, ohne Duplikate) und ob die Regel gerade ausgelöst ist.
+    """
+
+    __slots__ = ("rule", "buckets", "active", "changed")
+
+    def __init__(self, rule, buckets=(), active=False):
+        self.rule = rule
+        self.buckets = deque(buckets)
+        self.active = active
+        self.changed = False
+
+    def update(self, bucket, matched):
+        """
+        Verarbeitet ein Event im Zeitabschnitt 'bucket'.
+
+        Returns:
+            bool: True, wenn die Regel durch dieses Event auslöst.
+        """
+        buckets = self.buckets
+        if matched:
+            if not buckets or bucket > buckets[-1]:
+                buckets.append(bucket)
+            elif bucket not in buckets:
+                # Verspätetes Event: selten, deshalb genügt das Einsortieren
+                if bucket <= buckets[-1] - self.rule.window:
+                    return False
+                items = list(buckets)
+                insort(items, bucket)
+                self.buckets = buckets = deque(items)
+            else:
+                return False
+            self.changed = True
+        elif not buckets:
+            return False
+        # Zeitabschnitte, die aus dem Fenster gefallen sind, entfernen
+        newest = max(bucket, buckets[-1]) if buckets else bucket
+        while buckets and buckets[0] <= newest - self.rule.window:
+            buckets.popleft()
+            self.changed = True
+        fired = len(buckets) >= self.rule.required
+        if fired and not self.active:
+            self.active = self.changed = True
+            return True
+        if not fired and self.active:
+            self.active = False
+            self.changed = True
+        return False
+
+def _bucket(timestamp, unit):
+    moment = datetime.fromisoformat(timestamp)
+    ordinal = moment.toordinal()
+    return ordinal * 24 + moment.hour if unit == "hour" else ordinal
+
+def _bucket_label(bucket, unit):
+    if unit == "hour":
+        return datetime.fromordinal(bucket // 24).replace(hour=bucket % 24).isoformat(timespec="minutes")
+    return datetime.fromordinal(bucket).date().isoformat()
+
+def _extract(value, path):
+    current = {"value": value}
+    for name in path:
+        current = current.get(name) if isinstance(current, dict) else None
+    return current
+
+def _sources(connections, db_path):
+    """
+    (Verbindung, Schema, Meta-Schlüssel des Lesezeigers) der Hauptdatenbank
+    und der aktiven Partitionen, die connect_event_groups angehängt hat.
+    """
+    sources = [(connections[0], "main", "alerts_cursor")]
+    active = {os.path.realpath(entry["path"]): entry["name"] for entry in partitions.list_partitions(db_path)
+              if entry["state"] == partitions.STATE_ACTIVE}
+    for conn in connections:
+        for _, schema, path in conn.execute('PRAGMA database_list').fetchall():
+            if schema not in ("main", "temp") and path and os.path.realpath(path) in active:
+                sources.append((conn, schema, f"alerts_cursor:{active[os.path.realpath(path)]}"))
+    return sources
+
+def evaluate_alerts(db_path, rules=None, batch_size=1000):
+    """
+    Wertet alle seit dem letzten Aufruf neu gespeicherten Events aus und
+    speichert ausgelöste Warnungen als 'alert'-Events.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        rules (list): Optional die Regeln (Standard: load_rules()).
+        batch_size (int): Anzahl der Events, die auf einmal gelesen werden.
+
+    Returns:
+        list: Die neu gespeicherten Warnungen (Event-Diktionäre).
+    """
+    rules = load_rules() if rules is None else rules
+    if not rules:
+        return []
+    rules_by_type = {}
+    for rule in rules:
+        rules_by_type.setdefault(rule.event_type, []).append(rule)
+    event_types = list(rules_by_type)
+    placeholders = ", ".join("?" for _ in event_types)
+
+    connections = []
+    alerts = []
+    try:
+        # Die aktiven Partitionen werden höchstens so viele auf einmal angehängt, wie SQLite erlaubt
+        if partitions.is_enabled():
+            connections = partitions.connect_event_groups(db_path)
+        else:
+            connections = [sqlite3.connect(db_path)]
+        conn = connections[0]
+        states = {rule.name: RuleState(rule) for rule in rules}
+        for name, buckets, active in conn.execute('SELECT rule, buckets, active FROM alert_state'):
+            if name in states:
+                states[name] = RuleState(states[name].rule, json.loads(buckets), bool(active))
+        cursors = {}
+        for source, schema, cursor_key in _sources(connections, db_path):
+            row = conn.execute('SELECT value FROM meta WHERE key = ?', (cursor_key,)).fetchone()
+            last_id = int(row[0]) if row else 0
+            # Obergrenze vorab festlegen, damit währenddessen geschriebene Events beim nächsten Mal folgen
+            newest = source.execute(f'SELECT max(id) FROM {schema}.events').fetchone()[0] or 0
+            # Nur Events nach dem Lesezeiger, über den Primärschlüssel gesucht
+            cursor = source.execute(
+                f'SELECT id, timestamp, event_type, value FROM {schema}.events '
+                f'WHERE id > ? AND id <= ? AND event_type IN ({placeholders}) ORDER BY id',
+                (last_id, newest, *event_types)
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for _, timestamp, event_type, value in rows:
+                    value = database.decode_value(value)
+                    for rule in rules_by_type[event_type]:
+                        try:
+                            bucket = _bucket(timestamp, rule.unit)
+                        except ValueError:
+                            continue
+                        field = _extract(value, rule.path)
+                        state = states[rule.name]
+                        if state.update(bucket, field is not None and rule.predicate(field)):
+                            alerts.append(_alert_event(rule, state, timestamp, field))
+            # Auch Events anderer Typen müssen nicht erneut gelesen werden
+            cursors[cursor_key] = max(last_id, newest)
+
+        now = datetime.now().isoformat()
+        with conn:
+            database.write_events(conn, alerts)
+            conn.executemany('''
+                INSERT INTO alert_state (rule, buckets, active, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (rule) DO UPDATE SET
+                    buckets = excluded.buckets, active = excluded.active, updated_at = excluded.updated_at
+            ''', [(name, json.dumps(list(state.buckets)), int(state.active), now)
+                  for name, state in states.items() if state.changed])
+            for key, value in cursors.items():
+                database.write_meta(conn, key, value)
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Auswerten der Warnregeln: %s", e)
+        return []
+    finally:
+        for conn in connections:
+            conn.close()
+    for alert in alerts:
+        # Jede ausgelöste Regel soll erscheinen, daher ohne Begrenzung gleicher Meldungen
+        logger.warning("WARNUNG (%s): %s", alert['value']['rule'], alert['value']['message'],
+                       extra={"rule": alert['value']['rule'], "rate_limit": False})
+    return alerts
+
+def _alert_event(rule, state, timestamp, field):
+    first = _bucket_label(state.buckets[0], rule.unit)
+    last = _bucket_label(state.buckets[-1], rule.unit)
+    details = {
+        "rule": rule.name,
+        "count": len(state.buckets),
+        "window": rule.window,
+        "unit": rule.unit,
+        "value": field,
+        "first": first,
+        "last": last,
+    }
+    try:
+        message = rule.message.format(**details)
+    except (KeyError, IndexError, ValueError):
+        message = rule.message
+    return {
+        "timestamp": timestamp,
+        "source_module": SOURCE_MODULE,
+        "event_type": ALERT_EVENT_TYPE,
+        "value": dict(details, message=message),
+    }
+
+def run_alerts(db_path):
+    """Wertet die Warnregeln aus, sofern sie in [Alerts] aktiviert sind."""
+    if not settings.get_config().getboolean('Alerts', 'enabled', fallback=True):
+        return []
+    return evaluate_alerts(db_path)
@@ -0,0 +1,351 @@
+# analytics.py - Zeitlich ausgerichtete Auswertungen über mehrere Module
+#
+# Eine Zeitreihe ('Serie') ist ein Zahlenwert eines Event-Typs, verdichtet pro
+# Tag oder Stunde, z.B. die mittlere Niederschlagswahrscheinlichkeit aus
+# 'weather_forecast' oder die Anzahl der 'youtube_video_watched'-Events.
+# Die Werte werden in SQLite aggregiert (über die Wert-Spalten aus
+# database.VALUE_COLUMNS, sonst json_extract); für Tage, deren Events bereits
+# von der Aufbewahrung gelöscht wurden, kommen sie aus 'daily_rollups'
+# (siehe retention.py).
+#
+# Mehrere Serien werden per As-of-Join auf die Zeitabschnitte der ersten Serie
+# ausgerichtet: Zu jedem Abschnitt gilt der letzte Wert der anderen Serie, der
+# nicht später liegt (höchstens 'tolerance' Abschnitte zurück). Da alle Serien
+# nach Zeit sortiert sind, genügt ein gemeinsamer Durchlauf (Sort-Merge) in
+# O(n + m) statt verschachtelter Schleifen.
+#
+# Aufruf z.B.: python main.py report youtube_videos precipitation_probability --group-by precipitation_probability --bins 0,30,60,101
+
+import logging
+import math
+import re
+import sqlite3
+from datetime import date
+
+import database
+import partitions
+import retention
+
+logger = logging.getLogger(__name__)
+
+# Vordefinierte Serien: Name -> (event_type, JSON-Pfad oder '' für die Anzahl, Aggregation)
+SERIES = {
+    "temperature": ("weather_forecast", "$.forecast.temperature_celsius", "avg"),
+    "precipitation_probability": ("weather_forecast", "$.forecast.precipitation_probability_percent", "avg"),
+    "wind_speed": ("weather_forecast", "$.forecast.wind_speed_kmh", "max"),
+    "grass_pollen": ("pollen_forecast_daily", "$.pollen_types.grass.level_numeric", "max"),
+    "birch_pollen": ("pollen_forecast_daily", "$.pollen_types.birch.level_numeric", "max"),
+    "youtube_videos": ("youtube_video_watched", "", "count"),
+    "appointments": ("weekly_appointment_reminder", "", "count"),
+    "shopping_lists": ("shopping_list_processed", "", "count"),
+}
+
+AGGREGATIONS = ("avg", "sum", "min", "max", "count")
+BUCKETS = ("day", "hour")
+
+def parse_series(spec):
+    """
+    Liest eine Serie: entweder ein Name aus SERIES oder
+    'event_type:JSON-Pfad:Aggregation' (Pfad leer für die Anzahl), z.B.
+    'pollen_forecast_daily:$.pollen_types.hazel.level_numeric:max'.
+
+    Returns:
+        tuple: (event_type, Pfad, Aggregation)
+
+    Raises:
+        ValueError: Bei unbekanntem Namen oder ungültiger Angabe.
+    """
+    if spec in SERIES:
+        return SERIES[spec]
+    parts = spec.split(":")
+    if len(parts) != 3:
+        raise ValueError(f"Unbekannte Serie '{spec}' (erwartet: {', '.join(SERIES)} oder 'event_type:pfad:aggregation').")
+    event_type, path, aggregation = (part.strip() for part in parts)
+    # Typ und Pfad werden in die Abfrage eingesetzt (siehe _event_buckets)
+    if not re.fullmatch(r"\w+", event_type):
+        raise ValueError(f"Ungültiger Event-Typ '{event_type}'.")
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"Unbekannte Aggregation '{aggregation}' (erlaubt: {', '.join(AGGREGATIONS)}).")
+    if path and (not path.startswith("$") or "'" in path):
+        raise ValueError(f"Ungültiger JSON-Pfad '{path}' (muss mit '$' beginnen).")
+    if not path and aggregation != "count":
+        raise ValueError("Ohne JSON-Pfad ist nur 'count' möglich.")
+    return event_type, path, aggregation
+
+def bucket_key(moment, bucket):
+    """
+    Wandelt einen Zeitpunkt (ISO 8601) in eine fortlaufende Nummer des
+    Zeitabschnitts um, sodass benachbarte Abschnitte um 1 auseinanderliegen.
+    """
+    ordinal = date.fromisoformat(moment[:10]).toordinal()
+    if bucket == "day":
+        return ordinal
+    return ordinal * 24 + int(moment[11:13] or 0)
+
+def bucket_label(key, bucket):
+    if bucket == "day":
+        return date.fromordinal(key).isoformat()
+    return f"{date.fromordinal(key // 24).isoformat()}T{key % 24:02d}"
+
+def _value_column(event_type, path):
+    """Die Wert-Spalte für den Pfad, falls deklariert (siehe database.VALUE_COLUMNS)."""
+    for column, (column_path, _) in database.VALUE_COLUMNS.get(event_type, {}).items():
+        if column_path == path:
+            return column
+    return None
+
+def _event_buckets(db_path, event_type, path, bucket, start=None, end=None):
+    """Anzahl, Summe, Minimum und Maximum pro Zeitabschnitt aus den gespeicherten Events."""
+    width = 10 if bucket == "day" else 13
+    if not path:
+        value = "1"
+    else:
+        value = _value_column(event_type, path) or f"CASE WHEN json_valid(value) THEN json_extract(value, '{path}') END"
+    clauses, params = [f"event_type = '{event_type}'"], []
+    if start:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    query = f'''
+        SELECT substr(timestamp, 1, {width}) AS bucket, count(v), sum(v), min(v), max(v)
+        FROM (SELECT timestamp, {value} AS v FROM all_events WHERE {' AND '.join(clauses)})
+        WHERE v IS NOT NULL
+        GROUP BY bucket ORDER BY bucket
+    '''
+    buckets = []
+    try:
+        # Bei vielen Partitionen liefert jede Verbindung eigene Zeilen für denselben Abschnitt
+        for row in partitions.iter_event_rows(db_path, query, params, start, end, key=lambda row: row[0]):
+            row = (bucket_key(row[0], bucket), *row[1:])
+            if buckets and buckets[-1][0] == row[0]:
+                buckets[-1:] = _merge_buckets(buckets[-1:], [row])
+            else:
+                buckets.append(row)
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Lesen der Serie '%s:%s': %s", event_type, path, e)
+        return []
+    return buckets
+
+def _rollup_buckets(db_path, event_type, path, start=None, end=None):
+    """Tageswerte bereits gelöschter Events aus 'daily_rollups' (über den QueryCache)."""
+    # json_tree schreibt Schlüssel mit Sonderzeichen in Anführungszeichen, z.B. $.forecast."temperature_celsius"
+    query = '''
+        SELECT day, sum(count) AS count, sum(sum) AS sum, min(min) AS min, max(max) AS max
+        FROM daily_rollups
+        WHERE event_type = ? AND replace(path, '"', '') = ? AND day >= ? AND day < ?
+        GROUP BY day ORDER BY day
+    '''
+    params = (event_type, path or retention.EVENT_COUNT_PATH, (start or "")[:10], (end or "9999-12-31")[:10])
+    try:
+        rows = database.cached_query(db_path, query, params)
+    except sqlite3.Error as e:
+        # z.B. noch keine 'daily_rollups'-Tabelle, wenn die Aufbewahrung nie lief
+        logger.info("Keine Tageswerte aus 'daily_rollups' für '%s': %s", event_type, e)
+        return []
+    return [(bucket_key(row["day"], "day"), row["count"], row["sum"], row["min"], row["max"]) for row in rows]
+
+def _merge_buckets(left, right):
+    """Fügt zwei nach Abschnitt sortierte Listen von (Abschnitt, Anzahl, Summe, Min, Max) zusammen."""
+    merged, i, j = [], 0, 0
+    while i < len(left) or j < len(right):
+        if j >= len(right) or (i < len(left) and left[i][0] < right[j][0]):
+            merged.append(left[i])
+            i += 1
+        elif i >= len(left) or right[j][0] < left[i][0]:
+            merged.append(right[j])
+            j += 1
+        else:
+            a, b = left[i], right[j]
+            merged.append((a[0], (a[1] or 0) + (b[1] or 0), _add(a[2], b[2]), _pick(min, a[3], b[3]), _pick(max, a[4], b[4])))
+            i += 1
+            j += 1
+    return merged
+
+def _add(a, b):
+    return b if a is None else a if b is None else a + b
+
+def _pick(function, a, b):
+    return b if a is None else a if b is None else function(a, b)
+
+def load_series(db_path, spec, bucket="day", start=None, end=None):
+    """
+    Lädt eine Serie als nach Zeit sortierte Liste.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        spec (str): Die Serie (siehe parse_series).
+        bucket (str): 'day' oder 'hour'.
+        start (str): Optional Beginn des Zeitraums (ISO 8601).
+        end (str): Optional Ende des Zeitraums (ISO 8601, exklusiv).
+
+    Returns:
+        list: (Abschnitt, Wert)-Tupel, der Abschnitt als Nummer (siehe bucket_key).
+    """
+    event_type, path, aggregation = parse_series(spec)
+    rows = _event_buckets(db_path, event_type, path, bucket, start, end)
+    if bucket == "day":
+        # Verdichtete Tage stehen nur noch in 'daily_rollups'
+        rows = _merge_buckets(rows, _rollup_buckets(db_path, event_type, path, start, end))
+    series = []
+    for key, count, total, minimum, maximum in rows:
+        if aggregation == "count":
+            value = count
+        elif aggregation == "sum":
+            value = total
+        elif aggregation == "min":
+            value = minimum
+        elif aggregation == "max":
+            value = maximum
+        else:
+            value = total / count if count else None
+        series.append((key, value))
+    return series
+
+def asof_join(left, right, tolerance=None):
+    """
+    Ordnet jedem Abschnitt von 'left' den letzten Wert von 'right' zu, der
+    nicht später liegt, in einem gemeinsamen Durchlauf über beide Serien.
+
+    Args:
+        left (list): Nach Abschnitt sortierte (Abschnitt, Wert)-Tupel.
+        right (list): Nach Abschnitt sortierte (Abschnitt, Wert)-Tupel.
+        tolerance (int): Optional höchstens so viele Abschnitte zurück.
+
+    Returns:
+        list: (Abschnitt, Wert aus left, Wert aus right oder None)-Tupel.
+    """
+    joined, j, current = [], 0, None
+    for key, value in left:
+        while j < len(right) and right[j][0] <= key:
+            current = right[j]
+            j += 1
+        if current is not None and (tolerance is None or key - current[0] <= tolerance):
+            joined.append((key, value, current[1]))
+        else:
+            joined.append((key, value, None))
+    return joined
+
+def align(series_list, tolerance=None):
+    """
+    Richtet mehrere Serien auf die Abschnitte der ersten aus.
+
+    Returns:
+        list: (Abschnitt, Wert der ersten Serie, Wert der zweiten, ...)-Tupel.
+    """
+    if not series_list:
+        return []
+    rows = [[key, value] for key, value in series_list[0]]
+    for other in series_list[1:]:
+        for row, (_, _, matched) in zip(rows, asof_join(series_list[0], other, tolerance)):
+            row.append(matched)
+    return [tuple(row) for row in rows]
+
+def correlation(pairs):
+    """
+    Pearson-Korrelation über die Paare, in denen beide Werte vorhanden sind.
+
+    Returns:
+        tuple: (Korrelation oder None, Anzahl der Paare)
+    """
+    pairs = [(x, y) for x, y in pairs if x is not None and y is not None]
+    n = len(pairs)
+    if n < 2:
+        return None, n
+    mean_x = sum(x for x, _ in pairs) / n
+    mean_y = sum(y for _, y in pairs) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in pairs)
+    var_x = sum((x - mean_x) ** 2 for x, _ in pairs)
+    var_y = sum((y - mean_y) ** 2 for _, y in pairs)
+    if var_x == 0 or var_y == 0:
+        return None, n
+    return cov / math.sqrt(var_x * var_y), n
+
+def grouped_summary(pairs, bins):
+    """
+    Fasst die Werte einer Serie nach Klassen einer anderen zusammen, z.B.
+    YouTube-Videos pro Tag nach Niederschlagswahrscheinlichkeit.
+
+    Args:
+        pairs (list): (Wert, Gruppierungswert)-Tupel.
+        bins (list): Aufsteigende Klassengrenzen, z.B. [0, 30, 60, 101].
+
+    Returns:
+        list: (Untergrenze, Obergrenze, Anzahl, Mittelwert, Minimum, Maximum)-Tupel pro Klasse.
+    """
+    groups = [[] for _ in bins[:-1]]
+    for value, group_value in pairs:
+        if value is None or group_value is None:
+            continue
+        for i in range(len(bins) - 1):
+            if bins[i] <= group_value < bins[i + 1]:
+                groups[i].append(value)
+                break
+    return [
+        (bins[i], bins[i + 1], len(values),
+         sum(values) / len(values) if values else None,
+         min(values) if values else None, max(values) if values else None)
+        for i, values in enumerate(groups)
+    ]
+
+def _format(value):
+    if value is None:
+        return "-"
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+def report(db_path, specs, bucket="day", start=None, end=None, tolerance=None, group_by=None, bins=None, show_rows=False):
+    """
+    Gibt einen Bericht über mehrere Serien aus: Korrelation der ersten Serie
+    mit jeder weiteren und optional eine Zusammenfassung der ersten Serie
+    nach Klassen der Serie 'group_by'.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        specs (list): Die Serien (siehe parse_series); die erste gibt die Abschnitte vor.
+        bucket (str): 'day' oder 'hour'.
+        start (str): Optional Beginn des Zeitraums (ISO 8601).
+        end (str): Optional Ende des Zeitraums (ISO 8601, exklusiv).
+        tolerance (int): Optional höchstens so viele Abschnitte zurück beim As-of-Join.
+        group_by (str): Optional eine der Serien, nach der gruppiert wird.
+        bins (list): Klassengrenzen für 'group_by'.
+        show_rows (bool): Auch die ausgerichteten Zeilen ausgeben.
+
+    Returns:
+        list: Die ausgerichteten Zeilen (siehe align).
+    """
+    if group_by and group_by not in specs:
+        specs = list(specs) + [group_by]
+    rows = align([load_series(db_path, spec, bucket, start, end) for spec in specs], tolerance)
+    print(f"Bericht über {len(rows)} Abschnitte ({bucket}), Basis: '{specs[0]}'.")
+    if show_rows:
+        print("\t".join(["abschnitt"] + list(specs)))
+        for key, *values in rows:
+            print("\t".join([bucket_label(key, bucket)] + [_format(value) for value in values]))
+    for index, spec in enumerate(specs[1:], start=1):
+        value, n = correlation([(row[1], row[index + 1]) for row in rows])
+        print(f"Korrelation '{specs[0]}' ~ '{spec}': {_format(value)} (n={n})")
+    if group_by:
+        index = specs.index(group_by)
+        print(f"'{specs[0]}' nach '{group_by}':")
+        for low, high, count, mean, minimum, maximum in grouped_summary([(row[1], row[index + 1]) for row in rows], bins):
+            print(f"  [{low}, {high}): n={count}, Mittel={_format(mean)}, Min={_format(minimum)}, Max={_format(maximum)}")
+    return rows
+
+def add_arguments(parser):
+    """Fügt die Optionen des Report-Befehls zu einem argparse-Parser hinzu."""
+    parser.add_argument("series", nargs="+",
+                        help=f"Serien ({', '.join(SERIES)} oder 'event_type:pfad:aggregation'); die erste gibt die Abschnitte vor.")
+    parser.add_argument("--bucket", choices=BUCKETS, default="day", help="Zeitabschnitt (Standard: day).")
+    parser.add_argument("--start", help="Beginn des Zeitraums (ISO 8601).")
+    parser.add_argument("--end", help="Ende des Zeitraums, ausschließlich (ISO 8601).")
+    parser.add_argument("--tolerance", type=int, help="As-of-Join höchstens so viele Abschnitte zurück.")
+    parser.add_argument("--group-by", help="Erste Serie nach Klassen dieser Serie zusammenfassen.")
+    parser.add_argument("--bins", default="0,25,50,75,101", help="Klassengrenzen für --group-by (Standard: 0,25,50,75,101).")
+    parser.add_argument("--rows", action="store_true", help="Die ausgerichteten Zeilen ausgeben.")
+
+def run_from_args(db_path, args):
+    """Erstellt den Bericht mit den von add_arguments() definierten Optionen."""
+    bins = sorted(float(value) for value in args.bins.split(","))
+    return report(db_path, args.series, args.bucket, args.start, args.end, args.tolerance,
+                  args.group_by, bins, args.rows)
@@ -0,0 +1,268 @@
+# archive.py - Archiv der rohen API-Antworten und erneute Auswertung
+#
+# Die Antworten der Wetter- und Pollen-API werden unverändert, komprimiert
+# (lzma oder zlib) in der Tabelle 'raw_responses' gespeichert, einmal pro
+# Inhalt (SHA-256 des Antworttexts): Liefert die API bei mehreren Abrufen
+# dieselbe Antwort, kommt nur ein Eintrag im Abrufprotokoll 'fetch_log' hinzu.
+# Das Protokoll hält Modul, URL, Zeitpunkt, HTTP-Status und den Kontext des
+# Abrufs (z.B. Ort und abgefragte Tage) fest.
+#
+# Wird die Auswertung eines Moduls korrigiert, bildet 'main.py reprocess' die
+# Events aus den archivierten Antworten neu, ohne Netzwerkzugriff: Die
+# parse_response()-Funktion des Moduls läuft parallel in mehreren Prozessen,
+# geschrieben wird im aufrufenden Prozess. Da nur Events mit natürlichem
+# Schlüssel neu geschrieben werden, ersetzen sie die bisherigen Events (die
+# alten Werte bleiben in 'event_revisions' erhalten).
+
+import hashlib
+import importlib
+import json
+import logging
+import lzma
+import sqlite3
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import database
+import partitions
+import settings
+
+logger = logging.getLogger(__name__)
+
+CODECS = {
+    "lzma": (lzma.compress, lzma.decompress),
+    "zlib": (lambda data: zlib.compress(data, 9), zlib.decompress),
+}
+
+_db_path = None
+_initialized = set()
+
+def is_enabled():
+    return settings.get_config().getboolean('Archive', 'enabled', fallback=True)
+
+def init_archive(db_path):
+    """
+    Erstellt die Tabellen 'raw_responses' und 'fetch_log' und legt fest, in
+    welcher Datenbank die Antworten archiviert werden.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    global _db_path
+    _db_path = db_path
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS raw_responses (
+                content_hash TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                body BLOB NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS fetch_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_module TEXT NOT NULL,
+                url TEXT NOT NULL,
+                fetched_at TEXT NOT NULL,
+                status INTEGER,
+                content_hash TEXT NOT NULL REFERENCES raw_responses (content_hash),
+                context TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_fetch_log_module ON fetch_log (source_module, fetched_at)')
+        conn.commit()
+        _initialized.add(db_path)
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Anlegen der Archiv-Tabellen: %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+def store_response(source_module, url, body, status=None, context=None, fetched_at=None):
+    """
+    Archiviert eine API-Antwort. Ein bereits archivierter Inhalt wird nicht
+    erneut komprimiert oder gespeichert, nur der Abruf protokolliert.
+
+    Args:
+        source_module (str): Das Modul, dessen Abruf archiviert wird.
+        url (str): Die aufgerufene URL (samt Abfrageparametern).
+        body (bytes): Der unveränderte Antworttext.
+        status (int): Optional der HTTP-Status.
+        context (dict): Optional Argumente für parse_response() des Moduls,
+                        z.B. {"location": "Ulm", "dates": ["2024-06-01"]}.
+        fetched_at (str): Optional der Abrufzeitpunkt (Standard: jetzt).
+
+    Returns:
+        str: Der Inhalts-Hash oder None, wenn nicht archiviert wurde.
+    """
+    if not is_enabled():
+        return None
+    db_path = _db_path or settings.get_db_path()
+    if db_path not in _initialized:
+        init_archive(db_path)
+    content_hash = hashlib.sha256(body).hexdigest()
+    codec = settings.get_config().get('Archive', 'codec', fallback='lzma').strip()
+    if codec not in CODECS:
+        codec = "lzma"
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path, timeout=10)
+        with conn:
+            known = conn.execute(
+                'SELECT 1 FROM raw_responses WHERE content_hash = ?', (content_hash,)
+            ).fetchone()
+            if known is None:
+                conn.execute(
+                    'INSERT OR IGNORE INTO raw_responses (content_hash, codec, size, body) VALUES (?, ?, ?, ?)',
+                    (content_hash, codec, len(body), CODECS[codec][0](body))
+                )
+            conn.execute('''
+                INSERT INTO fetch_log (source_module, url, fetched_at, status, content_hash, context)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (source_module, url, fetched_at or datetime.now().isoformat(), status, content_hash,
+                  json.dumps(context or {}, ensure_ascii=False)))
+        return content_hash
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Archivieren der Antwort für '%s': %s", source_module, e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def iter_fetches(db_path, source_module, start=None, end=None, batch_size=100):
+    """
+    Liefert die archivierten Abrufe eines Moduls in zeitlicher Reihenfolge,
+    in Blöcken samt komprimiertem Antworttext.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        source_module (str): Der Modulname.
+        start (str): Optional nur Abrufe ab diesem Zeitpunkt (ISO 8601).
+        end (str): Optional nur Abrufe vor diesem Zeitpunkt (ISO 8601).
+        batch_size (int): Abrufe pro Block.
+
+    Yields:
+        list: (fetched_at, codec, komprimierter Text, Kontext)-Tupel.
+    """
+    conditions, params = ["f.source_module = ?"], [source_module]
+    if start:
+        conditions.append("f.fetched_at >= ?")
+        params.append(start)
+    if end:
+        conditions.append("f.fetched_at < ?")
+        params.append(end)
+    query = f'''
+        SELECT f.id, f.fetched_at, r.codec, r.body, f.context
+        FROM fetch_log f JOIN raw_responses r ON r.content_hash = f.content_hash
+        WHERE {" AND ".join(conditions)} AND f.id > ?
+        ORDER BY f.id LIMIT ?
+    '''
+    last_id = 0
+    while True:
+        conn = None
+        try:
+            conn = sqlite3.connect(db_path)
+            rows = conn.execute(query, (*params, last_id, batch_size)).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Fehler beim Lesen des Abrufprotokolls: %s", e)
+            return
+        finally:
+            if conn:
+                conn.close()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [(fetched_at, codec, body, json.loads(context or "{}")) for _, fetched_at, codec, body, context in rows]
+
+def parse_fetches(source_module, fetches):
+    """
+    Bildet die Events eines Blocks archivierter Abrufe über parse_response()
+    des Moduls (läuft im Prozess-Pool). Zurückgegeben werden nur Events mit
+    natürlichem Schlüssel, da nur sie beim Schreiben die bisherigen ersetzen.
+
+    Args:
+        source_module (str): Der Modulname.
+        fetches (list): Siehe iter_fetches.
+
+    Returns:
+        tuple: (Liste der Event-Diktionäre, Anzahl verworfener Events)
+    """
+    module = importlib.import_module(f"modules.{source_module}")
+    natural_keys = module.MODULE_INFO.get("natural_keys", {})
+    events, skipped = [], 0
+    for fetched_at, codec, body, context in fetches:
+        try:
+            response = json.loads(CODECS[codec][1](body))
+        except ValueError:
+            skipped += 1
+            continue
+        for event in module.parse_response(response, fetched_at=fetched_at, **context):
+            fields = natural_keys.get(event["event_type"])
+            if not fields:
+                skipped += 1
+                continue
+            event["source_module"] = source_module
+            event["natural_key"] = database.natural_key(event, fields)
+            events.append(event)
+    return events, skipped
+
+def reprocess(db_path, source_module, start=None, end=None, workers=None, batch_size=100):
+    """
+    Bildet die Events eines Moduls aus den archivierten Antworten neu und
+    schreibt sie; bestehende Events mit gleichem natürlichem Schlüssel werden
+    aktualisiert. Spätere Abrufe überschreiben frühere.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        source_module (str): Der Modulname, z.B. 'weather_tracker'.
+        start (str): Optional nur Abrufe ab diesem Zeitpunkt (ISO 8601).
+        end (str): Optional nur Abrufe vor diesem Zeitpunkt (ISO 8601).
+        workers (int): Anzahl paralleler Prozesse (Standard aus [Archive]).
+        batch_size (int): Abrufe pro Aufgabe im Prozess-Pool.
+
+    Returns:
+        dict: Anzahl der ausgewerteten Abrufe, geschriebenen und verworfenen Events.
+    """
+    module = importlib.import_module(f"modules.{source_module}")
+    if not callable(getattr(module, "parse_response", None)):
+        raise ValueError(f"Modul '{source_module}' hat keine parse_response()-Funktion.")
+    workers = workers or settings.get_config().getint('Archive', 'workers', fallback=4)
+    summary = {"fetches": 0, "events": 0, "skipped": 0}
+    with ProcessPoolExecutor(max_workers=max(workers, 1)) as pool:
+        batches = iter_fetches(db_path, source_module, start, end, batch_size)
+        pending = []
+        # Höchstens zwei Blöcke pro Prozess gleichzeitig, damit das Archiv nicht vollständig im Speicher liegt
+        for batch in batches:
+            pending.append((len(batch), pool.submit(parse_fetches, source_module, batch)))
+            if len(pending) >= 2 * max(workers, 1):
+                _write_result(db_path, pending.pop(0), summary)
+        while pending:
+            _write_result(db_path, pending.pop(0), summary)
+    logger.info("Neu ausgewertet: %s Abrufe von '%s', %s Events geschrieben, %s ohne Schlüssel verworfen.",
+                summary['fetches'], source_module, summary['events'], summary['skipped'])
+    return summary
+
+def _write_result(db_path, item, summary):
+    # Die Ergebnisse werden in der Reihenfolge der Abrufe geschrieben
+    num_fetches, future = item
+    events, skipped = future.result()
+    summary["fetches"] += num_fetches
+    summary["skipped"] += skipped
+    if events:
+        for group in partitions.group_events(events):
+            summary["events"] += partitions.insert_events(db_path, group)
+
+def add_arguments(parser):
+    """Fügt die Optionen des Reprocess-Befehls zu einem argparse-Parser hinzu."""
+    parser.add_argument("module", help="Modulname, z.B. weather_tracker.")
+    parser.add_argument("--start", help="Nur Abrufe ab diesem Zeitpunkt (ISO 8601).")
+    parser.add_argument("--end", help="Nur Abrufe vor diesem Zeitpunkt (ISO 8601).")
+    parser.add_argument("--workers", type=int, help="Anzahl paralleler Prozesse.")
+
+def run_from_args(db_path, args):
+    """Führt die erneute Auswertung mit den von add_arguments() definierten Optionen aus."""
+    return reprocess(db_path, args.module, args.start, args.end, args.workers)
@@ -0,0 +1,319 @@
+# backfill.py - Nachträgliches Laden historischer Wetter- und Pollendaten
+#
+# Ein Zeitraum wird pro Quelle und Ort in Abschnitte von 'chunk_days' Tagen
+# zerlegt, die parallel (mit begrenzter Anfragerate) über die
+# start_date/end_date-Abfragen der Open-Meteo-APIs geladen werden. Die Events
+# werden mit denselben Funktionen und natürlichen Schlüsseln wie im
+# Live-Betrieb gebildet und ergänzen nur fehlende Events: Ein vorhandenes
+# Event (z.B. aus dem Live-Betrieb, mit Niederschlagswahrscheinlichkeit) mit
+# demselben Schlüssel bleibt unverändert, ein erneutes Laden doppelt nichts. Erledigte
+# Abschnitte stehen in der Tabelle 'backfill_progress'; ein abgebrochener
+# Backfill setzt beim nächsten Aufruf mit den fehlenden Abschnitten fort.
+# Geladene Tage gelten danach als abgedeckt (siehe gaps.py).
+
+import importlib
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+import database
+import gaps
+import partitions
+import settings
+
+logger = logging.getLogger(__name__)
+
+# Quelle -> (Modul, Abruf-Funktion, Funktion, die aus 'hourly' Events bildet)
+SOURCES = {
+    "weather": ("weather_tracker", "get_weather_data", "build_forecast_events"),
+    "pollen": ("pollen_tracker", "get_pollen_data", "build_daily_events"),
+}
+
+def _source(source):
+    """Das Modul samt Abruf- und Event-Funktion; die Module werden erst hier importiert."""
+    module_name, fetch, build = SOURCES[source]
+    module = importlib.import_module(f"modules.{module_name}")
+    return module, getattr(module, fetch), getattr(module, build)
+
+def module_location(source):
+    """
+    Returns:
+        tuple: (Name, Breitengrad, Längengrad) des Orts, für den das Modul der
+               Quelle bei seinen Läufen abruft (LOCATION im Modul).
+    """
+    return tuple(_source(source)[0].LOCATION)
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+def load_locations():
+    """
+    Liest die Orte aus 'locations' in [Backfill], z.B. "Ulm: 48.4011, 9.9876; Berlin: 52.52, 13.41".
+
+    Returns:
+        list: (Name, Breitengrad, Längengrad)-Tupel.
+    """
+    text = settings.get_config().get('Backfill', 'locations', fallback='Ulm: 48.4011, 9.9876')
+    locations = []
+    for entry in text.replace("\n", ";").split(";"):
+        if not entry.strip():
+            continue
+        name, _, coordinates = entry.partition(":")
+        latitude, longitude = (float(part) for part in coordinates.split(","))
+        locations.append((name.strip(), latitude, longitude))
+    return locations
+
+def split_range(start_date, end_date, chunk_days):
+    """
+    Zerlegt einen Zeitraum in Abschnitte von höchstens 'chunk_days' Tagen.
+
+    Args:
+        start_date (str): Erster Tag (YYYY-MM-DD).
+        end_date (str): Letzter Tag (YYYY-MM-DD, einschließlich).
+        chunk_days (int): Maximale Länge eines Abschnitts.
+
+    Returns:
+        list: (erster Tag, letzter Tag)-Paare als Strings.
+    """
+    first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    chunks = []
+    while first <= last:
+        chunk_end = min(first + timedelta(days=chunk_days - 1), last)
+        chunks.append((first.isoformat(), chunk_end.isoformat()))
+        first = chunk_end + timedelta(days=1)
+    return chunks
+
+def init_backfill_store(db_path):
+    """
+    Erstellt die Tabelle 'backfill_progress' mit dem Stand jedes Abschnitts.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS backfill_progress (
+                source TEXT NOT NULL,
+                location TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                event_count INTEGER,
+                error TEXT,
+                updated_at TEXT,
+                PRIMARY KEY (source, location, start_date, end_date)
+            )
+        ''')
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Anlegen der Tabelle 'backfill_progress': %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+def _done_chunks(db_path):
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        return set(conn.execute(
+            'SELECT source, location, start_date, end_date FROM backfill_progress WHERE status = ?',
+            (STATUS_DONE,)
+        ))
+    finally:
+        if conn:
+            conn.close()
+
+def _record_progress(db_path, task, status, event_count=None, error=None):
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute('''
+                INSERT INTO backfill_progress (source, location, start_date, end_date, status, event_count, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (source, location, start_date, end_date) DO UPDATE SET
+                    status = excluded.status, event_count = excluded.event_count,
+                    error = excluded.error, updated_at = excluded.updated_at
+            ''', (*task, status, event_count, error, datetime.now().isoformat()))
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Speichern des Backfill-Fortschritts: %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+class RateLimiter:
+    """
+    Begrenzt die Anfragen aller Threads auf 'requests_per_second', indem
+    jeder Aufruf von wait() einen eigenen Startzeitpunkt zugeteilt bekommt.
+    """
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def _fetch_chunk(task, coordinates, limiter, retries):
+    """Lädt einen Abschnitt und bildet die Events; None, wenn alle Versuche scheitern."""
+    source, location, start_date, end_date = task
+    _, fetch, build = _source(source)
+    latitude, longitude = coordinates
+    dates = [day.isoformat() for day in _days(start_date, end_date)]
+    # Archivierte Antworten lassen sich später ohne erneuten Abruf auswerten (siehe archive.py)
+    context = {"location": location, "dates": dates}
+    delay = 2.0
+    for attempt in range(retries + 1):
+        limiter.wait()
+        response = fetch(latitude, longitude, start_date=start_date, end_date=end_date, archive_context=context)
+        if response and 'hourly' in response:
+            return build(response['hourly'], location, dates=set(dates))
+        if attempt < retries:
+            time.sleep(delay)
+            delay *= 2
+    return None
+
+def _days(start_date, end_date):
+    day, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    while day <= last:
+        yield day
+        day += timedelta(days=1)
+
+def _prepare(source, events):
+    """Ergänzt Modulname und natürlichen Schlüssel wie main.prepare_event."""
+    module = _source(source)[0]
+    source_module = SOURCES[source][0]
+    natural_keys = module.MODULE_INFO.get("natural_keys", {})
+    for event in events:
+        event["source_module"] = source_module
+        fields = natural_keys.get(event["event_type"])
+        if fields:
+            event["natural_key"] = database.natural_key(event, fields)
+    return events
+
+def fetch_tasks(db_path, tasks, workers=4, requests_per_second=2.0, retries=2, locations=None):
+    """
+    Lädt Abschnitte parallel und schreibt ihre Events; der Fortschritt jedes
+    Abschnitts wird in 'backfill_progress' gespeichert. Geschrieben wird nur
+    im aufrufenden Thread.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        tasks (list): (Quelle, Ort, erster Tag, letzter Tag)-Tupel.
+        workers (int): Anzahl paralleler Anfragen.
+        requests_per_second (float): Maximale Anfragerate (0 = unbegrenzt).
+        retries (int): Wiederholungen pro Abschnitt bei Fehlern.
+        locations (list): Optional die Orte der Abschnitte als (Name, Breitengrad,
+                          Längengrad)-Tupel (Standard: load_locations()).
+
+    Returns:
+        dict: Anzahl der erledigten und fehlgeschlagenen Abschnitte und der geschriebenen Events.
+    """
+    locations = load_locations() if locations is None else locations
+    coordinates = {name: (latitude, longitude) for name, latitude, longitude in locations}
+    summary = {"done": 0, "failed": 0, "events": 0}
+    if not tasks:
+        return summary
+    limiter = RateLimiter(requests_per_second)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = {
+            pool.submit(_fetch_chunk, task, coordinates[task[1]], limiter, retries): task
+            for task in tasks if task[1] in coordinates
+        }
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                events = future.result()
+            except Exception as e:
+                events, error = None, str(e)
+            else:
+                error = "Keine Daten erhalten"
+            if events is None:
+                _record_progress(db_path, task, STATUS_FAILED, error=error)
+                summary["failed"] += 1
+                logger.warning("Backfill %s %s %s..%s fehlgeschlagen: %s", task[0], task[1], task[2], task[3], error)
+                continue
+            counts = [partitions.insert_events(db_path, group, overwrite=False)
+                      for group in partitions.group_events(_prepare(task[0], events) if events else [])]
+            written = sum(counts)
+            if 0 in counts:
+                _record_progress(db_path, task, STATUS_FAILED, error="Schreiben fehlgeschlagen")
+                summary["failed"] += 1
+                continue
+            _record_progress(db_path, task, STATUS_DONE, event_count=written)
+            if events:
+                module = _source(task[0])[0]
+                gaps.record_days(db_path, SOURCES[task[0]][0], module.MODULE_INFO["interval_seconds"],
+                                     _days(task[2], task[3]))
+            summary["done"] += 1
+            summary["events"] += written
+            logger.info("Backfill %s %s %s..%s: %s Events.", task[0], task[1], task[2], task[3], written)
+    return summary
+
+def run_backfill(db_path, start_date, end_date, sources=None, chunk_days=None, workers=None,
+                 requests_per_second=None, force=False):
+    """
+    Lädt die Daten eines Zeitraums für alle Orte aus [Backfill] nach.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        start_date (str): Erster Tag (YYYY-MM-DD).
+        end_date (str): Letzter Tag (YYYY-MM-DD, einschließlich).
+        sources (list): Optional nur diese Quellen (siehe SOURCES).
+        chunk_days (int): Tage pro Anfrage (Standard aus [Backfill]).
+        workers (int): Anzahl paralleler Anfragen (Standard aus [Backfill]).
+        requests_per_second (float): Maximale Anfragerate (Standard aus [Backfill]).
+        force (bool): Auch bereits erledigte Abschnitte erneut laden.
+
+    Returns:
+        dict: Siehe fetch_tasks.
+    """
+    config = settings.get_config()
+    chunk_days = chunk_days or config.getint('Backfill', 'chunk_days', fallback=31)
+    workers = workers or config.getint('Backfill', 'workers', fallback=4)
+    if requests_per_second is None:
+        requests_per_second = config.getfloat('Backfill', 'requests_per_second', fallback=2.0)
+    retries = config.getint('Backfill', 'retries', fallback=2)
+
+    init_backfill_store(db_path)
+    done = set() if force else _done_chunks(db_path)
+    tasks = [
+        (source, name, chunk_start, chunk_end)
+        for source in (sources or SOURCES)
+        for name, _, _ in load_locations()
+        for chunk_start, chunk_end in split_range(start_date, end_date, max(chunk_days, 1))
+    ]
+    pending = [task for task in tasks if task not in done]
+    logger.info("Backfill %s..%s: %s von %s Abschnitten zu laden.", start_date, end_date, len(pending), len(tasks))
+    summary = fetch_tasks(db_path, pending, workers, requests_per_second, retries)
+    logger.info("Backfill abgeschlossen: %s Abschnitte, %s Events, %s fehlgeschlagen.",
+                summary['done'], summary['events'], summary['failed'])
+    return summary
+
+def add_arguments(parser):
+    """Fügt die Optionen des Backfill-Befehls zu einem argparse-Parser hinzu."""
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    parser.add_argument("start", help="Erster Tag (YYYY-MM-DD).")
+    parser.add_argument("end", nargs="?", default=yesterday, help="Letzter Tag (Standard: gestern).")
+    parser.add_argument("--source", dest="sources", action="append", choices=sorted(SOURCES),
+                        help="Nur diese Quelle (mehrfach möglich).")
+    parser.add_argument("--chunk-days", type=int, help="Tage pro Anfrage.")
+    parser.add_argument("--workers", type=int, help="Anzahl paralleler Anfragen.")
+    parser.add_argument("--rate", type=float, dest="requests_per_second", help="Maximale Anfragen pro Sekunde.")
+    parser.add_argument("--force", action="store_true", help="Bereits geladene Abschnitte erneut laden.")
+
+def run_from_args(db_path, args):
+    """Führt den Backfill mit den von add_arguments() definierten Optionen aus."""
+    return run_backfill(db_path, args.start, args.end, args.sources, args.chunk_days, args.workers,
+                        args.requests_per_second, args.force)
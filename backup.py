@@ -0,0 +1,482 @@
+# backup.py - Online-Sicherung der Datenbank über die SQLite-Backup-API
+#
+# Statt die Datei zu kopieren (unsicher, solange geschrieben wird), liest
+# sqlite3.Connection.backup die Seiten der Datenbank in Schritten von
+# 'pages_per_step' Seiten. Die Tracker-Module können zwischen zwei Schritten
+# weiter schreiben; ändert sich die Datenbank während der Sicherung, beginnt
+# SQLite den Vorgang neu, sodass die Kopie immer einem konsistenten Stand
+# entspricht. Damit eine Sicherung unter ständigem Schreiben trotzdem fertig
+# wird, kopiert sie nach 'max_restarts' Neustarts die ganze Datei in einem
+# einzigen Schritt: Schreibende Module warten dann, bis die Kopie fertig ist
+# (die Ingest-Warteschlange wiederholt gesperrte Schreibvorgänge). Mit
+# 'pages_per_step = -1' wird immer in einem Schritt kopiert. Die Kopie wird
+# danach mit gzip komprimiert.
+#
+# Eine Sicherung ('Snapshot') umfasst die Hauptdatenbank und die nicht
+# archivierten Partitionen (siehe partitions.py). Für jede Datei wird ein
+# Fingerabdruck (Größe und Änderungszeit) gespeichert; unveränderte Dateien,
+# z.B. eingefrorene Partitionen, werden nicht erneut kopiert, sondern aus der
+# vorigen Sicherung übernommen.
+#
+# Geänderte Dateien - die Hauptdatenbank bei jedem Lauf (mindestens die
+# 'runs'-Tabelle) und die laufende Partition - werden inkrementell gesichert:
+# Zu jeder Sicherung wird eine Prüfsumme pro Datenbankseite gespeichert
+# (.hashes-Datei). Die nächste Sicherung kopiert die Datei zwar weiterhin über
+# die Backup-API in eine temporäre Datei, legt im Sicherungsordner aber nur
+# eine Delta-Datenbank mit den geänderten Seiten ab (.delta.db.gz). Seiten
+# statt Zeilen erfassen auch aktualisierte und gelöschte Events, Indizes und
+# den Suchindex. Nach 'max_deltas' Deltas wird wieder vollständig kopiert,
+# damit die Kette beim Wiederherstellen kurz bleibt.
+#
+# Die Datei 'manifest.json' im Sicherungsordner listet pro Snapshot die
+# zugehörigen Dateien (vollständige Kopie samt Deltas). Nur die neuesten
+# 'keep' Snapshots bleiben erhalten; Dateien, auf die keiner von ihnen mehr
+# verweist, werden gelöscht.
+#
+# Wiederherstellen: python main.py snapshot --restore <Zielordner> [--id <Snapshot>]
+# entpackt die vollständigen Kopien und spielt die Deltas ein (siehe
+# restore_snapshot). Danach die Hauptdatenbank ('main.db') nach 'path' aus
+# [Database] und die Partitionen in den Ordner aus [Partitions] verschieben.
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+
+import database
+import instrumentation
+import partitions
+import settings
+
+logger = logging.getLogger(__name__)
+
+# Name, unter dem die Läufe in der 'runs'-Tabelle gespeichert werden
+RUN_NAME = "backup"
+
+MANIFEST_NAME = "manifest.json"
+
+# Name der Hauptdatenbank im Manifest (Partitionen stehen unter ihrem Namen)
+MAIN_NAME = "main"
+
+# Länge der Prüfsumme einer Datenbankseite in den .hashes-Dateien
+_DIGEST_SIZE = 16
+
+def backup_directory():
+    directory = settings.get_config().get('Backup', 'directory', fallback='data/backups').strip()
+    return settings.resolve_path(directory or 'data/backups')
+
+def fingerprint(path):
+    """
+    Args:
+        path (str): Pfad zu einer Datenbankdatei.
+
+    Returns:
+        list: Größe und Änderungszeit der Datei (samt WAL-Datei, falls vorhanden).
+    """
+    values = []
+    for candidate in (path, path + "-wal"):
+        if os.path.exists(candidate):
+            info = os.stat(candidate)
+            values.extend([info.st_size, info.st_mtime_ns])
+    return values
+
+class _TooManyRestarts(Exception):
+    pass
+
+def _backup(source, target, pages_per_step, step_sleep_seconds, max_restarts):
+    if pages_per_step > 0:
+        progress = {"remaining": None, "restarts": 0}
+
+        def check_restart(status, remaining, total):
+            # Nach einem Neustart sind wieder mehr Seiten übrig als nach dem vorigen Schritt
+            if progress["remaining"] is not None and remaining > progress["remaining"]:
+                progress["restarts"] += 1
+                if progress["restarts"] > max_restarts:
+                    raise _TooManyRestarts()
+            progress["remaining"] = remaining
+
+        try:
+            source.backup(target, pages=pages_per_step, sleep=step_sleep_seconds, progress=check_restart)
+            return
+        except _TooManyRestarts:
+            logger.info("Sicherung wurde %s-mal neu begonnen, kopiere in einem Schritt.", progress["restarts"])
+    # Ein einziger Schritt hält die Lesesperre bis zum Ende und kann daher nicht neu beginnen
+    source.backup(target, pages=-1)
+
+def _copy(source_path, temp_path, pages_per_step, step_sleep_seconds, max_restarts):
+    source = target = None
+    try:
+        # Nur lesend öffnen, damit auch schreibgeschützte (eingefrorene) Partitionen gesichert werden
+        source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+        target = sqlite3.connect(temp_path)
+        _backup(source, target, pages_per_step, step_sleep_seconds, max_restarts)
+    finally:
+        if target:
+            target.close()
+        if source:
+            source.close()
+
+def _compress(raw_path, target_path, compress_level):
+    with open(raw_path, "rb") as raw, gzip.open(target_path + ".part", "wb", compresslevel=compress_level) as packed:
+        shutil.copyfileobj(raw, packed, 1024 * 1024)
+    os.replace(target_path + ".part", target_path)
+    return os.path.getsize(target_path)
+
+def copy_database(source_path, target_path, pages_per_step=4096, step_sleep_seconds=0.05, compress_level=6,
+                  max_restarts=3):
+    """
+    Sichert eine Datenbank schrittweise über die Backup-API und komprimiert
+    die Kopie mit gzip.
+
+    Args:
+        source_path (str): Pfad zur zu sichernden Datenbank.
+        target_path (str): Pfad der komprimierten Sicherung (.db.gz).
+        pages_per_step (int): Seiten pro Schritt der Backup-API (-1: alles in einem Schritt).
+        step_sleep_seconds (float): Wartezeit, wenn die Datenbank gerade gesperrt ist.
+        compress_level (int): gzip-Kompressionsstufe (1-9).
+        max_restarts (int): Neustarts, nach denen in einem Schritt kopiert wird.
+
+    Returns:
+        int: Größe der komprimierten Sicherung in Bytes.
+    """
+    temp_path = target_path + ".tmp"
+    _copy(source_path, temp_path, pages_per_step, step_sleep_seconds, max_restarts)
+    try:
+        return _compress(temp_path, target_path, compress_level)
+    finally:
+        os.remove(temp_path)
+
+def _page_size(path):
+    with open(path, "rb") as f:
+        header = f.read(100)
+    # Im Dateikopf steht 1 für 65536 Bytes
+    page_size = int.from_bytes(header[16:18], "big")
+    return 65536 if page_size == 1 else page_size
+
+def _read_hashes(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return [data[i:i + _DIGEST_SIZE] for i in range(0, len(data), _DIGEST_SIZE)]
+
+def _diff_pages(copy_path, hashes_path, page_size, previous_hashes=None, delta_path=None):
+    """
+    Speichert die Prüfsummen aller Seiten einer Kopie und schreibt mit
+    'delta_path' die Seiten, deren Prüfsumme von 'previous_hashes' abweicht,
+    in eine Delta-Datenbank (Tabellen 'pages' und 'delta').
+
+    Returns:
+        int: Die Anzahl der geänderten Seiten.
+    """
+    delta = None
+    changed = page_no = 0
+    try:
+        if delta_path:
+            delta = sqlite3.connect(delta_path)
+            delta.execute('CREATE TABLE delta (page_size INTEGER NOT NULL, page_count INTEGER NOT NULL)')
+            # Seitennummer ab 0, die Seite beginnt also bei page_no * page_size
+            delta.execute('CREATE TABLE pages (page_no INTEGER PRIMARY KEY, data BLOB NOT NULL)')
+        with open(copy_path, "rb") as source, open(hashes_path + ".tmp", "wb") as hashes:
+            while True:
+                page = source.read(page_size)
+                if not page:
+                    break
+                digest = hashlib.blake2b(page, digest_size=_DIGEST_SIZE).digest()
+                hashes.write(digest)
+                if delta and (page_no >= len(previous_hashes) or previous_hashes[page_no] != digest):
+                    delta.execute('INSERT INTO pages (page_no, data) VALUES (?, ?)', (page_no, page))
+                    changed += 1
+                page_no += 1
+        if delta:
+            delta.execute('INSERT INTO delta (page_size, page_count) VALUES (?, ?)', (page_size, page_no))
+            delta.commit()
+        os.replace(hashes_path + ".tmp", hashes_path)
+    finally:
+        if delta:
+            delta.close()
+    return changed
+
+def _chain(item):
+    """Die Dateien einer gesicherten Datei: vollständige Kopie, Deltas und Prüfsummen."""
+    return [item["file"], *item.get("deltas", [])] + ([item["hashes"]] if item.get("hashes") else [])
+
+def _chain_exists(directory, item):
+    return all(os.path.exists(os.path.join(directory, name)) for name in _chain(item))
+
+def _store(path, name, snapshot_id, directory, current, earlier, options):
+    """
+    Sichert eine geänderte Datei: als Delta zur Kette von 'earlier', sofern
+    möglich, sonst als vollständige Kopie.
+
+    Returns:
+        dict: Der Eintrag der Datei im Manifest.
+    """
+    temp_path = os.path.join(directory, f"{name}-{snapshot_id}.tmp")
+    hashes_name = f"{name}-{snapshot_id}.hashes"
+    hashes_path = os.path.join(directory, hashes_name)
+    _copy(path, temp_path, options["pages_per_step"], options["step_sleep_seconds"], options["max_restarts"])
+    try:
+        page_size = _page_size(temp_path)
+        deltas = earlier.get("deltas", []) if earlier else []
+        if (earlier and earlier.get("hashes") and earlier.get("page_size") == page_size
+                and len(deltas) < options["max_deltas"]):
+            delta_name = f"{name}-{snapshot_id}.delta.db.gz"
+            raw_delta = temp_path + ".delta"
+            try:
+                _diff_pages(temp_path, hashes_path, page_size,
+                            _read_hashes(os.path.join(directory, earlier["hashes"])), raw_delta)
+                size = _compress(raw_delta, os.path.join(directory, delta_name), options["compress_level"])
+            finally:
+                if os.path.exists(raw_delta):
+                    os.remove(raw_delta)
+            return {"file": earlier["file"], "deltas": deltas + [delta_name], "hashes": hashes_name,
+                    "page_size": page_size, "fingerprint": current, "size": size}
+        _diff_pages(temp_path, hashes_path, page_size)
+        file_name = f"{name}-{snapshot_id}.db.gz"
+        size = _compress(temp_path, os.path.join(directory, file_name), options["compress_level"])
+        return {"file": file_name, "deltas": [], "hashes": hashes_name, "page_size": page_size,
+                "fingerprint": current, "size": size}
+    finally:
+        os.remove(temp_path)
+
+def load_manifest(directory):
+    """
+    Args:
+        directory (str): Der Sicherungsordner.
+
+    Returns:
+        dict: Das Manifest mit der Liste 'snapshots' (älteste zuerst).
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"snapshots": []}
+
+def _save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+def _sources(db_path):
+    """Die zu sichernden Dateien: Name -> Pfad."""
+    sources = {MAIN_NAME: db_path}
+    for entry in partitions.list_partitions(db_path):
+        # Archivierte Partitionen liegen bereits komprimiert im Archivordner
+        if entry["state"] != partitions.STATE_ARCHIVED and os.path.exists(entry["path"]):
+            sources[entry["name"]] = entry["path"]
+    return sources
+
+def rotate(directory, manifest, keep):
+    """
+    Entfernt alle bis auf die neuesten 'keep' Snapshots aus dem Manifest und
+    löscht die Dateien, auf die kein verbliebener Snapshot mehr verweist.
+
+    Returns:
+        int: Anzahl der gelöschten Dateien.
+    """
+    manifest["snapshots"] = manifest["snapshots"][-max(keep, 1):]
+    referenced = {
+        name for snapshot in manifest["snapshots"] for item in snapshot["files"].values() for name in _chain(item)
+    }
+    removed = 0
+    for name in os.listdir(directory):
+        if name.endswith((".db.gz", ".hashes")) and name not in referenced:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+def create_snapshot(db_path, directory=None, full=False):
+    """
+    Erstellt einen Snapshot der Hauptdatenbank und ihrer Partitionen. Ohne
+    'full' werden nur seit dem letzten Snapshot geänderte Dateien gesichert,
+    und zwar als Delta der geänderten Seiten; das ist praktisch immer die
+    Hauptdatenbank und die laufende Partition.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        directory (str): Sicherungsordner (Standard: 'directory' in [Backup]).
+        full (bool): Alle Dateien vollständig kopieren.
+
+    Returns:
+        dict: Der neue Snapshot-Eintrag des Manifests.
+    """
+    config = settings.get_config()
+    options = {
+        "pages_per_step": config.getint('Backup', 'pages_per_step', fallback=4096),
+        "max_restarts": config.getint('Backup', 'max_restarts', fallback=3),
+        "step_sleep_seconds": config.getfloat('Backup', 'step_sleep_seconds', fallback=0.05),
+        "compress_level": config.getint('Backup', 'compress_level', fallback=6),
+        "max_deltas": config.getint('Backup', 'max_deltas', fallback=6),
+    }
+    keep = config.getint('Backup', 'keep', fallback=7)
+
+    directory = directory or backup_directory()
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    previous = manifest["snapshots"][-1]["files"] if manifest["snapshots"] and not full else {}
+    snapshot_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+    snapshot = {"id": snapshot_id, "created_at": datetime.now().isoformat(), "files": {}}
+
+    copied = 0
+    for name, path in _sources(db_path).items():
+        # Vor dem Kopieren erfasst: Schreibt ein Modul währenddessen, wird die Datei beim nächsten Mal erneut gesichert.
+        # Für die Hauptdatenbank trifft das bei jedem Lauf zu.
+        current = fingerprint(path)
+        earlier = previous.get(name)
+        if earlier and not _chain_exists(directory, earlier):
+            earlier = None
+        if earlier and earlier["fingerprint"] == current:
+            snapshot["files"][name] = earlier
+            continue
+        snapshot["files"][name] = _store(path, name, snapshot_id, directory, current, earlier, options)
+        copied += 1
+
+    manifest["snapshots"].append(snapshot)
+    removed = rotate(directory, manifest, keep)
+    _save_manifest(directory, manifest)
+    logger.info("Sicherung '%s' erstellt: %s von %s Dateien kopiert, %s alte Dateien gelöscht.",
+                snapshot_id, copied, len(snapshot['files']), removed)
+    snapshot["copied"] = copied
+    return snapshot
+
+def _apply_delta(delta_path, raw_path):
+    """Schreibt die Seiten einer komprimierten Delta-Datenbank in eine entpackte Kopie."""
+    unpacked = raw_path + ".delta"
+    with gzip.open(delta_path, "rb") as packed, open(unpacked, "wb") as raw:
+        shutil.copyfileobj(packed, raw, 1024 * 1024)
+    delta = None
+    try:
+        delta = sqlite3.connect(unpacked)
+        page_size, page_count = delta.execute('SELECT page_size, page_count FROM delta').fetchone()
+        with open(raw_path, "r+b") as target:
+            for page_no, data in delta.execute('SELECT page_no, data FROM pages ORDER BY page_no'):
+                target.seek(page_no * page_size)
+                target.write(data)
+            target.truncate(page_count * page_size)
+    finally:
+        if delta:
+            delta.close()
+        os.remove(unpacked)
+
+def restore_file(directory, item, target_path):
+    """
+    Stellt eine gesicherte Datei wieder her: Die vollständige Kopie wird
+    entpackt und die Deltas werden der Reihe nach eingespielt.
+
+    Args:
+        directory (str): Der Sicherungsordner.
+        item (dict): Der Eintrag der Datei in einem Snapshot des Manifests.
+        target_path (str): Pfad der wiederhergestellten Datenbank.
+    """
+    temp_path = target_path + ".tmp"
+    try:
+        with gzip.open(os.path.join(directory, item["file"]), "rb") as packed, open(temp_path, "wb") as raw:
+            shutil.copyfileobj(packed, raw, 1024 * 1024)
+        for delta_name in item.get("deltas", []):
+            _apply_delta(os.path.join(directory, delta_name), temp_path)
+        os.replace(temp_path, target_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def restore_snapshot(target_directory, directory=None, snapshot_id=None):
+    """
+    Stellt alle Dateien eines Snapshots in einem Ordner wieder her: die
+    Hauptdatenbank als 'main.db', die Partitionen unter ihrem Namen.
+
+    Args:
+        target_directory (str): Zielordner.
+        directory (str): Sicherungsordner (Standard: 'directory' in [Backup]).
+        snapshot_id (str): Optional die ID des Snapshots (Standard: der neueste).
+
+    Returns:
+        dict: Name -> Pfad der wiederhergestellten Datei.
+
+    Raises:
+        KeyError: Wenn der Snapshot nicht im Manifest steht.
+    """
+    directory = directory or backup_directory()
+    snapshots = [snapshot for snapshot in load_manifest(directory)["snapshots"]
+                 if snapshot_id is None or snapshot["id"] == snapshot_id]
+    if not snapshots:
+        raise KeyError(f"Snapshot '{snapshot_id}' nicht im Manifest gefunden.")
+    snapshot = snapshots[-1]
+    os.makedirs(target_directory, exist_ok=True)
+    restored = {}
+    for name, item in snapshot["files"].items():
+        restored[name] = os.path.join(target_directory, f"{name}.db")
+        restore_file(directory, item, restored[name])
+    logger.info("Sicherung '%s' nach '%s' wiederhergestellt (%s Dateien).",
+                snapshot['id'], target_directory, len(restored))
+    return restored
+
+def run_backup(db_path, full=False):
+    """
+    Erstellt einen Snapshot und speichert den Lauf wie einen Modul-Lauf in
+    der 'runs'-Tabelle (Anzahl der kopierten Dateien als 'event_count').
+    """
+    with instrumentation.measure_module(RUN_NAME) as metrics:
+        try:
+            snapshot = create_snapshot(db_path, full=full)
+            metrics.event_count = snapshot["copied"]
+        except (OSError, sqlite3.Error) as e:
+            metrics.record_failure(e)
+            logger.error("Fehler bei der Sicherung: %s", e)
+    database.insert_run(db_path, metrics.as_dict())
+
+_background_thread = None
+
+def start_background(db_path, last_runs):
+    """
+    Startet eine Sicherung in einem Hintergrund-Thread, sofern sie in
+    [Backup] aktiviert ist, seit der letzten 'interval_seconds' vergangen sind
+    und keine Sicherung läuft.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        last_runs (dict): Modulname -> Startzeitpunkt des letzten Laufs (ISO 8601).
+
+    Returns:
+        threading.Thread: Der gestartete Thread oder None.
+    """
+    global _background_thread
+    config = settings.get_config()
+    if not config.getboolean('Backup', 'enabled', fallback=False):
+        return None
+    if _background_thread is not None and _background_thread.is_alive():
+        return None
+    interval = config.getint('Backup', 'interval_seconds', fallback=86400)
+    last_run = last_runs.get(RUN_NAME)
+    if last_run and (datetime.now() - datetime.fromisoformat(last_run)).total_seconds() < interval:
+        return None
+    _background_thread = threading.Thread(target=run_backup, args=(db_path,), name="backup")
+    _background_thread.start()
+    return _background_thread
+
+def add_arguments(parser):
+    """Fügt die Optionen des Snapshot-Befehls zu einem argparse-Parser hinzu."""
+    parser.add_argument("--directory", help="Sicherungsordner (Standard: 'directory' in [Backup]).")
+    parser.add_argument("--full", action="store_true", help="Alle Dateien vollständig kopieren, auch unveränderte.")
+    parser.add_argument("--restore", metavar="ZIELORDNER",
+                        help="Statt zu sichern einen Snapshot in diesen Ordner wiederherstellen.")
+    parser.add_argument("--id", help="ID des wiederherzustellenden Snapshots (Standard: der neueste).")
+
+def run_from_args(db_path, args):
+    """Erstellt einen Snapshot bzw. stellt ihn wieder her (siehe add_arguments())."""
+    directory = os.path.abspath(args.directory) if args.directory else None
+    if args.restore:
+        return restore_snapshot(os.path.abspath(args.restore), directory, args.id)
+    return create_snapshot(db_path, directory, args.full)
+
+# Einmalige Sicherung im Vordergrund, z.B. per Cron
+if __name__ == "__main__":
+    import logs
+
+    logs.setup_logging()
+    run_backup(settings.get_db_path())
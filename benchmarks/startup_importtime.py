@@ -0,0 +1,99 @@
+# benchmarks/startup_importtime.py - Misst die Kaltstartzeit des Trackers mit 'python -X importtime'
+#
+# Aufruf aus dem Hauptverzeichnis des Projekts:
+#   python benchmarks/startup_importtime.py
+#   python benchmarks/startup_importtime.py --runs 5 --json bench_output.txt
+#   python benchmarks/startup_importtime.py --max-ms 150   (Exit-Code 1 bei Überschreitung)
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Der gemessene Start: main importieren und die Module über das Manifest ermitteln,
+# so wie es main.run_once() vor dem eigentlichen Sammeln tut.
+STARTUP_CODE = "import main; main.discover_modules(main.MODULES_DIR)"
+
+def parse_importtime(stderr):
+    """
+    Wertet die Ausgabe von '-X importtime' aus.
+
+    Args:
+        stderr (str): Die Standardfehlerausgabe des gemessenen Prozesses.
+
+    Returns:
+        list: Tupel (Modulname, eigene Zeit in µs, kumulierte Zeit in µs).
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            imports.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return imports
+
+def measure_once():
+    """
+    Startet einen frischen Python-Prozess und misst dessen Startzeit.
+
+    Returns:
+        dict: Gesamtdauer des Prozesses, Summe der Importzeiten und die Importliste.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Gemessener Prozess ist fehlgeschlagen:\n{result.stderr}")
+    imports = parse_importtime(result.stderr)
+    return {
+        "wall_ms": wall_ms,
+        "import_ms": sum(self_us for _, self_us, _ in imports) / 1000,
+        "imports": imports,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Kaltstart-Benchmark des Stat-Trackers.")
+    parser.add_argument("--runs", type=int, default=3, help="Anzahl der Messläufe (der beste zählt).")
+    parser.add_argument("--top", type=int, default=10, help="Anzahl der teuersten Importe in der Ausgabe.")
+    parser.add_argument("--json", metavar="PFAD", help="Ergebnis zusätzlich als JSON in diese Datei schreiben.")
+    parser.add_argument("--max-ms", type=float, help="Mit Exit-Code 1 beenden, wenn der Start länger dauert.")
+    args = parser.parse_args()
+
+    results = [measure_once() for _ in range(args.runs)]
+    best = min(results, key=lambda r: r["wall_ms"])
+
+    print(f"Kaltstart (bester von {args.runs}): {best['wall_ms']:.1f} ms, davon Importe: {best['import_ms']:.1f} ms")
+    print("Teuerste Importe (kumuliert):")
+    for name, _, cumulative_us in sorted(best["imports"], key=lambda i: i[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    imported = {name.strip() for name, _, _ in best["imports"]}
+    if "requests" in imported:
+        print("Warnung: 'requests' wird bereits beim Start importiert.")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "wall_ms": best["wall_ms"],
+                "import_ms": best["import_ms"],
+                "runs": [r["wall_ms"] for r in results],
+                "requests_imported": "requests" in imported,
+            }, f, indent=2)
+
+    if args.max_ms is not None and best["wall_ms"] > args.max_ms:
+        print(f"Startzeit überschreitet das Limit von {args.max_ms:.0f} ms.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
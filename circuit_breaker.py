@@ -0,0 +1,226 @@
+# circuit_breaker.py - Circuit Breaker für unzuverlässige externe APIs
+#
+# Für jeden Endpunkt (Hostname, z.B. 'api.open-meteo.com') werden die
+# Ergebnisse der letzten Anfragen festgehalten. Schlägt innerhalb von
+# 'window_seconds' mindestens der Anteil 'failure_rate' von mindestens
+# 'min_calls' Anfragen fehl, wird der Breaker geöffnet: Weitere Anfragen an
+# diesen Endpunkt werden sofort abgewiesen, ohne auf einen Timeout zu warten.
+# Nach 'cooldown_seconds' ist der Breaker halb offen und lässt genau eine
+# Probe-Anfrage durch; gelingt sie, wird er wieder geschlossen, sonst bleibt
+# er für eine weitere Wartezeit offen.
+#
+# Der Zustand liegt in der Tabelle 'circuit_breakers' der zentralen Datenbank
+# und übersteht so Neustarts und gilt auch für Module im Prozess-Pool.
+
+import json
+import logging
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Höchstens so viele Ergebnisse werden pro Endpunkt gespeichert
+MAX_OUTCOMES = 100
+
+_db_path = None
+_initialized = set()
+
+def endpoint_for(url):
+    """
+    Args:
+        url (str): Die aufgerufene URL.
+
+    Returns:
+        str: Der Endpunkt, für den der Breaker gilt (Hostname samt Port).
+    """
+    return urlsplit(url).netloc.lower()
+
+def is_enabled():
+    return settings.get_config().getboolean('CircuitBreaker', 'enabled', fallback=True)
+
+def request_timeout():
+    """Timeout in Sekunden für HTTP-Anfragen laut [CircuitBreaker]."""
+    return settings.get_config().getfloat('CircuitBreaker', 'timeout_seconds', fallback=10)
+
+def _options():
+    config = settings.get_config()
+    return {
+        "window_seconds": config.getint('CircuitBreaker', 'window_seconds', fallback=21600),
+        "min_calls": config.getint('CircuitBreaker', 'min_calls', fallback=3),
+        "failure_rate": config.getfloat('CircuitBreaker', 'failure_rate', fallback=0.5),
+        "cooldown_seconds": config.getint('CircuitBreaker', 'cooldown_seconds', fallback=1800),
+    }
+
+def init_breaker_store(db_path):
+    """
+    Erstellt die Tabelle 'circuit_breakers' und legt fest, in welcher
+    Datenbank der Zustand der Breaker gespeichert wird.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    global _db_path
+    _db_path = db_path
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS circuit_breakers (
+                endpoint TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                outcomes TEXT NOT NULL,
+                opened_at REAL,
+                trial_at REAL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        _initialized.add(db_path)
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Anlegen der Tabelle 'circuit_breakers': %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+def _connect():
+    # Im Prozess-Pool oder beim Backfill wurde init_breaker_store ggf. noch nicht aufgerufen
+    db_path = _db_path or settings.get_db_path()
+    if db_path not in _initialized:
+        init_breaker_store(db_path)
+    # Autocommit: Lesen sperrt nicht, geschrieben wird nur in _begin_write
+    return sqlite3.connect(db_path, timeout=10, isolation_level=None)
+
+def _begin_write(conn):
+    # Schreibend sperren, damit parallele Anfragen denselben Zustand sehen;
+    # der Zustand muss danach neu gelesen werden
+    conn.execute('BEGIN IMMEDIATE')
+
+def _load(conn, endpoint):
+    row = conn.execute(
+        'SELECT state, outcomes, opened_at, trial_at FROM circuit_breakers WHERE endpoint = ?', (endpoint,)
+    ).fetchone()
+    if row is None:
+        return {"state": CLOSED, "outcomes": [], "opened_at": None, "trial_at": None}
+    return {"state": row[0], "outcomes": json.loads(row[1]), "opened_at": row[2], "trial_at": row[3]}
+
+def _save(conn, endpoint, breaker, now):
+    conn.execute('''
+        INSERT INTO circuit_breakers (endpoint, state, outcomes, opened_at, trial_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (endpoint) DO UPDATE SET
+            state = excluded.state, outcomes = excluded.outcomes, opened_at = excluded.opened_at,
+            trial_at = excluded.trial_at, updated_at = excluded.updated_at
+    ''', (endpoint, breaker["state"], json.dumps(breaker["outcomes"]), breaker["opened_at"], breaker["trial_at"], now))
+
+def _decide(breaker, now, cooldown):
+    # True/False: Entscheidung ohne Zustandsänderung, None: Probe-Anfrage fällig
+    if breaker["state"] == CLOSED:
+        return True
+    if breaker["state"] == OPEN and now - breaker["opened_at"] < cooldown:
+        return False
+    # Ist die Probe-Anfrage nie zurückgekommen (z.B. Absturz), darf nach der Wartezeit eine neue los
+    if breaker["state"] == HALF_OPEN and breaker["trial_at"] and now - breaker["trial_at"] < cooldown:
+        return False
+    return None
+
+def allow(endpoint, now=None):
+    """
+    Prüft, ob eine Anfrage an den Endpunkt erlaubt ist. Ist die Wartezeit
+    eines offenen Breakers abgelaufen, wird er halb offen und diese Anfrage
+    ist die Probe-Anfrage.
+
+    Args:
+        endpoint (str): Der Endpunkt (siehe endpoint_for).
+        now (float): Optional der aktuelle Zeitpunkt (für Tests).
+
+    Returns:
+        bool: True, wenn die Anfrage ausgeführt werden darf.
+    """
+    if not is_enabled():
+        return True
+    now = time.time() if now is None else now
+    cooldown = _options()["cooldown_seconds"]
+    conn = None
+    try:
+        conn = _connect()
+        decision = _decide(_load(conn, endpoint), now, cooldown)
+        if decision is not None:
+            return decision
+        # Nur der Wechsel nach halb offen sperrt; ein paralleler Aufruf kann die Probe schon gestartet haben
+        _begin_write(conn)
+        breaker = _load(conn, endpoint)
+        decision = _decide(breaker, now, cooldown)
+        if decision is not None:
+            conn.execute('ROLLBACK')
+            return decision
+        breaker["state"] = HALF_OPEN
+        breaker["trial_at"] = now
+        _save(conn, endpoint, breaker, now)
+        conn.execute('COMMIT')
+        logger.info("Circuit Breaker für '%s' ist halb offen, sende Probe-Anfrage.", endpoint)
+        return True
+    except sqlite3.Error as e:
+        # Ohne gespeicherten Zustand lieber anfragen als ein Modul dauerhaft blockieren
+        logger.error("Fehler beim Lesen des Circuit Breakers für '%s': %s", endpoint, e)
+        return True
+    finally:
+        if conn:
+            conn.close()
+
+def record(endpoint, success, now=None):
+    """
+    Speichert das Ergebnis einer Anfrage und öffnet oder schließt den
+    Breaker entsprechend.
+
+    Args:
+        endpoint (str): Der Endpunkt (siehe endpoint_for).
+        success (bool): Ob die Anfrage erfolgreich war.
+        now (float): Optional der aktuelle Zeitpunkt (für Tests).
+
+    Returns:
+        str: Der neue Zustand des Breakers.
+    """
+    if not is_enabled():
+        return CLOSED
+    now = time.time() if now is None else now
+    options = _options()
+    conn = None
+    try:
+        conn = _connect()
+        _begin_write(conn)
+        breaker = _load(conn, endpoint)
+        if breaker["state"] == CLOSED:
+            outcomes = [o for o in breaker["outcomes"] if now - o[0] < options["window_seconds"]]
+            outcomes.append([now, 1 if success else 0])
+            breaker["outcomes"] = outcomes[-MAX_OUTCOMES:]
+            failures = sum(1 for _, ok in breaker["outcomes"] if not ok)
+            calls = len(breaker["outcomes"])
+            if not success and calls >= options["min_calls"] and failures / calls >= options["failure_rate"]:
+                breaker.update(state=OPEN, opened_at=now, trial_at=None)
+                logger.warning("Circuit Breaker für '%s' geöffnet (%s von %s Anfragen fehlgeschlagen).",
+                               endpoint, failures, calls)
+        elif success:
+            # Nur die Probe-Anfrage schließt den Breaker; eine verspätete Antwort
+            # einer Anfrage von vor dem Öffnen lässt ihn offen
+            if breaker["state"] == HALF_OPEN:
+                breaker.update(state=CLOSED, outcomes=[], opened_at=None, trial_at=None)
+                logger.info("Circuit Breaker für '%s' wieder geschlossen.", endpoint)
+        else:
+            # Fehlgeschlagene Probe-Anfrage (oder eine Anfrage von vor dem Öffnen): erneut warten
+            breaker.update(state=OPEN, opened_at=now, trial_at=None)
+        _save(conn, endpoint, breaker, now)
+        conn.execute('COMMIT')
+        return breaker["state"]
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Speichern des Circuit Breakers für '%s': %s", endpoint, e)
+        return CLOSED
+    finally:
+        if conn:
+            conn.close()
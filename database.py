@@ -1,13 +1,129 @@
 # database.py - Hilfsfunktionen für die SQLite-Datenbank
 
+import hashlib
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+import logging
 import json # Für das Speichern komplexerer Daten im 'value'-Feld
 
+import instrumentation
+import settings
+
+logger = logging.getLogger(__name__)
+
+# Felder des JSON-Werts, die als virtuelle Spalten (GENERATED ALWAYS AS ...
+# VIRTUAL) der 'events'-Tabelle abfragbar sind, damit Filter und Sortierung
+# nicht jede Zeile in Python dekodieren müssen (siehe partitions.query_events):
+# event_type -> {Spaltenname: (JSON-Pfad, Index anlegen)}. Der Pfad None steht
+# für den ganzen Wert (z.B. YouTube-Titel, die als einfacher String gespeichert
+# sind). Die Spalten belegen keinen Speicher; Indizes gelten nur für Events
+# ihres Typs. Bestehende Spalten werden nicht verändert, ein geänderter Pfad
+# braucht daher einen neuen Spaltennamen.
+VALUE_COLUMNS = {
+    "weather_forecast": {
+        "weather_location": ("$.location", False),
+        "weather_temperature": ("$.forecast.temperature_celsius", True),
+        "weather_code": ("$.forecast.weather_code", False),
+        "weather_precipitation_probability": ("$.forecast.precipitation_probability_percent", False),
+        "weather_wind_speed": ("$.forecast.wind_speed_kmh", False),
+    },
+    "pollen_forecast_daily": {
+        "pollen_date": ("$.date", False),
+        "pollen_grass": ("$.pollen_types.grass.level_numeric", True),
+        "pollen_birch": ("$.pollen_types.birch.level_numeric", True),
+        "pollen_hazel": ("$.pollen_types.hazel.level_numeric", False),
+        "pollen_alder": ("$.pollen_types.alder.level_numeric", False),
+    },
+    "youtube_video_watched": {
+        "youtube_title": (None, True),
+    },
+}
+
+def value_column_expression(event_type, path):
+    """
+    Der SQL-Ausdruck einer Wert-Spalte. JSON-Funktionen werden nur auf
+    gültiges JSON angewendet, da sonst das Schreiben fehlschlagen würde.
+    """
+    if path is None:
+        return f"CASE WHEN event_type = '{event_type}' THEN value END"
+    return f"CASE WHEN event_type = '{event_type}' AND json_valid(value) THEN json_extract(value, '{path}') END"
+
+def add_value_columns(conn, schema="main"):
+    """
+    Ergänzt die fehlenden Wert-Spalten aus VALUE_COLUMNS samt Indizes.
+
+    Args:
+        conn (sqlite3.Connection): Die Verbindung zur Datenbank.
+        schema (str): Name der (ggf. angehängten) Datenbank.
+    """
+    # table_info enthält keine berechneten Spalten, table_xinfo schon
+    existing = {row[1] for row in conn.execute(f'PRAGMA {schema}.table_xinfo(events)')}
+    for event_type, columns in VALUE_COLUMNS.items():
+        for column, (path, indexed) in columns.items():
+            if column not in existing:
+                conn.execute(
+                    f'ALTER TABLE {schema}.events ADD COLUMN {column} '
+                    f'GENERATED ALWAYS AS ({value_column_expression(event_type, path)}) VIRTUAL'
+                )
+            if indexed:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {schema}.idx_events_{column} "
+                    f"ON events ({column}) WHERE event_type = '{event_type}'"
+                )
+
+def create_event_tables(conn, schema="main"):
+    """
+    Erstellt die 'events'-Tabelle samt Indizes und Wert-Spalten und die
+    'event_revisions'-Tabelle, z.B. in der Hauptdatenbank oder einer
+    Partition (siehe partitions.py).
+
+    Args:
+        conn (sqlite3.Connection): Die Verbindung zur Datenbank.
+        schema (str): Name der (ggf. angehängten) Datenbank.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            source_module TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            value TEXT -- Kann JSON-String für komplexere Daten enthalten
+        )
+    ''')
+    # Natürlicher Schlüssel für Events, die bei jedem Lauf erneut gemeldet werden
+    # (z.B. Vorhersagen), damit sie aktualisiert statt doppelt gespeichert werden
+    columns = [row[1] for row in cursor.execute(f'PRAGMA {schema}.table_info(events)')]
+    if 'natural_key' not in columns:
+        cursor.execute(f'ALTER TABLE {schema}.events ADD COLUMN natural_key TEXT')
+    cursor.execute(f'''
+        CREATE UNIQUE INDEX IF NOT EXISTS {schema}.idx_events_natural_key
+        ON events (natural_key) WHERE natural_key IS NOT NULL
+    ''')
+    # Frühere Werte aktualisierter Events, gespeichert als JSON Merge Patch (RFC 7396),
+    # der den neuen Wert wieder in den vorherigen überführt
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.event_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            revised_at TEXT NOT NULL,
+            previous_timestamp TEXT,
+            delta TEXT NOT NULL
+        )
+    ''')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_event_revisions_event ON event_revisions (event_id, id)')
+    # Für Abfragen und Exporte nach Zeitraum
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_events_timestamp ON events (timestamp)')
+    add_value_columns(conn, schema)
+
 def init_db(db_path):
     """
-    Initialisiert die SQLite-Datenbank und erstellt die 'events'-Tabelle,
-    falls sie noch nicht existiert.
+    Initialisiert die SQLite-Datenbank und erstellt die 'events'- und
+    'runs'-Tabellen, falls sie noch nicht existieren.
 
     Args:
         db_path (str): Der vollständige Pfad zur Datenbankdatei.
@@ -15,24 +131,257 @@ def init_db(db_path):
     conn = None
     try:
         conn = sqlite3.connect(db_path)
+        # Wirkt nur bei neuen Datenbanken: Freier Platz kann dann schrittweise
+        # per 'PRAGMA incremental_vacuum' zurückgegeben werden (siehe retention.py)
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
         cursor = conn.cursor()
+        create_event_tables(conn)
+        # Laufzeit-Metriken pro Modul und Lauf (siehe instrumentation.py)
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS events (
+            CREATE TABLE IF NOT EXISTS runs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
+                started_at TEXT NOT NULL,
                 source_module TEXT NOT NULL,
-                event_type TEXT NOT NULL,
-                value TEXT -- Kann JSON-String für komplexere Daten enthalten
+                wall_time_seconds REAL,
+                cpu_time_seconds REAL,
+                event_count INTEGER,
+                http_requests INTEGER,
+                http_time_seconds REAL,
+                http_bytes INTEGER,
+                db_writes INTEGER,
+                db_write_time_seconds REAL,
+                failures INTEGER,
+                error TEXT
+            )
+        ''')
+        run_columns = [row[1] for row in cursor.execute('PRAGMA table_info(runs)')]
+        if 'skipped_open_circuit' not in run_columns:
+            cursor.execute('ALTER TABLE runs ADD COLUMN skipped_open_circuit INTEGER')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_runs_module ON runs (source_module, started_at)')
+        # Schlüssel-Wert-Tabelle für interne Zähler, z.B. die Schreib-Generation des QueryCache
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value
             )
         ''')
         conn.commit()
-        print(f"Datenbank '{db_path}' initialisiert oder bereits vorhanden.")
+        logger.info("Datenbank '%s' initialisiert oder bereits vorhanden.", db_path)
+    except sqlite3.Error as e:
+        logger.error("Fehler bei der Datenbank-Initialisierung: %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+def bump_write_generation(conn):
+    """
+    Erhöht die Schreib-Generation in der 'meta'-Tabelle. Muss innerhalb der
+    Transaktion aufgerufen werden, die Events schreibt oder löscht, damit
+    zwischengespeicherte Abfragen (siehe QueryCache) ungültig werden.
+
+    Args:
+        conn (sqlite3.Connection): Die Verbindung mit der offenen Transaktion.
+    """
+    conn.execute('''
+        INSERT INTO meta (key, value) VALUES ('write_generation', 1)
+        ON CONFLICT (key) DO UPDATE SET value = value + 1
+    ''')
+
+def _set_meta(conn, key, value):
+    conn.execute('''
+        INSERT INTO meta (key, value) VALUES (?, ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value
+    ''', (key, value))
+
+def write_meta(conn, key, value):
+    """
+    Wie set_meta, aber auf einer vorhandenen Verbindung innerhalb der
+    Transaktion des Aufrufers, z.B. zusammen mit den Events, auf die sich
+    der Wert bezieht.
+
+    Args:
+        conn (sqlite3.Connection): Die Verbindung mit der offenen Transaktion.
+        key (str): Der Schlüssel.
+        value: Der Wert (Zahl oder String).
+    """
+    _set_meta(conn, key, value)
+
+def get_meta(db_path, key, default=None):
+    """
+    Liest einen Wert aus der 'meta'-Tabelle.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        key (str): Der Schlüssel.
+        default: Rückgabewert, wenn der Schlüssel fehlt.
+
+    Returns:
+        Der gespeicherte Wert oder 'default'.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
     except sqlite3.Error as e:
-        print(f"Fehler bei der Datenbank-Initialisierung: {e}")
+        logger.error("Fehler beim Lesen von '%s' aus der meta-Tabelle: %s", key, e)
+        return default
     finally:
         if conn:
             conn.close()
 
+def set_meta(db_path, key, value):
+    """
+    Schreibt einen Wert in die 'meta'-Tabelle.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        key (str): Der Schlüssel.
+        value: Der Wert (Zahl oder String).
+
+    Returns:
+        bool: True, wenn der Wert gespeichert wurde.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        _set_meta(conn, key, value)
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Schreiben von '%s' in die meta-Tabelle: %s", key, e)
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+def _event_to_row(event_data):
+    """
+    Wandelt ein Event (Event-Objekt oder Diktionär) in ein Tupel für die 'events'-Tabelle um.
+    """
+    # Standardwerte und Typkonvertierung
+    timestamp = event_data.get("timestamp", datetime.now().isoformat())
+    source_module = event_data.get("source_module", "unknown")
+    event_type = event_data.get("event_type", "generic_event")
+    value = event_data.get("value")
+
+    # Konvertiere 'value' in einen JSON-String, wenn es ein komplexer Typ ist
+    if value is not None and not isinstance(value, (str, int, float, bool)):
+        value = json.dumps(value)
+    elif value is None:
+        value = "null" # Speichere explizit "null" als String
+
+    return (timestamp, source_module, event_type, value, event_data.get("natural_key"))
+
+def natural_key(event_data, fields):
+    """
+    Bildet den natürlichen Schlüssel eines Events aus Modul, Event-Typ und
+    den angegebenen Feldern. Ein Feld ist 'timestamp' oder ein Pfad in den
+    Wert wie 'value.date' bzw. 'value.forecast.time'.
+
+    Args:
+        event_data (Event | dict): Das Event.
+        fields (iterable): Die Felder des Schlüssels.
+
+    Returns:
+        str: Der Schlüssel als JSON-Liste.
+    """
+    parts = [event_data.get("source_module", "unknown"), event_data.get("event_type", "generic_event")]
+    for field in fields:
+        if field == "timestamp":
+            parts.append(event_data.get("timestamp"))
+            continue
+        current = {"value": event_data.get("value")}
+        for name in field.split("."):
+            current = current.get(name) if isinstance(current, dict) else None
+        parts.append(current)
+    return json.dumps(parts, ensure_ascii=False, default=str)
+
+def merge_patch_delta(new, old):
+    """
+    Berechnet einen JSON Merge Patch, der 'new' in 'old' überführt. Bei
+    Objekten enthält er nur die geänderten Schlüssel, sonst den alten Wert.
+    """
+    if not isinstance(new, dict) or not isinstance(old, dict):
+        return old
+    delta = {}
+    for key in new.keys() | old.keys():
+        if key not in old:
+            delta[key] = None
+        elif key not in new or new[key] != old[key]:
+            delta[key] = merge_patch_delta(new.get(key), old[key]) if key in new else old[key]
+    return delta
+
+def apply_merge_patch(target, patch):
+    """Wendet einen JSON Merge Patch (RFC 7396) auf einen Wert an."""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+def _record_revisions(conn, rows, schema="main"):
+    """
+    Speichert für Events mit natürlichem Schlüssel, deren Wert sich geändert
+    hat, den Unterschied zum bisherigen Wert in 'event_revisions'.
+    """
+    keys = list({row[4] for row in rows if row[4] is not None})
+    if not keys:
+        return
+    existing = {}
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        for event_id, key, timestamp, value in conn.execute(
+            f"SELECT id, natural_key, timestamp, value FROM {schema}.events WHERE natural_key IN ({', '.join('?' for _ in chunk)})",
+            chunk
+        ):
+            existing[key] = (event_id, timestamp, value)
+    revised_at = datetime.now().isoformat()
+    revisions = []
+    for timestamp, _, _, value, key in rows:
+        if key not in existing:
+            continue
+        event_id, old_timestamp, old_value = existing[key]
+        if old_value != value:
+            delta = merge_patch_delta(decode_value(value), decode_value(old_value))
+            revisions.append((event_id, revised_at, old_timestamp, json.dumps(delta, ensure_ascii=False)))
+        existing[key] = (event_id, timestamp, value)
+    if revisions:
+        conn.executemany(
+            f'INSERT INTO {schema}.event_revisions (event_id, revised_at, previous_timestamp, delta) VALUES (?, ?, ?, ?)',
+            revisions
+        )
+
+# Events ohne natürlichen Schlüssel werden immer eingefügt (der eindeutige Index
+# ist partiell). Mit Schlüssel wird ein vorhandenes Event nur überschrieben, wenn
+# sich sein Wert geändert hat.
+_UPSERT_EVENT = '''
+    INSERT INTO {schema}.events (timestamp, source_module, event_type, value, natural_key)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (natural_key) WHERE natural_key IS NOT NULL DO UPDATE SET
+        timestamp = excluded.timestamp,
+        value = excluded.value
+    WHERE events.value IS NOT excluded.value
+'''
+
+# Nachgeladene Events (siehe backfill.py) ergänzen nur fehlende Events
+_INSERT_MISSING_EVENT = '''
+    INSERT INTO {schema}.events (timestamp, source_module, event_type, value, natural_key)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (natural_key) WHERE natural_key IS NOT NULL DO NOTHING
+'''
+
+def _write_rows(conn, rows, schema="main", overwrite=True):
+    if not overwrite:
+        conn.executemany(_INSERT_MISSING_EVENT.format(schema=schema), rows)
+        return
+    _record_revisions(conn, rows, schema)
+    conn.executemany(_UPSERT_EVENT.format(schema=schema), rows)
+
 def insert_event(db_path, event_data):
     """
     Fügt ein einzelnes Event in die 'events'-Tabelle ein.
@@ -47,73 +396,390 @@ def insert_event(db_path, event_data):
                            wenn es kein einfacher Typ ist.
     """
     conn = None
+    start = time.perf_counter()
     try:
         conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        _write_rows(conn, [_event_to_row(event_data)])
+        bump_write_generation(conn)
+        conn.commit()
+        logger.debug("Event eingefügt: %s", event_data)
+    except sqlite3.Error as e:
+        # Nur Modul und Typ; der ganze Wert kann groß sein und steht mit DEBUG im Log
+        logger.error("Fehler beim Einfügen eines Events von '%s' (%s): %s",
+                     event_data.get("source_module"), event_data.get("event_type"), e)
+        logger.debug("Nicht eingefügtes Event: %s", event_data)
+    finally:
+        if conn:
+            conn.close()
+        instrumentation.record_db_write(time.perf_counter() - start, 1)
 
-        # Standardwerte und Typkonvertierung
-        timestamp = event_data.get("timestamp", datetime.now().isoformat())
-        source_module = event_data.get("source_module", "unknown")
-        event_type = event_data.get("event_type", "generic_event")
-        value = event_data.get("value")
+def insert_events(db_path, events, checkpoint=None, raise_errors=False, overwrite=True):
+    """
+    Fügt mehrere Events in einer einzigen Transaktion in die 'events'-Tabelle ein.
 
-        # Konvertiere 'value' in einen JSON-String, wenn es ein komplexer Typ ist
-        if value is not None and not isinstance(value, (str, int, float, bool)):
-            value = json.dumps(value)
-        elif value is None:
-            value = "null" # Speichere explizit "null" als String
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        events (list): Eine Liste von Event-Diktionären (siehe insert_event).
+        checkpoint (tuple): Optional (Schlüssel, Wert), der in derselben
+                            Transaktion in die 'meta'-Tabelle geschrieben wird,
+                            z.B. die Position in der Spool-Datei (siehe ingest.py).
+        raise_errors (bool): Datenbankfehler weitergeben statt 0 zurückzugeben,
+                             z.B. um eine gesperrte Datenbank zu erkennen.
+        overwrite (bool): Vorhandene Events mit demselben natürlichen Schlüssel
+                          aktualisieren; mit False bleiben sie unverändert.
 
-        cursor.execute('''
-            INSERT INTO events (timestamp, source_module, event_type, value)
-            VALUES (?, ?, ?, ?)
-        ''', (timestamp, source_module, event_type, value))
+    Returns:
+        int: Die Anzahl der geschriebenen Events (0 bei einem Fehler).
+    """
+    if not events:
+        return 0
+    conn = None
+    start = time.perf_counter()
+    rows = [_event_to_row(event) for event in events]
+    try:
+        conn = sqlite3.connect(db_path)
+        _write_rows(conn, rows, overwrite=overwrite)
+        if checkpoint is not None:
+            _set_meta(conn, *checkpoint)
+        bump_write_generation(conn)
         conn.commit()
-        # print(f"Event eingefügt: {event_data}") # Nur zum Debuggen
+        return len(rows)
     except sqlite3.Error as e:
-        print(f"Fehler beim Einfügen des Events {event_data}: {e}")
+        if raise_errors:
+            raise
+        logger.error("Fehler beim Einfügen von %s Events: %s", len(rows), e)
+        return 0
     finally:
         if conn:
             conn.close()
+        instrumentation.record_db_write(time.perf_counter() - start, len(rows))
 
-def get_all_events(db_path):
+def write_events(conn, events):
+    """
+    Wie insert_events, aber auf einer vorhandenen Verbindung innerhalb der
+    Transaktion des Aufrufers (die Hauptdatenbank). Erhöht die
+    Schreib-Generation (siehe bump_write_generation).
+
+    Args:
+        conn (sqlite3.Connection): Die Verbindung mit der offenen Transaktion.
+        events (list): Eine Liste von Event-Diktionären (siehe insert_event).
+
+    Returns:
+        int: Die Anzahl der geschriebenen Events.
+    """
+    if not events:
+        return 0
+    rows = [_event_to_row(event) for event in events]
+    _write_rows(conn, rows)
+    bump_write_generation(conn)
+    return len(rows)
+
+def insert_run(db_path, run_data):
+    """
+    Speichert die Laufzeit-Metriken eines Modul-Laufs in der 'runs'-Tabelle.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        run_data (dict): Die Messwerte, z.B. aus RunMetrics.as_dict().
+    """
+    columns = [
+        "started_at", "source_module", "wall_time_seconds", "cpu_time_seconds",
+        "event_count", "http_requests", "http_time_seconds", "http_bytes",
+        "db_writes", "db_write_time_seconds", "skipped_open_circuit", "failures", "error",
+    ]
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            tuple(run_data.get(column) for column in columns)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Speichern der Laufzeit-Metriken: %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+def get_last_run_times(db_path):
     """
-    Ruft alle Events aus der 'events'-Tabelle ab.
+    Ermittelt für jedes Modul den Startzeitpunkt seines letzten Laufs.
 
     Args:
         db_path (str): Der vollständige Pfad zur Datenbankdatei.
 
     Returns:
-        list: Eine Liste von Diktionären, die die Events repräsentieren.
+        dict: Modulname -> Startzeitpunkt des letzten Laufs (ISO 8601).
     """
     conn = None
-    events = []
+    last_runs = {}
     try:
         conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row # Ermöglicht den Zugriff auf Spalten per Name
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM events ORDER BY timestamp ASC')
-        rows = cursor.fetchall()
-        for row in rows:
-            event = dict(row)
-            # Versuche, den 'value'-String zurück in ein Python-Objekt zu konvertieren
-            try:
-                if event['value'] == "null":
-                    event['value'] = None
-                else:
-                    event['value'] = json.loads(event['value'])
-            except (json.JSONDecodeError, TypeError):
-                # Wenn es kein gültiger JSON-String ist, behalte es als String
-                pass
-            events.append(event)
+        cursor.execute('SELECT source_module, MAX(started_at) FROM runs GROUP BY source_module')
+        last_runs = dict(cursor.fetchall())
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Abrufen der letzten Modul-Läufe: %s", e)
+    finally:
+        if conn:
+            conn.close()
+    return last_runs
+
+def get_event_revisions(db_path, event_id):
+    """
+    Stellt die früheren Werte eines per natürlichem Schlüssel aktualisierten
+    Events wieder her.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        event_id (int): Die ID des Events.
+
+    Returns:
+        list: Diktionäre mit 'revised_at', 'timestamp' und 'value', neueste
+              Änderung zuerst; der aktuelle Wert ist nicht enthalten.
+    """
+    conn = None
+    history = []
+    try:
+        conn = sqlite3.connect(db_path)
+        row = conn.execute('SELECT value FROM events WHERE id = ?', (event_id,)).fetchone()
+        if row is None:
+            return history
+        value = decode_value(row[0])
+        for revised_at, previous_timestamp, delta in conn.execute(
+            'SELECT revised_at, previous_timestamp, delta FROM event_revisions WHERE event_id = ? ORDER BY id DESC',
+            (event_id,)
+        ):
+            value = apply_merge_patch(value, json.loads(delta))
+            history.append({"revised_at": revised_at, "timestamp": previous_timestamp, "value": value})
     except sqlite3.Error as e:
-        print(f"Fehler beim Abrufen von Events: {e}")
+        logger.error("Fehler beim Abrufen der Revisionen von Event %s: %s", event_id, e)
     finally:
         if conn:
             conn.close()
-    return events
+    return history
+
+def decode_value(value):
+    """
+    Wandelt den gespeicherten 'value'-String zurück in ein Python-Objekt.
+
+    Args:
+        value (str): Der Wert aus der 'events'-Tabelle.
+
+    Returns:
+        Das dekodierte Objekt, None für "null" oder den unveränderten String,
+        wenn es kein gültiges JSON ist.
+    """
+    # Versuche, den 'value'-String zurück in ein Python-Objekt zu konvertieren
+    try:
+        if value == "null":
+            return None
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        # Wenn es kein gültiger JSON-String ist, behalte es als String
+        return value
+
+def get_all_events(db_path):
+    """
+    Ruft alle Events aus der 'events'-Tabelle und den nicht archivierten
+    Monats-Partitionen ab (siehe partitions.get_events).
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+
+    Returns:
+        list: Eine Liste von Diktionären, die die Events repräsentieren.
+    """
+    import partitions # partitions.py importiert database.py
+
+    return partitions.get_events(db_path)
+
+def normalize_query(query):
+    """
+    Vereinheitlicht eine SQL-Abfrage für den Cache-Schlüssel: Leerraum wird
+    zusammengefasst, ein abschließendes Semikolon entfernt. Zeichenketten in
+    der Abfrage bleiben unverändert.
+    """
+    parts = re.split(r"('(?:[^']|'')*')", query)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", parts[i])
+    return "".join(parts).strip().rstrip(";").strip()
+
+class QueryCache:
+    """
+    Zwischenspeicher für lesende Abfragen (z.B. Auswertungen für ein Dashboard).
+
+    Ergebnisse werden unter der normalisierten Abfrage und ihren Parametern
+    gespeichert und bleiben gültig, bis sich die Schreib-Generation in der
+    'meta'-Tabelle ändert (siehe bump_write_generation). Ob überhaupt ein
+    anderer Prozess geschrieben hat, wird vorher billig über
+    'PRAGMA data_version' geprüft, sodass ein Treffer weder die
+    'events'-Tabelle noch die 'meta'-Tabelle liest. Die Generation erhöhen
+    nur Schreibvorgänge auf Events und Rollups; die Laufzeit-Metriken jedes
+    Modul-Laufs (siehe insert_run) leeren den Cache nicht, Abfragen auf die
+    'runs'-Tabelle gehören daher nicht in den Cache.
+
+    Im Speicher werden höchstens 'max_entries' Ergebnisse gehalten (LRU).
+    Mit 'persistent_path' werden die Ergebnisse zusätzlich in einer eigenen
+    SQLite-Datei abgelegt und überstehen so einen Neustart.
+    """
+
+    def __init__(self, db_path, max_entries=256, persistent_path=None, max_persistent_entries=4096):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.persistent_path = persistent_path
+        self.max_persistent_entries = max_persistent_entries
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # Schlüssel -> (Generation, Spalten, Zeilen)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._data_version = None
+        self._generation = None
+        self._store = None
+        if persistent_path:
+            self._store = sqlite3.connect(persistent_path, check_same_thread=False)
+            self._store.execute('''
+                CREATE TABLE IF NOT EXISTS query_cache (
+                    key TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    used_at REAL NOT NULL
+                )
+            ''')
+            self._store.commit()
+
+    def close(self):
+        self._conn.close()
+        if self._store:
+            self._store.close()
+
+    def current_generation(self):
+        """
+        Returns:
+            int: Die aktuelle Schreib-Generation der Datenbank.
+        """
+        data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != self._data_version or self._generation is None:
+            try:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = 'write_generation'").fetchone()
+            except sqlite3.OperationalError:
+                row = None # Datenbank ohne 'meta'-Tabelle (init_db noch nicht ausgeführt)
+            self._generation = row[0] if row else 0
+            self._data_version = data_version
+        return self._generation
+
+    def _store_get(self, key, generation):
+        row = self._store.execute(
+            'SELECT result FROM query_cache WHERE key = ? AND generation = ?', (key, generation)
+        ).fetchone()
+        if row is None:
+            return None
+        self._store.execute('UPDATE query_cache SET used_at = ? WHERE key = ?', (time.time(), key))
+        self._store.commit()
+        result = json.loads(row[0])
+        return result["columns"], [tuple(r) for r in result["rows"]]
+
+    def _store_put(self, key, generation, columns, rows):
+        try:
+            result = json.dumps({"columns": columns, "rows": rows})
+        except (TypeError, ValueError):
+            return # z.B. BLOB-Spalten werden nur im Speicher gehalten
+        self._store.execute(
+            'INSERT OR REPLACE INTO query_cache (key, generation, result, used_at) VALUES (?, ?, ?, ?)',
+            (key, generation, result, time.time())
+        )
+        self._store.execute('''
+            DELETE FROM query_cache WHERE key NOT IN (
+                SELECT key FROM query_cache ORDER BY used_at DESC LIMIT ?
+            )
+        ''', (self.max_persistent_entries,))
+        self._store.commit()
+
+    def query(self, query, params=()):
+        """
+        Führt eine lesende Abfrage aus oder liefert das zwischengespeicherte
+        Ergebnis, sofern seitdem nichts geschrieben wurde.
+
+        Args:
+            query (str): Die SQL-Abfrage (nur SELECT).
+            params (tuple): Die Parameter der Abfrage.
+
+        Returns:
+            list: Eine Liste von Diktionären (Spaltenname -> Wert).
+        """
+        params = tuple(params)
+        with self._lock:
+            generation = self.current_generation()
+            key = hashlib.sha1(repr((normalize_query(query), params)).encode("utf-8")).hexdigest()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                columns, rows = entry[1], entry[2]
+            else:
+                cached = self._store_get(key, generation) if self._store else None
+                if cached is not None:
+                    self.persistent_hits += 1
+                    columns, rows = cached
+                else:
+                    self.misses += 1
+                    cursor = self._conn.execute(query, params)
+                    columns = [description[0] for description in cursor.description or ()]
+                    rows = cursor.fetchall()
+                    if self._store:
+                        self._store_put(key, generation, columns, rows)
+                self._entries[key] = (generation, columns, rows)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return [dict(zip(columns, row)) for row in rows]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._store:
+                self._store.execute('DELETE FROM query_cache')
+                self._store.commit()
+
+_query_caches = {}
+_query_caches_lock = threading.Lock()
+
+def get_query_cache(db_path):
+    """
+    Gibt den gemeinsamen QueryCache für eine Datenbank zurück, eingestellt
+    über den Abschnitt [QueryCache] der Konfigurationsdatei.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+
+    Returns:
+        QueryCache: Der Cache für diese Datenbank.
+    """
+    with _query_caches_lock:
+        cache = _query_caches.get(db_path)
+        if cache is None:
+            config = settings.get_config()
+            persistent_path = config.get('QueryCache', 'persistent_path', fallback='').strip()
+            cache = QueryCache(
+                db_path,
+                max_entries=config.getint('QueryCache', 'max_entries', fallback=256),
+                persistent_path=settings.resolve_path(persistent_path) if persistent_path else None,
+                max_persistent_entries=config.getint('QueryCache', 'max_persistent_entries', fallback=4096),
+            )
+            _query_caches[db_path] = cache
+        return cache
+
+def cached_query(db_path, query, params=()):
+    """
+    Kurzform für get_query_cache(db_path).query(query, params).
+    """
+    return get_query_cache(db_path).query(query, params)
 
 # Beispiel für die Nutzung (kann entfernt werden, wenn main.py die einzige Schnittstelle ist)
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     test_db_path = 'test_statistics.db'
     init_db(test_db_path)
 
@@ -0,0 +1,87 @@
+# event.py - Kompakter Datentyp für die Events der Tracker-Module
+
+from datetime import datetime
+
+class Event:
+    """
+    Ein einzelnes Event, wie es in der 'events'-Tabelle gespeichert wird.
+
+    Dank __slots__ belegt ein Event deutlich weniger Speicher als ein
+    Diktionär, was bei großen Mengen (z.B. YouTube-Verlauf oder GPS-Tracks)
+    ins Gewicht fällt. Der Zeitstempel wird beim Erstellen in einen
+    ISO-8601-String umgewandelt, sodass beim Schreiben nichts mehr
+    nachbearbeitet werden muss.
+
+    Attributes:
+        timestamp (str): Zeitpunkt im ISO-8601-Format.
+        event_type (str): Der Typ des Events, z.B. 'weather_forecast'.
+        value: Der Wert (einfacher Typ oder JSON-fähige Struktur).
+        source_module (str): Das erzeugende Modul, None bis main.py es setzt.
+        natural_key (str): Optionaler natürlicher Schlüssel (siehe database.natural_key).
+    """
+
+    __slots__ = ("timestamp", "event_type", "value", "source_module", "natural_key")
+
+    def __init__(self, event_type, value=None, timestamp=None, source_module=None, natural_key=None):
+        if timestamp is None:
+            timestamp = datetime.now()
+        self.timestamp = timestamp.isoformat() if isinstance(timestamp, datetime) else str(timestamp)
+        self.event_type = event_type
+        self.value = value
+        self.source_module = source_module
+        self.natural_key = natural_key
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Erstellt ein Event aus dem bisherigen Diktionär-Format der Module.
+
+        Args:
+            data (dict): Diktionär mit 'event_type', 'value' und optional
+                         'timestamp', 'source_module' und 'natural_key'.
+
+        Returns:
+            Event: Das neue Event.
+        """
+        return cls(
+            data.get("event_type", "generic_event"),
+            data.get("value"),
+            data.get("timestamp"),
+            data.get("source_module"),
+            data.get("natural_key"),
+        )
+
+    def get(self, key, default=None):
+        """Lesezugriff wie bei einem Diktionär, damit bestehender Code weiter funktioniert."""
+        if key in self.__slots__:
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __contains__(self, key):
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: Das Event als Diktionär (z.B. für die Spool-Datei in ingest.py).
+        """
+        data = {
+            "timestamp": self.timestamp,
+            "event_type": self.event_type,
+            "value": self.value,
+        }
+        if self.source_module is not None:
+            data["source_module"] = self.source_module
+        if self.natural_key is not None:
+            data["natural_key"] = self.natural_key
+        return data
+
+    def __eq__(self, other):
+        if not isinstance(other, Event):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return (f"Event(event_type={self.event_type!r}, timestamp={self.timestamp!r}, "
+                f"source_module={self.source_module!r}, value={self.value!r})")
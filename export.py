@@ -0,0 +1,386 @@
+# export.py - Streamender Export der Events als NDJSON, CSV oder Parquet
+#
+# Der Zeitraum wird in Abschnitte ('slice_days') aufgeteilt, die unabhängig
+# voneinander (optional parallel in mehreren Prozessen) in Teildateien
+# geschrieben werden. Innerhalb eines Abschnitts werden die Events seitenweise
+# über (timestamp, id) gelesen, sodass nie mehr als 'chunk_size' Zeilen im
+# Speicher liegen. Fertige Abschnitte stehen in einer Checkpoint-Datei; ein
+# abgebrochener Export setzt beim nächsten Aufruf mit denselben Parametern dort
+# fort. Zum Schluss werden die Teildateien der Reihe nach zusammengefügt.
+#
+# Die JSON-Werte werden direkt in SQLite zerlegt (json_extract bzw. json()),
+# damit nicht jede Zeile in Python dekodiert und wieder kodiert werden muss.
+#
+# Bei aktivierter Partitionierung wird jede Monats-Partition des Abschnitts
+# (siehe partitions.py) einzeln seitenweise gelesen und nach Zeitpunkt mit
+# der Hauptdatenbank zusammengeführt. Die 'id' ist nur innerhalb einer Datei
+# eindeutig.
+
+import csv
+import heapq
+import json
+import logging
+import os
+import shutil
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import partitions
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "csv", "parquet")
+
+# Spalten, die jede Zeile im CSV- und Parquet-Export enthält
+BASE_COLUMNS = ["id", "timestamp", "source_module", "event_type", "value"]
+
+# Bekannte Wert-Schemata, die im CSV- und Parquet-Export in eigene Spalten
+# aufgeteilt werden: Spaltenname -> (Typ, [(event_type, JSON-Pfad), ...]).
+# Der Typ ('float', 'int' oder 'str') bestimmt die Parquet-Spalte.
+FLAT_COLUMNS = {
+    "forecast_time": ("str", [("weather_forecast", "$.forecast.time")]),
+    "temperature_celsius": ("float", [("weather_forecast", "$.forecast.temperature_celsius")]),
+    "weather_description": ("str", [("weather_forecast", "$.forecast.weather_description")]),
+    "precipitation_probability_percent": ("float", [("weather_forecast", "$.forecast.precipitation_probability_percent")]),
+    "wind_speed_kmh": ("float", [("weather_forecast", "$.forecast.wind_speed_kmh")]),
+    "warnings": ("str", [("weather_forecast", "$.warnings")]),
+    "date": ("str", [
+        ("pollen_forecast_daily", "$.date"),
+        ("weekly_holiday_reminder", "$.date"),
+        ("weekly_appointment_reminder", "$.date"),
+    ]),
+    "grass_pollen": ("float", [("pollen_forecast_daily", "$.pollen_types.grass.level_numeric")]),
+    "birch_pollen": ("float", [("pollen_forecast_daily", "$.pollen_types.birch.level_numeric")]),
+    "hazel_pollen": ("float", [("pollen_forecast_daily", "$.pollen_types.hazel.level_numeric")]),
+    "alder_pollen": ("float", [("pollen_forecast_daily", "$.pollen_types.alder.level_numeric")]),
+    "ragweed_pollen": ("float", [("pollen_forecast_daily", "$.pollen_types.ragweed.level_numeric")]),
+    "name": ("str", [
+        ("weekly_holiday_reminder", "$.local_name"),
+        ("weekly_appointment_reminder", "$.title"),
+    ]),
+    "shopping_items": ("str", [("shopping_list_processed", "$.items")]),
+}
+
+def _flat_columns(event_types=None):
+    """Die aufgeteilten Spalten, die für die gewählten Event-Typen relevant sind."""
+    if not event_types:
+        return list(FLAT_COLUMNS)
+    return [name for name, (_, sources) in FLAT_COLUMNS.items()
+            if any(event_type in event_types for event_type, _ in sources)]
+
+def _select_clause(fmt, flat_columns):
+    if fmt == "ndjson":
+        # Gültiges JSON wird eingebettet, alles andere (z.B. YouTube-Titel) als String
+        return '''json_object(
+            'id', id, 'timestamp', timestamp, 'source_module', source_module, 'event_type', event_type,
+            'value', CASE WHEN value = 'null' THEN NULL WHEN json_valid(value) THEN json(value) ELSE value END
+        )'''
+    expressions = list(BASE_COLUMNS)
+    for name in flat_columns:
+        _, sources = FLAT_COLUMNS[name]
+        cases = " ".join(
+            f"WHEN event_type = '{event_type}' THEN json_extract(value, '{path}')"
+            for event_type, path in sources
+        )
+        expressions.append(f"CASE WHEN json_valid(value) THEN CASE {cases} END END AS {name}")
+    return ", ".join(expressions)
+
+def _filter_clause(modules, event_types):
+    clauses, params = [], []
+    if modules:
+        clauses.append(f"source_module IN ({', '.join('?' for _ in modules)})")
+        params.extend(modules)
+    if event_types:
+        clauses.append(f"event_type IN ({', '.join('?' for _ in event_types)})")
+        params.extend(event_types)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+def iter_event_chunks(db_path, start, end, fmt="ndjson", modules=None, event_types=None, chunk_size=5000):
+    """
+    Liest die Events eines Zeitraums seitenweise (Keyset-Paging über
+    timestamp und id), ohne den ganzen Zeitraum in den Speicher zu laden.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        start (str): Beginn des Zeitraums (ISO 8601, einschließlich).
+        end (str): Ende des Zeitraums (ISO 8601, ausschließlich).
+        fmt (str): 'ndjson' liefert fertige JSON-Zeilen, sonst Spaltentupel.
+        modules (list): Optional nur Events dieser Module.
+        event_types (list): Optional nur Events dieser Typen.
+        chunk_size (int): Anzahl der Zeilen pro Seite.
+
+    Yields:
+        list: Die Zeilen einer Seite.
+    """
+    sources = [_iter_source_rows(path, start, end, fmt, modules, event_types, chunk_size)
+               for _, path in partitions.event_sources(db_path, start, end)]
+    rows = heapq.merge(*sources, key=lambda row: row[-2]) if len(sources) > 1 else sources[0]
+    try:
+        chunk = []
+        for row in rows:
+            chunk.append(row[:-2])
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        for source in sources:
+            source.close()
+
+def _iter_source_rows(path, start, end, fmt, modules, event_types, chunk_size):
+    """Die Zeilen einer Datenbankdatei, seitenweise nach (timestamp, id) gelesen."""
+    filters, filter_params = _filter_clause(modules, event_types)
+    select = _select_clause(fmt, _flat_columns(event_types))
+    query = f'''
+        SELECT {select}, timestamp AS _ts, id AS _id FROM events
+        WHERE timestamp >= ? AND timestamp < ? AND (timestamp, id) > (?, ?){filters}
+        ORDER BY timestamp, id
+        LIMIT ?
+    '''
+    last_ts, last_id = "", 0
+    conn = sqlite3.connect(path)
+    try:
+        while True:
+            rows = conn.execute(query, (start, end, last_ts, last_id, *filter_params, chunk_size)).fetchall()
+            if not rows:
+                return
+            last_ts, last_id = rows[-1][-2], rows[-1][-1]
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+    finally:
+        conn.close()
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+def _parquet_schema(pa, flat_columns):
+    types = {"float": pa.float64(), "int": pa.int64(), "str": pa.string()}
+    fields = [
+        pa.field("id", pa.int64()),
+        pa.field("timestamp", pa.string()),
+        pa.field("source_module", pa.string()),
+        pa.field("event_type", pa.string()),
+        pa.field("value", pa.string()),
+    ]
+    fields += [pa.field(name, types[FLAT_COLUMNS[name][0]]) for name in flat_columns]
+    return pa.schema(fields)
+
+def _parquet_batch(pa, schema, rows):
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_floating(field.type):
+            values = [float(v) if isinstance(v, (int, float)) else None for v in values]
+        elif pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def export_slice(db_path, part_path, start, end, fmt, modules=None, event_types=None, chunk_size=5000):
+    """
+    Exportiert einen Abschnitt des Zeitraums in eine Teildatei. Wird in den
+    Worker-Prozessen ausgeführt und öffnet daher eine eigene Verbindung.
+    CSV-Teildateien enthalten keine Kopfzeile, jede Seite wird bei Parquet
+    zu einer eigenen Row Group.
+
+    Returns:
+        int: Die Anzahl der exportierten Events.
+    """
+    count = 0
+    chunks = iter_event_chunks(db_path, start, end, fmt, modules, event_types, chunk_size)
+    tmp_path = part_path + ".tmp"
+    if fmt == "parquet":
+        pa = _require_pyarrow()
+        schema = _parquet_schema(pa, _flat_columns(event_types))
+        writer = pa.parquet.ParquetWriter(tmp_path, schema)
+        try:
+            for rows in chunks:
+                writer.write_batch(_parquet_batch(pa, schema, rows))
+                count += len(rows)
+        finally:
+            writer.close()
+    else:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f) if fmt == "csv" else None
+            for rows in chunks:
+                if writer:
+                    writer.writerows(rows)
+                else:
+                    f.writelines(row[0] + "\n" for row in rows)
+                count += len(rows)
+    os.replace(tmp_path, part_path)
+    return count
+
+def _time_range(db_path, start, end, modules, event_types):
+    """Ergänzt fehlende Grenzen des Zeitraums aus den vorhandenen Events."""
+    if start and end:
+        return start, end
+    filters, params = _filter_clause(modules, event_types)
+    bounds = []
+    for _, path in partitions.event_sources(db_path):
+        conn = sqlite3.connect(path)
+        try:
+            bounds.append(conn.execute(f"SELECT MIN(timestamp), MAX(timestamp) FROM events WHERE 1 = 1{filters}", params).fetchone())
+        finally:
+            conn.close()
+    bounds = [bound for bound in bounds if bound[0] is not None]
+    if not bounds:
+        return None, None
+    first, last = min(bound[0] for bound in bounds), max(bound[1] for bound in bounds)
+    if not end:
+        end = (date.fromisoformat(last[:10]) + timedelta(days=1)).isoformat()
+    return start or first[:10], end
+
+def split_range(start, end, slice_days):
+    """
+    Teilt einen Zeitraum in Abschnitte an Tagesgrenzen auf.
+
+    Returns:
+        list: (Beginn, Ende)-Tupel, jeweils als ISO-8601-String.
+    """
+    slices = []
+    current = start
+    while current < end:
+        boundary = (date.fromisoformat(current[:10]) + timedelta(days=slice_days)).isoformat()
+        boundary = min(boundary, end)
+        slices.append((current, boundary))
+        current = boundary
+    return slices
+
+def _load_checkpoint(path, params):
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if checkpoint.get("params") != params:
+        return {}
+    return {int(index): rows for index, rows in checkpoint.get("done", {}).items()}
+
+def _save_checkpoint(path, params, done):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"params": params, "done": done}, f)
+    os.replace(tmp_path, path)
+
+def _merge_parts(part_paths, output_path, fmt, flat_columns):
+    tmp_path = output_path + ".tmp"
+    if fmt == "parquet":
+        pa = _require_pyarrow()
+        schema = _parquet_schema(pa, flat_columns)
+        writer = pa.parquet.ParquetWriter(tmp_path, schema)
+        try:
+            for part_path in part_paths:
+                part = pa.parquet.ParquetFile(part_path)
+                # Row Group für Row Group, damit nie eine ganze Teildatei im Speicher liegt
+                for i in range(part.num_row_groups):
+                    writer.write_table(part.read_row_group(i))
+        finally:
+            writer.close()
+    else:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as out:
+            if fmt == "csv":
+                csv.writer(out).writerow(BASE_COLUMNS + flat_columns)
+            for part_path in part_paths:
+                with open(part_path, encoding="utf-8", newline="") as part:
+                    shutil.copyfileobj(part, out)
+    os.replace(tmp_path, output_path)
+
+def export_events(db_path, output_path, fmt="ndjson", start=None, end=None, modules=None,
+                  event_types=None, chunk_size=5000, slice_days=7, workers=1):
+    """
+    Exportiert Events eines Zeitraums in eine Datei. Bricht der Export ab,
+    setzt ein erneuter Aufruf mit denselben Parametern nach dem letzten
+    vollständig geschriebenen Abschnitt fort.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        output_path (str): Zieldatei.
+        fmt (str): 'ndjson', 'csv' oder 'parquet' (benötigt pyarrow).
+        start (str): Beginn des Zeitraums (ISO 8601, Standard: ältestes Event).
+        end (str): Ende des Zeitraums, ausschließlich (Standard: nach dem jüngsten Event).
+        modules (list): Optional nur Events dieser Module.
+        event_types (list): Optional nur Events dieser Typen.
+        chunk_size (int): Zeilen pro gelesener Seite bzw. Parquet-Row-Group.
+        slice_days (int): Länge der Abschnitte in Tagen.
+        workers (int): Anzahl paralleler Prozesse (1 = ohne Prozess-Pool).
+
+    Returns:
+        int: Die Anzahl der exportierten Events oder None bei einem Fehler.
+    """
+    if fmt not in FORMATS:
+        logger.error("Unbekanntes Export-Format '%s' (erlaubt: %s).", fmt, ', '.join(FORMATS))
+        return None
+    if fmt == "parquet" and _require_pyarrow() is None:
+        logger.error("Für den Parquet-Export wird 'pyarrow' benötigt (pip install 'stat-tracker[parquet]').")
+        return None
+
+    start, end = _time_range(db_path, start, end, modules, event_types)
+    if start is None:
+        logger.info("Keine Events für den Export gefunden.")
+        return 0
+
+    params = {
+        "fmt": fmt, "start": start, "end": end, "modules": modules, "event_types": event_types,
+        "slice_days": slice_days,
+    }
+    checkpoint_path = output_path + ".checkpoint"
+    parts_dir = output_path + ".parts"
+    os.makedirs(parts_dir, exist_ok=True)
+    done = _load_checkpoint(checkpoint_path, params)
+    if done:
+        logger.info("Setze Export fort: %s Abschnitte bereits geschrieben.", len(done))
+
+    slices = split_range(start, end, slice_days)
+    part_paths = [os.path.join(parts_dir, f"{i:06d}.{fmt}") for i in range(len(slices))]
+    pending = [i for i in range(len(slices)) if i not in done or not os.path.exists(part_paths[i])]
+
+    def finished(index, rows):
+        done[index] = rows
+        _save_checkpoint(checkpoint_path, params, done)
+
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(export_slice, db_path, part_paths[i], *slices[i], fmt, modules, event_types, chunk_size): i
+                for i in pending
+            }
+            for future, index in futures.items():
+                finished(index, future.result())
+    else:
+        for index in pending:
+            finished(index, export_slice(db_path, part_paths[index], *slices[index], fmt, modules, event_types, chunk_size))
+
+    _merge_parts(part_paths, output_path, fmt, _flat_columns(event_types))
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    os.remove(checkpoint_path)
+    total = sum(done.values())
+    logger.info("%s Events nach '%s' exportiert (%s).", total, output_path, fmt)
+    return total
+
+def add_arguments(parser):
+    """Fügt die Optionen des Export-Befehls zu einem argparse-Parser hinzu."""
+    parser.add_argument("output", help="Zieldatei des Exports.")
+    parser.add_argument("--format", dest="fmt", choices=FORMATS, default="ndjson", help="Ausgabeformat (Standard: ndjson).")
+    parser.add_argument("--start", help="Beginn des Zeitraums (ISO 8601, z.B. 2024-01-01).")
+    parser.add_argument("--end", help="Ende des Zeitraums, ausschließlich (ISO 8601).")
+    parser.add_argument("--module", dest="modules", action="append", help="Nur Events dieses Moduls (mehrfach möglich).")
+    parser.add_argument("--event-type", dest="event_types", action="append", help="Nur Events dieses Typs (mehrfach möglich).")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Zeilen pro Seite bzw. Parquet-Row-Group.")
+    parser.add_argument("--slice-days", type=int, default=7, help="Länge der parallel exportierten Abschnitte in Tagen.")
+    parser.add_argument("--workers", type=int, default=1, help="Anzahl paralleler Prozesse.")
+
+def run_from_args(db_path, args):
+    """Führt den Export mit den von add_arguments() definierten Optionen aus."""
+    return export_events(
+        db_path, os.path.abspath(args.output), args.fmt, args.start, args.end, args.modules,
+        args.event_types, max(args.chunk_size, 1), max(args.slice_days, 1), max(args.workers, 1),
+    )
@@ -0,0 +1,272 @@
+# gaps.py - Abdeckung der Modul-Läufe und Nachholen fehlender Zeitabschnitte
+#
+# Nach jedem erfolgreichen Lauf eines Moduls wird sein Zeitabschnitt (Stunde
+# oder Tag, je nach Intervall des Moduls) in der Tabelle 'coverage'
+# eingetragen. Fehlgeschlagene Läufe (z.B. mit 'weather_fetch_failed') und
+# Zeiten, in denen der Tracker gar nicht lief, bleiben so als Lücken
+# erkennbar, ohne die 'events'-Tabelle zu durchsuchen: Eine Bereichsabfrage
+# über den Primärschlüssel liefert die abgedeckten Abschnitte eines Zeitraums.
+# Für Module mit Backfill-Quelle (siehe backfill.py) lädt repair_gaps die
+# fehlenden Tage gezielt nach, und zwar nur für den Ort, den das Modul abruft.
+# Das Nachladen läuft wie Aufräumen und Sicherung in einem Hintergrund-Thread
+# (siehe start_background), damit Abrufe und Wartezeiten zwischen
+# Wiederholungen die Modul-Läufe nicht aufhalten.
+
+import logging
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+import backfill
+import database
+import instrumentation
+import settings
+
+logger = logging.getLogger(__name__)
+
+RUN_NAME = "coverage_repair"
+
+def bucket_unit(interval_seconds):
+    """Module, die höchstens einmal am Tag laufen, werden pro Tag erfasst, alle anderen pro Stunde."""
+    return "day" if interval_seconds >= 86400 else "hour"
+
+def bucket_for(moment, unit):
+    """
+    Args:
+        moment (datetime): Der Zeitpunkt.
+        unit (str): 'hour' oder 'day'.
+
+    Returns:
+        str: Der Zeitabschnitt, z.B. '2024-06-01T14' oder '2024-06-01'.
+    """
+    return moment.strftime("%Y-%m-%dT%H" if unit == "hour" else "%Y-%m-%d")
+
+def _buckets(start, end, unit):
+    """Alle Zeitabschnitte von 'start' bis vor 'end'."""
+    step = timedelta(hours=1) if unit == "hour" else timedelta(days=1)
+    moment = start.replace(minute=0, second=0, microsecond=0)
+    if unit == "day":
+        moment = moment.replace(hour=0)
+    while moment < end:
+        yield bucket_for(moment, unit)
+        moment += step
+
+def init_coverage_store(db_path):
+    """
+    Erstellt die Tabelle 'coverage'.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS coverage (
+                source_module TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                collected_at TEXT NOT NULL,
+                PRIMARY KEY (source_module, bucket)
+            ) WITHOUT ROWID
+        ''')
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Anlegen der Tabelle 'coverage': %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+def record_coverage(db_path, source_module, buckets):
+    """
+    Trägt Zeitabschnitte eines Moduls als abgedeckt ein.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        source_module (str): Der Modulname.
+        buckets (iterable): Die Zeitabschnitte (siehe bucket_for).
+    """
+    collected_at = datetime.now().isoformat()
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.executemany('''
+                INSERT INTO coverage (source_module, bucket, collected_at) VALUES (?, ?, ?)
+                ON CONFLICT (source_module, bucket) DO UPDATE SET collected_at = excluded.collected_at
+            ''', [(source_module, bucket, collected_at) for bucket in buckets])
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Speichern der Abdeckung von '%s': %s", source_module, e)
+    finally:
+        if conn:
+            conn.close()
+
+def record_run(db_path, plugin, metrics):
+    """
+    Trägt die Zeitabschnitte eines erfolgreichen Modul-Laufs ein: den
+    Abschnitt des Starts und, bei längeren Intervallen (z.B. alle 6 Stunden),
+    die folgenden Abschnitte bis zum nächsten fälligen Lauf. Läufe, deren
+    Anfragen ein offener Circuit Breaker abgewiesen hat, bleiben Lücken.
+    """
+    if metrics.failures or metrics.skipped_open_circuit:
+        return
+    unit = bucket_unit(plugin.interval_seconds)
+    span = timedelta(hours=1) if unit == "hour" else timedelta(days=1)
+    start = datetime.fromisoformat(metrics.started_at)
+    count = max(1, int(plugin.interval_seconds // span.total_seconds()))
+    record_coverage(db_path, plugin.name, [bucket_for(start + span * i, unit) for i in range(count)])
+
+def record_days(db_path, source_module, interval_seconds, days):
+    """Trägt ganze Tage als abgedeckt ein, z.B. nach einem Backfill."""
+    unit = bucket_unit(interval_seconds)
+    buckets = []
+    for day in days:
+        start = datetime.combine(day, datetime.min.time())
+        buckets.extend(_buckets(start, start + timedelta(days=1), unit))
+    record_coverage(db_path, source_module, buckets)
+
+def find_gaps(db_path, source_module, interval_seconds, start, end):
+    """
+    Ermittelt die nicht abgedeckten Zeitabschnitte eines Moduls. Zeit vor dem
+    ersten abgedeckten Abschnitt zählt nicht als Lücke.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        source_module (str): Der Modulname.
+        interval_seconds (int): Das Intervall des Moduls.
+        start (datetime): Beginn des Zeitraums.
+        end (datetime): Ende des Zeitraums (exklusiv).
+
+    Returns:
+        list: Die fehlenden Zeitabschnitte, aufsteigend.
+    """
+    unit = bucket_unit(interval_seconds)
+    expected = list(_buckets(start, end, unit))
+    if not expected:
+        return []
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        earliest = conn.execute(
+            'SELECT min(bucket) FROM coverage WHERE source_module = ?', (source_module,)
+        ).fetchone()[0]
+        if earliest is None:
+            return []
+        covered = {row[0] for row in conn.execute(
+            'SELECT bucket FROM coverage WHERE source_module = ? AND bucket BETWEEN ? AND ?',
+            (source_module, max(expected[0], earliest), expected[-1])
+        )}
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Lesen der Abdeckung von '%s': %s", source_module, e)
+        return []
+    finally:
+        if conn:
+            conn.close()
+    return [bucket for bucket in expected if bucket >= earliest and bucket not in covered]
+
+def _day_ranges(days, chunk_days):
+    """Fasst aufeinanderfolgende Tage zu (erster, letzter Tag)-Abschnitten zusammen."""
+    ranges = []
+    for day in sorted(days):
+        if ranges and day == ranges[-1][1] + timedelta(days=1) and (day - ranges[-1][0]).days < chunk_days:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [(first.isoformat(), last.isoformat()) for first, last in ranges]
+
+def repair_gaps(db_path, plugins, lookback_days=7, now=None):
+    """
+    Sucht die Lücken der letzten 'lookback_days' Tage und lädt sie für Module
+    mit Backfill-Quelle gezielt über backfill.fetch_tasks nach. Die jüngsten
+    Tage, die das Wetter-Archiv noch nicht enthält, fragt der weather_tracker
+    bei der Vorhersage-API ab; vorhandene Events bleiben unverändert.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        plugins (list): PluginMetadata der Module (Name und Intervall).
+        lookback_days (int): Wie weit zurück nach Lücken gesucht wird.
+        now (datetime): Optional der aktuelle Zeitpunkt (für Tests).
+
+    Returns:
+        dict: Modulname -> Anzahl der gefundenen Lücken.
+    """
+    now = now or datetime.now()
+    start = now - timedelta(days=lookback_days)
+    sources = {module_name: source for source, (module_name, _, _) in backfill.SOURCES.items()}
+    config = settings.get_config()
+    chunk_days = config.getint('Backfill', 'chunk_days', fallback=31)
+    gaps, tasks, locations = {}, [], {}
+    for plugin in plugins:
+        # Der laufende Abschnitt ist noch keine Lücke
+        unit = bucket_unit(plugin.interval_seconds)
+        end = now - (timedelta(hours=1) if unit == "hour" else timedelta(days=1))
+        missing = find_gaps(db_path, plugin.name, plugin.interval_seconds, start, end)
+        if not missing:
+            continue
+        gaps[plugin.name] = len(missing)
+        source = sources.get(plugin.name)
+        if source is None:
+            logger.info("Abdeckung: %s Lücken bei '%s' (kein Nachladen möglich).", len(missing), plugin.name)
+            continue
+        days = {date.fromisoformat(bucket[:10]) for bucket in missing}
+        # Die Lücken betreffen nur den Ort des Moduls, nicht alle Orte aus [Backfill]
+        location = backfill.module_location(source)
+        locations[location[0]] = location
+        logger.info("Abdeckung: %s Lücken bei '%s', lade %s Tage für %s nach.",
+                    len(missing), plugin.name, len(days), location[0])
+        tasks.extend((source, location[0], first, last) for first, last in _day_ranges(days, chunk_days))
+    if tasks:
+        backfill.init_backfill_store(db_path)
+        backfill.fetch_tasks(
+            db_path, tasks,
+            workers=config.getint('Backfill', 'workers', fallback=4),
+            requests_per_second=config.getfloat('Backfill', 'requests_per_second', fallback=2.0),
+            retries=config.getint('Backfill', 'retries', fallback=2),
+            locations=list(locations.values()),
+        )
+    return gaps
+
+def run_repair(db_path, plugins):
+    """
+    Führt repair_gaps mit 'lookback_days' aus [Coverage] aus. Der Lauf wird
+    in der 'runs'-Tabelle gespeichert.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        plugins (list): PluginMetadata der Module.
+    """
+    config = settings.get_config()
+    with instrumentation.measure_module(RUN_NAME) as metrics:
+        gaps = repair_gaps(db_path, plugins, config.getint('Coverage', 'lookback_days', fallback=7))
+    metrics.event_count = sum(gaps.values())
+    database.insert_run(db_path, metrics.as_dict())
+
+_background_thread = None
+
+def start_background(db_path, plugins, last_runs):
+    """
+    Startet run_repair in einem Hintergrund-Thread, sofern 'repair' in
+    [Coverage] aktiviert ist, seit dem letzten Lauf 'repair_interval_seconds'
+    vergangen sind und kein Lauf aktiv ist.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        plugins (list): PluginMetadata der Module.
+        last_runs (dict): Modulname -> Startzeitpunkt des letzten Laufs (ISO 8601).
+
+    Returns:
+        threading.Thread: Der gestartete Thread oder None.
+    """
+    global _background_thread
+    config = settings.get_config()
+    if not config.getboolean('Coverage', 'repair', fallback=True):
+        return None
+    if _background_thread is not None and _background_thread.is_alive():
+        return None
+    interval = config.getint('Coverage', 'repair_interval_seconds', fallback=21600)
+    last_run = last_runs.get(RUN_NAME)
+    if last_run and (datetime.now() - datetime.fromisoformat(last_run)).total_seconds() < interval:
+        return None
+    # Kein Daemon-Thread, damit eine laufende Transaktion nicht beim Beenden abbricht
+    _background_thread = threading.Thread(target=run_repair, args=(db_path, list(plugins)), name="coverage_repair")
+    _background_thread.start()
+    return _background_thread
@@ -0,0 +1,237 @@
+# geocoder.py - Offline-Reverse-Geocoding über ein lokales Ortsverzeichnis (Gazetteer)
+#
+# Das Ortsverzeichnis liegt als Binärdatei vor, die per mmap eingebunden wird.
+# Die Einträge sind bereits beim Erstellen der Datei in der Reihenfolge eines
+# balancierten k-d-Baums abgelegt (Knoten = Mitte des jeweiligen Bereichs),
+# sodass eine Abfrage nur O(log n) Einträge direkt aus der Datei liest und
+# beim Laden nichts sortiert oder in Python-Objekte umgewandelt werden muss.
+#
+# Aufbau der Datei:
+#   Kopf:      Kennung b"STGZ", Version (uint16), Anzahl Einträge (uint32)
+#   Einträge:  x, y, z (Einheitsvektor, float32), Breiten- und Längengrad (float32),
+#              Offset und Länge des Namens im Namensblock (uint32, uint16)
+#   Namen:     UTF-8-kodierte Ortsnamen ohne Trennzeichen
+
+import csv
+import logging
+import math
+import mmap
+import os
+import struct
+from functools import lru_cache
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"STGZ"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHI")
+_RECORD = struct.Struct("<fffffIH2x")
+
+EARTH_RADIUS_METERS = 6371000.0
+
+# Gebündeltes Ortsverzeichnis und seine Quelldatei; die Binärdatei wird
+# mitgeliefert und nur über 'python geocoder.py' neu erstellt
+DEFAULT_GAZETTEER_PATH = os.path.join(settings.BASE_DIR, 'data', 'gazetteer.bin')
+DEFAULT_GAZETTEER_SOURCE = os.path.join(settings.BASE_DIR, 'data', 'gazetteer.csv')
+
+def _unit_vector(latitude, longitude):
+    """
+    Wandelt Breiten- und Längengrad in einen Punkt auf der Einheitskugel um.
+    Der euklidische Abstand dieser Punkte wächst streng monoton mit der
+    Entfernung auf der Erdoberfläche, daher eignet er sich für den k-d-Baum.
+    """
+    phi = math.radians(latitude)
+    lam = math.radians(longitude)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+def _chord_to_meters(chord):
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, chord / 2))
+
+def build_gazetteer(csv_path, bin_path):
+    """
+    Erstellt die Binärdatei des Ortsverzeichnisses aus einer CSV-Datei mit
+    den Spalten 'name', 'latitude' und 'longitude'.
+
+    Args:
+        csv_path (str): Pfad zur CSV-Quelldatei.
+        bin_path (str): Pfad der zu erstellenden Binärdatei.
+
+    Returns:
+        int: Die Anzahl der Einträge.
+    """
+    places = []
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            lat, lon = float(row["latitude"]), float(row["longitude"])
+            places.append((_unit_vector(lat, lon), lat, lon, row["name"].strip()))
+
+    # Einträge in k-d-Baum-Reihenfolge bringen: Der Median jedes Bereichs
+    # (nach der Achse der jeweiligen Tiefe) steht in der Mitte des Bereichs.
+    def arrange(lo, hi, depth):
+        if hi - lo <= 1:
+            return
+        axis = depth % 3
+        places[lo:hi] = sorted(places[lo:hi], key=lambda p: p[0][axis])
+        mid = (lo + hi) // 2
+        arrange(lo, mid, depth + 1)
+        arrange(mid + 1, hi, depth + 1)
+
+    arrange(0, len(places), 0)
+
+    names = bytearray()
+    records = bytearray()
+    for (x, y, z), lat, lon, name in places:
+        encoded = name.encode('utf-8')
+        records += _RECORD.pack(x, y, z, lat, lon, len(names), len(encoded))
+        names += encoded
+
+    tmp_path = bin_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(places)))
+        f.write(records)
+        f.write(names)
+    os.replace(tmp_path, bin_path)
+    return len(places)
+
+class Gazetteer:
+    """
+    Beantwortet "Welcher Ort liegt am nächsten?" für Koordinaten, ohne
+    Netzwerkzugriff. Ergebnisse werden in einem LRU-Cache gehalten, dessen
+    Schlüssel die auf 'cache_decimals' Nachkommastellen gerundeten
+    Koordinaten sind (3 Stellen ≈ 110 m).
+    """
+
+    def __init__(self, path=DEFAULT_GAZETTEER_PATH, cache_size=4096, cache_decimals=3):
+        self.path = path
+        self.cache_decimals = cache_decimals
+        with open(path, "rb") as f:
+            # Eine leere Datei lässt sich nicht einbinden (ValueError)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self._mm)
+        magic, version, count = _HEADER.unpack_from(self._mm, 0) if size >= _HEADER.size else (None, None, 0)
+        if magic != _MAGIC or version != _VERSION or size < _HEADER.size + count * _RECORD.size:
+            self._mm.close()
+            raise ValueError(f"'{path}' ist keine gültige Gazetteer-Datei.")
+        self.count = count
+        self._names_offset = _HEADER.size + count * _RECORD.size
+        self._cached_lookup = lru_cache(maxsize=cache_size)(self._nearest_rounded)
+
+    def close(self):
+        self._mm.close()
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, index):
+        return _RECORD.unpack_from(self._mm, _HEADER.size + index * _RECORD.size)
+
+    def _name(self, offset, length):
+        start = self._names_offset + offset
+        return self._mm[start:start + length].decode('utf-8')
+
+    def _nearest_index(self, query):
+        best = [None, float("inf")] # Index, quadrierter Abstand
+
+        def search(lo, hi, depth):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            record = self._record(mid)
+            dist2 = (record[0] - query[0]) ** 2 + (record[1] - query[1]) ** 2 + (record[2] - query[2]) ** 2
+            if dist2 < best[1]:
+                best[0], best[1] = mid, dist2
+            axis = depth % 3
+            diff = query[axis] - record[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            search(near[0], near[1], depth + 1)
+            # Die andere Seite nur durchsuchen, wenn die Trennebene näher liegt als der bisher beste Treffer
+            if diff * diff < best[1]:
+                search(far[0], far[1], depth + 1)
+
+        search(0, self.count, 0)
+        return best[0], best[1]
+
+    def _nearest_rounded(self, latitude, longitude):
+        index, dist2 = self._nearest_index(_unit_vector(latitude, longitude))
+        if index is None:
+            return None
+        _, _, _, lat, lon, name_offset, name_length = self._record(index)
+        return {
+            "name": self._name(name_offset, name_length),
+            "latitude": lat,
+            "longitude": lon,
+            "distance_meters": _chord_to_meters(math.sqrt(dist2)),
+        }
+
+    def nearest(self, latitude, longitude):
+        """
+        Findet den nächstgelegenen Ort des Verzeichnisses.
+
+        Args:
+            latitude (float): Breitengrad.
+            longitude (float): Längengrad.
+
+        Returns:
+            dict: 'name', 'latitude', 'longitude' und 'distance_meters' (Entfernung
+                  von den gerundeten Koordinaten) oder None bei leerem Verzeichnis.
+                  Eine Kopie, Änderungen wirken sich nicht auf den Cache aus.
+        """
+        result = self._cached_lookup(round(latitude, self.cache_decimals), round(longitude, self.cache_decimals))
+        return dict(result) if result else None
+
+    def nearest_many(self, points):
+        """
+        Sucht die nächstgelegenen Orte für einen ganzen Track. Gleiche
+        gerundete Koordinaten werden dabei nur einmal nachgeschlagen.
+
+        Args:
+            points (iterable): (Breitengrad, Längengrad)-Tupel.
+
+        Returns:
+            list: Die Ergebnisse von nearest() in derselben Reihenfolge (je eine Kopie).
+        """
+        results = {}
+        keys = [(round(lat, self.cache_decimals), round(lon, self.cache_decimals)) for lat, lon in points]
+        for key in keys:
+            if key not in results:
+                results[key] = self._cached_lookup(*key)
+        return [dict(results[key]) if results[key] else None for key in keys]
+
+_default_gazetteer = None
+
+def get_default_gazetteer():
+    """
+    Gibt das gebündelte Ortsverzeichnis zurück. Die mitgelieferte Binärdatei
+    wird unverändert geladen (auch auf schreibgeschützten Installationen);
+    nach Änderungen an der CSV-Quelle wird sie mit 'python geocoder.py' neu
+    erstellt.
+
+    Returns:
+        Gazetteer: Das Ortsverzeichnis oder None, wenn keines verfügbar ist.
+    """
+    global _default_gazetteer
+    if _default_gazetteer is None:
+        try:
+            _default_gazetteer = Gazetteer(DEFAULT_GAZETTEER_PATH)
+        except (OSError, ValueError) as e:
+            logger.error("Fehler beim Laden des Ortsverzeichnisses (neu erstellen mit 'python geocoder.py'): %s", e)
+            return None
+    return _default_gazetteer
+
+def reverse_geocode(latitude, longitude):
+    """Kurzform für get_default_gazetteer().nearest()."""
+    gazetteer = get_default_gazetteer()
+    return gazetteer.nearest(latitude, longitude) if gazetteer else None
+
+def reverse_geocode_many(points):
+    """Kurzform für get_default_gazetteer().nearest_many()."""
+    gazetteer = get_default_gazetteer()
+    points = list(points)
+    return gazetteer.nearest_many(points) if gazetteer else [None] * len(points)
+
+# Erstellt die Binärdatei neu, z.B. nach Änderungen an data/gazetteer.csv
+if __name__ == "__main__":
+    count = build_gazetteer(DEFAULT_GAZETTEER_SOURCE, DEFAULT_GAZETTEER_PATH)
+    print(f"Ortsverzeichnis mit {count} Einträgen unter '{DEFAULT_GAZETTEER_PATH}' erstellt.")
@@ -0,0 +1,84 @@
+# http_client.py - Gemeinsame HTTP-Hilfsfunktionen für die Tracker-Module
+
+import time
+
+import archive as archive_module
+import circuit_breaker
+import instrumentation
+
+_circuit_open_error = None
+
+def circuit_open_error():
+    """
+    Liefert die Ausnahme für Anfragen, die ein offener Circuit Breaker
+    abweist. Sie erbt von requests.exceptions.ConnectionError, damit die
+    Module sie wie einen nicht erreichbaren Server behandeln.
+
+    Returns:
+        type: Die Klasse CircuitOpenError.
+    """
+    global _circuit_open_error
+    if _circuit_open_error is None:
+        import requests
+
+        class CircuitOpenError(requests.exceptions.ConnectionError):
+            """Die Anfrage wurde wegen eines offenen Circuit Breakers nicht gesendet."""
+
+        _circuit_open_error = CircuitOpenError
+    return _circuit_open_error
+
+def _is_failure(response):
+    # Überlastung und Serverfehler sprechen für einen gestörten Dienst, 4xx-Fehler nicht
+    return response.status_code >= 500 or response.status_code == 429
+
+def request(method, url, archive=None, **kwargs):
+    """
+    Führt eine HTTP-Anfrage über 'requests' aus und rechnet Dauer und
+    Größe der Antwort dem aktuell gemessenen Modul-Lauf zu.
+
+    Ohne eigenen 'timeout' gilt 'timeout_seconds' aus [CircuitBreaker]. Ist
+    der Circuit Breaker des Endpunkts offen, wird die Anfrage nicht gesendet,
+    sondern sofort mit CircuitOpenError abgebrochen und als
+    'skipped_open_circuit' gezählt.
+
+    Args:
+        method (str): Die HTTP-Methode, z.B. "GET" oder "POST".
+        url (str): Die aufzurufende URL.
+        archive (dict): Optional wird eine erfolgreiche Antwort unverändert
+                        archiviert (siehe archive.py); erwartet 'source_module'
+                        und optional 'context'.
+        **kwargs: Weitere Argumente für requests.request (params, headers, data, ...).
+
+    Returns:
+        requests.Response: Die Antwort des Servers.
+    """
+    # 'requests' ist vergleichsweise teuer zu importieren und wird daher erst
+    # bei der ersten Anfrage geladen, nicht schon beim Start des Trackers.
+    import requests
+
+    endpoint = circuit_breaker.endpoint_for(url)
+    if not circuit_breaker.allow(endpoint):
+        instrumentation.record_skipped_open_circuit()
+        raise circuit_open_error()(f"Circuit Breaker für '{endpoint}' ist offen, Anfrage übersprungen.")
+    kwargs.setdefault("timeout", circuit_breaker.request_timeout())
+
+    start = time.perf_counter()
+    num_bytes = 0
+    success = False
+    try:
+        response = requests.request(method, url, **kwargs)
+        num_bytes = len(response.content)
+        success = not _is_failure(response)
+        if archive is not None and response.ok:
+            archive_module.store_response(archive["source_module"], response.url, response.content,
+                                          response.status_code, archive.get("context"))
+        return response
+    finally:
+        instrumentation.record_http(time.perf_counter() - start, num_bytes)
+        circuit_breaker.record(endpoint, success)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -0,0 +1,347 @@
+# ingest.py - Warteschlange zwischen den Tracker-Modulen und der Datenbank
+#
+# Jedes Event wird zuerst an eine Spool-Datei angehängt (4 Byte Länge,
+# little-endian, gefolgt vom Event als UTF-8-JSON) und dann in eine begrenzte
+# Warteschlange im Speicher gelegt. Ein Hintergrund-Thread schreibt die Events
+# blockweise in die Datenbank und speichert in derselben Transaktion, bis zu
+# welcher Position der Spool-Datei alles geschrieben ist. Die Module warten
+# dadurch nie auf SQLite, und ist die Datenbank gesperrt oder das Programm
+# bricht ab, gehen keine Events verloren: Sie werden beim nächsten Start aus
+# der Spool-Datei nachgeholt.
+#
+# Ist die Warteschlange voll, landen neue Events nur noch in der Spool-Datei;
+# der Hintergrund-Thread liest sie von dort, sobald die Warteschlange leer ist.
+#
+# Nur eine gesperrte Datenbank ("database is locked"/"busy") gilt als
+# vorübergehend und wird mit wachsender Pause wiederholt. Scheitert ein Block
+# aus einem anderen Grund oder nach 'max_attempts' Versuchen, wird er halbiert,
+# bis das fehlerhafte Event allein steht; dieses landet im selben Format in der
+# Dead-Letter-Datei und wird übersprungen, damit die folgenden Events nicht
+# dauerhaft blockiert sind.
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import struct
+import threading
+import time
+
+import database
+import partitions
+from event import Event
+
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct("<I")
+
+# Schlüssel in der 'meta'-Tabelle für die bereits geschriebene Position der Spool-Datei
+CHECKPOINT_KEY = "ingest_spool_offset"
+
+def read_spool(path, offset=0, max_records=None):
+    """
+    Liest Events aus der Spool-Datei ab einer Position. Ein unvollständiger
+    Eintrag am Ende (z.B. nach einem Absturz beim Schreiben) wird ignoriert.
+
+    Args:
+        path (str): Pfad zur Spool-Datei.
+        offset (int): Startposition in Bytes.
+        max_records (int): Optional höchstens so viele Events.
+
+    Returns:
+        list: (Endposition, Event-Diktionär)-Tupel.
+    """
+    records = []
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while max_records is None or len(records) < max_records:
+                header = f.read(_LENGTH.size)
+                if len(header) < _LENGTH.size:
+                    break
+                (length,) = _LENGTH.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    break
+                offset += _LENGTH.size + length
+                try:
+                    records.append((offset, json.loads(payload.decode("utf-8"))))
+                except ValueError:
+                    logger.warning("Beschädigter Eintrag in der Spool-Datei vor Position %s übersprungen.", offset)
+    except FileNotFoundError:
+        pass
+    return records
+
+def _is_transient(error):
+    """True bei einer gesperrten Datenbank, die nach einer Pause wieder frei ist."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+def _complete_length(path, offset):
+    """Ende des letzten vollständigen Eintrags ab 'offset' (ohne die Einträge zu dekodieren)."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(_LENGTH.size)
+            if len(header) < _LENGTH.size:
+                return offset
+            (length,) = _LENGTH.unpack(header)
+            if offset + _LENGTH.size + length > size:
+                return offset
+            f.seek(length, os.SEEK_CUR)
+            offset += _LENGTH.size + length
+
+class IngestQueue:
+    """
+    Nimmt Events der Tracker-Module entgegen und schreibt sie im Hintergrund
+    in die Datenbank (siehe Beschreibung am Anfang der Datei).
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        spool_path (str): Pfad zur Spool-Datei.
+        max_queue_size (int): Maximale Anzahl der Events im Speicher.
+        batch_size (int): Maximale Anzahl der Events pro Transaktion.
+        compact_bytes (int): Ab dieser Größe wird die Spool-Datei geleert,
+                             sobald alle Events geschrieben sind.
+        fsync (bool): Jedes Event sofort auf die Platte schreiben (langsamer,
+                      übersteht auch einen Stromausfall).
+        max_attempts (int): Versuche bei gesperrter Datenbank, bevor ein Block
+                            als fehlerhaft gilt.
+        dead_letter_path (str): Datei für Events, die nicht geschrieben werden
+                                können (Standard: Spool-Datei mit Endung '.dead').
+    """
+
+    def __init__(self, db_path, spool_path, max_queue_size=10000, batch_size=500,
+                 compact_bytes=16 * 1024 * 1024, fsync=False, max_attempts=20, dead_letter_path=None):
+        self.db_path = db_path
+        self.spool_path = spool_path
+        self.batch_size = max(batch_size, 1)
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        self.max_attempts = max(max_attempts, 1)
+        self.dead_letter_path = dead_letter_path or spool_path + ".dead"
+        self.enqueued = 0
+        self.written = 0
+        self.dead_lettered = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._spool = None
+        self._spool_size = 0
+        self._committed = 0
+        # Position, ab der Events nur in der Spool-Datei stehen (None = alle in der Warteschlange)
+        self._spool_only_from = None
+
+    def start(self):
+        """
+        Öffnet die Spool-Datei, holt noch nicht geschriebene Events nach und
+        startet den Hintergrund-Thread.
+        """
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        self._spool = open(self.spool_path, "ab")
+        self._spool_size = self._spool.tell()
+        self._committed = int(database.get_meta(self.db_path, CHECKPOINT_KEY, 0) or 0)
+        if self._committed > self._spool_size:
+            # Die Spool-Datei wurde nach dem letzten Checkpoint geleert
+            self._committed = 0
+        complete = _complete_length(self.spool_path, self._committed)
+        if complete < self._spool_size:
+            # Unvollständigen Eintrag eines abgebrochenen Schreibvorgangs abschneiden,
+            # damit neue Einträge direkt an den letzten vollständigen anschließen
+            logger.warning("Unvollständigen Eintrag am Ende von '%s' entfernt.", self.spool_path)
+            self._spool.truncate(complete)
+            self._spool.seek(complete)
+            self._spool_size = complete
+        if self._spool_size > self._committed:
+            logger.info("Spool-Datei enthält %s Bytes noch nicht geschriebener Events, hole sie nach.",
+                        self._spool_size - self._committed)
+            self._spool_only_from = self._committed
+        self._thread = threading.Thread(target=self._drain, name="ingest-drainer", daemon=True)
+        self._thread.start()
+        return self
+
+    def put(self, event):
+        """
+        Nimmt ein Event entgegen. Blockiert nie auf die Datenbank.
+
+        Args:
+            event (Event | dict): Das Event (siehe event.py bzw. database.insert_event).
+        """
+        if isinstance(event, Event):
+            event = event.to_dict()
+        payload = json.dumps(event, ensure_ascii=False, default=str).encode("utf-8")
+        with self._lock:
+            self._spool.write(_LENGTH.pack(len(payload)) + payload)
+            self._spool.flush()
+            if self.fsync:
+                os.fsync(self._spool.fileno())
+            self._spool_size += _LENGTH.size + len(payload)
+            self.enqueued += 1
+            if self._spool_only_from is None:
+                # Wie in der Spool-Datei, damit der Hintergrund-Thread dasselbe
+                # (serialisierbare und unveränderliche) Event schreibt
+                try:
+                    self._queue.put_nowait((self._spool_size, payload))
+                except queue.Full:
+                    self._spool_only_from = self._spool_size - _LENGTH.size - len(payload)
+
+    def put_many(self, events):
+        for event in events:
+            self.put(event)
+
+    def _commit(self, records):
+        """
+        Schreibt Events samt Checkpoint. Betrifft der Block mehr Partitionen,
+        als in einer Transaktion geschrieben werden können (siehe
+        partitions.group_events), wird jede Gruppe mit dem Checkpoint ihres
+        letzten Events geschrieben. Eine gesperrte Datenbank wird bis zu
+        'max_attempts'-mal abgewartet; scheitert der Block danach oder aus einem
+        anderen Grund, werden seine Hälften einzeln geschrieben und ein einzelnes
+        fehlerhaftes Event in die Dead-Letter-Datei verschoben.
+
+        Returns:
+            bool: False, wenn die Warteschlange beim Warten beendet wurde.
+        """
+        groups = partitions.group_events(records, key=lambda record: record[1])
+        if len(groups) > 1:
+            return all(self._commit(group) for group in groups)
+        delay = 0.5
+        events = [event for _, event in records]
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                partitions.insert_events(self.db_path, events, checkpoint=(CHECKPOINT_KEY, records[-1][0]),
+                                         raise_errors=True)
+            except Exception as e:
+                if _is_transient(e) and attempt < self.max_attempts:
+                    if self._stop.is_set():
+                        return False # Bleibt in der Spool-Datei und wird beim nächsten Start nachgeholt
+                    time.sleep(delay)
+                    delay = min(delay * 2, 30)
+                    continue
+                error = e
+                break
+            self._committed = records[-1][0]
+            self.written += len(records)
+            return True
+        if len(records) > 1:
+            middle = len(records) // 2
+            return self._commit(records[:middle]) and self._commit(records[middle:])
+        self._dead_letter(records[0], error)
+        return True
+
+    def _dead_letter(self, record, error):
+        """Verschiebt ein Event, das nicht geschrieben werden kann, in die Dead-Letter-Datei."""
+        offset, event = record
+        payload = json.dumps(event, ensure_ascii=False, default=str).encode("utf-8")
+        with open(self.dead_letter_path, "ab") as f:
+            f.write(_LENGTH.pack(len(payload)) + payload)
+        logger.error("Event vor Position %s der Spool-Datei nach '%s' verschoben: %s",
+                     offset, self.dead_letter_path, error)
+        # Gelingt das nicht, wird das Event beim nächsten Start erneut versucht
+        database.set_meta(self.db_path, CHECKPOINT_KEY, offset)
+        self._committed = offset
+        self.dead_lettered += 1
+
+    def _replay_spool(self):
+        """Schreibt Events, die nur in der Spool-Datei stehen."""
+        while True:
+            records = read_spool(self.spool_path, self._committed, self.batch_size)
+            if records:
+                if not self._commit(records):
+                    return
+                continue
+            with self._lock:
+                if self._committed >= self._spool_size:
+                    self._spool_only_from = None
+                    return
+                if self._stop.is_set():
+                    return
+            time.sleep(0.05) # Unvollständiger Eintrag, der gerade geschrieben wird
+
+    def _compact(self):
+        with self._lock:
+            if (self._spool_only_from is None and self._queue.empty()
+                    and self._committed == self._spool_size and self._spool_size >= self.compact_bytes):
+                # Erst leeren, dann den Checkpoint zurücksetzen: Bricht das Programm
+                # dazwischen ab, liegt der Checkpoint hinter dem Dateiende und start() beginnt bei 0
+                self._spool.truncate(0)
+                self._spool_size = 0
+                self._committed = 0
+                database.set_meta(self.db_path, CHECKPOINT_KEY, 0)
+
+    def _drain(self):
+        while True:
+            try:
+                if not self._drain_batch():
+                    return
+            except Exception:
+                logger.exception("Fehler beim Schreiben der Warteschlange, die Events werden aus '%s' nachgeholt.",
+                                 self.spool_path)
+                with self._lock:
+                    # Die Events der Warteschlange stehen auch in der Spool-Datei
+                    while not self._queue.empty():
+                        self._queue.get_nowait()
+                    self._spool_only_from = self._committed
+                if self._stop.wait(1):
+                    return
+
+    def _drain_batch(self):
+        """Schreibt einen Block; False, wenn der Hintergrund-Thread enden soll."""
+        try:
+            first = self._queue.get(timeout=0.2)
+        except queue.Empty:
+            if self._stop.is_set():
+                return False
+            if self._spool_only_from is not None:
+                self._replay_spool()
+            else:
+                self._compact()
+            return True
+        records = [first]
+        while len(records) < self.batch_size:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        records = [(offset, json.loads(payload.decode("utf-8"))) for offset, payload in records]
+        return self._commit(records)
+
+    def wait_until_drained(self, timeout=None):
+        """
+        Wartet, bis alle bisher angenommenen Events geschrieben sind.
+
+        Returns:
+            bool: True, wenn alles geschrieben wurde.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                if self._committed >= self._spool_size:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def close(self, timeout=30):
+        """
+        Wartet bis zu 'timeout' Sekunden auf das Schreiben der restlichen
+        Events und beendet den Hintergrund-Thread. Nicht geschriebene Events
+        bleiben in der Spool-Datei.
+
+        Returns:
+            bool: True, wenn alle Events geschrieben wurden.
+        """
+        drained = self.wait_until_drained(timeout)
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        with self._lock:
+            if self._spool:
+                self._spool.close()
+                self._spool = None
+        if not drained:
+            logger.warning("Nicht alle Events wurden geschrieben, der Rest bleibt in '%s'.", self.spool_path)
+        return drained
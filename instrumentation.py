@@ -0,0 +1,240 @@
+# instrumentation.py - Laufzeit-Messungen für Tracker-Module und Datenbankzugriffe
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Der aktuell gemessene Modul-Lauf wird pro Thread gehalten, damit
+# HTTP- und Datenbank-Messungen dem richtigen Modul zugeordnet werden.
+_state = threading.local()
+
+class RunMetrics:
+    """
+    Sammelt die Messwerte eines einzelnen Modul-Laufs: Laufzeit, CPU-Zeit,
+    Anzahl der Events, HTTP-Zeit und -Datenmenge, Schreibzeit in die
+    Datenbank, wegen offener Circuit Breaker übersprungene Anfragen sowie
+    aufgetretene Fehler.
+    """
+
+    def __init__(self, module_name):
+        self.module_name = module_name
+        self.started_at = datetime.now().isoformat()
+        self.wall_time_seconds = 0.0
+        self.cpu_time_seconds = 0.0
+        self.event_count = 0
+        self.http_requests = 0
+        self.http_time_seconds = 0.0
+        self.http_bytes = 0
+        self.db_writes = 0
+        self.db_write_time_seconds = 0.0
+        self.skipped_open_circuit = 0
+        self.failures = 0
+        self.error = None
+
+    def record_http(self, duration, num_bytes):
+        self.http_requests += 1
+        self.http_time_seconds += duration
+        self.http_bytes += num_bytes
+
+    def record_db_write(self, duration, num_rows):
+        self.db_writes += num_rows
+        self.db_write_time_seconds += duration
+
+    def record_skipped_open_circuit(self):
+        self.skipped_open_circuit += 1
+
+    def record_failure(self, message=None):
+        self.failures += 1
+        if message:
+            self.error = str(message)
+
+    def as_dict(self):
+        """
+        Gibt die Messwerte als Diktionär zurück, passend zu den Spalten
+        der 'runs'-Tabelle.
+        """
+        return {
+            "started_at": self.started_at,
+            "source_module": self.module_name,
+            "wall_time_seconds": self.wall_time_seconds,
+            "cpu_time_seconds": self.cpu_time_seconds,
+            "event_count": self.event_count,
+            "http_requests": self.http_requests,
+            "http_time_seconds": self.http_time_seconds,
+            "http_bytes": self.http_bytes,
+            "db_writes": self.db_writes,
+            "db_write_time_seconds": self.db_write_time_seconds,
+            "skipped_open_circuit": self.skipped_open_circuit,
+            "failures": self.failures,
+            "error": self.error,
+        }
+
+@contextmanager
+def measure_module(module_name):
+    """
+    Misst einen Modul-Lauf. Innerhalb des with-Blocks werden HTTP-Anfragen
+    und Datenbank-Schreibvorgänge automatisch dem Modul zugerechnet.
+
+    Args:
+        module_name (str): Der Name des gemessenen Moduls.
+
+    Yields:
+        RunMetrics: Das Messobjekt für diesen Lauf.
+    """
+    metrics = RunMetrics(module_name)
+    previous = getattr(_state, "metrics", None)
+    _state.metrics = metrics
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_time_seconds = time.perf_counter() - wall_start
+        metrics.cpu_time_seconds = time.thread_time() - cpu_start
+        _state.metrics = previous
+
+@contextmanager
+def resume(metrics):
+    """
+    Ordnet Messungen im with-Block einem bereits abgeschlossenen Lauf zu,
+    z.B. wenn die Events eines Moduls erst nach track() im Haupt-Thread
+    geschrieben werden. Laufzeit und CPU-Zeit bleiben dabei unverändert.
+
+    Args:
+        metrics (RunMetrics): Das Messobjekt des Laufs.
+    """
+    previous = getattr(_state, "metrics", None)
+    _state.metrics = metrics
+    try:
+        yield metrics
+    finally:
+        _state.metrics = previous
+
+def current_metrics():
+    """
+    Gibt das Messobjekt des aktuell laufenden Moduls zurück oder None,
+    wenn gerade kein Modul gemessen wird.
+    """
+    return getattr(_state, "metrics", None)
+
+def record_http(duration, num_bytes):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.record_http(duration, num_bytes)
+
+def record_db_write(duration, num_rows):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.record_db_write(duration, num_rows)
+
+def record_skipped_open_circuit():
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.record_skipped_open_circuit()
+
+def _collect_module_stats(db_path):
+    """
+    Liest den jeweils letzten Lauf jedes Moduls sowie die Gesamtzahlen
+    aus der 'runs'-Tabelle.
+
+    Returns:
+        dict: Modulname -> {'last_run': dict, 'runs_total': int, 'failures_total': int}
+    """
+    stats = {}
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT source_module, COUNT(*) AS runs_total, SUM(failures) AS failures_total,
+                   AVG(wall_time_seconds) AS avg_wall_time_seconds, MAX(id) AS last_id
+            FROM runs
+            GROUP BY source_module
+        ''')
+        totals = cursor.fetchall()
+        for row in totals:
+            last_run = conn.execute('SELECT * FROM runs WHERE id = ?', (row['last_id'],)).fetchone()
+            stats[row['source_module']] = {
+                "runs_total": row['runs_total'],
+                "failures_total": row['failures_total'] or 0,
+                "avg_wall_time_seconds": row['avg_wall_time_seconds'] or 0.0,
+                "last_run": dict(last_run),
+            }
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Lesen der Laufzeit-Metriken: %s", e)
+    finally:
+        if conn:
+            conn.close()
+    return stats
+
+# Kennzahlen des letzten Laufs, die als Prometheus-Gauges exportiert werden:
+# (Spalte in 'runs', Metrikname, Beschreibung)
+_GAUGES = [
+    ("wall_time_seconds", "stat_tracker_module_wall_time_seconds", "Laufzeit des letzten Modul-Laufs"),
+    ("cpu_time_seconds", "stat_tracker_module_cpu_time_seconds", "CPU-Zeit des letzten Modul-Laufs"),
+    ("event_count", "stat_tracker_module_events", "Anzahl der Events im letzten Modul-Lauf"),
+    ("http_requests", "stat_tracker_module_http_requests", "HTTP-Anfragen im letzten Modul-Lauf"),
+    ("http_time_seconds", "stat_tracker_module_http_time_seconds", "HTTP-Zeit im letzten Modul-Lauf"),
+    ("http_bytes", "stat_tracker_module_http_bytes", "Geladene Bytes im letzten Modul-Lauf"),
+    ("db_write_time_seconds", "stat_tracker_module_db_write_time_seconds", "Schreibzeit in die Datenbank im letzten Modul-Lauf"),
+    ("skipped_open_circuit", "stat_tracker_module_skipped_open_circuit", "Wegen offenem Circuit Breaker übersprungene Anfragen im letzten Modul-Lauf"),
+    ("failures", "stat_tracker_module_failures", "Fehler im letzten Modul-Lauf"),
+]
+
+def _format_prometheus(stats):
+    lines = []
+    for column, metric, help_text in _GAUGES:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for module_name, module_stats in sorted(stats.items()):
+            value = module_stats["last_run"].get(column) or 0
+            lines.append(f'{metric}{{module="{module_name}"}} {value}')
+    for key, metric, help_text in [
+        ("runs_total", "stat_tracker_module_runs_total", "Anzahl aller Modul-Läufe"),
+        ("failures_total", "stat_tracker_module_failures_total", "Anzahl aller Fehler eines Moduls"),
+    ]:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for module_name, module_stats in sorted(stats.items()):
+            lines.append(f'{metric}{{module="{module_name}"}} {module_stats[key]}')
+    return "\n".join(lines) + "\n"
+
+def export_metrics(db_path, output_path, fmt="prometheus"):
+    """
+    Exportiert die Laufzeit-Metriken aller Module als Prometheus-Textdatei
+    (für den Textfile-Collector des node_exporter) oder als JSON-Snapshot.
+    Die Datei wird atomar ersetzt, damit nie eine halb geschriebene Datei
+    gelesen wird.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        output_path (str): Zielpfad der Exportdatei.
+        fmt (str): 'prometheus' oder 'json'.
+    """
+    stats = _collect_module_stats(db_path)
+    if fmt == "json":
+        content = json.dumps({
+            "generated_at": datetime.now().isoformat(),
+            "modules": stats,
+        }, indent=2, ensure_ascii=False)
+    elif fmt == "prometheus":
+        content = _format_prometheus(stats)
+    else:
+        logger.warning("Unbekanntes Metrik-Format '%s', Export übersprungen.", fmt)
+        return
+
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, output_path)
+    except OSError as e:
+        logger.error("Fehler beim Schreiben der Metrik-Datei '%s': %s", output_path, e)
@@ -0,0 +1,210 @@
+# logs.py - Strukturiertes Logging im Hintergrund
+#
+# Alle Module schreiben über ihren eigenen Logger (logging.getLogger(__name__))
+# statt mit print(). setup_logging() hängt an den Root-Logger nur einen
+# QueueHandler: Der aufrufende Thread legt den LogRecord in eine Warteschlange,
+# Formatieren und Schreiben übernimmt der Thread des QueueListener. Ein Tracker
+# wartet so nie auf die Ausgabe.
+#
+# Ausgegeben wird eine JSON-Zeile pro Meldung (Zeit, Level, Logger, Nachricht
+# sowie zusätzliche Felder aus 'extra'), mit 'format = text' in [Logging]
+# lesbarer Text. Die Level lassen sich pro Logger im Abschnitt [LogLevels]
+# festlegen, z.B. 'weather_tracker = DEBUG'. Meldungen pro Eintrag
+# (jede Wetterstunde, jeder Termin) werden mit DEBUG geloggt; ist das Level
+# höher, kostet ein solcher Aufruf nur die Level-Prüfung, da die Nachricht
+# erst beim Schreiben aus Vorlage und Argumenten zusammengesetzt wird.
+#
+# Warnungen und Fehler mit derselben Vorlage (z.B. ein Datenbankfehler pro
+# Event) werden pro Logger höchstens einmal je 'rate_limit_seconds'
+# ausgegeben; die nächste Meldung nennt die Anzahl der unterdrückten im Feld
+# 'suppressed'. Mit extra={"rate_limit": False} wird eine Meldung nie unterdrückt.
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+import settings
+
+# Attribute jedes LogRecord; alle anderen stammen aus 'extra' und landen im JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Argumente dieser Typen kann der Aufrufer nach dem Loggen nicht mehr verändern
+_IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, type(None), datetime)
+
+_listener = None
+_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """Formatiert einen LogRecord als eine JSON-Zeile."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "rate_limit" and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lässt Meldungen ab 'min_level' mit gleicher Vorlage pro Logger höchstens
+    einmal je 'interval_seconds' durch. Die durchgelassene Meldung erhält die
+    Anzahl der seither unterdrückten im Attribut 'suppressed'.
+    """
+
+    def __init__(self, interval_seconds=60, min_level=logging.WARNING):
+        super().__init__()
+        self.interval_seconds = interval_seconds
+        self.min_level = min_level
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.min_level or self.interval_seconds <= 0 or not getattr(record, "rate_limit", True):
+            return True
+        # Die Vorlage (nicht die fertige Nachricht), damit z.B. jedes fehlerhafte Event zählt
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.interval_seconds:
+                self._seen[key] = (last, suppressed + 1)
+                return False
+            self._seen[key] = (now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class _FrozenArgument:
+    # Text eines veränderlichen Arguments zum Zeitpunkt des Loggens, für %s und %r
+    __slots__ = ("text", "representation")
+
+    def __init__(self, value):
+        self.text = str(value)
+        self.representation = repr(value)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return self.representation
+
+def _freeze(value):
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    if isinstance(value, tuple) and all(isinstance(item, _IMMUTABLE_TYPES) for item in value):
+        return value
+    return _FrozenArgument(value)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # QueueHandler.prepare() formatiert die Nachricht im aufrufenden Thread;
+    # hier wird sie erst vom Listener formatiert. Nur veränderliche Argumente
+    # (Listen, Diktionäre, Objekte) werden sofort in Text umgewandelt, damit
+    # die Meldung ihren Stand beim Aufruf zeigt und nicht den beim Schreiben.
+    def prepare(self, record):
+        if not record.args:
+            return record
+        record = copy.copy(record)
+        if isinstance(record.args, dict):
+            record.args = {key: _freeze(value) for key, value in record.args.items()}
+        else:
+            record.args = tuple(_freeze(value) for value in record.args)
+        return record
+
+def _formatter(fmt):
+    if fmt == "text":
+        return logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+    return JsonFormatter()
+
+def _output_handler(config):
+    path = config.get('Logging', 'path', fallback='').strip()
+    if path:
+        path = settings.resolve_path(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # WatchedFileHandler öffnet die Datei neu, wenn logrotate sie verschoben hat
+        handler = logging.handlers.WatchedFileHandler(path, encoding="utf-8")
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(_formatter(config.get('Logging', 'format', fallback='json').strip().lower()))
+    return handler
+
+def _apply_levels(config):
+    logging.getLogger().setLevel(config.get('Logging', 'level', fallback='INFO').strip().upper() or 'INFO')
+    if config.has_section('LogLevels'):
+        for name, level in config.items('LogLevels'):
+            logging.getLogger(name).setLevel(level.strip().upper())
+
+def setup_logging():
+    """
+    Richtet das Logging gemäß den Abschnitten [Logging] und [LogLevels] der
+    Konfigurationsdatei ein und startet den Listener-Thread. Weitere Aufrufe
+    haben keine Wirkung.
+
+    Returns:
+        logging.handlers.QueueListener: Der laufende Listener.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return _listener
+        config = settings.get_config()
+        root = logging.getLogger()
+        log_queue = queue.SimpleQueue()
+        queue_handler = _DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(config.getfloat('Logging', 'rate_limit_seconds', fallback=60)))
+        root.addHandler(queue_handler)
+        _apply_levels(config)
+        _listener = logging.handlers.QueueListener(log_queue, _output_handler(config), respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        # Ein per fork gestarteter Worker-Prozess erbt den QueueHandler, aber nicht den Listener-Thread
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_reset_after_fork)
+        return _listener
+
+def stop_logging():
+    """Schreibt die restlichen Meldungen der Warteschlange und beendet den Listener."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, _DeferredQueueHandler):
+                root.removeHandler(handler)
+        _listener = None
+
+def _reset_after_fork():
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    # Im Kind direkt schreiben; der Listener des Elternprozesses läuft hier nicht
+    for handler in list(root.handlers):
+        if isinstance(handler, _DeferredQueueHandler):
+            root.removeHandler(handler)
+            config = settings.get_config()
+            direct = _output_handler(config)
+            # Neuer Filter, da die Sperre des alten im Moment des fork belegt gewesen sein kann
+            direct.addFilter(RateLimitFilter(config.getfloat('Logging', 'rate_limit_seconds', fallback=60)))
+            root.addHandler(direct)
+    _listener = None
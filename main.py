@@ -1,20 +1,28 @@
 # main.py - Das Hauptprogramm für den Stat-Tracker
 
 import os
-import importlib.util
+import argparse
+import logging
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 import sys
 
-# Pfad zur Datenbankdatei
-# Die Datenbankdatei wird im 'data'-Ordner erstellt.
-DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'statistics.db')
-
 # Pfad zum Ordner, der die Tracker-Module enthält
 MODULES_DIR = os.path.join(os.path.dirname(__file__), 'modules')
 
-# Stelle sicher, dass der 'data'-Ordner existiert
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+# Zwischengespeichertes Manifest der Module (Name, Intervall, Ausführungsart),
+# damit beim Start nicht jedes Modul importiert werden muss.
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), 'data', 'module_manifest.json')
+
+# Toleranz beim Prüfen der Fälligkeit, damit ein leicht verfrühter Start
+# (z.B. durch Cron-Jitter) einen Lauf nicht um ein ganzes Intervall verschiebt.
+SCHEDULE_TOLERANCE_SECONDS = 60
+
+# Abstand, in dem run_plugins() die Zeitlimits der laufenden Plugins prüft
+TIMEOUT_POLL_SECONDS = 0.5
 
 # Importiere die Datenbank-Hilfsfunktionen
 # Wir versuchen, database.py zu importieren. Wenn es nicht gefunden wird,
@@ -23,88 +31,444 @@ try:
     # Füge das Verzeichnis des Skripts zum Python-Pfad hinzu,
     # damit database.py gefunden werden kann.
     sys.path.append(os.path.dirname(__file__))
+    import alerts
+    import analytics
+    import archive
+    import backfill
+    import backup
+    import circuit_breaker
     import database
+    from event import Event
+    import export
+    import gaps
+    import ingest
+    import instrumentation
+    import logs
+    import partitions
+    import registry
+    import retention
+    import search
+    import settings
 except ImportError:
     print("Fehler: Die Datei 'database.py' konnte nicht gefunden werden.")
     print("Bitte stelle sicher, dass 'database.py' im selben Verzeichnis wie 'main.py' liegt.")
     sys.exit(1) # Beende das Programm, da die Datenbankfunktionen fehlen
 
-def load_modules(directory):
+# Pfad zur Datenbankdatei laut config.ini (Standard: 'data/statistics.db')
+DB_PATH = settings.get_db_path()
+
+# Stelle sicher, dass der 'data'-Ordner existiert
+os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+
+# Als Skript gestartet hieße der Logger sonst '__main__'
+logger = logging.getLogger("main")
+
+# Warteschlange zur Datenbank (siehe ingest.py), wird in main() gestartet.
+# Ohne Warteschlange werden die Events direkt geschrieben.
+INGEST_QUEUE = None
+
+def discover_modules(directory):
     """
-    Lädt alle Python-Module aus dem angegebenen Verzeichnis.
+    Ermittelt alle Tracker-Plugins (lokale Module und installierte Entry
+    Points) über das zwischengespeicherte Manifest, ohne sie zu importieren.
 
     Args:
         directory (str): Der Pfad zum Verzeichnis, das die Module enthält.
 
     Returns:
-        list: Eine Liste von geladenen Modulobjekten.
+        list: PluginMetadata-Objekte aller Plugins mit 'track()'-Funktion.
     """
-    loaded_modules = []
-    if not os.path.exists(directory):
-        print(f"Warnung: Modulverzeichnis '{directory}' nicht gefunden.")
-        return loaded_modules
+    default_interval = settings.get_config().getint('General', 'run_interval_seconds', fallback=3600)
+    return registry.discover_plugins(directory, MANIFEST_PATH, default_interval)
 
-    for filename in os.listdir(directory):
-        if filename.endswith(".py") and filename != "__init__.py":
-            module_name = filename[:-3]  # Dateierweiterung .py entfernen
-            module_path = os.path.join(directory, filename)
+def seconds_until_due(plugin, last_runs, now=None):
+    """
+    Berechnet, in wie vielen Sekunden ein Modul wieder ausgeführt werden soll.
+
+    Args:
+        plugin (PluginMetadata): Die Metadaten des Plugins.
+        last_runs (dict): Modulname -> Startzeitpunkt des letzten Laufs (ISO 8601).
+        now (datetime): Aktueller Zeitpunkt (Standard: jetzt).
+
+    Returns:
+        float: Sekunden bis zur nächsten Fälligkeit, 0 wenn das Modul fällig ist.
+    """
+    last_run = last_runs.get(plugin.name)
+    if not last_run:
+        return 0.0
+    now = now or datetime.now()
+    elapsed = (now - datetime.fromisoformat(last_run)).total_seconds()
+    remaining = plugin.interval_seconds - elapsed
+    return 0.0 if remaining <= SCHEDULE_TOLERANCE_SECONDS else remaining
 
+def export_run_metrics():
+    """
+    Exportiert die Laufzeit-Metriken gemäß dem Abschnitt [Metrics] der
+    Konfigurationsdatei. Ohne 'export_path' findet kein Export statt.
+    """
+    config = settings.get_config()
+    export_path = config.get('Metrics', 'export_path', fallback='').strip()
+    if not export_path:
+        return
+    export_format = config.get('Metrics', 'export_format', fallback='prometheus').strip()
+    instrumentation.export_metrics(DB_PATH, settings.resolve_path(export_path), export_format)
+
+def prepare_event(plugin, item, metrics):
+    """
+    Wandelt ein von track() geliefertes Event (Event-Objekt oder Diktionär)
+    in ein vollständiges Event um: Modulname, Zeitpunkt und ggf. natürlicher
+    Schlüssel werden ergänzt, Fehler-Events als Fehlschlag gezählt.
+
+    Args:
+        plugin (PluginMetadata): Die Metadaten des Plugins.
+        item (Event | dict): Das Event aus track().
+        metrics (RunMetrics): Das Messobjekt des Laufs.
+
+    Returns:
+        Event: Das vervollständigte Event, oder None, wenn es verworfen wird.
+    """
+    # Fehlt der Zeitpunkt, wird er jetzt festgehalten, da das Event ggf. erst später geschrieben wird
+    event = item if isinstance(item, Event) else Event.from_dict(item)
+    # Füge den Modulnamen zum Event hinzu, falls nicht vorhanden
+    if event.source_module is None:
+        event.source_module = plugin.name
+    # Wiederholt gemeldete Events (z.B. Vorhersagen) werden per Schlüssel aktualisiert
+    key_fields = plugin.natural_key_fields(event.event_type)
+    if key_fields and event.natural_key is None:
+        event.natural_key = database.natural_key(event, key_fields)
+    # Fehler-Events der Module (z.B. 'weather_fetch_failed') zählen als Fehlschlag.
+    # Hat ein offener Circuit Breaker die Anfrage abgewiesen, ist der Ausfall
+    # bereits bekannt und wird nicht bei jedem Lauf erneut gespeichert.
+    if event.event_type.endswith("_failed"):
+        if metrics.skipped_open_circuit:
+            return None
+        metrics.record_failure(event.value)
+    return event
+
+class PluginRun:
+    """
+    Zustand eines eingereichten Plugin-Laufs, den collect_plugin() im
+    Thread-Pool mit dem Haupt-Thread teilt: wann der Lauf tatsächlich
+    begonnen hat (das Zeitlimit zählt erst ab dann, nicht ab dem Einreihen
+    in den Pool) und ob er wegen Zeitüberschreitung abgebrochen wurde.
+    """
+
+    def __init__(self):
+        self.started = None
+        self.cancelled = threading.Event()
+
+def collect_plugin(plugin, sink=None, run=None):
+    """
+    Lädt ein Plugin und ruft seine track()-Funktion auf. Läuft je nach
+    Plugin im Thread- oder Prozess-Pool.
+
+    track() darf eine Liste oder einen Generator liefern. Mit 'sink' werden
+    die Events schon während des Laufs in Blöcken von 'batch_size'
+    weitergereicht, sodass ein Generator nie vollständig im Speicher liegt;
+    ohne 'sink' (z.B. im Prozess-Pool) schreibt der Haupt-Thread alle Events
+    nach dem Lauf.
+
+    Args:
+        plugin (PluginMetadata): Die Metadaten des Plugins.
+        sink (callable): Optional, nimmt eine Liste von Events entgegen und
+                         gibt die Anzahl der übernommenen Events zurück.
+        run (PluginRun): Optional, nur im Thread-Pool. Nach einem Abbruch
+                         werden keine Events mehr an 'sink' übergeben.
+
+    Returns:
+        tuple: (Liste der noch nicht übergebenen Events, RunMetrics des Laufs)
+    """
+    if run is not None:
+        run.started = time.monotonic()
+    logger.info("Sammle Daten von Modul: '%s'...", plugin.name)
+    events = []
+    # Laufzeit, CPU-Zeit und HTTP-Zeit werden pro Modul gemessen
+    with instrumentation.measure_module(plugin.name) as metrics:
+        # Das Modul wird erst jetzt importiert, da es tatsächlich ausgeführt wird
+        track = registry.load_plugin(plugin)
+        if track is None:
+            metrics.record_failure("Modul konnte nicht geladen werden")
+        else:
+            batch_size = max(plugin.batch_size, 1)
             try:
-                spec = importlib.util.spec_from_file_location(module_name, module_path)
-                if spec is None:
-                    print(f"Warnung: Konnte Spezifikation für Modul '{module_name}' nicht laden.")
-                    continue
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-
-                # Überprüfe, ob das Modul eine 'track'-Funktion hat
-                if hasattr(module, 'track') and callable(module.track):
-                    loaded_modules.append(module)
-                    print(f"Modul '{module_name}' erfolgreich geladen.")
-                else:
-                    print(f"Warnung: Modul '{module_name}' hat keine 'track()'-Funktion.")
+                for item in track() or []:
+                    # Der Haupt-Thread hat den Lauf bereits als Zeitüberschreitung gespeichert
+                    if run is not None and run.cancelled.is_set():
+                        logger.warning("Modul '%s' wurde nach Zeitüberschreitung abgebrochen.", plugin.name)
+                        return [], metrics
+                    event = prepare_event(plugin, item, metrics)
+                    if event is None:
+                        continue
+                    events.append(event)
+                    if sink is not None and len(events) >= batch_size:
+                        metrics.event_count += sink(events)
+                        events = []
             except Exception as e:
-                print(f"Fehler beim Laden von Modul '{module_name}': {e}")
-    return loaded_modules
+                metrics.record_failure(e)
+                logger.error("Fehler beim Ausführen von Modul '%s': %s", plugin.name, e)
+    return events, metrics
+
+def enqueue_events(events):
+    """Übergibt Events an die Warteschlange zur Datenbank (Sink für collect_plugin)."""
+    INGEST_QUEUE.put_many(events)
+    return len(events)
 
-def main():
+def store_events(plugin, events, metrics):
     """
-    Hauptfunktion des Life-Trackers.
-    Initialisiert die Datenbank, lädt Module und sammelt Daten.
+    Übergibt die restlichen Events eines Plugins an die Warteschlange zur
+    Datenbank (ohne Warteschlange: schreibt sie in Blöcken von 'batch_size'
+    direkt) und speichert die Laufzeit-Metriken des Laufs.
+
+    Args:
+        plugin (PluginMetadata): Die Metadaten des Plugins.
+        events (list): Die noch nicht übergebenen Events aus collect_plugin().
+        metrics (RunMetrics): Das Messobjekt des Laufs.
     """
-    print(f"Starte Life-Tracker um {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Datenbankpfad: {DB_PATH}")
+    with instrumentation.resume(metrics):
+        if events:
+            if INGEST_QUEUE is not None:
+                metrics.event_count += enqueue_events(events)
+            else:
+                batch_size = max(plugin.batch_size, 1)
+                for i in range(0, len(events), batch_size):
+                    for group in partitions.group_events(events[i:i + batch_size]):
+                        metrics.event_count += partitions.insert_events(DB_PATH, group)
+        if metrics.event_count:
+            target = "an die Warteschlange übergeben" if INGEST_QUEUE is not None else "in die Datenbank geschrieben"
+            logger.info("'%s' Events von '%s' %s.", metrics.event_count, plugin.name, target)
+        elif not metrics.failures:
+            logger.info("Modul '%s' hat keine Events zurückgegeben.", plugin.name)
+    database.insert_run(DB_PATH, metrics.as_dict())
+    gaps.record_run(DB_PATH, plugin, metrics)
+    logger.info("Laufzeit von '%s': %.2fs (HTTP: %.2fs, DB: %.2fs)", plugin.name,
+                metrics.wall_time_seconds, metrics.http_time_seconds, metrics.db_write_time_seconds)
 
-    # Initialisiere die Datenbank (erstellt die Tabelle, falls nicht vorhanden)
-    database.init_db(DB_PATH)
+def run_plugins(plugins):
+    """
+    Führt die Plugins parallel aus: I/O-lastige Plugins im Thread-Pool,
+    CPU-lastige im Prozess-Pool. Überschreitet ein Plugin sein
+    'timeout_seconds' (gezählt ab dem tatsächlichen Start, nicht ab dem
+    Einreihen in den Pool), wird der Lauf als Fehlschlag gespeichert und nicht
+    weiter auf das Plugin gewartet; ein Plugin im Thread-Pool gibt danach
+    keine Events mehr an die Warteschlange weiter.
 
-    # Lade die Tracker-Module
-    tracker_modules = load_modules(MODULES_DIR)
+    Args:
+        plugins (list): Die auszuführenden PluginMetadata-Objekte.
+    """
+    config = settings.get_config()
+    pools = {}
+    pending = {}
+    for plugin in plugins:
+        if plugin.executor not in pools:
+            if plugin.executor == "process":
+                max_workers = config.getint('General', 'max_cpu_workers', fallback=os.cpu_count() or 1)
+                pools["process"] = ProcessPoolExecutor(max_workers=max_workers)
+            else:
+                max_workers = config.getint('General', 'max_io_workers', fallback=4)
+                pools["thread"] = ThreadPoolExecutor(max_workers=max_workers)
+        # Im Thread-Pool gehen die Events schon während des Laufs an die Warteschlange
+        sink = enqueue_events if INGEST_QUEUE is not None and plugin.executor == "thread" else None
+        run = PluginRun()
+        if plugin.executor == "thread":
+            future = pools["thread"].submit(collect_plugin, plugin, sink, run)
+        else:
+            future = pools["process"].submit(collect_plugin, plugin, sink)
+        pending[future] = (plugin, run)
 
-    if not tracker_modules:
-        print("Keine Tracker-Module gefunden oder geladen. Beende.")
-        return
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=TIMEOUT_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                plugin, _ = pending.pop(future)
+                try:
+                    events, metrics = future.result()
+                except Exception as e:
+                    # z.B. ein abgestürzter Worker-Prozess
+                    metrics = instrumentation.RunMetrics(plugin.name)
+                    metrics.record_failure(e)
+                    logger.error("Fehler beim Ausführen von Modul '%s': %s", plugin.name, e)
+                    events = []
+                store_events(plugin, events, metrics)
+            now = time.monotonic()
+            for future, (plugin, run) in list(pending.items()):
+                # Im Prozess-Pool gilt der Lauf als begonnen, sobald der Pool ihn übernimmt
+                if run.started is None and future.running():
+                    run.started = now
+                if not plugin.timeout_seconds or run.started is None or now - run.started < plugin.timeout_seconds:
+                    continue
+                del pending[future]
+                run.cancelled.set()
+                future.cancel()
+                metrics = instrumentation.RunMetrics(plugin.name)
+                metrics.wall_time_seconds = plugin.timeout_seconds
+                metrics.record_failure(f"Zeitüberschreitung nach {plugin.timeout_seconds}s")
+                logger.error("Modul '%s' hat das Zeitlimit von %ss überschritten.", plugin.name, plugin.timeout_seconds)
+                store_events(plugin, [], metrics)
+    finally:
+        # Nicht auf Plugins warten, die ihr Zeitlimit überschritten haben
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+def run_once(force=False):
+    """
+    Führt einen Sammeldurchlauf aus. Es werden nur die Module importiert
+    und ausgeführt, deren Intervall seit dem letzten Lauf abgelaufen ist.
+
+    Args:
+        force (bool): Wenn True, werden alle Module unabhängig vom Intervall ausgeführt.
+
+    Returns:
+        float: Sekunden bis zum nächsten fälligen Modul (None, wenn keine Module gefunden wurden).
+    """
+    plugins = discover_modules(MODULES_DIR)
+    if not plugins:
+        logger.info("Keine Tracker-Module gefunden oder geladen. Beende.")
+        return None
 
-    # Iteriere durch die geladenen Module und rufe ihre track()-Funktion auf
-    for module in tracker_modules:
-        module_name = module.__name__.split('.')[-1] # Holt den Dateinamen ohne Pfad
-        print(f"\nSammle Daten von Modul: '{module_name}'...")
+    last_runs = database.get_last_run_times(DB_PATH)
+    due_plugins = []
+    for plugin in plugins:
+        if not force and seconds_until_due(plugin, last_runs) > 0:
+            logger.info("Modul '%s' ist noch nicht fällig und wird übersprungen.", plugin.name)
+        else:
+            due_plugins.append(plugin)
+    run_plugins(due_plugins)
+
+    export_run_metrics()
+
+    # Warnregeln über die neuen Events auswerten (siehe [Alerts] in config.ini); dafür
+    # kurz warten, bis die Warteschlange die Events dieses Laufs geschrieben hat
+    if INGEST_QUEUE is not None:
+        INGEST_QUEUE.wait_until_drained(timeout=10)
+    alerts.run_alerts(DB_PATH)
+
+    last_runs = database.get_last_run_times(DB_PATH)
+    # Lücken früherer Läufe im Hintergrund nachladen (siehe [Coverage] in config.ini)
+    gaps.start_background(DB_PATH, plugins, last_runs)
+    # Abgelaufene Events im Hintergrund aufräumen (siehe [Retention] in config.ini)
+    retention.start_background(DB_PATH, last_runs)
+    # Sicherung im laufenden Betrieb (siehe [Backup] in config.ini)
+    backup.start_background(DB_PATH, last_runs)
+    # Abgeschlossene Monate einfrieren bzw. archivieren (siehe [Partitions] in config.ini)
+    partitions.maintain_partitions(DB_PATH)
+    return min(seconds_until_due(plugin, last_runs) for plugin in plugins)
+
+def start_ingest_queue():
+    """
+    Startet die Warteschlange zur Datenbank gemäß dem Abschnitt [Ingest] der
+    Konfigurationsdatei und holt dabei noch nicht geschriebene Events aus der
+    Spool-Datei nach.
+
+    Returns:
+        IngestQueue: Die gestartete Warteschlange oder None, wenn sie deaktiviert ist.
+    """
+    config = settings.get_config()
+    if not config.getboolean('Ingest', 'enabled', fallback=True):
+        return None
+    spool_path = config.get('Ingest', 'spool_path', fallback='data/ingest.spool').strip() or 'data/ingest.spool'
+    dead_letter_path = config.get('Ingest', 'dead_letter_path', fallback='').strip()
+    return ingest.IngestQueue(
+        DB_PATH,
+        settings.resolve_path(spool_path),
+        max_queue_size=config.getint('Ingest', 'max_queue_size', fallback=10000),
+        batch_size=config.getint('Ingest', 'batch_size', fallback=500),
+        compact_bytes=config.getint('Ingest', 'compact_bytes', fallback=16 * 1024 * 1024),
+        fsync=config.getboolean('Ingest', 'fsync', fallback=False),
+        max_attempts=config.getint('Ingest', 'max_attempts', fallback=20),
+        dead_letter_path=settings.resolve_path(dead_letter_path) if dead_letter_path else None,
+    ).start()
+
+def main(argv=None):
+    """
+    Hauptfunktion des Life-Trackers.
+    Initialisiert die Datenbank, lädt die fälligen Module und sammelt Daten.
+
+    Args:
+        argv (list): Kommandozeilenargumente (Standard: sys.argv[1:]).
+    """
+    parser = argparse.ArgumentParser(description="Stat-Tracker: sammelt Daten aller fälligen Tracker-Module.")
+    parser.add_argument("--force", action="store_true",
+                        help="Alle Module ausführen, auch wenn ihr Intervall noch nicht abgelaufen ist.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Dauerhaft laufen und jedes Modul in seinem Intervall ausführen.")
+    subparsers = parser.add_subparsers(dest="command")
+    export_parser = subparsers.add_parser("export", help="Events als NDJSON, CSV oder Parquet exportieren.")
+    export.add_arguments(export_parser)
+    backfill_parser = subparsers.add_parser("backfill", help="Historische Wetter- und Pollendaten nachladen.")
+    backfill.add_arguments(backfill_parser)
+    reprocess_parser = subparsers.add_parser("reprocess", help="Events eines Moduls aus archivierten API-Antworten neu bilden.")
+    archive.add_arguments(reprocess_parser)
+    report_parser = subparsers.add_parser("report", help="Zeitreihen mehrerer Module ausrichten und vergleichen.")
+    analytics.add_arguments(report_parser)
+    snapshot_parser = subparsers.add_parser("snapshot", help="Datenbank im laufenden Betrieb komprimiert sichern bzw. wiederherstellen.")
+    backup.add_arguments(snapshot_parser)
+    args = parser.parse_args(argv)
+    # Meldungen aller Module gehen ab hier über den Listener-Thread (siehe [Logging] in config.ini)
+    logs.setup_logging()
+
+    if args.command == "export":
+        database.init_db(DB_PATH)
+        export.run_from_args(DB_PATH, args)
+        return
+    if args.command == "backfill":
+        database.init_db(DB_PATH)
+        search.init_search_index(DB_PATH)
+        partitions.init_catalog(DB_PATH)
+        gaps.init_coverage_store(DB_PATH)
+        circuit_breaker.init_breaker_store(DB_PATH)
+        archive.init_archive(DB_PATH)
+        backfill.run_from_args(DB_PATH, args)
+        return
+    if args.command == "report":
+        database.init_db(DB_PATH)
+        partitions.init_catalog(DB_PATH)
         try:
-            # Die track()-Funktion sollte eine Liste von Event-Diktionären zurückgeben
-            events_data = module.track()
-            if events_data:
-                for event in events_data:
-                    # Füge den Modulnamen zum Event hinzu, falls nicht vorhanden
-                    if "source_module" not in event:
-                        event["source_module"] = module_name
-                    database.insert_event(DB_PATH, event)
-                print(f"'{len(events_data)}' Events von '{module_name}' in die Datenbank geschrieben.")
-            else:
-                print(f"Modul '{module_name}' hat keine Events zurückgegeben.")
-        except Exception as e:
-            print(f"Fehler beim Ausführen von Modul '{module_name}': {e}")
+            analytics.run_from_args(DB_PATH, args)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+    if args.command == "snapshot":
+        database.init_db(DB_PATH)
+        partitions.init_catalog(DB_PATH)
+        backup.run_from_args(DB_PATH, args)
+        return
+    if args.command == "reprocess":
+        database.init_db(DB_PATH)
+        search.init_search_index(DB_PATH)
+        partitions.init_catalog(DB_PATH)
+        archive.init_archive(DB_PATH)
+        archive.run_from_args(DB_PATH, args)
+        return
+
+    logger.info("Starte Life-Tracker, Datenbankpfad: %s", DB_PATH)
+
+    # Initialisiere die Datenbank (erstellt die Tabelle, falls nicht vorhanden)
+    database.init_db(DB_PATH)
+    # Volltextindex samt Triggern, damit neue Events sofort durchsuchbar sind
+    search.init_search_index(DB_PATH)
+    partitions.init_catalog(DB_PATH)
+    alerts.init_alert_store(DB_PATH)
+    gaps.init_coverage_store(DB_PATH)
+    circuit_breaker.init_breaker_store(DB_PATH)
+    archive.init_archive(DB_PATH)
+
+    global INGEST_QUEUE
+    INGEST_QUEUE = start_ingest_queue()
+    try:
+        next_due = run_once(force=args.force)
+        logger.info("Daten-Sammelprozess abgeschlossen.")
 
-    print("\nDaten-Sammelprozess abgeschlossen.")
+        while args.daemon and next_due is not None:
+            # Mindestens eine Sekunde warten, um bei Fehlern keine Dauerschleife zu erzeugen
+            sleep_seconds = max(next_due, 1.0)
+            logger.info("Nächster Lauf in %.0f Sekunden.", sleep_seconds)
+            time.sleep(sleep_seconds)
+            next_due = run_once()
+    finally:
+        if INGEST_QUEUE is not None:
+            timeout = settings.get_config().getfloat('Ingest', 'shutdown_timeout_seconds', fallback=30)
+            INGEST_QUEUE.close(timeout)
+            INGEST_QUEUE = None
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,112 @@
+# module_manifest.py - Zwischengespeichertes Verzeichnis der Tracker-Module
+
+import ast
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Version des Manifest-Formats. Bei Änderungen am Aufbau wird der Cache verworfen.
+MANIFEST_VERSION = 2
+
+def read_module_info(module_path):
+    """
+    Liest die Metadaten eines Tracker-Moduls, ohne das Modul auszuführen.
+    Dazu wird der Quelltext nur geparst: Ausgewertet werden ein optionales
+    Literal 'MODULE_INFO = {...}' auf Modulebene sowie das Vorhandensein
+    einer 'track()'-Funktion.
+
+    Args:
+        module_path (str): Der Pfad zur .py-Datei des Moduls.
+
+    Returns:
+        dict: {'has_track': bool, 'info': dict} oder None, wenn die Datei
+              nicht gelesen oder geparst werden kann.
+    """
+    try:
+        with open(module_path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=module_path)
+    except (OSError, SyntaxError, ValueError) as e:
+        logger.error("Fehler beim Lesen von Modul '%s': %s", module_path, e)
+        return None
+
+    has_track = False
+    info = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == 'track':
+            has_track = True
+        elif isinstance(node, ast.Assign):
+            if any(isinstance(t, ast.Name) and t.id == 'MODULE_INFO' for t in node.targets):
+                try:
+                    value = ast.literal_eval(node.value)
+                except ValueError:
+                    logger.warning("'MODULE_INFO' in '%s' ist kein reines Literal und wird ignoriert.", module_path)
+                    continue
+                if isinstance(value, dict):
+                    info = value
+    return {"has_track": has_track, "info": info}
+
+def _load_cache(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if cache.get("version") != MANIFEST_VERSION:
+        return {}
+    return cache.get("modules", {})
+
+def _save_cache(manifest_path, modules):
+    tmp_path = manifest_path + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "modules": modules}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path)
+    except OSError as e:
+        logger.warning("Modul-Manifest '%s' konnte nicht gespeichert werden: %s", manifest_path, e)
+
+def build_manifest(module_paths, manifest_path):
+    """
+    Liefert die Manifest-Einträge zu den angegebenen Moduldateien. Einträge
+    aus dem Cache werden wiederverwendet, solange sich Änderungszeit und
+    Größe der Datei nicht geändert haben; nur geänderte Dateien werden neu
+    geparst.
+
+    Args:
+        module_paths (list): Absolute Pfade der .py-Dateien der Module.
+        manifest_path (str): Pfad zur Cache-Datei des Manifests.
+
+    Returns:
+        dict: Pfad -> Manifest-Eintrag mit den Schlüsseln 'has_track' und
+              'info' (der Inhalt von MODULE_INFO).
+    """
+    cached = _load_cache(manifest_path)
+    modules = {}
+    changed = False
+
+    for module_path in module_paths:
+        try:
+            stat = os.stat(module_path)
+        except OSError:
+            continue
+
+        entry = cached.get(module_path)
+        if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            modules[module_path] = entry
+            continue
+
+        parsed = read_module_info(module_path)
+        if parsed is None:
+            continue
+        modules[module_path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "has_track": parsed["has_track"],
+            "info": parsed["info"],
+        }
+        changed = True
+
+    if changed or set(modules) != set(cached):
+        _save_cache(manifest_path, modules)
+    return modules
@@ -1,10 +1,30 @@
 # modules/holiday_and_appointment_tracker.py - Modul zur Abfrage von Feiertagen und Terminen
 
-import requests
 from datetime import datetime, timedelta, date
 import json
+import logging
 import calendar # Für die Wochenberechnung
 
+import http_client
+
+# Derselbe Logger, ob über registry.py oder als 'modules.<name>' geladen (archive.py)
+logger = logging.getLogger(__name__.rpartition('.')[2])
+
+# Metadaten für das Modul-Manifest (werden ohne Import des Moduls gelesen).
+# Feiertage und Termine der Woche ändern sich selten, ein Lauf pro Tag genügt.
+MODULE_INFO = {
+    "interval_seconds": 86400,
+    "timeout_seconds": 60,
+    "concurrency": "io",
+    "event_types": ["weekly_holiday_reminder", "weekly_appointment_reminder"],
+    "capabilities": ["network"],
+    # Feiertage und Termine werden jede Woche erneut gemeldet, aber nur einmal gespeichert
+    "natural_keys": {
+        "weekly_holiday_reminder": ["value.date", "value.name"],
+        "weekly_appointment_reminder": ["value.date", "value.time", "value.title"],
+    },
+}
+
 def get_public_holidays(year, country_code="DE"):
     """
     Ruft öffentliche Feiertage für ein bestimmtes Jahr und Land von date.nager.at ab.
@@ -17,16 +37,18 @@ def get_public_holidays(year, country_code="DE"):
         list: Eine Liste von Diktionären, die die Feiertage repräsentieren, oder None bei einem Fehler.
               Jeder Feiertag hat die Schlüssel 'date', 'localName', 'name', 'countryCode', 'fixed', 'global'.
     """
+    import requests # Erst hier importieren, damit der Start ohne 'requests' auskommt
+
     url = f"https://date.nager.at/api/v3/PublicHolidays/{year}/{country_code}"
     try:
-        response = requests.get(url)
+        response = http_client.get(url)
         response.raise_for_status() # Löst einen HTTPError für schlechte Antworten (4xx oder 5xx) aus
         return response.json()
     except requests.exceptions.RequestException as e:
-        print(f"Fehler bei der Feiertags-API-Anfrage: {e}")
+        logger.error("Fehler bei der Feiertags-API-Anfrage: %s", e)
         return None
     except json.JSONDecodeError as e:
-        print(f"Fehler beim Parsen der JSON-Antwort der Feiertags-API: {e}")
+        logger.error("Fehler beim Parsen der JSON-Antwort der Feiertags-API: %s", e)
         return None
 
 def get_appointments_from_calendar():
@@ -40,7 +62,7 @@ def get_appointments_from_calendar():
               Jeder Termin sollte 'date' (als datetime.date Objekt), 'time' (optional),
               'title' und 'description' enthalten.
     """
-    print("Simuliere das Abrufen von Kalenderterminen...")
+    logger.debug("Simuliere das Abrufen von Kalenderterminen...")
     # Beispiel-Termine (ersetze dies durch echte Kalenderdaten)
     today = date.today()
     appointments = [
@@ -90,7 +112,7 @@ def track():
     start_of_week = current_date - timedelta(days=current_date.weekday())
     end_of_week = start_of_week + timedelta(days=6)
 
-    print(f"Prüfe Feiertage und Termine für die Woche vom {start_of_week.strftime('%Y-%m-%d')} bis {end_of_week.strftime('%Y-%m-%d')}")
+    logger.info("Prüfe Feiertage und Termine für die Woche vom %s bis %s", start_of_week, end_of_week)
 
     # 1. Feiertage abrufen und filtern
     holidays = get_public_holidays(current_year, "DE")
@@ -111,9 +133,9 @@ def track():
                     "event_type": "weekly_holiday_reminder",
                     "value": event_value
                 })
-                print(f"  Feiertag gefunden: {holiday['localName']} am {holiday_date_str}")
+                logger.debug("Feiertag gefunden: %s am %s", holiday['localName'], holiday_date_str)
     else:
-        print("  Konnte keine Feiertagsdaten abrufen.")
+        logger.warning("Konnte keine Feiertagsdaten abrufen.")
 
     # 2. Termine abrufen und filtern
     appointments = get_appointments_from_calendar()
@@ -134,17 +156,18 @@ def track():
                     "event_type": "weekly_appointment_reminder",
                     "value": event_value
                 })
-                print(f"  Termin gefunden: {appt['title']} am {appt_date.isoformat()} um {appt.get('time', 'ganztägig')}")
+                logger.debug("Termin gefunden: %s am %s um %s", appt['title'], appt_date, appt.get('time', 'ganztägig'))
     else:
-        print("  Konnte keine Kalendertermine abrufen.")
+        logger.warning("Konnte keine Kalendertermine abrufen.")
 
     if not events:
-        print("Keine Feiertage oder Termine für diese Woche gefunden.")
+        logger.info("Keine Feiertage oder Termine für diese Woche gefunden.")
 
     return events
 
 # Beispiel für die Nutzung (kann entfernt werden, wenn main.py die einzige Schnittstelle ist)
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
     print("Test von holiday_and_appointment_tracker.py:")
     tracked_events = track()
     for event in tracked_events:
@@ -0,0 +1,667 @@
+# modules/location_tracker.py - Modul zur Erfassung des Aufenthaltsorts
+
+import csv
+import logging
+import math
+import os
+import sqlite3
+import sys
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from datetime import datetime, timedelta
+
+import database
+import geocoder
+import settings
+from event import Event
+
+# Derselbe Logger, ob über registry.py oder als 'modules.<name>' geladen (archive.py)
+logger = logging.getLogger(__name__.rpartition('.')[2])
+
+# Metadaten für das Modul-Manifest (werden ohne Import des Moduls gelesen)
+MODULE_INFO = {
+    "interval_seconds": 3600,
+    "timeout_seconds": 30,
+    "concurrency": "io",
+    "event_types": ["location_history_batch", "location_trace_ingested"],
+    "capabilities": [],
+}
+
+# Maximale Anzahl von Verlaufseinträgen pro Event
+FLUSH_BATCH_SIZE = 500
+
+# Anzahl der GPS-Punkte pro Schreib-Transaktion beim Einlesen von Tracks
+INSERT_BATCH_SIZE = 1000
+
+# Genauigkeit der gespeicherten Geohashes (9 Zeichen ≈ 5 m x 5 m)
+GEOHASH_PRECISION = 9
+
+EARTH_RADIUS_METERS = 6371000.0
+
+class LocationNotFoundError(LookupError):
+    """Der gesuchte Ort kommt im Verlauf nicht vor."""
+
+class InvalidLocationError(ValueError):
+    """Der Ort ist leer oder kein String."""
+
+class LocationTracker:
+    """
+    Speichert den aktuellen Ort und den Verlauf aller Orte.
+
+    Ortsnamen werden nur einmal gespeichert (interniert) und im Verlauf über
+    ihre Nummer referenziert. Der Verlauf selbst liegt in kompakten Arrays
+    (Ortsnummer und Zeitstempel), sodass auch lange Aufzeichnungen wenig
+    Speicher belegen. Für jeden Ort wird zusätzlich der Index seines ersten
+    Vorkommens gemerkt, damit find_location_in_history in O(1) antwortet.
+    """
+
+    def __init__(self, initial_location, timestamp=None):
+        self._names = []            # Ortsnummer -> internierter Ortsname
+        self._ids = {}              # Ortsname -> Ortsnummer
+        self._history = array('I')  # Ortsnummern in zeitlicher Reihenfolge
+        self._timestamps = array('d')  # Unix-Zeitstempel der Verlaufseinträge
+        self._first_index = {}      # Ortsnummer -> Index des ersten Vorkommens
+        self._flushed = 0           # Anzahl der bereits als Event ausgegebenen Einträge
+        self.current_location = None
+        self.update_location(initial_location, timestamp)
+
+    def _validate(self, location):
+        if not isinstance(location, str) or not location.strip():
+            raise InvalidLocationError(f"Ungültiger Ort: {location!r}")
+
+    def _intern(self, location):
+        location_id = self._ids.get(location)
+        if location_id is None:
+            location_id = len(self._names)
+            location = sys.intern(location)
+            self._names.append(location)
+            self._ids[location] = location_id
+        return location_id
+
+    def update_location(self, location, timestamp=None):
+        """
+        Setzt den aktuellen Ort und hängt ihn an den Verlauf an.
+
+        Args:
+            location (str): Der neue Ort.
+            timestamp (float): Unix-Zeitstempel des Ortswechsels (Standard: jetzt).
+
+        Raises:
+            InvalidLocationError: Wenn der Ort leer oder kein String ist.
+        """
+        self._validate(location)
+        location_id = self._intern(location)
+        self._first_index.setdefault(location_id, len(self._history))
+        self._history.append(location_id)
+        self._timestamps.append(time.time() if timestamp is None else timestamp)
+        self.current_location = self._names[location_id]
+
+    def get_location_history(self):
+        """
+        Returns:
+            list: Alle Orte des Verlaufs in zeitlicher Reihenfolge.
+        """
+        names = self._names
+        return [names[location_id] for location_id in self._history]
+
+    def find_location_in_history(self, location):
+        """
+        Gibt den Index des ersten Vorkommens eines Orts im Verlauf zurück.
+
+        Args:
+            location (str): Der gesuchte Ort.
+
+        Returns:
+            int: Der Index im Verlauf.
+
+        Raises:
+            LocationNotFoundError: Wenn der Ort nicht im Verlauf vorkommt.
+        """
+        index = self._first_index.get(self._ids.get(location))
+        if index is None:
+            raise LocationNotFoundError(f"Ort '{location}' nicht im Verlauf gefunden.")
+        return index
+
+    def reset_history(self):
+        """
+        Leert den Verlauf. Der aktuelle Ort bleibt erhalten, noch nicht
+        ausgegebene Einträge werden verworfen.
+        """
+        self._history = array('I')
+        self._timestamps = array('d')
+        self._first_index.clear()
+        self._flushed = 0
+
+    def flush_events(self, batch_size=FLUSH_BATCH_SIZE):
+        """
+        Gibt alle seit dem letzten Aufruf hinzugekommenen Verlaufseinträge als
+        Events zurück, jeweils bis zu 'batch_size' Einträge pro Event.
+
+        Returns:
+            list: Events vom Typ 'location_history_batch'.
+        """
+        events = []
+        names = self._names
+        end = len(self._history)
+        for start in range(self._flushed, end, batch_size):
+            stop = min(start + batch_size, end)
+            timestamps = [datetime.fromtimestamp(ts).isoformat() for ts in self._timestamps[start:stop]]
+            events.append({
+                "timestamp": timestamps[0],
+                "event_type": "location_history_batch",
+                "value": {
+                    "locations": [names[location_id] for location_id in self._history[start:stop]],
+                    "timestamps": timestamps,
+                }
+            })
+        self._flushed = end
+        return events
+
+    def __repr__(self):
+        return f"LocationTracker(current_location={self.current_location!r}, history_length={len(self._history)})"
+
+    def __str__(self):
+        return f"Aktueller Ort: {self.current_location}"
+
+# --- GPS-Tracks: Einlesen, Vereinfachen und räumlicher Index ---
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH_DECODE = {char: i for i, char in enumerate(_GEOHASH_ALPHABET)}
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Berechnet den Geohash eines Punkts. Punkte mit gemeinsamem Präfix liegen
+    in derselben Zelle, wodurch ein Präfix-Bereich im Index einer Fläche entspricht.
+
+    Args:
+        latitude (float): Breitengrad.
+        longitude (float): Längengrad.
+        precision (int): Anzahl der Zeichen.
+
+    Returns:
+        str: Der Geohash.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True # Geohash beginnt mit einem Längengrad-Bit
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+def _geohash_cell_size(precision):
+    """Gibt die Kantenlängen (Breitengrade, Längengrade) einer Geohash-Zelle zurück."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def geohash_cells_around(latitude, longitude, radius_meters):
+    """
+    Ermittelt die Geohash-Präfixe, die einen Kreis um einen Punkt vollständig
+    abdecken: die Zelle des Mittelpunkts und ihre acht Nachbarn, bei der
+    feinsten Genauigkeit, deren Zellen mindestens so groß wie der Radius sind.
+
+    Returns:
+        list: Die Geohash-Präfixe (ohne Duplikate).
+    """
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_deg, lon_deg = _geohash_cell_size(candidate)
+        lat_m = math.radians(lat_deg) * EARTH_RADIUS_METERS
+        lon_m = math.radians(lon_deg) * EARTH_RADIUS_METERS * cos_lat
+        if lat_m >= radius_meters and lon_m >= radius_meters:
+            precision = candidate
+            break
+
+    lat_deg, lon_deg = _geohash_cell_size(precision)
+    cells = []
+    for d_lat in (-lat_deg, 0.0, lat_deg):
+        for d_lon in (-lon_deg, 0.0, lon_deg):
+            lat = min(max(latitude + d_lat, -90.0), 90.0)
+            lon = (longitude + d_lon + 180.0) % 360.0 - 180.0
+            cell = geohash_encode(lat, lon, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+def haversine_meters(lat1, lon1, lat2, lon2):
+    """Berechnet die Entfernung zweier Punkte auf der Erdoberfläche in Metern."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+def _parse_time(value):
+    """
+    Wandelt einen Zeitstempel aus GPX/CSV (ISO 8601 oder Unix-Sekunden) in
+    Unix-Sekunden um.
+    """
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value).timestamp()
+
+def read_gpx(path):
+    """
+    Liest die Trackpunkte einer GPX-Datei als Strom, ohne die ganze Datei
+    in den Speicher zu laden.
+
+    Yields:
+        tuple: (Unix-Zeitstempel, Breitengrad, Längengrad)
+    """
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if not elem.tag.endswith("trkpt"):
+            continue
+        time_text = None
+        for child in elem:
+            if child.tag.endswith("time"):
+                time_text = child.text
+                break
+        if time_text:
+            yield _parse_time(time_text), float(elem.get("lat")), float(elem.get("lon"))
+        elem.clear()
+
+def read_csv(path):
+    """
+    Liest GPS-Punkte aus einer CSV-Datei mit Kopfzeile. Erkannt werden die
+    Spalten 'timestamp'/'time', 'lat'/'latitude' und 'lon'/'lng'/'longitude'.
+
+    Yields:
+        tuple: (Unix-Zeitstempel, Breitengrad, Längengrad)
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        columns = {name.strip().lower(): name for name in (reader.fieldnames or [])}
+        time_col = columns.get("timestamp") or columns.get("time")
+        lat_col = columns.get("lat") or columns.get("latitude")
+        lon_col = columns.get("lon") or columns.get("lng") or columns.get("longitude")
+        if not (time_col and lat_col and lon_col):
+            raise ValueError(f"CSV-Datei '{path}' hat keine Spalten für Zeit, Breiten- und Längengrad.")
+        for row in reader:
+            try:
+                yield _parse_time(row[time_col]), float(row[lat_col]), float(row[lon_col])
+            except (TypeError, ValueError):
+                continue # Unvollständige Zeilen überspringen
+
+def read_trace_file(path):
+    """Liest eine GPX- oder CSV-Datei anhand ihrer Dateiendung."""
+    if path.lower().endswith(".gpx"):
+        return read_gpx(path)
+    return read_csv(path)
+
+class TraceSimplifier:
+    """
+    Vereinfacht einen GPS-Track während des Einlesens: Ein Punkt wird nur
+    übernommen, wenn er mindestens 'min_distance_meters' vom zuletzt
+    übernommenen Punkt entfernt ist oder seit diesem 'max_interval_seconds'
+    vergangen sind. Stillstand und dichte Sekunden-Pings schrumpfen so auf
+    wenige Punkte, ohne dass der Track zwischengespeichert werden muss.
+    """
+
+    def __init__(self, min_distance_meters=25.0, max_interval_seconds=300.0):
+        self.min_distance_meters = min_distance_meters
+        self.max_interval_seconds = max_interval_seconds
+        self._last_kept = None
+        self._pending = None # Letzter verworfener Punkt, damit das Track-Ende erhalten bleibt
+
+    def add(self, point):
+        """
+        Args:
+            point (tuple): (Unix-Zeitstempel, Breitengrad, Längengrad)
+
+        Returns:
+            tuple: Der Punkt, wenn er übernommen wird, sonst None.
+        """
+        last = self._last_kept
+        if (last is None
+                or point[0] - last[0] >= self.max_interval_seconds
+                or haversine_meters(last[1], last[2], point[1], point[2]) >= self.min_distance_meters):
+            self._last_kept = point
+            self._pending = None
+            return point
+        self._pending = point
+        return None
+
+    def finish(self):
+        """Gibt den letzten Punkt des Tracks zurück, falls er noch nicht übernommen wurde."""
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self._last_kept = pending
+        return pending
+
+    def simplify(self, points):
+        """Vereinfacht einen Strom von Punkten (Generator)."""
+        for point in points:
+            kept = self.add(point)
+            if kept is not None:
+                yield kept
+        last = self.finish()
+        if last is not None:
+            yield last
+
+def init_location_store(db_path):
+    """
+    Erstellt die Tabelle 'location_points' für vereinfachte GPS-Punkte samt
+    Index über Geohash und Zeit, falls sie noch nicht existiert.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS location_points (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                geohash TEXT NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_location_points_geohash ON location_points (geohash, timestamp)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_location_points_timestamp ON location_points (timestamp)')
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error("Fehler bei der Initialisierung der Ortsdaten: %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+def _to_local_iso(unix_seconds):
+    return datetime.fromtimestamp(unix_seconds).isoformat()
+
+def ingest_trace(db_path, points, simplifier=None):
+    """
+    Vereinfacht einen Strom von GPS-Punkten und speichert die übernommenen
+    Punkte blockweise in 'location_points'. Jeder Block wird zusätzlich über
+    das lokale Ortsverzeichnis benannt; Ortswechsel landen im gemeinsamen
+    LocationTracker und als Liste 'places' im Ergebnis.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        points (iterable): (Unix-Zeitstempel, Breitengrad, Längengrad)-Tupel.
+        simplifier (TraceSimplifier): Vereinfachung (Standard: Werte aus config.ini).
+
+    Returns:
+        dict: Anzahl gelesener und gespeicherter Punkte, Start und Ende des
+              Tracks sowie die besuchten Orte in zeitlicher Reihenfolge.
+    """
+    simplifier = simplifier or _configured_simplifier()
+    max_place_distance = settings.get_config().getfloat(
+        'LocationTracker', 'max_place_distance_meters', fallback=25000.0)
+    stats = {"raw_points": 0, "stored_points": 0, "start": None, "end": None, "places": []}
+
+    def counted(source):
+        for point in source:
+            stats["raw_points"] += 1
+            yield point
+
+    def write(conn, batch):
+        rows = [(_to_local_iso(ts), lat, lon, geohash_encode(lat, lon)) for ts, lat, lon in batch]
+        conn.executemany('''
+            INSERT INTO location_points (timestamp, latitude, longitude, geohash)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+        stats["stored_points"] += len(rows)
+        stats["start"] = stats["start"] or rows[0][0]
+        stats["end"] = rows[-1][0]
+
+        places = geocoder.reverse_geocode_many([(lat, lon) for _, lat, lon in batch])
+        for (ts, _, _), place in zip(batch, places):
+            if place is None or place["distance_meters"] > max_place_distance:
+                continue
+            if not stats["places"] or stats["places"][-1] != place["name"]:
+                stats["places"].append(place["name"])
+            record_location(place["name"], ts)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        batch = []
+        for point in simplifier.simplify(counted(points)):
+            batch.append(point)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                write(conn, batch)
+                batch = []
+        if batch:
+            write(conn, batch)
+    finally:
+        conn.close()
+    return stats
+
+def get_points_on_date(db_path, day):
+    """
+    Beantwortet "Wo war ich am Tag X?" über den Zeit-Index.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        day (datetime.date): Der gesuchte Tag.
+
+    Returns:
+        list: (Zeitstempel, Breitengrad, Längengrad)-Tupel in zeitlicher Reihenfolge.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        return conn.execute('''
+            SELECT timestamp, latitude, longitude FROM location_points
+            WHERE timestamp >= ? AND timestamp < ?
+            ORDER BY timestamp
+        ''', (day.isoformat(), (day + timedelta(days=1)).isoformat())).fetchall()
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Abrufen der Ortsdaten: %s", e)
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def find_visits_within_radius(db_path, latitude, longitude, radius_meters, max_gap_seconds=1800):
+    """
+    Findet alle Aufenthalte im Umkreis eines Punkts. Statt alle Punkte zu
+    durchsuchen, werden nur die Geohash-Zellen um den Punkt über den Index
+    gelesen und anschließend exakt nach Entfernung gefiltert.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        latitude (float): Breitengrad des Mittelpunkts.
+        longitude (float): Längengrad des Mittelpunkts.
+        radius_meters (float): Radius in Metern.
+        max_gap_seconds (float): Größere Zeitlücken zwischen Punkten beginnen einen neuen Aufenthalt.
+
+    Returns:
+        list: Aufenthalte als Diktionäre mit 'start', 'end' und 'points'.
+    """
+    cells = geohash_cells_around(latitude, longitude, radius_meters)
+    conn = None
+    rows = []
+    try:
+        conn = sqlite3.connect(db_path)
+        for cell in cells:
+            # '~' sortiert hinter allen Zeichen des Geohash-Alphabets
+            rows.extend(conn.execute('''
+                SELECT timestamp, latitude, longitude FROM location_points
+                WHERE geohash >= ? AND geohash < ?
+            ''', (cell, cell + "~")).fetchall())
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Abrufen der Ortsdaten: %s", e)
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+    points = sorted(
+        row for row in rows
+        if haversine_meters(latitude, longitude, row[1], row[2]) <= radius_meters
+    )
+    visits = []
+    for point in points:
+        ts = datetime.fromisoformat(point[0])
+        if visits and (ts - visits[-1]["_end"]).total_seconds() <= max_gap_seconds:
+            visits[-1]["_end"] = ts
+            visits[-1]["end"] = point[0]
+            visits[-1]["points"].append(point)
+        else:
+            visits.append({"start": point[0], "end": point[0], "points": [point], "_end": ts})
+    for visit in visits:
+        del visit["_end"]
+    return visits
+
+def _configured_simplifier():
+    config = settings.get_config()
+    return TraceSimplifier(
+        min_distance_meters=config.getfloat('LocationTracker', 'min_distance_meters', fallback=25.0),
+        max_interval_seconds=config.getfloat('LocationTracker', 'max_interval_seconds', fallback=300.0),
+    )
+
+def ingest_drop_directory(db_path, directory):
+    """
+    Liest alle GPX- und CSV-Dateien aus dem Ablageordner ein und verschiebt
+    sie danach in den Unterordner 'processed'.
+
+    Returns:
+        list: Events vom Typ 'location_trace_ingested', eines pro Datei.
+    """
+    events = []
+    if not os.path.isdir(directory):
+        return events
+    processed_dir = os.path.join(directory, "processed")
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        if not os.path.isfile(path) or not filename.lower().endswith((".gpx", ".csv")):
+            continue
+        try:
+            stats = ingest_trace(db_path, read_trace_file(path))
+        except (OSError, ValueError, ET.ParseError, sqlite3.Error) as e:
+            logger.error("Fehler beim Einlesen von '%s': %s", filename, e)
+            continue
+        os.makedirs(processed_dir, exist_ok=True)
+        os.replace(path, os.path.join(processed_dir, filename))
+        logger.info("Track '%s': %s Punkte gelesen, %s gespeichert.", filename, stats['raw_points'], stats['stored_points'])
+        events.append({
+            "timestamp": stats["start"] or datetime.now().isoformat(),
+            "event_type": "location_trace_ingested",
+            "value": dict(stats, file=filename),
+        })
+    return events
+
+# Gemeinsamer Tracker des laufenden Prozesses, z.B. für einen Daemon-Betrieb
+_tracker = None
+
+# Schlüssel in der meta-Tabelle für den zuletzt erfassten Ort. registry.py lädt
+# das Modul bei jedem Lauf neu, '_tracker' beginnt dann wieder mit None.
+LAST_LOCATION_KEY = "location_tracker.last_location"
+
+def _restore_tracker(db_path):
+    """
+    Setzt den gemeinsamen Tracker nach einem Neuladen des Moduls auf den
+    zuletzt gespeicherten Ort, ohne diesen erneut als Event auszugeben.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    global _tracker
+    if _tracker is not None:
+        return
+    last_location = database.get_meta(db_path, LAST_LOCATION_KEY)
+    if last_location:
+        _tracker = LocationTracker(last_location)
+        # Wurde bereits in einem früheren Lauf ausgegeben
+        _tracker.flush_events()
+
+def record_location(location, timestamp=None):
+    """
+    Erfasst einen Ortswechsel im gemeinsamen Tracker dieses Prozesses.
+    Ein unveränderter Ort wird nicht erneut gespeichert.
+
+    Args:
+        location (str): Der aktuelle Ort.
+        timestamp (float): Unix-Zeitstempel (Standard: jetzt).
+    """
+    global _tracker
+    if _tracker is None:
+        _tracker = LocationTracker(location, timestamp)
+    elif _tracker.current_location != location:
+        _tracker.update_location(location, timestamp)
+
+def track():
+    """
+    Liest neue GPS-Tracks aus dem Ablageordner ein und liefert die neu
+    erfassten Orte als gebündelte Events. Ist in der Konfiguration unter
+    [LocationTracker] ein 'location' gesetzt, wird dieser Ort vorher erfasst.
+
+    Die Events werden als Generator geliefert, sodass main.py sie schon
+    während des Einlesens in Blöcken weiterreichen kann.
+
+    Yields:
+        Event: Events vom Typ 'location_trace_ingested' (eines pro Datei) und
+               'location_history_batch'. 'source_module' wird von main.py hinzugefügt.
+    """
+    config = settings.get_config()
+    db_path = settings.get_db_path()
+    _restore_tracker(db_path)
+    event_count = 0
+    drop_directory = config.get('LocationTracker', 'drop_directory', fallback='').strip()
+    if drop_directory:
+        init_location_store(db_path)
+        for event in ingest_drop_directory(db_path, settings.resolve_path(drop_directory)):
+            event_count += 1
+            yield Event.from_dict(event)
+
+    configured = config.get('LocationTracker', 'location', fallback='').strip()
+    if configured:
+        record_location(configured)
+
+    if _tracker is None:
+        if not event_count:
+            logger.info("Keine Orte erfasst.")
+        return
+
+    # Nur die Verlaufs-Events enthalten 'locations'
+    location_count = batch_count = 0
+    for event in _tracker.flush_events():
+        location_count += len(event['value']['locations'])
+        batch_count += 1
+        yield Event.from_dict(event)
+    logger.info("%s neue Orte in %s Events gebündelt.", location_count, batch_count)
+    database.set_meta(db_path, LAST_LOCATION_KEY, _tracker.current_location)
+
+# Beispiel für die Nutzung (kann entfernt werden, wenn main.py die einzige Schnittstelle ist)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+    print("Test von location_tracker.py:")
+    record_location("Ulm")
+    record_location("München")
+    tracked_events = track()
+    for event in tracked_events:
+        print(event)
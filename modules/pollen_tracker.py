@@ -1,21 +1,51 @@
 # modules/pollen_tracker.py - Modul zur Abfrage und Speicherung von Pollenflugdaten
 
-import requests
 from datetime import datetime, timedelta
 import json
-
-def get_pollen_data(latitude, longitude, timezone="Europe/Berlin"):
+import logging
+
+import http_client
+
+# Derselbe Logger, ob über registry.py oder als 'modules.<name>' geladen (archive.py)
+logger = logging.getLogger(__name__.rpartition('.')[2])
+
+# Metadaten für das Modul-Manifest (werden ohne Import des Moduls gelesen).
+# Pollenflugdaten werden als Tageswert gespeichert, ein Lauf pro Tag genügt.
+MODULE_INFO = {
+    "interval_seconds": 86400,
+    "timeout_seconds": 60,
+    "concurrency": "io",
+    "event_types": ["pollen_forecast_daily", "pollen_fetch_failed", "pollen_no_data_today", "pollen_extraction_failed"],
+    "capabilities": ["network"],
+    # Ein Eintrag pro Tag, spätere Läufe am selben Tag aktualisieren ihn
+    "natural_keys": {"pollen_forecast_daily": ["value.location", "value.date"]},
+}
+
+# Ort, für den track() abruft (Name, Breite, Länge); gaps.py lädt Lücken nur für ihn nach
+LOCATION = ("Ulm", 48.4011, 9.9876)
+
+def get_pollen_data(latitude, longitude, timezone="Europe/Berlin", start_date=None, end_date=None,
+                    archive_context=None):
     """
-    Ruft stündliche Pollenflugdaten von der Open-Meteo Pollen API ab.
+    Ruft stündliche Pollenflugdaten von der Open-Meteo Pollen API ab. Mit
+    'start_date' und 'end_date' wird statt des heutigen Tages dieser
+    Zeitraum abgefragt (siehe backfill.py). Mit 'archive_context' wird die
+    Antwort für eine spätere erneute Auswertung archiviert (siehe archive.py).
 
     Args:
         latitude (float): Breitengrad des Standorts.
         longitude (float): Längengrad des Standorts.
         timezone (str): Zeitzone für die Abfrage.
+        start_date (str): Optional erster Tag (YYYY-MM-DD).
+        end_date (str): Optional letzter Tag (YYYY-MM-DD, einschließlich).
+        archive_context (dict): Optional Argumente für parse_response(), die
+                                mit der Antwort archiviert werden.
 
     Returns:
         dict: Die JSON-Antwort der Open-Meteo Pollen API oder None bei einem Fehler.
     """
+    import requests # Erst hier importieren, damit der Start ohne 'requests' auskommt
+
     # API-Endpunkt für Pollenflugvorhersagen
     url = "https://api.open-meteo.com/v1/pollen"
     params = {
@@ -27,16 +57,21 @@ def get_pollen_data(latitude, longitude, timezone="Europe/Berlin"):
         "timezone": timezone,
         "forecast_days": 1 # Nur für den heutigen Tag
     }
+    if start_date and end_date:
+        del params["forecast_days"]
+        params["start_date"] = start_date
+        params["end_date"] = end_date
 
     try:
-        response = requests.get(url, params=params)
+        archive = {"source_module": "pollen_tracker", "context": archive_context} if archive_context else None
+        response = http_client.get(url, params=params, archive=archive)
         response.raise_for_status() # Löst einen HTTPError für schlechte Antworten (4xx oder 5xx) aus
         return response.json()
     except requests.exceptions.RequestException as e:
-        print(f"Fehler bei der Pollen-API-Anfrage: {e}")
+        logger.error("Fehler bei der Pollen-API-Anfrage: %s", e)
         return None
     except json.JSONDecodeError as e:
-        print(f"Fehler beim Parsen der JSON-Antwort der Pollen-API: {e}")
+        logger.error("Fehler beim Parsen der JSON-Antwort der Pollen-API: %s", e)
         return None
 
 def interpret_pollen_level(level):
@@ -72,92 +107,112 @@ def track():
               Jedes Diktionär sollte 'timestamp', 'event_type' und 'value' enthalten.
               'source_module' wird von main.py hinzugefügt.
     """
-    events = []
-    # Koordinaten für Ulm, Deutschland
-    ulm_latitude = 48.4011
-    ulm_longitude = 9.9876
+    location, latitude, longitude = LOCATION
+
+    logger.info("Rufe Pollenflugdaten für %s ab (Lat: %s, Lon: %s)...", location, latitude, longitude)
+    # Mit der Antwort wird archiviert, wie sie ausgewertet wurde (siehe parse_response)
+    now = datetime.now()
+    context = {"location": location, "dates": [now.strftime("%Y-%m-%d")], "timestamp": now.isoformat()}
+    pollen_response = get_pollen_data(latitude, longitude, archive_context=context)
+
+    events = parse_response(pollen_response, **context)
+    for event in events:
+        if event["event_type"] == "pollen_fetch_failed":
+            logger.warning("Konnte keine Pollenflugdaten abrufen oder die Antwort war unerwartet.")
+        elif event["event_type"] == "pollen_no_data_today":
+            logger.info("Keine Pollenflugdaten für den heutigen Tag gefunden.")
+        elif event["event_type"] == "pollen_extraction_failed":
+            logger.warning("Konnte keine spezifischen Pollenflugdaten für heute extrahieren.")
+        elif logger.isEnabledFor(logging.DEBUG):
+            for pollen_type, data in event["value"]["pollen_types"].items():
+                logger.debug("Pollenflug am %s: %s %s (Level: %s)", event['value']['date'],
+                             pollen_type.capitalize(), data['level_description'], data['level_numeric'])
+
+    return events
+
+def parse_response(pollen_response, location, dates=None, timestamp=None, fetched_at=None):
+    """
+    Bildet die Events aus einer Antwort der Pollen API. Wird von track() und
+    beim erneuten Auswerten archivierter Antworten verwendet (siehe archive.py).
 
-    print(f"Rufe Pollenflugdaten für Ulm ab (Lat: {ulm_latitude}, Lon: {ulm_longitude})...")
-    pollen_response = get_pollen_data(ulm_latitude, ulm_longitude)
+    Args:
+        pollen_response (dict): Die JSON-Antwort oder None bei einem Fehler.
+        location (str): Der Name des Orts.
+        dates (list): Optional nur diese Tage (YYYY-MM-DD).
+        timestamp (str): Optional Zeitstempel aller Events (siehe build_daily_events).
+        fetched_at (str): Optional der Abrufzeitpunkt (Standard: jetzt).
 
+    Returns:
+        list: Event-Diktionäre mit 'timestamp', 'event_type' und 'value'.
+    """
+    failed_at = timestamp or fetched_at or datetime.now().isoformat()
     if not pollen_response or 'hourly' not in pollen_response:
-        print("Konnte keine Pollenflugdaten abrufen oder die Antwort war unerwartet.")
-        events.append({
-            "timestamp": datetime.now().isoformat(),
-            "event_type": "pollen_fetch_failed",
-            "value": "no_data_available"
-        })
-        return events
-
-    hourly_data = pollen_response['hourly']
-    times = hourly_data['time']
-    
-    today_date_str = datetime.now().strftime("%Y-%m-%d")
-    
-    # Finde den Index für die heutige Tagesmitte oder den ersten Eintrag des Tages
-    # Wir nehmen den ersten Eintrag des heutigen Tages, da Pollenflug oft als Tageswert
-    # oder als Höchstwert für den Tag relevant ist, nicht unbedingt stündlich.
-    today_index = -1
-    for i, time_str in enumerate(times):
-        dt_object = datetime.fromisoformat(time_str)
-        if dt_object.date().strftime("%Y-%m-%d") == today_date_str:
-            today_index = i
-            break
-
-    if today_index == -1:
-        print("Keine Pollenflugdaten für den heutigen Tag gefunden.")
-        events.append({
-            "timestamp": datetime.now().isoformat(),
-            "event_type": "pollen_no_data_today",
-            "value": "no_data_for_current_day"
-        })
-        return events
-
-    # Sammle die Pollenwerte für den heutigen Tag
-    pollen_data_today = {}
-    # Iteriere über alle Pollentypen, die in der hourly_data vorhanden sind
-    for key, values in hourly_data.items():
-        if key.endswith('_pollen'):
-            pollen_type = key.replace('_pollen', '')
-            # Nimm den Wert für den gefundenen heutigen Index
-            if i < len(values): # Stelle sicher, dass der Index gültig ist
-                level = values[today_index]
-                pollen_data_today[pollen_type] = {
-                    "level_numeric": level,
-                    "level_description": interpret_pollen_level(level)
-                }
-            else:
-                pollen_data_today[pollen_type] = {
-                    "level_numeric": -1, # Indikator für fehlende Daten
-                    "level_description": "Daten nicht verfügbar"
-                }
+        return [{"timestamp": failed_at, "event_type": "pollen_fetch_failed", "value": "no_data_available"}]
 
-    if pollen_data_today:
-        event_value = {
-            "date": today_date_str,
-            "pollen_types": pollen_data_today
-        }
-
-        events.append({
-            "timestamp": datetime.now().isoformat(), # Aktueller Zeitstempel für das Event
-            "event_type": "pollen_forecast_daily",
-            "value": event_value
-        })
-        print(f"Pollenflugdaten für heute ({today_date_str}):")
-        for pollen_type, data in pollen_data_today.items():
-            print(f"  {pollen_type.capitalize()}: {data['level_description']} (Level: {data['level_numeric']})")
-    else:
-        print("Konnte keine spezifischen Pollenflugdaten für heute extrahieren.")
-        events.append({
-            "timestamp": datetime.now().isoformat(),
-            "event_type": "pollen_extraction_failed",
-            "value": "no_specific_pollen_data"
-        })
+    dates = set(dates) if dates is not None else None
+    if dates is not None and not any(time_str[:10] in dates for time_str in pollen_response['hourly']['time']):
+        return [{"timestamp": failed_at, "event_type": "pollen_no_data_today", "value": "no_data_for_current_day"}]
+
+    daily_events = build_daily_events(pollen_response['hourly'], location, dates=dates, timestamp=timestamp)
+    if not daily_events:
+        return [{"timestamp": failed_at, "event_type": "pollen_extraction_failed", "value": "no_specific_pollen_data"}]
+    return daily_events
+
+def build_daily_events(hourly_data, location, dates=None, timestamp=None):
+    """
+    Bildet pro Tag ein 'pollen_forecast_daily'-Event aus dem ersten
+    Stundenwert des Tages, da Pollenflug oft als Tageswert oder als
+    Höchstwert für den Tag relevant ist, nicht unbedingt stündlich.
+
+    Args:
+        hourly_data (dict): Der 'hourly'-Teil der Antwort der Pollen API.
+        location (str): Der Name des Orts.
+        dates (set): Optional nur diese Tage (YYYY-MM-DD).
+        timestamp (str): Optional Zeitstempel aller Events (Standard: die
+                         erste Stunde des jeweiligen Tages).
 
+    Returns:
+        list: Event-Diktionäre mit 'timestamp', 'event_type' und 'value'.
+    """
+    first_index = {}
+    for i, time_str in enumerate(hourly_data['time']):
+        day = time_str[:10]
+        if day not in first_index and (dates is None or day in dates):
+            first_index[day] = i
+
+    events = []
+    for day, index in first_index.items():
+        # Iteriere über alle Pollentypen, die in der hourly_data vorhanden sind
+        pollen_data = {}
+        for key, values in hourly_data.items():
+            if key.endswith('_pollen'):
+                pollen_type = key.replace('_pollen', '')
+                if index < len(values): # Stelle sicher, dass der Index gültig ist
+                    level = values[index]
+                    pollen_data[pollen_type] = {
+                        "level_numeric": level,
+                        "level_description": interpret_pollen_level(level)
+                    }
+                else:
+                    pollen_data[pollen_type] = {
+                        "level_numeric": -1, # Indikator für fehlende Daten
+                        "level_description": "Daten nicht verfügbar"
+                    }
+        if pollen_data:
+            events.append({
+                "timestamp": timestamp or hourly_data['time'][index],
+                "event_type": "pollen_forecast_daily",
+                "value": {
+                    "location": location,
+                    "date": day,
+                    "pollen_types": pollen_data
+                }
+            })
     return events
 
 # Beispiel für die Nutzung (kann entfernt werden, wenn main.py die einzige Schnittstelle ist)
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
     print("Test von pollen_tracker.py:")
     tracked_events = track()
     for event in tracked_events:
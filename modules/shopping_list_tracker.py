@@ -2,15 +2,29 @@
 
 import base64
 import json
+import logging
 from datetime import datetime
-import requests
 import os
 
+import http_client
+
+# Derselbe Logger, ob über registry.py oder als 'modules.<name>' geladen (archive.py)
+logger = logging.getLogger(__name__.rpartition('.')[2])
+
 # API-Schlüssel für die Gemini API.
 # Im Canvas-Kontext wird dieser automatisch bereitgestellt, wenn er leer ist.
 # Für lokale Tests musst du hier deinen eigenen API-Schlüssel einfügen.
 API_KEY = "" # LASS DIESEN STRING LEER, WENN DU IM CANVAS BIST
 
+# Metadaten für das Modul-Manifest (werden ohne Import des Moduls gelesen)
+MODULE_INFO = {
+    "interval_seconds": 3600,
+    "timeout_seconds": 120,
+    "concurrency": "io",
+    "event_types": ["shopping_list_processed", "shopping_list_processing_failed"],
+    "capabilities": ["network"],
+}
+
 def process_image_with_gemini(base64_image_data, prompt_text):
     """
     Sendet ein Base64-kodiertes Bild an die Gemini API zur Bildanalyse.
@@ -22,6 +36,8 @@ def process_image_with_gemini(base64_image_data, prompt_text):
     Returns:
         dict: Das JSON-Ergebnis der Gemini API oder None bei einem Fehler.
     """
+    import requests # Erst hier importieren, damit der Start ohne 'requests' auskommt
+
     url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={API_KEY}"
     headers = {
         'Content-Type': 'application/json'
@@ -58,7 +74,7 @@ def process_image_with_gemini(base64_image_data, prompt_text):
     }
 
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        response = http_client.post(url, headers=headers, data=json.dumps(payload))
         response.raise_for_status() # Löst einen HTTPError für schlechte Antworten (4xx oder 5xx) aus
         result = response.json()
 
@@ -71,17 +87,17 @@ def process_image_with_gemini(base64_image_data, prompt_text):
             json_string = result["candidates"][0]["content"]["parts"][0]["text"]
             return json.loads(json_string)
         else:
-            print("Fehler: Unerwartete Antwortstruktur von der Gemini API.")
+            logger.error("Unerwartete Antwortstruktur von der Gemini API.")
             return None
     except requests.exceptions.RequestException as e:
-        print(f"Fehler bei der API-Anfrage: {e}")
+        logger.error("Fehler bei der API-Anfrage: %s", e)
         return None
     except json.JSONDecodeError as e:
-        print(f"Fehler beim Parsen der JSON-Antwort: {e}")
-        print(f"Rohantwort: {response.text}")
+        logger.error("Fehler beim Parsen der JSON-Antwort: %s", e)
+        logger.debug("Rohantwort: %s", response.text)
         return None
     except Exception as e:
-        print(f"Ein unerwarteter Fehler ist aufgetreten: {e}")
+        logger.exception("Ein unerwarteter Fehler ist aufgetreten: %s", e)
         return None
 
 def track():
@@ -98,7 +114,7 @@ def track():
     events = []
     current_time = datetime.now()
 
-    print("Simuliere die Verarbeitung eines Einkaufszettel-Bildes...")
+    logger.info("Simuliere die Verarbeitung eines Einkaufszettel-Bildes...")
 
     # --- SIMULIERTE BILDDATEN ---
     # In einer realen Anwendung würdest du hier ein Bild von der Festplatte laden
@@ -131,7 +147,7 @@ def track():
 
     if api_response and "items" in api_response:
         shopping_list_items = api_response["items"]
-        print(f"Erkannte Artikel: {shopping_list_items}")
+        logger.debug("Erkannte Artikel: %s", shopping_list_items)
 
         events.append({
             "timestamp": current_time.isoformat(),
@@ -139,7 +155,7 @@ def track():
             "value": {"items": shopping_list_items} # Speichere die Liste der Artikel
         })
     else:
-        print("Konnte keine Artikel vom Einkaufszettel-Bild extrahieren oder API-Fehler.")
+        logger.warning("Konnte keine Artikel vom Einkaufszettel-Bild extrahieren oder API-Fehler.")
         events.append({
             "timestamp": current_time.isoformat(),
             "event_type": "shopping_list_processing_failed",
@@ -150,6 +166,7 @@ def track():
 
 # Beispiel für die Nutzung (kann entfernt werden, wenn main.py die einzige Schnittstelle ist)
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
     print("Test von shopping_list_tracker.py:")
     # Um dies lokal zu testen, musst du ein echtes Base64-kodiertes Bild
     # eines Einkaufszettels in der `track()`-Funktion einfügen,
@@ -1,109 +1,308 @@
 # modules/weather_tracker.py - Modul zur Abfrage und Speicherung von Wetterdaten
 
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import json
+import logging
+import math
+import sqlite3
+from array import array
+from collections import deque
+from itertools import compress, islice, repeat
+import operator
 
-def get_weather_data(latitude, longitude, timezone="Europe/Berlin"):
+import http_client
+import partitions
+import settings
+
+# Derselbe Logger, ob über registry.py oder als 'modules.<name>' geladen (archive.py)
+logger = logging.getLogger(__name__.rpartition('.')[2])
+
+# Metadaten für das Modul-Manifest (werden ohne Import des Moduls gelesen)
+MODULE_INFO = {
+    "interval_seconds": 3600,
+    "timeout_seconds": 60,
+    "concurrency": "io",
+    "event_types": ["weather_forecast", "weather_fetch_failed"],
+    "capabilities": ["network"],
+    # Jede Vorhersagestunde wird bei jedem Lauf erneut gemeldet und nur aktualisiert
+    "natural_keys": {"weather_forecast": ["value.location", "timestamp"]},
+}
+
+# Open-Meteo-Archiv für vergangene Tage (siehe backfill.py)
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Das Archiv enthält die letzten Tage noch nicht; so lange und bis zu
+# FORECAST_PAST_DAYS zurück liefert die Vorhersage-API vergangene Tage
+ARCHIVE_LAG_DAYS = 5
+FORECAST_PAST_DAYS = 92
+
+# Stunden, für die ein Event gespeichert wird
+TARGET_HOURS = (8, 14, 18, 22)
+
+# Ort, für den track() abruft (Name, Breite, Länge); gaps.py lädt Lücken nur für ihn nach
+LOCATION = ("Ulm", 48.4011, 9.9876)
+
+def get_weather_data(latitude, longitude, timezone="Europe/Berlin", start_date=None, end_date=None,
+                     archive_context=None):
     """
-    Ruft stündliche Wetterdaten von der Open-Meteo API ab.
+    Ruft stündliche Wetterdaten von der Open-Meteo API ab. Mit 'start_date'
+    und 'end_date' werden vergangene Tage abgefragt (siehe backfill.py):
+    ältere über die Archiv-API, Zeiträume bis in die letzten
+    ARCHIVE_LAG_DAYS Tage über die Vorhersage-API, da das Archiv sie noch
+    nicht enthält. Ohne Zeitraum wird die Vorhersage für heute abgefragt. Mit
+    'archive_context' wird die Antwort für eine spätere erneute Auswertung
+    archiviert (siehe archive.py).
 
     Args:
         latitude (float): Breitengrad des Standorts.
         longitude (float): Längengrad des Standorts.
         timezone (str): Zeitzone für die Abfrage.
+        start_date (str): Optional erster Tag (YYYY-MM-DD).
+        end_date (str): Optional letzter Tag (YYYY-MM-DD, einschließlich).
+        archive_context (dict): Optional Argumente für parse_response(), die
+                                mit der Antwort archiviert werden.
 
     Returns:
         dict: Die JSON-Antwort der Open-Meteo API oder None bei einem Fehler.
     """
-    # API-Endpunkt für stündliche Vorhersagen
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "hourly": "temperature_2m,weather_code,precipitation_probability,wind_speed_10m",
-        "timezone": timezone,
-        "forecast_days": 1 # Nur für den heutigen Tag
-    }
+    import requests # Erst hier importieren, damit der Start ohne 'requests' auskommt
+
+    today = date.today()
+    if start_date and end_date and not (
+            date.fromisoformat(end_date) > today - timedelta(days=ARCHIVE_LAG_DAYS)
+            and date.fromisoformat(start_date) >= today - timedelta(days=FORECAST_PAST_DAYS)):
+        # Das Archiv enthält keine Niederschlagswahrscheinlichkeit
+        url = ARCHIVE_URL
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "hourly": "temperature_2m,weather_code,wind_speed_10m",
+            "timezone": timezone,
+            "start_date": start_date,
+            "end_date": end_date,
+        }
+    else:
+        # API-Endpunkt für stündliche Vorhersagen
+        url = FORECAST_URL
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "hourly": "temperature_2m,weather_code,precipitation_probability,wind_speed_10m",
+            "timezone": timezone,
+            "forecast_days": 1 # Nur für den heutigen Tag
+        }
+        if start_date and end_date:
+            del params["forecast_days"]
+            params["start_date"] = start_date
+            params["end_date"] = end_date
 
     try:
-        response = requests.get(url, params=params)
+        archive = {"source_module": "weather_tracker", "context": archive_context} if archive_context else None
+        response = http_client.get(url, params=params, archive=archive)
         response.raise_for_status() # Löst einen HTTPError für schlechte Antworten (4xx oder 5xx) aus
         return response.json()
     except requests.exceptions.RequestException as e:
-        print(f"Fehler bei der Wetter-API-Anfrage: {e}")
+        logger.error("Fehler bei der Wetter-API-Anfrage: %s", e)
         return None
     except json.JSONDecodeError as e:
-        print(f"Fehler beim Parsen der JSON-Antwort der Wetter-API: {e}")
+        logger.error("Fehler beim Parsen der JSON-Antwort der Wetter-API: %s", e)
         return None
 
+# Beschreibungen der WMO Weather Codes (vereinfachte Auswahl)
+# Referenz: https://www.nodc.noaa.gov/archive/arc0021/0002199/1.1/data/0-20/Y9999999.pdf (Seite 27)
+WEATHER_CODES = {
+    0: "Klarer Himmel",
+    1: "Überwiegend klar",
+    2: "Teilweise bewölkt",
+    3: "Bewölkt",
+    45: "Nebel",
+    48: "Ablagernder Reifnebel",
+    51: "Leichter Nieselregen",
+    53: "Mäßiger Nieselregen",
+    55: "Starker Nieselregen",
+    56: "Leichter gefrierender Nieselregen",
+    57: "Starker gefrierender Nieselregen",
+    61: "Leichter Regen",
+    63: "Mäßiger Regen",
+    65: "Starker Regen",
+    66: "Leichter gefrierender Regen",
+    67: "Starker gefrierender Regen",
+    71: "Leichter Schneefall",
+    73: "Mäßiger Schneefall",
+    75: "Starker Schneefall",
+    77: "Schneegriesel",
+    80: "Leichte Regenschauer",
+    81: "Mäßige Regenschauer",
+    82: "Starke Regenschauer",
+    85: "Leichte Schneeschauer",
+    86: "Starke Schneeschauer",
+    95: "Gewitter (leicht oder mäßig)",
+    96: "Gewitter mit leichtem Hagel",
+    99: "Gewitter mit starkem Hagel"
+}
+
+# Warnregeln, falls in config.ini kein Abschnitt [WeatherWarnings] existiert.
+# Format: "<Bedingung> [and <Bedingung> ...] | <Meldung>", eine Bedingung ist
+# "<Spalte> <Operator> <Zahl>" oder "<Spalte> in <Codes>" (z.B. "45, 48" oder "95-99").
+# Die Meldung darf Spaltenwerte enthalten, z.B. {wind_speed_10m}.
+DEFAULT_WARNING_RULES = {
+    "wind": "wind_speed_10m >= 40 | Windwarnung: Windgeschwindigkeit {wind_speed_10m} km/h erwartet.",
+    "precipitation": (
+        "precipitation_probability >= 70 and weather_code in 51-57, 61-67, 80-82, 85, 86"
+        " | Niederschlagswarnung: Hohe Regenwahrscheinlichkeit ({precipitation_probability}%) erwartet."
+    ),
+    "thunderstorm": "weather_code in 95-99 | Gewitterwarnung: Gewitter erwartet.",
+    "fog": "weather_code in 45, 48 | Sichtwarnung: Nebel erwartet.",
+}
+
+_COMPARISONS = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+    "<": operator.lt,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
 def interpret_weather_code(wmo_code):
     """
     Interpretiert den WMO Weather Code und gibt eine lesbare Beschreibung zurück.
-    Referenz: https://www.nodc.noaa.gov/archive/arc0021/0002199/1.1/data/0-20/Y9999999.pdf (Seite 27)
-    Eine vollständige Liste ist komplex, hier eine vereinfachte Auswahl.
-    """
-    codes = {
-        0: "Klarer Himmel",
-        1: "Überwiegend klar",
-        2: "Teilweise bewölkt",
-        3: "Bewölkt",
-        45: "Nebel",
-        48: "Ablagernder Reifnebel",
-        51: "Leichter Nieselregen",
-        53: "Mäßiger Nieselregen",
-        55: "Starker Nieselregen",
-        56: "Leichter gefrierender Nieselregen",
-        57: "Starker gefrierender Nieselregen",
-        61: "Leichter Regen",
-        63: "Mäßiger Regen",
-        65: "Starker Regen",
-        66: "Leichter gefrierender Regen",
-        67: "Starker gefrierender Regen",
-        71: "Leichter Schneefall",
-        73: "Mäßiger Schneefall",
-        75: "Starker Schneefall",
-        77: "Schneegriesel",
-        80: "Leichte Regenschauer",
-        81: "Mäßige Regenschauer",
-        82: "Starke Regenschauer",
-        85: "Leichte Schneeschauer",
-        86: "Starke Schneeschauer",
-        95: "Gewitter (leicht oder mäßig)",
-        96: "Gewitter mit leichtem Hagel",
-        99: "Gewitter mit starkem Hagel"
-    }
-    return codes.get(wmo_code, "Unbekannt")
+    """
+    return WEATHER_CODES.get(wmo_code, "Unbekannt")
 
-def check_for_warnings(weather_data_point):
+def _parse_codes(text):
+    codes = set()
+    for part in text.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = (int(bound) for bound in part.split("-", 1))
+            codes.update(range(first, last + 1))
+        elif part:
+            codes.add(int(part))
+    if not codes or min(codes) < 0:
+        raise ValueError(f"Ungültige Code-Liste: {text!r}")
+    return codes
+
+def _compile_condition(condition):
+    """
+    Übersetzt eine Bedingung in (Spalte, Funktion), wobei die Funktion eine
+    ganze Spalte auf eine Liste von Wahrheitswerten abbildet.
     """
-    Überprüft einen Wetterdatenpunkt auf potenzielle Warnungen
-    basierend auf Windgeschwindigkeit und Niederschlagswahrscheinlichkeit.
-    Dies ist eine vereinfachte Simulation.
+    parts = condition.split(None, 2)
+    if len(parts) != 3:
+        raise ValueError(f"Ungültige Bedingung: {condition!r}")
+    column, op, operand = parts
+    if op == "in":
+        # Nachschlagetabelle: table[code] ist 1, wenn der Code zur Menge gehört
+        codes = _parse_codes(operand)
+        table = bytes(1 if code in codes else 0 for code in range(max(codes) + 1))
+        size = len(table)
+        def predicate(values):
+            return [0 <= value < size and table[int(value)] == 1 for value in values]
+    elif op in _COMPARISONS:
+        compare, threshold = _COMPARISONS[op], float(operand)
+        def predicate(values):
+            return list(map(compare, values, repeat(threshold, len(values))))
+    else:
+        raise ValueError(f"Unbekannter Operator {op!r} in Bedingung {condition!r}")
+    return column, predicate
+
+def compile_warning_rules(rules):
+    """
+    Übersetzt Warnregeln einmalig in Prädikate, die ganze Spalten auswerten.
 
     Args:
-        weather_data_point (dict): Ein Diktionär mit Wetterdaten für einen Zeitpunkt.
+        rules (dict): Name -> Regel (Format siehe DEFAULT_WARNING_RULES).
 
     Returns:
-        list: Eine Liste von Warnmeldungen (Strings).
+        list: (Name, Bedingungen, Meldung)-Tupel; Bedingungen sind
+              (Spalte, Prädikat)-Paare.
+
+    Raises:
+        ValueError: Wenn eine Regel nicht gelesen werden kann.
+    """
+    compiled = []
+    for name, rule in rules.items():
+        expression, separator, message = rule.partition("|")
+        if not separator or not expression.strip():
+            raise ValueError(f"Warnregel '{name}' braucht die Form '<Bedingung> | <Meldung>'.")
+        conditions = [_compile_condition(part.strip()) for part in expression.split(" and ")]
+        compiled.append((name, conditions, message.strip()))
+    return compiled
+
+_warning_rules = None
+
+def get_warning_rules():
+    """
+    Returns:
+        list: Die übersetzten Warnregeln aus [WeatherWarnings] in config.ini
+              (bzw. DEFAULT_WARNING_RULES). Sie werden nur beim ersten Aufruf übersetzt.
     """
-    warnings = []
-    wind_speed = weather_data_point.get('wind_speed_10m', 0)
-    precipitation_probability = weather_data_point.get('precipitation_probability', 0)
-    weather_description = weather_data_point.get('weather_description', '')
-
-    if wind_speed >= 40: # z.B. ab 40 km/h Windböen
-        warnings.append(f"Windwarnung: Windgeschwindigkeit {wind_speed} km/h erwartet.")
-    if precipitation_probability >= 70: # z.B. ab 70% Wahrscheinlichkeit für starken Regen
-        if "Regen" in weather_description or "Schauer" in weather_description:
-            warnings.append(f"Niederschlagswarnung: Hohe Regenwahrscheinlichkeit ({precipitation_probability}%) erwartet.")
-    if "Gewitter" in weather_description:
-        warnings.append("Gewitterwarnung: Gewitter erwartet.")
-    if "Nebel" in weather_description:
-        warnings.append("Sichtwarnung: Nebel erwartet.")
+    global _warning_rules
+    if _warning_rules is None:
+        config = settings.get_config()
+        rules = dict(config.items('WeatherWarnings')) if config.has_section('WeatherWarnings') else DEFAULT_WARNING_RULES
+        _warning_rules = compile_warning_rules(rules)
+    return _warning_rules
 
+def _numeric_column(values):
+    # Fehlende und nicht numerische Werte (None, '61') werden zu NaN: Sie erfüllen
+    # keinen Vergleich und gehören zu keiner Code-Menge
+    return [value if isinstance(value, (int, float)) else math.nan for value in values]
+
+def evaluate_warnings(columns, rules=None):
+    """
+    Wertet die Warnregeln spaltenweise für alle Zeitpunkte auf einmal aus.
+    Die Spalten können die Stunden mehrerer Orte hintereinander enthalten.
+
+    Args:
+        columns (dict): Spaltenname -> Liste der Werte, z.B. der 'hourly'-Teil
+                        der Open-Meteo-Antwort ('weather_code' als WMO-Code).
+        rules (list): Übersetzte Regeln (Standard: get_warning_rules()).
+
+    Returns:
+        list: Pro Zeitpunkt eine Liste der Warnmeldungen.
+    """
+    rules = get_warning_rules() if rules is None else rules
+    length = max((len(values) for values in columns.values()), default=0)
+    warnings = [[] for _ in range(length)]
+    prepared = {}
+    for name, conditions, message in rules:
+        matches = None
+        for column, predicate in conditions:
+            if column not in columns:
+                matches = None
+                break
+            if column not in prepared:
+                prepared[column] = _numeric_column(columns[column])
+            result = predicate(prepared[column])
+            matches = result if matches is None else [a and b for a, b in zip(matches, result)]
+        if matches is None:
+            continue
+        for index in compress(range(length), matches):
+            values = {column: values[index] for column, values in columns.items() if index < len(values)}
+            try:
+                warnings[index].append(message.format(**values))
+            except (KeyError, IndexError, ValueError):
+                warnings[index].append(message)
     return warnings
 
+def check_for_warnings(weather_data_point):
+    """
+    Überprüft einen Wetterdatenpunkt auf Warnungen (siehe evaluate_warnings).
+
+    Args:
+        weather_data_point (dict): Ein Diktionär mit Wetterdaten für einen Zeitpunkt,
+                                   z.B. 'weather_code', 'wind_speed_10m' und
+                                   'precipitation_probability'.
+
+    Returns:
+        list: Eine Liste von Warnmeldungen (Strings).
+    """
+    warnings = evaluate_warnings({column: [value] for column, value in weather_data_point.items()})
+    return warnings[0] if warnings else []
+
 def track():
     """
     Sammelt Wetterdaten für Ulm für spezifische Tageszeiten
@@ -114,79 +313,307 @@ def track():
               Jedes Diktionär sollte 'timestamp', 'event_type' und 'value' enthalten.
               'source_module' wird von main.py hinzugefügt.
     """
-    events = []
-    # Koordinaten für Ulm, Deutschland
-    ulm_latitude = 48.4011
-    ulm_longitude = 9.9876
+    location, latitude, longitude = LOCATION
+
+    logger.info("Rufe Wetterdaten für %s ab (Lat: %s, Lon: %s)...", location, latitude, longitude)
+    # Mit der Antwort wird archiviert, wie sie ausgewertet wurde (siehe parse_response)
+    context = {"location": location, "dates": [datetime.now().strftime("%Y-%m-%d")]}
+    weather_response = get_weather_data(latitude, longitude, archive_context=context)
+
+    events = parse_response(weather_response, **context)
+    # Einzelne Stunden nur mit DEBUG, sonst wird die Schleife gar nicht erst durchlaufen
+    log_hours = logger.isEnabledFor(logging.DEBUG)
+    for event in events:
+        if event["event_type"] != "weather_forecast":
+            logger.warning("Konnte keine Wetterdaten abrufen oder die Antwort war unerwartet.")
+            continue
+        if not log_hours:
+            continue
+        weather_info = event["value"]["forecast"]
+        logger.debug("Wetter für %s Uhr: %s", weather_info['time'], weather_info)
+        for warning in event["value"]["warnings"]:
+            logger.debug("Warnung für %s Uhr: %s", weather_info['time'], warning)
+
+    if not events:
+        logger.info("Keine Wetterdaten für die Zielstunden gefunden.")
+
+    return events
+
+def parse_response(weather_response, location, dates=None, fetched_at=None):
+    """
+    Bildet die Events aus einer Antwort der Open-Meteo API. Wird von track()
+    und beim erneuten Auswerten archivierter Antworten verwendet (siehe
+    archive.py).
 
-    print(f"Rufe Wetterdaten für Ulm ab (Lat: {ulm_latitude}, Lon: {ulm_longitude})...")
-    weather_response = get_weather_data(ulm_latitude, ulm_longitude)
+    Args:
+        weather_response (dict): Die JSON-Antwort oder None bei einem Fehler.
+        location (str): Der Name des Orts.
+        dates (list): Optional nur diese Tage (YYYY-MM-DD).
+        fetched_at (str): Optional der Abrufzeitpunkt (Standard: jetzt).
 
+    Returns:
+        list: Event-Diktionäre mit 'timestamp', 'event_type' und 'value'.
+    """
     if not weather_response or 'hourly' not in weather_response:
-        print("Konnte keine Wetterdaten abrufen oder die Antwort war unerwartet.")
-        events.append({
-            "timestamp": datetime.now().isoformat(),
+        return [{
+            "timestamp": fetched_at or datetime.now().isoformat(),
             "event_type": "weather_fetch_failed",
             "value": "no_data_available"
-        })
-        return events
+        }]
+    return build_forecast_events(weather_response['hourly'], location,
+                                 dates=set(dates) if dates is not None else None)
 
-    hourly_data = weather_response['hourly']
-    times = hourly_data['time']
-    temperatures = hourly_data['temperature_2m']
-    weather_codes = hourly_data['weather_code']
-    precipitation_probabilities = hourly_data['precipitation_probability']
-    wind_speeds = hourly_data['wind_speed_10m']
+def build_forecast_events(hourly_data, location, dates=None, target_hours=TARGET_HOURS):
+    """
+    Bildet 'weather_forecast'-Events aus dem 'hourly'-Teil einer Antwort der
+    Open-Meteo API, eines pro Zielstunde. Fehlende Spalten (z.B. die
+    Niederschlagswahrscheinlichkeit im Archiv) werden als None gespeichert.
+
+    Args:
+        hourly_data (dict): Spaltenname -> Liste der Stundenwerte.
+        location (str): Der Name des Orts.
+        dates (set): Optional nur diese Tage (YYYY-MM-DD).
+        target_hours (tuple): Die Stunden, für die ein Event erzeugt wird.
 
-    # Gewünschte Stunden für die Abfrage
-    target_hours = [8, 14, 18, 22]
-    today_date = datetime.now().strftime("%Y-%m-%d")
+    Returns:
+        list: Event-Diktionäre mit 'timestamp', 'event_type' und 'value'.
+    """
+    times = hourly_data['time']
+    missing = [None] * len(times)
+    temperatures = hourly_data.get('temperature_2m') or missing
+    weather_codes = hourly_data.get('weather_code') or missing
+    precipitation_probabilities = hourly_data.get('precipitation_probability') or missing
+    wind_speeds = hourly_data.get('wind_speed_10m') or missing
+    # Die Warnregeln werden einmal über alle Stunden ausgewertet
+    hourly_warnings = evaluate_warnings(hourly_data)
 
+    events = []
     for i, time_str in enumerate(times):
         dt_object = datetime.fromisoformat(time_str)
-        if dt_object.date().strftime("%Y-%m-%d") == today_date and dt_object.hour in target_hours:
-            temp = temperatures[i]
-            wmo_code = weather_codes[i]
-            prec_prob = precipitation_probabilities[i]
-            wind_spd = wind_speeds[i]
-            weather_desc = interpret_weather_code(wmo_code)
-
-            weather_info = {
-                "time": dt_object.strftime("%H:%M"),
-                "temperature_celsius": temp,
-                "weather_description": weather_desc,
-                "precipitation_probability_percent": prec_prob,
-                "wind_speed_kmh": wind_spd
+        if dt_object.hour not in target_hours or (dates is not None and time_str[:10] not in dates):
+            continue
+        wmo_code = weather_codes[i]
+        weather_info = {
+            "time": dt_object.strftime("%H:%M"),
+            "temperature_celsius": temperatures[i],
+            "weather_code": wmo_code,
+            "weather_description": interpret_weather_code(wmo_code),
+            "precipitation_probability_percent": precipitation_probabilities[i],
+            "wind_speed_kmh": wind_speeds[i]
+        }
+        events.append({
+            "timestamp": dt_object.isoformat(),
+            "event_type": "weather_forecast",
+            "value": {
+                "location": location,
+                "forecast": weather_info,
+                "warnings": hourly_warnings[i]
             }
+        })
+    return events
 
-            warnings = check_for_warnings({
-                "weather_description": weather_desc,
-                "wind_speed_10m": wind_spd,
-                "precipitation_probability": prec_prob
-            })
+class _RecordView:
+    """
+    Schreibgeschützte Sicht auf die gespeicherten Messwerte. Die Diktionäre
+    mit 'date' und 'temperature' werden erst beim Zugriff erzeugt.
+    """
 
-            event_value = {
-                "forecast": weather_info,
-                "warnings": warnings if warnings else []
-            }
+    def __init__(self, tracker):
+        self._tracker = tracker
 
-            events.append({
-                "timestamp": dt_object.isoformat(),
-                "event_type": "weather_forecast",
-                "value": event_value
-            })
-            print(f"Wetter für {dt_object.strftime('%H:%M')} Uhr: {weather_info}")
-            if warnings:
-                for warning in warnings:
-                    print(f"  WARNUNG: {warning}")
+    def __len__(self):
+        return len(self._tracker._ordinals)
 
-    if not events:
-        print("Keine Wetterdaten für die Zielstunden gefunden.")
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {
+            "date": date.fromordinal(self._tracker._ordinals[index]).isoformat(),
+            "temperature": self._tracker._temperatures[index],
+        }
 
-    return events
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class WeatherTracker:
+    """
+    Sammelt Temperaturwerte im Speicher und beantwortet Durchschnitt, Maximum
+    und Minimum in O(1).
+
+    Die Werte liegen in zwei kompakten Arrays (Datum als Ordinalzahl und
+    Temperatur); Summe, Anzahl, Minimum und Maximum werden beim Hinzufügen
+    fortgeschrieben. Mit 'window_days' werden zusätzlich gleitende
+    Statistiken über die letzten N Tage geführt (monotone Deques für
+    Minimum und Maximum). Die Fenster-Statistiken setzen voraus, dass die
+    Werte in zeitlicher Reihenfolge hinzugefügt werden.
+    """
+
+    def __init__(self, window_days=None):
+        self._ordinals = array('i')
+        self._temperatures = array('d')
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+        self.window_days = window_days
+        self._window = deque()      # (Ordinalzahl, Temperatur) im Fenster
+        self._window_sum = 0.0
+        self._window_min = deque()  # aufsteigende Temperaturen
+        self._window_max = deque()  # absteigende Temperaturen
+
+    @property
+    def records(self):
+        return _RecordView(self)
+
+    def add_record(self, date_str, temperature):
+        """
+        Fügt einen Temperaturwert hinzu.
+
+        Args:
+            date_str (str): Datum im Format JJJJ-MM-TT.
+            temperature (int | float): Temperatur in °C.
+
+        Raises:
+            ValueError: Wenn das Datum ungültig ist.
+            TypeError: Wenn die Temperatur keine Zahl ist.
+        """
+        if isinstance(temperature, bool) or not isinstance(temperature, (int, float)):
+            raise TypeError(f"Temperatur muss eine Zahl sein, nicht {type(temperature).__name__}.")
+        ordinal = date.fromisoformat(date_str).toordinal()
+        self._append(ordinal, float(temperature))
+
+    def _append(self, ordinal, temperature):
+        self._ordinals.append(ordinal)
+        self._temperatures.append(temperature)
+        self._sum += temperature
+        if self._min is None or temperature < self._min:
+            self._min = temperature
+        if self._max is None or temperature > self._max:
+            self._max = temperature
+        if self.window_days:
+            self._push_window(ordinal, temperature)
+
+    def _push_window(self, ordinal, temperature):
+        self._window.append((ordinal, temperature))
+        self._window_sum += temperature
+        while self._window_min and self._window_min[-1][1] > temperature:
+            self._window_min.pop()
+        self._window_min.append((ordinal, temperature))
+        while self._window_max and self._window_max[-1][1] < temperature:
+            self._window_max.pop()
+        self._window_max.append((ordinal, temperature))
+
+        # Werte entfernen, die älter als das Fenster sind
+        oldest_allowed = ordinal - self.window_days + 1
+        while self._window and self._window[0][0] < oldest_allowed:
+            self._window_sum -= self._window.popleft()[1]
+        while self._window_min and self._window_min[0][0] < oldest_allowed:
+            self._window_min.popleft()
+        while self._window_max and self._window_max[0][0] < oldest_allowed:
+            self._window_max.popleft()
+
+    def add_records_bulk(self, ordinals, temperatures):
+        """
+        Fügt viele Werte auf einmal hinzu, ohne pro Wert Python-Objekte
+        anzulegen. Summe, Minimum und Maximum werden über die neuen Arrays
+        berechnet.
+
+        Args:
+            ordinals (array): Datumswerte als Ordinalzahlen (date.toordinal()).
+            temperatures (array): Die zugehörigen Temperaturen.
+        """
+        if len(ordinals) != len(temperatures):
+            raise ValueError("Anzahl der Datumswerte und Temperaturen stimmt nicht überein.")
+        if not temperatures:
+            return
+        self._ordinals.extend(ordinals)
+        self._temperatures.extend(temperatures)
+        self._sum += sum(temperatures)
+        new_min, new_max = min(temperatures), max(temperatures)
+        self._min = new_min if self._min is None else min(self._min, new_min)
+        self._max = new_max if self._max is None else max(self._max, new_max)
+        if self.window_days:
+            # Nur die Werte, die ins Fenster fallen können, durchlaufen die Deques
+            oldest_allowed = ordinals[-1] - self.window_days + 1
+            start = len(ordinals)
+            while start > 0 and ordinals[start - 1] >= oldest_allowed:
+                start -= 1
+            for i in range(start, len(ordinals)):
+                self._push_window(ordinals[i], temperatures[i])
+
+    @classmethod
+    def from_database(cls, db_path, start_date=None, end_date=None, window_days=None):
+        """
+        Lädt die Temperaturen aller 'weather_forecast'-Events aus der
+        Datenbank und ihren Monats-Partitionen. Datum und Temperatur werden
+        direkt in SQLite aus dem JSON-Wert gelesen und in die Arrays übernommen.
+
+        Args:
+            db_path (str): Der vollständige Pfad zur Datenbankdatei.
+            start_date (str): Optionales erstes Datum (JJJJ-MM-TT).
+            end_date (str): Optionales letztes Datum (JJJJ-MM-TT).
+            window_days (int): Optionales Fenster für gleitende Statistiken.
+
+        Returns:
+            WeatherTracker: Der befüllte Tracker.
+        """
+        tracker = cls(window_days=window_days)
+        query = '''
+            SELECT CAST(julianday(substr(timestamp, 1, 10)) - 1721424.5 AS INTEGER),
+                   json_extract(value, '$.forecast.temperature_celsius')
+            FROM all_events
+            WHERE event_type = 'weather_forecast'
+              AND json_valid(value)
+              AND json_extract(value, '$.forecast.temperature_celsius') IS NOT NULL
+        '''
+        params = []
+        end = None
+        if start_date:
+            query += " AND timestamp >= ?"
+            params.append(start_date)
+        if end_date:
+            end = (date.fromisoformat(end_date[:10]) + timedelta(days=1)).isoformat()
+            query += " AND timestamp < ?"
+            params.append(end)
+        query += " ORDER BY timestamp ASC"
+
+        # Die nach Datum sortierten Zeilen der Partitionen werden zusammengeführt
+        rows = partitions.iter_event_rows(db_path, query, params, start_date, end, key=lambda row: row[0])
+        try:
+            while True:
+                batch = list(islice(rows, 10000))
+                if not batch:
+                    break
+                ordinals, temperatures = zip(*batch)
+                tracker.add_records_bulk(array('i', ordinals), array('d', temperatures))
+        except sqlite3.Error as e:
+            logger.error("Fehler beim Laden der Wetterdaten: %s", e)
+        finally:
+            rows.close()
+        return tracker
+
+    def get_average_temperature(self):
+        count = len(self._temperatures)
+        return self._sum / count if count else 0
+
+    def get_max_temperature(self):
+        return self._max
+
+    def get_min_temperature(self):
+        return self._min
+
+    def get_window_average_temperature(self):
+        return self._window_sum / len(self._window) if self._window else 0
+
+    def get_window_max_temperature(self):
+        return self._window_max[0][1] if self._window_max else None
+
+    def get_window_min_temperature(self):
+        return self._window_min[0][1] if self._window_min else None
 
 # Beispiel für die Nutzung (kann entfernt werden, wenn main.py die einzige Schnittstelle ist)
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
     print("Test von weather_tracker.py:")
     tracked_events = track()
     for event in tracked_events:
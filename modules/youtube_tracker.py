@@ -1,4 +1,5 @@
 # modules/youtube_tracker.py
+import logging
 import sqlite3
 import os
 import platform
@@ -6,6 +7,9 @@ import shutil
 import datetime
 from sqlite3 import Error
 
+# Derselbe Logger, ob über registry.py oder als 'modules.<name>' geladen (archive.py)
+logger = logging.getLogger(__name__.rpartition('.')[2])
+
 # --- Konfiguration ---
 # Name dieses Moduls, wie er in der Datenbank erscheinen soll
 MODULE_NAME = "youtube_firefox_tracker"
@@ -58,14 +62,14 @@ def track_youtube_activity():
     """
     history_db_path = get_firefox_history_path()
     if not history_db_path:
-        print("Fehler: Firefox-Verlaufsdatenbank konnte nicht gefunden werden.")
+        logger.error("Firefox-Verlaufsdatenbank konnte nicht gefunden werden.")
         return []
 
     # Erstelle eine temporäre Kopie der Datenbank, um Sperrungen zu umgehen,
     # falls Firefox gerade läuft.
     temp_db_path = "temp_history.sqlite"
     shutil.copy2(history_db_path, temp_db_path)
-    print(f"Temporäre Kopie der Verlaufsdatenbank unter '{temp_db_path}' erstellt.")
+    logger.debug("Temporäre Kopie der Verlaufsdatenbank unter '%s' erstellt.", temp_db_path)
 
     conn = None
     events = []
@@ -96,7 +100,7 @@ def track_youtube_activity():
         cursor.execute(query, (yesterday_timestamp,))
         
         rows = cursor.fetchall()
-        print(f"{len(rows)} YouTube-Videoaufrufe in den letzten 24 Stunden gefunden.")
+        logger.info("%s YouTube-Videoaufrufe in den letzten 24 Stunden gefunden.", len(rows))
         
         for url, title, visit_date_us in rows:
             # Konvertiere den Mikrosekunden-Timestamp in ein lesbares Format
@@ -111,14 +115,14 @@ def track_youtube_activity():
             events.append(event)
 
     except Error as e:
-        print(f"Ein Datenbankfehler ist aufgetreten: {e}")
+        logger.error("Ein Datenbankfehler ist aufgetreten: %s", e)
     finally:
         if conn:
             conn.close()
         # Lösche die temporäre Datei
         if os.path.exists(temp_db_path):
             os.remove(temp_db_path)
-            print(f"Temporäre Datei '{temp_db_path}' wurde gelöscht.")
+            logger.debug("Temporäre Datei '%s' wurde gelöscht.", temp_db_path)
     
     return events
 
@@ -127,7 +131,7 @@ def save_events_to_database(events):
     Speichert eine Liste von Event-Diktionären in der zentralen Datenbank.
     """
     if not events:
-        print("Keine neuen Events zum Speichern.")
+        logger.info("Keine neuen Events zum Speichern.")
         return
 
     conn = None
@@ -135,8 +139,8 @@ def save_events_to_database(events):
         # Stelle sicher, dass der Pfad zur DB korrekt ist, wenn das Skript
         # aus dem 'modules'-Ordner ausgeführt wird.
         if not os.path.exists(DB_FILE):
-             print(f"Fehler: Die Datenbankdatei unter '{DB_FILE}' wurde nicht gefunden.")
-             print("Bitte stelle sicher, dass du zuerst 'database.py' ausgeführt hast.")
+             logger.error("Die Datenbankdatei unter '%s' wurde nicht gefunden. "
+                          "Bitte stelle sicher, dass du zuerst 'database.py' ausgeführt hast.", DB_FILE)
              return
 
         conn = sqlite3.connect(DB_FILE)
@@ -152,10 +156,10 @@ def save_events_to_database(events):
         
         cursor.executemany(insert_query, data_to_insert)
         conn.commit()
-        print(f"{len(events)} neue Events wurden erfolgreich in die Datenbank geschrieben.")
+        logger.info("%s neue Events wurden erfolgreich in die Datenbank geschrieben.", len(events))
 
     except Error as e:
-        print(f"Fehler beim Schreiben in die Datenbank: {e}")
+        logger.error("Fehler beim Schreiben in die Datenbank: %s", e)
     finally:
         if conn:
             conn.close()
@@ -165,6 +169,7 @@ def save_events_to_database(events):
 if __name__ == '__main__':
     # Dieser Teil wird nur ausgeführt, wenn du das Skript direkt startest.
     # Perfekt zum Testen des Moduls.
+    logging.basicConfig(level=logging.DEBUG)
     print("Starte YouTube-Tracker-Modul...")
     
     # 1. Daten aus Firefox extrahieren
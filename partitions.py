@@ -0,0 +1,792 @@
+# partitions.py - Aufteilung der Events auf Datenbankdateien pro Monat
+#
+# Ist die Partitionierung aktiviert ([Partitions] in config.ini), landen neue
+# Events nicht mehr in der Hauptdatenbank, sondern in einer eigenen Datei pro
+# Monat (z.B. data/partitions/events_2024_01.db). Der Katalog in der
+# Hauptdatenbank ('partitions'-Tabelle) speichert pro Partition den Pfad, die
+# Monatsgrenzen, den tatsächlich belegten Zeitraum und den Zustand:
+#
+#   active   - nimmt neue Events auf
+#   frozen   - abgeschlossen, kompaktiert und schreibgeschützt
+#   archived - komprimiert ins Archiv verschoben, wird bei Abfragen übersprungen
+#
+# Abfragen hängen per ATTACH nur die Partitionen an, deren Zeitraum den
+# gesuchten überschneidet, und lesen sie über die temporäre Sicht 'all_events'
+# (UNION ALL), zusammen mit den Events der Hauptdatenbank (ältere Daten vor der
+# Partitionierung, Events ohne gültigen Zeitpunkt und Events ohne natürlichen
+# Schlüssel für bereits archivierte Monate).
+# Betrifft eine Abfrage mehr Partitionen, als SQLite gleichzeitig anhängen kann
+# (standardmäßig 10), wird sie auf mehreren Verbindungen ausgeführt und die
+# sortierten Ergebnisse werden zusammengeführt (siehe iter_event_rows).
+# Index-Neuaufbau, Sicherung und VACUUM betreffen so nur noch kleine Dateien.
+#
+# Jede Partition hat einen eigenen Suchindex (siehe search.py). Die Leser der
+# Events - database.get_all_events, die Suche, der Export, die Aufbewahrung
+# (nur aktive Partitionen) und WeatherTracker.from_database - lesen
+# die Partitionen über event_sources() bzw. iter_event_rows() mit.
+#
+# Verspätete Events für eingefrorene Monate werden in deren Partition
+# geschrieben, die dafür kurz beschreibbar gemacht wird, damit der eindeutige
+# Index des natürlichen Schlüssels greift. Events mit Schlüssel für archivierte
+# Monate werden übersprungen, bis die Partition wiederhergestellt ist.
+#
+# Ein Aufruf von insert_events schreibt in genau einer Transaktion und darf
+# daher höchstens so viele Monate betreffen, wie SQLite anhängen kann; größere
+# Mengen teilt group_events vorher auf.
+#
+# Events mit natürlichem Schlüssel werden nur innerhalb einer Partition
+# aktualisiert; wird dasselbe Event in einem späteren Monat erneut gemeldet,
+# entsteht dort ein neuer Eintrag.
+
+import gzip
+import heapq
+import itertools
+import logging
+import os
+import shutil
+import sqlite3
+import stat
+import time
+from datetime import date, datetime
+
+import database
+import instrumentation
+import search
+import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_ACTIVE = "active"
+STATE_FROZEN = "frozen"
+STATE_ARCHIVED = "archived"
+
+# Dateirechte eingefrorener Partitionen bzw. während verspätete Events geschrieben werden
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+_WRITABLE = _READ_ONLY | stat.S_IWUSR
+
+def is_enabled():
+    return settings.get_config().getboolean('Partitions', 'enabled', fallback=False)
+
+def partition_directory():
+    directory = settings.get_config().get('Partitions', 'directory', fallback='data/partitions').strip()
+    return settings.resolve_path(directory or 'data/partitions')
+
+def partition_name(timestamp):
+    """
+    Args:
+        timestamp (str): Zeitpunkt im ISO-8601-Format.
+
+    Returns:
+        str: Der Name der Partition des Monats, z.B. 'events_2024_01', oder
+             None, wenn der Zeitpunkt nicht mit einem Datum (JJJJ-MM-TT) beginnt.
+    """
+    day = str(timestamp)[:10]
+    try:
+        if date.fromisoformat(day).isoformat() != day:
+            return None
+    except ValueError:
+        return None
+    return f"events_{day[:4]}_{day[5:7]}"
+
+def _month_bounds(name):
+    year, month = int(name[7:11]), int(name[12:14])
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+def init_catalog(db_path):
+    """
+    Erstellt die Katalog-Tabelle 'partitions' in der Hauptdatenbank und
+    ergänzt in aktiven Partitionen neue Wert-Spalten (siehe
+    database.VALUE_COLUMNS).
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS partitions (
+                name TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                start TEXT NOT NULL,
+                end TEXT NOT NULL,
+                min_timestamp TEXT,
+                max_timestamp TEXT,
+                event_count INTEGER,
+                state TEXT NOT NULL DEFAULT 'active',
+                archive_path TEXT
+            )
+        ''')
+        conn.commit()
+        active = [entry["path"] for entry in _catalog(conn).values() if entry["state"] == STATE_ACTIVE]
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Anlegen des Partitionskatalogs: %s", e)
+        return
+    finally:
+        if conn:
+            conn.close()
+    # Eingefrorene Partitionen sind schreibgeschützt, connect_events berechnet ihre Wert-Spalten
+    for path in active:
+        partition = None
+        try:
+            partition = sqlite3.connect(path)
+            database.add_value_columns(partition)
+            partition.commit()
+        except sqlite3.Error as e:
+            logger.error("Fehler beim Aktualisieren der Partition '%s': %s", path, e)
+        finally:
+            if partition:
+                partition.close()
+        search.init_search_index(path)
+
+def list_partitions(db_path):
+    """
+    Returns:
+        list: Diktionäre mit den Katalogeinträgen, nach Monat sortiert.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute('SELECT * FROM partitions ORDER BY start')]
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Lesen des Partitionskatalogs: %s", e)
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def _catalog(conn):
+    conn.row_factory = sqlite3.Row
+    try:
+        return {row["name"]: dict(row) for row in conn.execute('SELECT * FROM partitions')}
+    finally:
+        conn.row_factory = None
+
+def _create_partition(conn, name):
+    """Legt die Datei einer neuen Partition an und trägt sie in den Katalog ein."""
+    path = os.path.join(partition_directory(), f"{name}.db")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partition = sqlite3.connect(path)
+    try:
+        partition.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        database.create_event_tables(partition)
+        partition.commit()
+    finally:
+        partition.close()
+    search.init_search_index(path)
+    start, end = _month_bounds(name)
+    with conn:
+        conn.execute(
+            'INSERT OR IGNORE INTO partitions (name, path, start, end) VALUES (?, ?, ?, ?)',
+            (name, path, start, end)
+        )
+    return {"name": name, "path": path, "start": start, "end": end, "state": STATE_ACTIVE}
+
+# Standardwert von SQLite für die Anzahl gleichzeitig angehängter Datenbanken
+DEFAULT_ATTACH_LIMIT = 10
+
+def _attach_limit(conn):
+    # Connection.getlimit() und SQLITE_LIMIT_ATTACHED gibt es erst ab Python 3.11
+    limit = getattr(sqlite3, "SQLITE_LIMIT_ATTACHED", None)
+    if limit is None or not hasattr(conn, "getlimit"):
+        return DEFAULT_ATTACH_LIMIT
+    return conn.getlimit(limit)
+
+def group_events(events, key=None):
+    """
+    Teilt Events in aufeinanderfolgende Gruppen, die jeweils höchstens so
+    viele Monate betreffen, wie SQLite gleichzeitig anhängen kann, und damit
+    in einem Aufruf von insert_events geschrieben werden können.
+
+    Args:
+        events (list): Die Events in ihrer Reihenfolge.
+        key (callable): Optional liefert das Event eines Elements, z.B. bei
+                        (Position, Event)-Tupeln.
+
+    Returns:
+        list: Die Gruppen als Listen der Elemente (ohne Partitionierung eine).
+    """
+    if not events:
+        return []
+    if not is_enabled():
+        return [list(events)]
+    conn = sqlite3.connect(":memory:")
+    try:
+        limit = max(_attach_limit(conn), 1)
+    finally:
+        conn.close()
+    groups, months = [[]], set()
+    for item in events:
+        event = key(item) if key else item
+        name = partition_name(event.get("timestamp", datetime.now().isoformat()))
+        if name is not None and name not in months:
+            if len(months) == limit:
+                groups.append([])
+                months = set()
+            months.add(name)
+        groups[-1].append(item)
+    return groups
+
+def insert_events(db_path, events, checkpoint=None, raise_errors=False, overwrite=True):
+    """
+    Schreibt Events in die Partitionen ihrer Monate. Ohne aktivierte
+    Partitionierung wird database.insert_events verwendet. Events ohne
+    gültigen Zeitpunkt landen in der Hauptdatenbank, ebenso Events ohne
+    natürlichen Schlüssel für archivierte Monate; solche mit Schlüssel werden
+    dort übersprungen.
+
+    Alle betroffenen Partitionen werden an eine Verbindung angehängt und in
+    einer Transaktion zusammen mit dem Checkpoint geschrieben. Betrifft ein
+    Aufruf mehr Monate, als SQLite gleichzeitig anhängen kann, ist das ein
+    Fehler (vorher mit group_events aufteilen).
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        events (list): Die Events (siehe database.insert_events).
+        checkpoint (tuple): Optional (Schlüssel, Wert) für die 'meta'-Tabelle.
+        raise_errors (bool): Fehler weitergeben statt 0 zurückzugeben.
+        overwrite (bool): Vorhandene Events mit demselben natürlichen Schlüssel
+                          aktualisieren (siehe database.insert_events).
+
+    Returns:
+        int: Die Anzahl der geschriebenen Events (0 bei einem Fehler).
+
+    Raises:
+        ValueError: Mit raise_errors, wenn die Events zu viele Monate betreffen.
+    """
+    if not is_enabled():
+        return database.insert_events(db_path, events, checkpoint, raise_errors, overwrite)
+    if not events:
+        return 0
+    rows_by_partition = {}
+    for event in events:
+        row = database._event_to_row(event)
+        rows_by_partition.setdefault(partition_name(row[0]), []).append(row)
+    main_rows = rows_by_partition.pop(None, [])
+    if main_rows:
+        logger.warning("%s Events ohne gültigen Zeitpunkt (z.B. %r von '%s') werden in die Hauptdatenbank geschrieben.",
+                       len(main_rows), main_rows[0][0], main_rows[0][1])
+
+    conn = None
+    start = time.perf_counter()
+    row_count = len(main_rows) + sum(len(rows) for rows in rows_by_partition.values())
+    writable = []
+    try:
+        conn = sqlite3.connect(db_path)
+        catalog = _catalog(conn)
+        targets = []
+        for name, rows in sorted(rows_by_partition.items()):
+            entry = catalog.get(name) or _create_partition(conn, name)
+            if entry["state"] != STATE_ARCHIVED:
+                targets.append((entry, rows))
+                continue
+            # Der eindeutige Index der archivierten Datei ist nicht erreichbar, in der Hauptdatenbank entstünden Duplikate
+            keyed = [row for row in rows if row[4] is not None]
+            if keyed:
+                logger.warning("%s Events mit Schlüssel für die archivierte Partition '%s' werden übersprungen "
+                               "(siehe restore_partition).", len(keyed), name)
+                row_count -= len(keyed)
+            main_rows.extend(row for row in rows if row[4] is None)
+
+        limit = max(_attach_limit(conn), 1)
+        if len(targets) > limit:
+            raise ValueError(f"Die Events betreffen {len(targets)} Partitionen, höchstens {limit} können "
+                             f"in einer Transaktion geschrieben werden (siehe group_events).")
+        for i, (entry, _) in enumerate(targets):
+            if entry["state"] == STATE_FROZEN:
+                os.chmod(entry["path"], _WRITABLE)
+                writable.append(entry["path"])
+            conn.execute('ATTACH DATABASE ? AS ?', (entry["path"], f"p{i}"))
+        with conn:
+            for i, (entry, rows) in enumerate(targets):
+                database._write_rows(conn, rows, f"p{i}", overwrite)
+                first = min(row[0] for row in rows)
+                last = max(row[0] for row in rows)
+                conn.execute('''
+                    UPDATE partitions SET
+                        min_timestamp = min(coalesce(min_timestamp, :first), :first),
+                        max_timestamp = max(coalesce(max_timestamp, :last), :last)
+                    WHERE name = :name
+                ''', {"first": first, "last": last, "name": entry["name"]})
+                if entry["state"] == STATE_FROZEN:
+                    conn.execute(f'UPDATE partitions SET event_count = (SELECT count(*) FROM p{i}.events) '
+                                 f'WHERE name = ?', (entry["name"],))
+            if main_rows:
+                database._write_rows(conn, main_rows, overwrite=overwrite)
+            if checkpoint is not None:
+                database._set_meta(conn, *checkpoint)
+            database.bump_write_generation(conn)
+        return row_count
+    except (sqlite3.Error, OSError, ValueError) as e:
+        if raise_errors:
+            raise
+        logger.error("Fehler beim Einfügen von %s Events in die Partitionen: %s", row_count, e)
+        return 0
+    finally:
+        if conn:
+            conn.close()
+        for path in writable:
+            os.chmod(path, _READ_ONLY)
+        instrumentation.record_db_write(time.perf_counter() - start, row_count)
+
+_BASE_COLUMNS = ["id", "timestamp", "source_module", "event_type", "value", "natural_key"]
+
+def _view_columns(conn, schema):
+    """Die Spalten eines Teils von 'all_events'; fehlende Wert-Spalten werden berechnet."""
+    existing = {row[1] for row in conn.execute(f'PRAGMA {schema}.table_xinfo(events)')}
+    # 'natural_key' fehlt in Datenbanken, die vor dessen Einführung angelegt und nie mit init_db geöffnet wurden
+    columns = [column if column in existing else f"NULL AS {column}" for column in _BASE_COLUMNS]
+    for event_type, value_columns in database.VALUE_COLUMNS.items():
+        for column, (path, _) in value_columns.items():
+            if column in existing:
+                columns.append(column)
+            else:
+                columns.append(f"{database.value_column_expression(event_type, path)} AS {column}")
+    return ", ".join(columns)
+
+def _select_partitions(conn, start=None, end=None):
+    """Die nicht archivierten Partitionen mit Events, deren Zeitraum [start, end) überschneidet."""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'partitions'").fetchone():
+        return [] # Partitionierung wurde nie eingerichtet (siehe init_catalog)
+    selected = []
+    for entry in sorted(_catalog(conn).values(), key=lambda entry: entry["start"]):
+        # Leere Partitionen und solche außerhalb des Zeitraums werden nicht angehängt
+        if entry["min_timestamp"] is None:
+            continue
+        if start and entry["max_timestamp"] < start:
+            continue
+        if end and entry["min_timestamp"] >= end:
+            continue
+        if entry["state"] == STATE_ARCHIVED:
+            logger.warning("Partition '%s' ist archiviert und wird übersprungen (siehe restore_partition).",
+                           entry['name'])
+            continue
+        selected.append(entry)
+    return selected
+
+def _create_view(conn, entries, include_main=True):
+    """Hängt die Partitionen an und erstellt die temporäre Sicht 'all_events'."""
+    parts = []
+    if include_main:
+        parts.append(f"SELECT {_view_columns(conn, 'main')}, 'main' AS partition FROM main.events")
+    for i, entry in enumerate(entries):
+        conn.execute('ATTACH DATABASE ? AS ?', (entry["path"], f"p{i}"))
+        parts.append(f"SELECT {_view_columns(conn, f'p{i}')}, '{entry['name']}' AS partition FROM p{i}.events")
+    conn.execute('DROP VIEW IF EXISTS temp.all_events')
+    conn.execute(f"CREATE TEMP VIEW all_events AS {' UNION ALL '.join(parts)}")
+
+def event_sources(db_path, start=None, end=None, states=(STATE_ACTIVE, STATE_FROZEN)):
+    """
+    Die Datenbankdateien mit Events eines Zeitraums, um sie ohne ATTACH
+    einzeln zu lesen: die Hauptdatenbank und die Partitionen wie bei
+    connect_events.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        start (str): Optional Beginn des Zeitraums (ISO 8601).
+        end (str): Optional Ende des Zeitraums (ISO 8601, exklusiv).
+        states (tuple): Nur Partitionen in diesen Zuständen.
+
+    Returns:
+        list: (Name, Pfad)-Tupel, zuerst ('main', db_path).
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        selected = _select_partitions(conn, start, end)
+    finally:
+        conn.close()
+    return [("main", db_path)] + [(entry["name"], entry["path"]) for entry in selected if entry["state"] in states]
+
+def connect_events(db_path, start=None, end=None):
+    """
+    Öffnet die Hauptdatenbank und hängt alle nicht archivierten Partitionen
+    an, deren Zeitraum [start, end) überschneidet. Die temporäre Sicht
+    'all_events' vereint die Events der Hauptdatenbank und dieser Partitionen
+    (Spalten wie 'events' samt Wert-Spalten sowie 'partition'). Fehlt einer
+    älteren Partition eine Wert-Spalte, wird sie dort ohne Index berechnet.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        start (str): Optional Beginn des Zeitraums (ISO 8601).
+        end (str): Optional Ende des Zeitraums (ISO 8601, exklusiv).
+
+    Returns:
+        sqlite3.Connection: Die Verbindung; muss vom Aufrufer geschlossen werden.
+
+    Raises:
+        ValueError: Wenn mehr Partitionen betroffen sind, als SQLite anhängen
+                    kann (dann connect_event_groups verwenden).
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        selected = _select_partitions(conn, start, end)
+        if len(selected) > _attach_limit(conn):
+            raise ValueError(f"Der Zeitraum umfasst {len(selected)} Partitionen, "
+                             f"höchstens {_attach_limit(conn)} können angehängt werden.")
+        _create_view(conn, selected)
+        return conn
+    except Exception:
+        conn.close()
+        raise
+
+def connect_event_groups(db_path, start=None, end=None):
+    """
+    Wie connect_events, verteilt die Partitionen aber auf mehrere
+    Verbindungen mit je höchstens so vielen, wie SQLite anhängen kann. Die
+    Events der Hauptdatenbank stehen nur in der Sicht der ersten Verbindung.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        start (str): Optional Beginn des Zeitraums (ISO 8601).
+        end (str): Optional Ende des Zeitraums (ISO 8601, exklusiv).
+
+    Returns:
+        list: Die Verbindungen; müssen vom Aufrufer geschlossen werden.
+    """
+    connections = [sqlite3.connect(db_path)]
+    try:
+        selected = _select_partitions(connections[0], start, end)
+        group_size = max(_attach_limit(connections[0]), 1)
+        _create_view(connections[0], selected[:group_size])
+        for i in range(group_size, len(selected), group_size):
+            connections.append(sqlite3.connect(db_path))
+            _create_view(connections[-1], selected[i:i + group_size], include_main=False)
+        return connections
+    except Exception:
+        for conn in connections:
+            conn.close()
+        raise
+
+def iter_event_rows(db_path, query, params=(), start=None, end=None, key=None, reverse=False,
+                    row_factory=None):
+    """
+    Führt eine Abfrage auf der Sicht 'all_events' auf jeder Verbindung von
+    connect_event_groups aus und liefert die Zeilen aller Verbindungen. Mit
+    'key' werden die Ergebnisse, die dafür bereits danach sortiert sein
+    müssen, zu einer sortierten Folge zusammengeführt.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        query (str): Die Abfrage auf 'all_events'.
+        params (tuple): Die Parameter der Abfrage.
+        start (str): Optional Beginn des Zeitraums (ISO 8601).
+        end (str): Optional Ende des Zeitraums (ISO 8601, exklusiv).
+        key (callable): Optional Sortierschlüssel einer Zeile.
+        reverse (bool): Die Ergebnisse sind absteigend sortiert.
+        row_factory: Optional z.B. sqlite3.Row.
+
+    Yields:
+        Die Zeilen der Abfrage.
+    """
+    connections = connect_event_groups(db_path, start, end)
+    try:
+        cursors = []
+        for conn in connections:
+            conn.row_factory = row_factory
+            cursors.append(conn.execute(query, params))
+        if key is None:
+            yield from itertools.chain(*cursors)
+        else:
+            yield from heapq.merge(*cursors, key=key, reverse=reverse)
+    finally:
+        for conn in connections:
+            conn.close()
+
+def _order_key(value):
+    """Sortierschlüssel wie in SQLite: NULL vor Zahlen vor Text vor BLOB."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, value) if isinstance(value, str) else (3, value)
+
+def get_events(db_path, start=None, end=None, modules=None, event_types=None):
+    """
+    Liest Events eines Zeitraums aus der Hauptdatenbank und den Partitionen.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        start (str): Optional Beginn des Zeitraums (ISO 8601).
+        end (str): Optional Ende des Zeitraums (ISO 8601, exklusiv).
+        modules (list): Optional nur Events dieser Module.
+        event_types (list): Optional nur Events dieser Typen.
+
+    Returns:
+        list: Event-Diktionäre mit dekodiertem 'value', nach Zeitpunkt sortiert.
+    """
+    clauses, params = [], []
+    if start:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    if modules:
+        clauses.append(f"source_module IN ({', '.join('?' for _ in modules)})")
+        params.extend(modules)
+    if event_types:
+        clauses.append(f"event_type IN ({', '.join('?' for _ in event_types)})")
+        params.extend(event_types)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    events = []
+    columns = ", ".join(_BASE_COLUMNS + ["partition"])
+    query = f"SELECT {columns} FROM all_events {where} ORDER BY timestamp"
+    try:
+        for row in iter_event_rows(db_path, query, params, start, end,
+                                   key=lambda row: row["timestamp"], row_factory=sqlite3.Row):
+            event = dict(row)
+            event['value'] = database.decode_value(event['value'])
+            events.append(event)
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Lesen der Events aus den Partitionen: %s", e)
+    return events
+
+# Vergleichsoperatoren für query_events
+QUERY_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "LIKE", "IN")
+
+def query_events(db_path, event_type, filters=(), order_by=None, descending=False, limit=None,
+                 start=None, end=None):
+    """
+    Liest Events eines Typs mit Filtern und Sortierung auf Feldern des
+    JSON-Werts. Die Bedingungen werden als SQL auf die Wert-Spalten
+    (siehe database.VALUE_COLUMNS) an SQLite übergeben und nutzen deren
+    Indizes; nur die Treffer werden in Python dekodiert.
+
+    Beispiel:
+        query_events(db_path, "weather_forecast", [("weather_temperature", ">=", 30)],
+                     order_by="weather_temperature", descending=True, limit=10)
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        event_type (str): Der Event-Typ, z.B. 'weather_forecast'.
+        filters (list): (Spalte, Operator, Wert)-Tupel, z.B. ("pollen_birch", ">=", 3).
+                        Erlaubt sind die Wert-Spalten des Typs sowie 'timestamp'
+                        und 'source_module'; bei 'IN' ist der Wert eine Liste.
+        order_by (str): Optional Spalte für die Sortierung (Standard: 'timestamp').
+        descending (bool): Absteigend sortieren.
+        limit (int): Optional höchstens so viele Events.
+        start (str): Optional Beginn des Zeitraums (ISO 8601).
+        end (str): Optional Ende des Zeitraums (ISO 8601, exklusiv).
+
+    Returns:
+        list: Event-Diktionäre mit dekodiertem 'value' und den Wert-Spalten des Typs.
+
+    Raises:
+        ValueError: Bei unbekanntem Event-Typ, unbekannter Spalte oder unbekanntem Operator.
+    """
+    if event_type not in database.VALUE_COLUMNS:
+        raise ValueError(f"Für '{event_type}' sind keine Wert-Spalten definiert (siehe database.VALUE_COLUMNS).")
+    value_columns = list(database.VALUE_COLUMNS[event_type])
+    allowed = set(value_columns) | {"timestamp", "source_module"}
+
+    # Der Typ steht als Literal in der Abfrage, damit SQLite die Teil-Indizes
+    # (WHERE event_type = '...') der Wert-Spalten verwenden kann
+    clauses, params = [f"event_type = '{event_type}'"], []
+    if start:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    for column, operator, value in filters:
+        operator = operator.upper()
+        if column not in allowed:
+            raise ValueError(f"Unbekannte Spalte '{column}' für '{event_type}'.")
+        if operator not in QUERY_OPERATORS:
+            raise ValueError(f"Unbekannter Operator '{operator}'.")
+        if operator == "IN":
+            values = list(value)
+            clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        else:
+            clauses.append(f"{column} {operator} ?")
+            params.append(value)
+    order_by = order_by or "timestamp"
+    if order_by not in allowed:
+        raise ValueError(f"Unbekannte Spalte '{order_by}' für '{event_type}'.")
+    direction = "DESC" if descending else "ASC"
+    query = (
+        f"SELECT {', '.join(_BASE_COLUMNS + ['partition'] + value_columns)} FROM all_events "
+        f"WHERE {' AND '.join(clauses)} ORDER BY {order_by} {direction}, id {direction}"
+    )
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    events = []
+    rows = iter_event_rows(db_path, query, params, start, end, key=lambda row: _order_key(row[order_by]),
+                           reverse=descending, row_factory=sqlite3.Row)
+    try:
+        # Jede Verbindung liefert höchstens 'limit' Zeilen, zusammen zählt nur die Reihenfolge
+        for row in itertools.islice(rows, limit):
+            event = dict(row)
+            event['value'] = database.decode_value(event['value'])
+            events.append(event)
+    except sqlite3.Error as e:
+        logger.error("Fehler bei der Abfrage der Events vom Typ '%s': %s", event_type, e)
+    finally:
+        rows.close()
+    return events
+
+def _set_state(db_path, name, **values):
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with conn:
+            conn.execute(f"UPDATE partitions SET {assignments} WHERE name = ?", (*values.values(), name))
+    finally:
+        if conn:
+            conn.close()
+
+def _entry(db_path, name):
+    for entry in list_partitions(db_path):
+        if entry["name"] == name:
+            return entry
+    raise KeyError(f"Partition '{name}' nicht im Katalog gefunden.")
+
+def freeze_partition(db_path, name):
+    """
+    Friert eine abgeschlossene Partition ein: Sie wird kompaktiert (VACUUM),
+    die Statistiken werden aktualisiert und die Datei wird schreibgeschützt.
+    Verspätete Events dieses Monats schreibt insert_events weiterhin hinein.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        name (str): Der Name der Partition, z.B. 'events_2024_01'.
+
+    Returns:
+        bool: True, wenn die Partition eingefroren wurde.
+    """
+    entry = _entry(db_path, name)
+    if entry["state"] != STATE_ACTIVE:
+        return False
+    if entry["end"] > date.today().isoformat():
+        logger.info("Partition '%s' ist noch nicht abgeschlossen und wird nicht eingefroren.", name)
+        return False
+    _set_state(db_path, name, state=STATE_FROZEN)
+    conn = None
+    try:
+        conn = sqlite3.connect(entry["path"])
+        conn.execute('ANALYZE')
+        conn.execute('VACUUM')
+        event_count = conn.execute('SELECT count(*) FROM events').fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Einfrieren von Partition '%s': %s", name, e)
+        _set_state(db_path, name, state=STATE_ACTIVE)
+        return False
+    finally:
+        if conn:
+            conn.close()
+    os.chmod(entry["path"], _READ_ONLY)
+    _set_state(db_path, name, event_count=event_count)
+    logger.info("Partition '%s' eingefroren (%s Events).", name, event_count)
+    return True
+
+def archive_partition(db_path, name, archive_directory=None):
+    """
+    Komprimiert eine eingefrorene Partition mit gzip ins Archiv und entfernt
+    die Datei. Archivierte Partitionen werden bei Abfragen übersprungen.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        name (str): Der Name der Partition.
+        archive_directory (str): Zielordner (Standard: 'archive_directory' in [Partitions]).
+
+    Returns:
+        str: Der Pfad der Archivdatei oder None.
+    """
+    entry = _entry(db_path, name)
+    if entry["state"] != STATE_FROZEN:
+        logger.warning("Partition '%s' muss vor dem Archivieren eingefroren werden.", name)
+        return None
+    if archive_directory is None:
+        archive_directory = settings.resolve_path(settings.get_config().get(
+            'Partitions', 'archive_directory', fallback='data/partitions/archive').strip())
+    os.makedirs(archive_directory, exist_ok=True)
+    archive_path = os.path.join(archive_directory, f"{name}.db.gz")
+    temp_path = archive_path + ".tmp"
+    with open(entry["path"], "rb") as source, gzip.open(temp_path, "wb") as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    os.replace(temp_path, archive_path)
+    _set_state(db_path, name, state=STATE_ARCHIVED, archive_path=archive_path)
+    os.remove(entry["path"])
+    logger.info("Partition '%s' nach '%s' archiviert.", name, archive_path)
+    return archive_path
+
+def restore_partition(db_path, name):
+    """
+    Entpackt eine archivierte Partition wieder an ihren Platz (eingefroren).
+
+    Returns:
+        bool: True, wenn die Partition wiederhergestellt wurde.
+    """
+    entry = _entry(db_path, name)
+    if entry["state"] != STATE_ARCHIVED:
+        return False
+    temp_path = entry["path"] + ".tmp"
+    os.makedirs(os.path.dirname(entry["path"]), exist_ok=True)
+    with gzip.open(entry["archive_path"], "rb") as source, open(temp_path, "wb") as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    os.chmod(temp_path, _READ_ONLY)
+    os.replace(temp_path, entry["path"])
+    _set_state(db_path, name, state=STATE_FROZEN)
+    logger.info("Partition '%s' wiederhergestellt.", name)
+    return True
+
+def _months_before(today, months):
+    """Der erste Tag des Monats, der 'months' Monate vor dem aktuellen liegt."""
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1).isoformat()
+
+def maintain_partitions(db_path, today=None):
+    """
+    Friert Partitionen ein, deren Monat länger als 'freeze_after_months'
+    zurückliegt, und archiviert sie nach 'archive_after_months' (0 = nie).
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Hauptdatenbank.
+        today (date): Optional das heutige Datum (für Tests).
+    """
+    if not is_enabled():
+        return
+    config = settings.get_config()
+    today = today or datetime.now().date()
+    freeze_after = config.getint('Partitions', 'freeze_after_months', fallback=2)
+    archive_after = config.getint('Partitions', 'archive_after_months', fallback=0)
+    for entry in list_partitions(db_path):
+        if entry["state"] == STATE_ACTIVE and entry["end"] <= _months_before(today, freeze_after - 1):
+            freeze_partition(db_path, entry["name"])
+            entry = _entry(db_path, entry["name"])
+        if (archive_after > 0 and entry["state"] == STATE_FROZEN
+                and entry["end"] <= _months_before(today, archive_after - 1)):
+            archive_partition(db_path, entry["name"])
+
+# Verwaltung über die Kommandozeile, z.B. python partitions.py freeze events_2024_01
+if __name__ == "__main__":
+    import argparse
+    import logs
+
+    logs.setup_logging()
+    parser = argparse.ArgumentParser(description="Verwaltet die Monats-Partitionen der Events.")
+    parser.add_argument("action", choices=["list", "freeze", "archive", "restore", "maintain"])
+    parser.add_argument("name", nargs="?", help="Name der Partition, z.B. events_2024_01.")
+    args = parser.parse_args()
+
+    main_db = settings.get_db_path()
+    init_catalog(main_db)
+    if args.action == "list":
+        for entry in list_partitions(main_db):
+            print(f"{entry['name']}  {entry['state']:<8} {entry['min_timestamp'] or '-'} .. "
+                  f"{entry['max_timestamp'] or '-'}  {entry['event_count'] or ''}")
+    elif args.action == "maintain":
+        maintain_partitions(main_db)
+    elif not args.name:
+        parser.error("Für diese Aktion wird der Name der Partition benötigt.")
+    else:
+        {"freeze": freeze_partition, "archive": archive_partition,
+         "restore": restore_partition}[args.action](main_db, args.name)
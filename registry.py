@@ -0,0 +1,195 @@
+# registry.py - Verzeichnis aller Tracker-Plugins mit deklarativen Metadaten
+
+import importlib
+import importlib.metadata
+import importlib.util
+import logging
+import os
+from dataclasses import dataclass
+
+import module_manifest
+
+logger = logging.getLogger(__name__)
+
+# Gruppe der Entry Points, über die installierte Pakete eigene Tracker anmelden.
+# Beispiel in der pyproject.toml eines Plugin-Pakets:
+#   [project.entry-points."stat_tracker.modules"]
+#   strava_tracker = "strava_tracker"
+ENTRY_POINT_GROUP = "stat_tracker.modules"
+
+# Erlaubte Werte für 'concurrency' in MODULE_INFO
+CONCURRENCY_IO = "io"
+CONCURRENCY_CPU = "cpu"
+
+@dataclass(frozen=True)
+class PluginMetadata:
+    """
+    Beschreibt ein Tracker-Plugin, ohne dass sein Modul importiert werden muss.
+    Scheduler und Executor in main.py entscheiden anhand dieser Angaben, wann
+    ein Plugin läuft, in welchem Pool es ausgeführt wird und wie seine Events
+    geschrieben werden.
+
+    Attributes:
+        name (str): Name des Plugins, wird als 'source_module' gespeichert.
+        source (str): 'local' (Datei in modules/) oder 'entry_point'.
+        location (str): Dateipfad (local) bzw. Wert des Entry Points ('paket.modul[:funktion]').
+        interval_seconds (int): Ausführungsintervall.
+        timeout_seconds (float): Maximale Laufzeit von track(), None für unbegrenzt.
+        concurrency (str): 'io' (Thread-Pool) oder 'cpu' (Prozess-Pool).
+        event_types (tuple): Event-Typen, die das Plugin erzeugt.
+        batch_size (int): Anzahl der Events pro Schreib-Transaktion.
+        capabilities (tuple): Fähigkeiten bzw. Anforderungen, z.B. 'network'.
+        natural_keys (tuple): (event_type, Felder)-Paare für Events, die per
+                              natürlichem Schlüssel aktualisiert statt erneut
+                              eingefügt werden (siehe database.natural_key).
+    """
+    name: str
+    source: str
+    location: str
+    interval_seconds: int
+    timeout_seconds: float = None
+    concurrency: str = CONCURRENCY_IO
+    event_types: tuple = ()
+    batch_size: int = 500
+    capabilities: tuple = ()
+    natural_keys: tuple = ()
+
+    @property
+    def executor(self):
+        """Der passende Pool für dieses Plugin: 'process' für CPU-lastige, sonst 'thread'."""
+        return "process" if self.concurrency == CONCURRENCY_CPU else "thread"
+
+    def natural_key_fields(self, event_type):
+        """Die Felder des natürlichen Schlüssels für einen Event-Typ oder None."""
+        for key_event_type, fields in self.natural_keys:
+            if key_event_type == event_type:
+                return fields
+        return None
+
+def _metadata_from_info(name, source, location, info, default_interval):
+    concurrency = info.get("concurrency", CONCURRENCY_IO)
+    if concurrency not in (CONCURRENCY_IO, CONCURRENCY_CPU):
+        logger.warning("Unbekannte 'concurrency' '%s' für Plugin '%s', verwende '%s'.",
+                       concurrency, name, CONCURRENCY_IO)
+        concurrency = CONCURRENCY_IO
+    return PluginMetadata(
+        name=info.get("name", name),
+        source=source,
+        location=location,
+        interval_seconds=info.get("interval_seconds", default_interval),
+        timeout_seconds=info.get("timeout_seconds"),
+        concurrency=concurrency,
+        event_types=tuple(info.get("event_types", ())),
+        batch_size=info.get("batch_size", 500),
+        capabilities=tuple(info.get("capabilities", ())),
+        natural_keys=tuple(
+            (event_type, tuple(fields)) for event_type, fields in info.get("natural_keys", {}).items()
+        ),
+    )
+
+def _entry_points():
+    eps = importlib.metadata.entry_points()
+    if hasattr(eps, "select"):
+        return list(eps.select(group=ENTRY_POINT_GROUP))
+    return list(eps.get(ENTRY_POINT_GROUP, [])) # Python 3.9
+
+def _entry_point_origin(entry_point):
+    """
+    Ermittelt die Quelldatei eines Entry Points. find_spec führt das Modul
+    selbst nicht aus (bei Untermodulen werden nur die Elternpakete geladen).
+    """
+    module_name = entry_point.value.split(":")[0].strip()
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError) as e:
+        logger.error("Fehler beim Auffinden von Plugin '%s' (%s): %s", entry_point.name, module_name, e)
+        return module_name, None
+    if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+        return module_name, None
+    return module_name, spec.origin
+
+def discover_plugins(directory, manifest_path, default_interval_seconds):
+    """
+    Ermittelt alle Tracker-Plugins aus dem lokalen Modulverzeichnis und aus
+    den installierten Entry Points der Gruppe 'stat_tracker.modules'. Die
+    Metadaten stammen aus dem MODULE_INFO-Literal der Quelldateien und werden
+    über das Modul-Manifest zwischengespeichert.
+
+    Args:
+        directory (str): Das lokale Verzeichnis mit den Tracker-Modulen.
+        manifest_path (str): Pfad zur Cache-Datei des Manifests.
+        default_interval_seconds (int): Intervall für Plugins ohne eigene Angabe.
+
+    Returns:
+        list: PluginMetadata-Objekte aller Plugins mit 'track()'-Funktion.
+    """
+    candidates = [] # (Name, Quelle, Ort, Quelldatei)
+    if os.path.exists(directory):
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(".py") and filename != "__init__.py":
+                path = os.path.join(os.path.abspath(directory), filename)
+                candidates.append((filename[:-3], "local", path, path))
+    else:
+        logger.warning("Modulverzeichnis '%s' nicht gefunden.", directory)
+
+    for entry_point in _entry_points():
+        _, origin = _entry_point_origin(entry_point)
+        candidates.append((entry_point.name, "entry_point", entry_point.value, origin))
+
+    manifest = module_manifest.build_manifest(
+        [origin for _, _, _, origin in candidates if origin], manifest_path
+    )
+
+    plugins = []
+    seen = set()
+    for name, source, location, origin in candidates:
+        entry = manifest.get(origin) if origin else None
+        if entry is None and source == "entry_point":
+            # Ohne lesbare Quelldatei (z.B. nur .pyc) bleiben die Standardwerte
+            entry = {"has_track": True, "info": {}}
+        if entry is None:
+            continue
+        if not entry["has_track"] and source == "local":
+            logger.warning("Modul '%s' hat keine 'track()'-Funktion.", name)
+            continue
+        metadata = _metadata_from_info(name, source, location, entry["info"], default_interval_seconds)
+        if metadata.name in seen:
+            logger.warning("Plugin '%s' ist mehrfach vorhanden, nur das erste wird verwendet.", metadata.name)
+            continue
+        seen.add(metadata.name)
+        plugins.append(metadata)
+    return plugins
+
+def load_plugin(metadata):
+    """
+    Importiert ein Plugin und gibt seine track()-Funktion zurück (bei Entry
+    Points die im Entry Point genannte Funktion).
+
+    Args:
+        metadata (PluginMetadata): Die Metadaten des Plugins.
+
+    Returns:
+        callable: Die track()-Funktion oder None bei einem Fehler.
+    """
+    attribute = 'track'
+    try:
+        if metadata.source == "local":
+            spec = importlib.util.spec_from_file_location(metadata.name, metadata.location)
+            if spec is None:
+                logger.warning("Konnte Spezifikation für Modul '%s' nicht laden.", metadata.name)
+                return None
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        else:
+            module_name, _, attribute = metadata.location.partition(":")
+            attribute = attribute.strip() or 'track'
+            module = importlib.import_module(module_name.strip())
+    except Exception as e:
+        logger.error("Fehler beim Laden von Modul '%s': %s", metadata.name, e)
+        return None
+
+    track = getattr(module, attribute, None)
+    if not callable(track):
+        logger.warning("Modul '%s' hat keine '%s()'-Funktion.", metadata.name, attribute)
+        return None
+    return track
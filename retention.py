@@ -0,0 +1,362 @@
+# retention.py - Aufbewahrungsfristen, Tagesrollups und inkrementelles VACUUM für statistics.db
+#
+# Die Regeln stehen im Abschnitt [Retention] der config.ini. Jeder Schlüssel ist
+# entweder ein Modulname ('weather_tracker') oder Modulname und Event-Typ
+# ('weather_tracker.weather_forecast'); der genauere Eintrag gewinnt, 'default'
+# gilt für alle übrigen Events. Der Wert ist die Aufbewahrungsdauer in Tagen
+# (0 = unbegrenzt), optional gefolgt von ', rollup': Dann werden die Events vor
+# dem Löschen zu Tageswerten in der Tabelle 'daily_rollups' verdichtet.
+#
+# Gelöscht wird in kleinen Transaktionen, damit die Tracker-Module zwischendurch
+# schreiben können. Der freigewordene Platz wird anschließend schrittweise über
+# 'PRAGMA incremental_vacuum' an das Dateisystem zurückgegeben.
+#
+# Aktive Monats-Partitionen (siehe partitions.py) werden genauso bereinigt,
+# ihre Tageswerte landen in 'daily_rollups' der Hauptdatenbank. Eingefrorene
+# Partitionen sind schreibgeschützt; sie werden als Ganzes archiviert
+# ('archive_after_months' in [Partitions]) statt einzeln gelöscht.
+
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import database
+import instrumentation
+import partitions
+import settings
+
+logger = logging.getLogger(__name__)
+
+# Schlüssel im Abschnitt [Retention], die keine Aufbewahrungsregel sind
+_OPTIONS = {
+    "default", "interval_seconds", "batch_size", "batch_pause_seconds",
+    "vacuum_pages", "convert_auto_vacuum",
+}
+
+# Name, unter dem die Läufe in der 'runs'-Tabelle gespeichert werden
+RUN_NAME = "retention"
+
+# Pfad der Zeile, die in 'daily_rollups' die Anzahl der Events eines Tages zählt
+EVENT_COUNT_PATH = ""
+
+def init_retention_store(db_path):
+    """
+    Erstellt die Tabelle für die Tagesrollups sowie den Index, über den
+    abgelaufene Events gefunden werden.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS daily_rollups (
+                day TEXT NOT NULL,
+                source_module TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                path TEXT NOT NULL, -- JSON-Pfad des Zahlenwerts, '' für die Anzahl der Events
+                count INTEGER NOT NULL,
+                sum REAL,
+                min REAL,
+                max REAL,
+                PRIMARY KEY (day, source_module, event_type, path)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_events_retention ON events (source_module, event_type, timestamp)')
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Anlegen der Rollup-Tabelle: %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+def _parse_policy(key, raw):
+    days, _, flags = raw.partition(",")
+    try:
+        days = int(days.strip() or 0)
+    except ValueError:
+        logger.warning("Ungültige Aufbewahrungsregel '%s = %s', wird ignoriert.", key, raw)
+        return None
+    return {"days": max(days, 0), "rollup": flags.strip().lower() == "rollup"}
+
+def load_policies(config=None):
+    """
+    Liest die Aufbewahrungsregeln aus dem Abschnitt [Retention].
+
+    Args:
+        config (ConfigParser): Optionale Konfiguration (Standard: config.ini).
+
+    Returns:
+        dict: Schlüssel ('default', 'modul' oder 'modul.event_type') ->
+              {'days': int, 'rollup': bool}
+    """
+    config = config or settings.get_config()
+    policies = {"default": {"days": 0, "rollup": False}}
+    if not config.has_section('Retention'):
+        return policies
+    for key, raw in config.items('Retention'):
+        if key in _OPTIONS and key != "default":
+            continue
+        policy = _parse_policy(key, raw)
+        if policy is not None:
+            policies[key] = policy
+    return policies
+
+def resolve_policy(policies, source_module, event_type):
+    """
+    Wählt die Regel für ein Modul und einen Event-Typ aus: zuerst
+    'modul.event_type', dann 'modul', zuletzt 'default'.
+    """
+    return (policies.get(f"{source_module}.{event_type}".lower())
+            or policies.get(source_module.lower())
+            or policies["default"])
+
+def _rollup_batch(conn, ids, schema="main"):
+    """
+    Verdichtet die Events mit den angegebenen IDs zu Tageswerten: die Anzahl
+    der Events sowie Summe, Minimum und Maximum jedes Zahlenwerts im JSON
+    (ohne Werte in Listen, z.B. die Zeitstempel einer 'location_history_batch').
+    'schema' ist die Datenbank der Events, z.B. eine angehängte Partition.
+    """
+    placeholders = ", ".join("?" for _ in ids)
+    upsert = '''
+        ON CONFLICT (day, source_module, event_type, path) DO UPDATE SET
+            count = count + excluded.count,
+            sum = sum + excluded.sum,
+            min = min(min, excluded.min),
+            max = max(max, excluded.max)
+    '''
+    conn.execute(f'''
+        INSERT INTO main.daily_rollups (day, source_module, event_type, path, count, sum, min, max)
+        SELECT substr(timestamp, 1, 10), source_module, event_type, ?, COUNT(*), NULL, NULL, NULL
+        FROM {schema}.events WHERE id IN ({placeholders})
+        GROUP BY 1, 2, 3
+    ''' + upsert, (EVENT_COUNT_PATH, *ids))
+    conn.execute(f'''
+        INSERT INTO main.daily_rollups (day, source_module, event_type, path, count, sum, min, max)
+        SELECT substr(e.timestamp, 1, 10), e.source_module, e.event_type, t.fullkey,
+               COUNT(*), SUM(t.value), MIN(t.value), MAX(t.value)
+        FROM {schema}.events AS e, json_tree(e.value) AS t
+        WHERE e.id IN ({placeholders})
+          AND json_valid(e.value)
+          AND t.type IN ('integer', 'real')
+          AND instr(t.fullkey, '[') = 0
+        GROUP BY 1, 2, 3, 4
+    ''' + upsert, ids)
+
+def _purge(conn, source_module, event_type, policy, now, batch_size, pause_seconds, schema="main"):
+    """
+    Löscht die abgelaufenen Events eines Moduls und Event-Typs in Blöcken
+    aus der Datenbank 'schema'.
+
+    Returns:
+        int: Die Anzahl der gelöschten Events.
+    """
+    cutoff = (now - timedelta(days=policy["days"])).isoformat()
+    deleted = 0
+    while True:
+        start = time.perf_counter()
+        ids = [row[0] for row in conn.execute(f'''
+            SELECT id FROM {schema}.events
+            WHERE source_module = ? AND event_type = ? AND timestamp < ?
+            ORDER BY timestamp
+            LIMIT ?
+        ''', (source_module, event_type, cutoff, batch_size))]
+        if not ids:
+            return deleted
+        with conn:
+            if policy["rollup"]:
+                _rollup_batch(conn, ids, schema)
+            conn.execute(f"DELETE FROM {schema}.events WHERE id IN ({', '.join('?' for _ in ids)})", ids)
+            database.bump_write_generation(conn)
+        deleted += len(ids)
+        instrumentation.record_db_write(time.perf_counter() - start, len(ids))
+        if len(ids) < batch_size:
+            return deleted
+        # Anderen Schreibern (z.B. den Tracker-Modulen) eine Lücke lassen
+        time.sleep(pause_seconds)
+
+def ensure_incremental_vacuum(db_path, convert=False):
+    """
+    Prüft, ob die Datenbank im Modus auto_vacuum=INCREMENTAL läuft. Neue
+    Datenbanken werden von database.init_db() bereits so angelegt; bestehende
+    werden mit 'convert' einmalig per VACUUM umgestellt.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        convert (bool): Bestehende Datenbank bei Bedarf umstellen.
+
+    Returns:
+        bool: True, wenn inkrementelles VACUUM verfügbar ist.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return True
+        if not convert:
+            logger.warning("Die Datenbank nutzt kein auto_vacuum=INCREMENTAL, freier Platz wird nicht zurückgegeben.")
+            return False
+        logger.info("Stelle die Datenbank einmalig auf auto_vacuum=INCREMENTAL um (VACUUM)...")
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        return conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Umstellen auf inkrementelles VACUUM: %s", e)
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+def incremental_vacuum(db_path, pages_per_step=200, pause_seconds=0.05):
+    """
+    Gibt freie Seiten schrittweise an das Dateisystem zurück. Jeder Schritt
+    ist eine eigene kurze Transaktion.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        pages_per_step (int): Anzahl der Seiten pro Schritt.
+        pause_seconds (float): Pause zwischen den Schritten.
+
+    Returns:
+        int: Die Anzahl der freigegebenen Seiten.
+    """
+    conn = None
+    freed = 0
+    try:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        while True:
+            free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if free_pages == 0:
+                break
+            conn.execute(f'PRAGMA incremental_vacuum({int(pages_per_step)})').fetchall()
+            remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if remaining >= free_pages:
+                break # auto_vacuum ist nicht aktiv
+            freed += free_pages - remaining
+            time.sleep(pause_seconds)
+    except sqlite3.Error as e:
+        logger.error("Fehler beim inkrementellen VACUUM: %s", e)
+    finally:
+        if conn:
+            conn.close()
+    return freed
+
+def apply_retention(db_path, policies=None, now=None, batch_size=500, pause_seconds=0.05):
+    """
+    Wendet die Aufbewahrungsregeln auf alle Events der Hauptdatenbank und
+    der aktiven Partitionen an.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        policies (dict): Regeln wie von load_policies() (Standard: aus config.ini).
+        now (datetime): Bezugszeitpunkt (Standard: jetzt).
+        batch_size (int): Anzahl der Events pro Lösch-Transaktion.
+        pause_seconds (float): Pause zwischen zwei Transaktionen.
+
+    Returns:
+        dict: (source_module, event_type) -> Anzahl der gelöschten Events.
+    """
+    policies = policies or load_policies()
+    now = now or datetime.now()
+    deleted = {}
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        for name, path in partitions.event_sources(db_path, states=(partitions.STATE_ACTIVE,)):
+            schema = "main" if name == "main" else "p"
+            if schema != "main":
+                conn.execute("ATTACH DATABASE ? AS p", (path,))
+            try:
+                pairs = conn.execute(f'SELECT DISTINCT source_module, event_type FROM {schema}.events').fetchall()
+                for source_module, event_type in pairs:
+                    policy = resolve_policy(policies, source_module, event_type)
+                    if policy["days"] <= 0:
+                        continue
+                    count = _purge(conn, source_module, event_type, policy, now, batch_size, pause_seconds, schema)
+                    if count:
+                        key = (source_module, event_type)
+                        deleted[key] = deleted.get(key, 0) + count
+            finally:
+                if schema != "main":
+                    conn.execute("DETACH DATABASE p")
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Anwenden der Aufbewahrungsregeln: %s", e)
+    finally:
+        if conn:
+            conn.close()
+    return deleted
+
+def run_retention(db_path):
+    """
+    Führt einen vollständigen Aufräum-Lauf gemäß [Retention] aus: abgelaufene
+    Events verdichten und löschen, danach Platz inkrementell freigeben. Der
+    Lauf wird wie ein Modul-Lauf in der 'runs'-Tabelle gespeichert.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+
+    Returns:
+        dict: (source_module, event_type) -> Anzahl der gelöschten Events.
+    """
+    config = settings.get_config()
+    batch_size = config.getint('Retention', 'batch_size', fallback=500)
+    pause_seconds = config.getfloat('Retention', 'batch_pause_seconds', fallback=0.05)
+    vacuum_pages = config.getint('Retention', 'vacuum_pages', fallback=200)
+    convert = config.getboolean('Retention', 'convert_auto_vacuum', fallback=False)
+
+    init_retention_store(db_path)
+    with instrumentation.measure_module(RUN_NAME) as metrics:
+        deleted = apply_retention(db_path, load_policies(config), batch_size=batch_size, pause_seconds=pause_seconds)
+        freed = 0
+        if ensure_incremental_vacuum(db_path, convert):
+            freed = incremental_vacuum(db_path, vacuum_pages, pause_seconds)
+        # Partitionen werden bereits mit auto_vacuum=INCREMENTAL angelegt
+        for name, path in partitions.event_sources(db_path, states=(partitions.STATE_ACTIVE,))[1:]:
+            freed += incremental_vacuum(path, vacuum_pages, pause_seconds)
+    metrics.event_count = sum(deleted.values())
+    for (source_module, event_type), count in sorted(deleted.items()):
+        logger.info("Aufbewahrung: %s Events '%s/%s' gelöscht.", count, source_module, event_type)
+    logger.info("Aufbewahrung abgeschlossen: %s Events gelöscht, %s Seiten freigegeben.",
+                metrics.event_count, freed)
+    database.insert_run(db_path, metrics.as_dict())
+    return deleted
+
+_background_thread = None
+
+def start_background(db_path, last_runs):
+    """
+    Startet einen Aufräum-Lauf in einem Hintergrund-Thread, sofern seit dem
+    letzten Lauf 'interval_seconds' vergangen sind und kein Lauf aktiv ist.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        last_runs (dict): Modulname -> Startzeitpunkt des letzten Laufs (ISO 8601).
+
+    Returns:
+        threading.Thread: Der gestartete Thread oder None.
+    """
+    global _background_thread
+    config = settings.get_config()
+    if not config.has_section('Retention'):
+        return None
+    if _background_thread is not None and _background_thread.is_alive():
+        return None
+    interval = config.getint('Retention', 'interval_seconds', fallback=86400)
+    last_run = last_runs.get(RUN_NAME)
+    if last_run and (datetime.now() - datetime.fromisoformat(last_run)).total_seconds() < interval:
+        return None
+    # Kein Daemon-Thread, damit eine laufende Transaktion nicht beim Beenden abbricht
+    _background_thread = threading.Thread(target=run_retention, args=(db_path,), name="retention")
+    _background_thread.start()
+    return _background_thread
+
+# Einmaliger Aufräum-Lauf im Vordergrund, z.B. per Cron
+if __name__ == "__main__":
+    import logs
+
+    logs.setup_logging()
+    run_retention(settings.get_db_path())
@@ -0,0 +1,240 @@
+# search.py - Volltextsuche über die Texte der Events (FTS5)
+#
+# Die virtuelle Tabelle 'events_fts' enthält pro Event (rowid = events.id) die
+# durchsuchbaren Texte aus dem JSON-Wert, z.B. YouTube-Titel, Artikel von
+# Einkaufszetteln oder Termin- und Feiertagsnamen. Trigger auf der
+# 'events'-Tabelle halten den Index aktuell, auch für Module, die wie der
+# youtube_tracker direkt in die Datenbank schreiben, und für gelöschte Events
+# (siehe retention.py). Jede Monats-Partition (siehe partitions.py) hat einen
+# eigenen Index; search_events durchsucht die Hauptdatenbank und die
+# Partitionen des Zeitraums und führt die Treffer zusammen.
+
+import logging
+import sqlite3
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Event-Typen mit durchsuchbarem Text: event_type -> SQL-Ausdruck, der den Text
+# aus dem Wert {v} bildet. JSON-Funktionen werden nur auf gültiges JSON angewendet,
+# da z.B. YouTube-Titel als einfacher String gespeichert sind.
+TEXT_EXPRESSIONS = {
+    "youtube_video_watched": "{v}",
+    "shopping_list_processed": (
+        "(SELECT group_concat(item.value, ' ') FROM json_each("
+        "CASE WHEN json_valid({v}) THEN {v} ELSE '{{}}' END, '$.items') AS item)"
+    ),
+    "weekly_appointment_reminder": (
+        "CASE WHEN json_valid({v}) THEN trim(coalesce(json_extract({v}, '$.title'), '') || ' ' || "
+        "coalesce(json_extract({v}, '$.description'), '')) END"
+    ),
+    "weekly_holiday_reminder": (
+        "CASE WHEN json_valid({v}) THEN trim(coalesce(json_extract({v}, '$.local_name'), '') || ' ' || "
+        "coalesce(json_extract({v}, '$.name'), '')) END"
+    ),
+}
+
+def _text_expression(row=""):
+    """Der SQL-Ausdruck für den Text eines Events, 'row' ist z.B. 'NEW.' in Triggern."""
+    cases = " ".join(
+        f"WHEN '{event_type}' THEN {expression.format(v=row + 'value')}"
+        for event_type, expression in TEXT_EXPRESSIONS.items()
+    )
+    return f"CASE {row}event_type {cases} END"
+
+def _indexed_types():
+    return ", ".join(f"'{event_type}'" for event_type in TEXT_EXPRESSIONS)
+
+def init_search_index(db_path):
+    """
+    Erstellt die FTS5-Tabelle 'events_fts' samt Triggern. Beim ersten Anlegen
+    werden die bereits vorhandenen Events indexiert.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    types = _indexed_types()
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'events_fts'").fetchone()
+        # 'remove_diacritics 2' findet z.B. "München" auch mit "Munchen",
+        # der Präfix-Index beschleunigt Suchen wie "Mil*"
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+                text, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
+        ''')
+        new_text = _text_expression("NEW.")
+        conn.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events
+            WHEN NEW.event_type IN ({types}) BEGIN
+                INSERT INTO events_fts (rowid, text)
+                SELECT NEW.id, text FROM (SELECT {new_text} AS text) WHERE coalesce(text, '') != '';
+            END;
+            CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events
+            WHEN OLD.event_type IN ({types}) BEGIN
+                DELETE FROM events_fts WHERE rowid = OLD.id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF event_type, value ON events BEGIN
+                DELETE FROM events_fts WHERE rowid = OLD.id;
+                INSERT INTO events_fts (rowid, text)
+                SELECT NEW.id, text FROM (SELECT {new_text} AS text)
+                WHERE NEW.event_type IN ({types}) AND coalesce(text, '') != '';
+            END;
+        ''')
+        if not exists:
+            conn.execute(f'''
+                INSERT INTO events_fts (rowid, text)
+                SELECT id, text FROM (
+                    SELECT id, {_text_expression()} AS text FROM events WHERE event_type IN ({types})
+                ) WHERE coalesce(text, '') != ''
+            ''')
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Anlegen des Suchindex: %s", e)
+    finally:
+        if conn:
+            conn.close()
+
+def rebuild_search_index(db_path):
+    """
+    Baut den Suchindex vollständig neu auf, z.B. nachdem TEXT_EXPRESSIONS
+    geändert wurde.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.executescript('''
+            DROP TRIGGER IF EXISTS events_fts_insert;
+            DROP TRIGGER IF EXISTS events_fts_delete;
+            DROP TRIGGER IF EXISTS events_fts_update;
+            DROP TABLE IF EXISTS events_fts;
+        ''')
+    except sqlite3.Error as e:
+        logger.error("Fehler beim Löschen des Suchindex: %s", e)
+        return
+    finally:
+        if conn:
+            conn.close()
+    init_search_index(db_path)
+
+def build_match_query(text):
+    """
+    Wandelt eine einfache Sucheingabe in eine FTS5-Abfrage um: Jedes Wort
+    wird als Phrase gesucht (alle Wörter müssen vorkommen), ein '*' am
+    Wortende sucht nach dem Präfix.
+
+    Args:
+        text (str): Die Sucheingabe, z.B. "python tutorial" oder "Mil*".
+
+    Returns:
+        str: Der Ausdruck für MATCH.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def search_events(db_path, text, start=None, end=None, modules=None, event_types=None,
+                  order_by="rank", limit=50, raw=False):
+    """
+    Durchsucht die Texte der Events.
+
+    Args:
+        db_path (str): Der vollständige Pfad zur Datenbankdatei.
+        text (str): Die Sucheingabe (siehe build_match_query).
+        start (str): Optional nur Events ab diesem Zeitpunkt (ISO 8601).
+        end (str): Optional nur Events vor diesem Zeitpunkt (ISO 8601).
+        modules (list): Optional nur Events dieser Module.
+        event_types (list): Optional nur Events dieser Typen.
+        order_by (str): 'rank' (Relevanz nach BM25) oder 'recent' (neueste zuerst).
+        limit (int): Maximale Anzahl der Treffer.
+        raw (bool): 'text' unverändert als FTS5-Abfrage verwenden (z.B. "milch OR brot").
+
+    Returns:
+        list: Event-Diktionäre mit dekodiertem 'value' sowie 'rank',
+              'snippet' (Fundstelle, Treffer in eckigen Klammern) und
+              'partition' (siehe partitions.py).
+    """
+    import partitions # partitions.py importiert search.py
+
+    match = text if raw else build_match_query(text)
+    if not match:
+        return []
+    clauses, params = ["events_fts MATCH ?"], [match]
+    if start:
+        clauses.append("e.timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("e.timestamp < ?")
+        params.append(end)
+    if modules:
+        clauses.append(f"e.source_module IN ({', '.join('?' for _ in modules)})")
+        params.extend(modules)
+    if event_types:
+        clauses.append(f"e.event_type IN ({', '.join('?' for _ in event_types)})")
+        params.extend(event_types)
+    order = "e.timestamp DESC" if order_by == "recent" else "rank"
+    query = f'''
+        SELECT e.id, e.timestamp, e.source_module, e.event_type, e.value,
+               bm25(events_fts) AS rank,
+               snippet(events_fts, 0, '[', ']', '…', 10) AS snippet
+        FROM events_fts
+        JOIN events AS e ON e.id = events_fts.rowid
+        WHERE {" AND ".join(clauses)}
+        ORDER BY {order}
+        LIMIT ?
+    '''
+    params.append(limit)
+
+    results = []
+    for partition, path in partitions.event_sources(db_path, start, end):
+        conn = None
+        try:
+            conn = sqlite3.connect(path)
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'events_fts'").fetchone():
+                logger.info("'%s' hat keinen Suchindex und wird übersprungen.", partition)
+                continue
+            conn.row_factory = sqlite3.Row
+            for row in conn.execute(query, params):
+                event = dict(row, partition=partition)
+                event['value'] = database.decode_value(event['value'])
+                results.append(event)
+        except sqlite3.Error as e:
+            logger.error("Fehler bei der Suche nach '%s' in '%s': %s", text, partition, e)
+        finally:
+            if conn:
+                conn.close()
+    # Die BM25-Werte verschiedener Dateien beruhen auf deren eigener Statistik und sind nur ungefähr vergleichbar
+    if order_by == "recent":
+        results.sort(key=lambda event: event['timestamp'], reverse=True)
+    else:
+        results.sort(key=lambda event: event['rank'])
+    return results[:limit]
+
+# Einfache Suche über die Kommandozeile, z.B. python search.py "Milch" --recent
+if __name__ == "__main__":
+    import argparse
+    import logs
+    import settings
+
+    logs.setup_logging()
+    parser = argparse.ArgumentParser(description="Durchsucht die Texte der gespeicherten Events.")
+    parser.add_argument("text", help="Suchbegriffe, '*' am Wortende für Präfixsuche.")
+    parser.add_argument("--start", help="Nur Events ab diesem Zeitpunkt (ISO 8601).")
+    parser.add_argument("--end", help="Nur Events vor diesem Zeitpunkt (ISO 8601).")
+    parser.add_argument("--recent", action="store_true", help="Neueste Treffer zuerst statt nach Relevanz.")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    for hit in search_events(settings.get_db_path(), args.text, args.start, args.end,
+                             order_by="recent" if args.recent else "rank", limit=args.limit):
+        print(f"{hit['timestamp']}  {hit['source_module']:<35} {hit['snippet']}")
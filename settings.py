@@ -0,0 +1,51 @@
+# settings.py - Zugriff auf die zentrale Konfigurationsdatei config.ini
+
+import configparser
+import os
+
+# Hauptverzeichnis des Projekts (dort liegen config.ini, main.py und database.py)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pfad zur zentralen Konfigurationsdatei
+CONFIG_PATH = os.path.join(BASE_DIR, 'config.ini')
+
+_config = None
+
+def get_config():
+    """
+    Liest die Konfigurationsdatei einmalig ein und gibt sie zurück.
+    Fehlt die Datei, wird eine leere Konfiguration geliefert, sodass alle
+    Aufrufer mit ihren Standardwerten weiterarbeiten können.
+
+    Returns:
+        configparser.ConfigParser: Die geladene Konfiguration.
+    """
+    global _config
+    if _config is None:
+        config = configparser.ConfigParser(interpolation=None)
+        config.read(CONFIG_PATH, encoding='utf-8')
+        _config = config
+    return _config
+
+def resolve_path(path):
+    """
+    Wandelt einen Pfad aus der Konfiguration in einen absoluten Pfad um.
+    Relative Pfade werden relativ zum Hauptverzeichnis des Projekts aufgelöst.
+
+    Args:
+        path (str): Der Pfad aus der Konfigurationsdatei.
+
+    Returns:
+        str: Der absolute Pfad.
+    """
+    if os.path.isabs(path):
+        return path
+    return os.path.join(BASE_DIR, path)
+
+def get_db_path():
+    """
+    Returns:
+        str: Der absolute Pfad zur zentralen Datenbank laut Abschnitt [Database].
+    """
+    path = get_config().get('Database', 'path', fallback='data/statistics.db').strip()
+    return resolve_path(path or 'data/statistics.db')
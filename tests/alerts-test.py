@@ -0,0 +1,77 @@
+import configparser
+
+import pytest
+
+import alerts
+import database
+import settings
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "_config", configparser.ConfigParser(interpolation=None))
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    alerts.init_alert_store(path)
+    return path
+
+def pollen(day, level):
+    return {"timestamp": f"2024-04-{day:02d}T06:00:00", "source_module": "pollen_tracker",
+            "event_type": "pollen_forecast_daily", "value": {"pollen_types": {"birch": {"level_numeric": level}}}}
+
+def test_rule_fires_once_per_streak_across_runs(db_path):
+    rule = alerts.parse_rule("birch", "pollen_forecast_daily | value.pollen_types.birch.level_numeric >= 3 | "
+                                      "3 days | Birkenpollen seit {count} Tagen stark ({first} bis {last}).")
+    database.insert_events(db_path, [pollen(1, 3), pollen(2, 4)])
+    assert alerts.evaluate_alerts(db_path, [rule]) == []
+
+    database.insert_events(db_path, [pollen(3, 3), pollen(4, 5)])
+    fired = alerts.evaluate_alerts(db_path, [rule])
+    assert [alert["value"]["message"] for alert in fired] == [
+        "Birkenpollen seit 3 Tagen stark (2024-04-01 bis 2024-04-03)."]
+
+    # Erst nach einer Unterbrechung löst die Regel erneut aus
+    database.insert_events(db_path, [pollen(5, 1), pollen(6, 3), pollen(7, 3), pollen(8, 3)])
+    fired = alerts.evaluate_alerts(db_path, [rule])
+    assert [alert["timestamp"][:10] for alert in fired] == ["2024-04-08"]
+    assert [e["event_type"] for e in database.get_all_events(db_path)].count("alert") == 2
+
+def test_codes_in_window_and_invalid_rules(monkeypatch):
+    rule = alerts.parse_rule("storm", "weather_forecast | value.forecast.weather_code in 95-99, 45 | 2 in 3 hours | x")
+    assert (rule.required, rule.window, rule.unit) == (2, 3, "hour")
+    assert rule.predicate(96) and rule.predicate(45) and not rule.predicate(80)
+    with pytest.raises(ValueError):
+        alerts.parse_rule("broken", "weather_forecast | value.x ~ 3 | 3 days | x")
+    with pytest.raises(ValueError):
+        alerts.parse_rule("broken", "weather_forecast | value.x >= 3 | 3 in 2 days | x")
+
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"Alerts": {
+        "enabled": "yes",
+        "broken": "weather_forecast | value.x",
+        "storm": "weather_forecast | value.forecast.weather_code in 95-99 | 3 in 7 days | Gewitter",
+    }})
+    monkeypatch.setattr(settings, "_config", config)
+    assert [rule.name for rule in alerts.load_rules()] == ["storm"]
+
+def test_active_partitions_are_read_in_attachable_groups(tmp_path, monkeypatch):
+    import partitions
+
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"Partitions": {"enabled": "yes", "directory": str(tmp_path / "partitions")}})
+    monkeypatch.setattr(settings, "_config", config)
+    monkeypatch.setattr(partitions, "_attach_limit", lambda conn: 2)
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    partitions.init_catalog(path)
+    alerts.init_alert_store(path)
+
+    rule = alerts.parse_rule("birch", "pollen_forecast_daily | value.pollen_types.birch.level_numeric >= 3 | "
+                                      "1 days | Birkenpollen stark am {last}.")
+    days = [dict(pollen(1, 3 if month % 2 else 1), timestamp=f"2024-{month:02d}-01T06:00:00")
+            for month in range(1, 6)]
+    for group in partitions.group_events(days):
+        partitions.insert_events(path, group)
+    fired = alerts.evaluate_alerts(path, [rule])
+    assert [alert["timestamp"][:7] for alert in fired] == ["2024-01", "2024-03", "2024-05"]
+    assert database.get_meta(path, "alerts_cursor:events_2024_05") == 1
+    assert alerts.evaluate_alerts(path, [rule]) == []
@@ -0,0 +1,58 @@
+import configparser
+from datetime import date, datetime
+
+import pytest
+
+import analytics
+import database
+import retention
+import settings
+
+def day(text):
+    return date.fromisoformat(text).toordinal()
+
+def test_asof_join_uses_last_earlier_value_within_tolerance():
+    left = [(1, "a"), (2, "b"), (5, "c"), (9, "d")]
+    right = [(0, 10), (2, 20), (3, 30), (8, 80)]
+    assert analytics.asof_join(left, right) == [(1, "a", 10), (2, "b", 20), (5, "c", 30), (9, "d", 80)]
+    assert analytics.asof_join(left, right, tolerance=1) == [(1, "a", 10), (2, "b", 20), (5, "c", None), (9, "d", 80)]
+    assert analytics.asof_join(left, []) == [(1, "a", None), (2, "b", None), (5, "c", None), (9, "d", None)]
+
+def test_merge_buckets_combines_equal_buckets():
+    left = [(1, 2, 10.0, 4.0, 6.0), (3, 1, 5.0, 5.0, 5.0)]
+    right = [(1, 1, 2.0, 2.0, 2.0), (2, 1, None, None, None)]
+    assert analytics._merge_buckets(left, right) == [
+        (1, 3, 12.0, 2.0, 6.0), (2, 1, None, None, None), (3, 1, 5.0, 5.0, 5.0)]
+
+def test_series_combine_events_with_rollups(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "_config", configparser.ConfigParser(interpolation=None))
+    db_path = str(tmp_path / "test.db")
+    database.init_db(db_path)
+    retention.init_retention_store(db_path)
+
+    def forecast(timestamp, temperature):
+        return {"timestamp": timestamp, "source_module": "weather_tracker", "event_type": "weather_forecast",
+                "value": {"forecast": {"temperature_celsius": temperature}}}
+
+    database.insert_events(db_path, [
+        forecast("2024-01-01T08:00:00", 2.0), forecast("2024-01-01T14:00:00", 6.0),
+        forecast("2024-06-01T08:00:00", 18.0), forecast("2024-06-01T14:00:00", 24.0),
+        {"timestamp": "2024-06-02T20:00:00", "source_module": "youtube_tracker",
+         "event_type": "youtube_video_watched", "value": "Python Tutorial"},
+    ])
+    retention.apply_retention(db_path, {"default": {"days": 0, "rollup": False},
+                                        "weather_tracker": {"days": 30, "rollup": True}},
+                              now=datetime(2024, 6, 10), pause_seconds=0)
+
+    temperature = analytics.load_series(db_path, "temperature")
+    assert temperature == [(day("2024-01-01"), 4.0), (day("2024-06-01"), 21.0)]
+    assert analytics.load_series(db_path, "weather_forecast:$.forecast.temperature_celsius:max", bucket="hour") == [
+        (day("2024-06-01") * 24 + 8, 18.0), (day("2024-06-01") * 24 + 14, 24.0)]
+    rows = analytics.align([analytics.load_series(db_path, "youtube_videos"), temperature])
+    assert rows == [(day("2024-06-02"), 1, 21.0)]
+
+def test_invalid_series_are_rejected():
+    for spec in ["rainfall", "weather_forecast:$.x", "weather_forecast:$.x:median",
+                 "weather_forecast:forecast.x:max", "weather_forecast::avg", "x;y:$.a:max"]:
+        with pytest.raises(ValueError):
+            analytics.parse_series(spec)
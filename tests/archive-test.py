@@ -0,0 +1,50 @@
+import configparser
+import json
+import sqlite3
+
+import pytest
+
+import archive
+import database
+import settings
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"Archive": {"enabled": "yes", "codec": "zlib"}})
+    monkeypatch.setattr(settings, "_config", config)
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    archive.init_archive(path)
+    return path
+
+def weather_body(temperature):
+    return json.dumps({"hourly": {"time": ["2024-06-01T08:00", "2024-06-01T09:00"],
+                                  "temperature_2m": [temperature, 20.0], "weather_code": [1, 1]}}).encode()
+
+def count_rows(db_path, table):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_identical_responses_are_stored_once_and_reprocessed(db_path):
+    context = {"location": "Ulm", "dates": ["2024-06-01"]}
+    url = "https://api.open-meteo.com/v1/forecast?latitude=48.4"
+    first = archive.store_response("weather_tracker", url, weather_body(14.0), 200, context, "2024-06-01T06:00:00")
+    assert archive.store_response("weather_tracker", url, weather_body(14.0), 200, context, "2024-06-01T07:00:00") == first
+    archive.store_response("weather_tracker", url, weather_body(15.5), 200, context, "2024-06-01T07:30:00")
+    archive.store_response("weather_tracker", url, b"<html>Wartung</html>", 503, context, "2024-06-01T07:45:00")
+    assert (count_rows(db_path, "raw_responses"), count_rows(db_path, "fetch_log")) == (3, 4)
+
+    summary = archive.reprocess(db_path, "weather_tracker", workers=1, batch_size=2)
+    assert summary == {"fetches": 4, "events": 3, "skipped": 1}
+    events = database.get_all_events(db_path)
+    assert [(e["timestamp"], e["value"]["forecast"]["temperature_celsius"]) for e in events] == [
+        ("2024-06-01T08:00:00", 15.5)]
+    assert len(database.get_event_revisions(db_path, events[0]["id"])) == 1
+
+def test_reprocess_requires_parse_response(db_path):
+    with pytest.raises(ValueError):
+        archive.reprocess(db_path, "location_tracker", workers=1)
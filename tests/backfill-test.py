@@ -0,0 +1,52 @@
+import configparser
+
+import pytest
+
+import backfill
+import database
+import gaps
+import settings
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"Backfill": {"locations": "Ulm: 48.4011, 9.9876; Berlin: 52.52, 13.41",
+                                   "workers": "2", "requests_per_second": "0", "retries": "0"}})
+    monkeypatch.setattr(settings, "_config", config)
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    gaps.init_coverage_store(path)
+    return path
+
+def forecast(location, day):
+    return {"timestamp": f"{day}T08:00:00", "event_type": "weather_forecast",
+            "value": {"location": location, "forecast": {"time": f"{day}T08:00", "temperature_celsius": 12.0}}}
+
+def test_split_range_and_locations(db_path):
+    assert backfill.split_range("2024-01-30", "2024-02-03", 2) == [
+        ("2024-01-30", "2024-01-31"), ("2024-02-01", "2024-02-02"), ("2024-02-03", "2024-02-03")]
+    assert [name for name, _, _ in backfill.load_locations()] == ["Ulm", "Berlin"]
+
+def test_interrupted_backfill_resumes_with_failed_chunks(db_path, monkeypatch):
+    fetched = []
+    offline = {("weather", "Berlin", "2024-06-03", "2024-06-04")}
+
+    def fetch(task, coordinates, limiter, retries):
+        fetched.append(task)
+        if task in offline:
+            raise ConnectionError("Zeitüberschreitung")
+        return [forecast(task[1], task[2]), forecast(task[1], task[3])]
+
+    monkeypatch.setattr(backfill, "_fetch_chunk", fetch)
+    summary = backfill.run_backfill(db_path, "2024-06-01", "2024-06-04", sources=["weather"], chunk_days=2)
+    assert summary == {"done": 3, "failed": 1, "events": 6}
+
+    fetched.clear()
+    offline.clear()
+    summary = backfill.run_backfill(db_path, "2024-06-01", "2024-06-04", sources=["weather"], chunk_days=2)
+    assert fetched == [("weather", "Berlin", "2024-06-03", "2024-06-04")]
+    assert summary == {"done": 1, "failed": 0, "events": 2}
+
+    # Erneutes Laden mit force verdoppelt nichts
+    backfill.run_backfill(db_path, "2024-06-01", "2024-06-04", sources=["weather"], chunk_days=2, force=True)
+    assert len(database.get_all_events(db_path)) == 8
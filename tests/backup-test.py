@@ -0,0 +1,140 @@
+import configparser
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from itertools import count
+
+import pytest
+
+import backup
+import database
+import partitions
+import settings
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({
+        "Partitions": {"enabled": "yes", "directory": str(tmp_path / "partitions"),
+                       "archive_directory": str(tmp_path / "archive")},
+        "Backup": {"keep": "2", "pages_per_step": "2"},
+    })
+    monkeypatch.setattr(settings, "_config", config)
+    ticks = count()
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 6, 1, 12) + timedelta(minutes=next(ticks))
+
+    monkeypatch.setattr(backup, "datetime", Clock)
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    partitions.init_catalog(path)
+    return path
+
+def event(timestamp, value):
+    return {"timestamp": timestamp, "source_module": "test", "event_type": "test_event", "value": value}
+
+def test_snapshots_reuse_frozen_partitions_and_rotate(db_path, tmp_path):
+    directory = str(tmp_path / "backups")
+    partitions.insert_events(db_path, [event("2024-01-15T08:00:00", 1)])
+    partitions.freeze_partition(db_path, "events_2024_01")
+
+    snapshots = []
+    for value in range(3):
+        database.insert_events(db_path, [event(f"2024-06-0{value + 1}T08:00:00", value)])
+        snapshots.append(backup.create_snapshot(db_path, directory))
+
+    assert [s["copied"] for s in snapshots] == [2, 1, 1]
+    manifest = backup.load_manifest(directory)
+    assert [s["id"] for s in manifest["snapshots"]] == [s["id"] for s in snapshots[1:]]
+    frozen = snapshots[0]["files"]["events_2024_01"]
+    assert manifest["snapshots"][1]["files"]["events_2024_01"] == frozen
+
+    # Die Hauptdatenbank wird nur beim ersten Mal vollständig kopiert, danach als Delta
+    main = [s["files"]["main"] for s in snapshots]
+    assert main[2]["file"] == main[0]["file"]
+    assert main[2]["deltas"] == [main[1]["deltas"][0], main[2]["deltas"][1]]
+    assert sorted(os.listdir(directory)) == sorted(
+        [backup.MANIFEST_NAME, frozen["file"], frozen["hashes"], main[0]["file"]]
+        + main[2]["deltas"] + [main[1]["hashes"], main[2]["hashes"]])
+
+    restored = backup.restore_snapshot(str(tmp_path / "restored"), directory)
+    conn = sqlite3.connect(restored["main"])
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+        assert conn.execute("SELECT value FROM events ORDER BY timestamp").fetchall() == [("0",), ("1",), ("2",)]
+    finally:
+        conn.close()
+
+def test_deltas_capture_updates_and_deletes_and_restart_after_max_deltas(db_path, tmp_path):
+    settings.get_config()["Backup"].update({"max_deltas": "2", "keep": "5"})
+    directory = str(tmp_path / "backups")
+    keyed = dict(event("2024-06-01T08:00:00", "alt"), natural_key="a")
+    database.insert_events(db_path, [keyed, event("2024-06-02T08:00:00", "weg")])
+    first = backup.create_snapshot(db_path, directory)["id"]
+
+    database.insert_events(db_path, [dict(keyed, value="neu")])
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("DELETE FROM events WHERE value = 'weg'")
+        conn.executemany("INSERT INTO runs (started_at, source_module) VALUES (?, 'test')",
+                         [(f"2024-06-01T{hour:02d}:00:00",) for hour in range(24)])
+    conn.close()
+    second = backup.create_snapshot(db_path, directory)
+    assert len(second["files"]["main"]["deltas"]) == 1
+    assert second["files"]["main"]["size"] < os.path.getsize(os.path.join(directory, second["files"]["main"]["file"]))
+
+    for value in range(2):
+        database.insert_events(db_path, [event(f"2024-06-1{value}T08:00:00", value)])
+        latest = backup.create_snapshot(db_path, directory)
+    assert latest["files"]["main"]["deltas"] == []
+    assert latest["files"]["main"]["file"] != second["files"]["main"]["file"]
+
+    def restored_values(snapshot_id):
+        path = backup.restore_snapshot(str(tmp_path / snapshot_id), directory, snapshot_id)["main"]
+        conn = sqlite3.connect(path)
+        try:
+            return ([row[0] for row in conn.execute("SELECT value FROM events ORDER BY timestamp")],
+                    conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0])
+        finally:
+            conn.close()
+
+    assert restored_values(second["id"]) == (["neu"], 24)
+    assert restored_values(latest["id"]) == (["neu", "0", "1"], 24)
+    with pytest.raises(KeyError):
+        backup.restore_snapshot(str(tmp_path / "missing"), directory, first + "-x")
+
+def test_backup_finishes_while_the_source_is_written(tmp_path):
+    source_path = str(tmp_path / "busy.db")
+    writer = sqlite3.connect(source_path)
+    writer.execute("CREATE TABLE filler (data BLOB)")
+    writer.executemany("INSERT INTO filler VALUES (randomblob(1000))", [()] * 50)
+    writer.commit()
+
+    class WrittenSource:
+        # Schreibt nach jedem Schritt, sodass SQLite die Sicherung jedes Mal neu beginnt
+        def __init__(self):
+            self.conn = sqlite3.connect(source_path)
+            self.steps = 0
+
+        def backup(self, target, pages=-1, sleep=0.25, progress=None):
+            def write_between_steps(status, remaining, total):
+                self.steps += 1
+                writer.execute("INSERT INTO filler VALUES (randomblob(1000))")
+                writer.commit()
+                if progress:
+                    progress(status, remaining, total)
+            return self.conn.backup(target, pages=pages, sleep=sleep, progress=write_between_steps)
+
+    source = WrittenSource()
+    target = sqlite3.connect(str(tmp_path / "copy.db"))
+    try:
+        backup._backup(source, target, pages_per_step=2, step_sleep_seconds=0, max_restarts=3)
+        assert source.steps < 20
+        assert target.execute("SELECT COUNT(*) FROM filler").fetchone()[0] >= 50
+    finally:
+        target.close()
+        source.conn.close()
+        writer.close()
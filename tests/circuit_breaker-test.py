@@ -0,0 +1,58 @@
+import configparser
+import sqlite3
+
+import pytest
+
+import circuit_breaker
+import settings
+
+ENDPOINT = "api.open-meteo.com"
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"CircuitBreaker": {"window_seconds": "600", "min_calls": "3",
+                                         "failure_rate": "0.5", "cooldown_seconds": "60"}})
+    monkeypatch.setattr(settings, "_config", config)
+    monkeypatch.setattr(circuit_breaker, "_initialized", set())
+    path = str(tmp_path / "test.db")
+    circuit_breaker.init_breaker_store(path)
+    monkeypatch.setattr(circuit_breaker, "_db_path", path)
+    return path
+
+def test_breaker_opens_probes_and_closes_again(db_path):
+    assert circuit_breaker.record(ENDPOINT, True, now=0) == circuit_breaker.CLOSED
+    assert circuit_breaker.record(ENDPOINT, False, now=1) == circuit_breaker.CLOSED
+    assert circuit_breaker.record(ENDPOINT, False, now=2) == circuit_breaker.OPEN
+    # Verspätete Antwort einer Anfrage von vor dem Öffnen
+    assert circuit_breaker.record(ENDPOINT, True, now=3) == circuit_breaker.OPEN
+    assert not circuit_breaker.allow(ENDPOINT, now=30)
+
+    # Nach der Wartezeit genau eine Probe-Anfrage
+    assert circuit_breaker.allow(ENDPOINT, now=70)
+    assert not circuit_breaker.allow(ENDPOINT, now=71)
+    assert circuit_breaker.record(ENDPOINT, False, now=72) == circuit_breaker.OPEN
+    assert not circuit_breaker.allow(ENDPOINT, now=100)
+    assert circuit_breaker.allow(ENDPOINT, now=140)
+    assert circuit_breaker.record(ENDPOINT, True, now=141) == circuit_breaker.CLOSED
+    assert circuit_breaker.allow(ENDPOINT, now=142)
+
+def test_allow_reads_while_another_connection_writes(db_path):
+    for now in range(3):
+        circuit_breaker.record(ENDPOINT, False, now=now)
+    other = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        other.execute("BEGIN IMMEDIATE")
+        # Ein offener Breaker wird ohne Schreibsperre erkannt
+        assert not circuit_breaker.allow(ENDPOINT, now=10)
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+
+def test_unreadable_store_does_not_block_requests(db_path, monkeypatch):
+    def broken(conn, endpoint):
+        raise sqlite3.OperationalError("no such table: circuit_breakers")
+
+    monkeypatch.setattr(circuit_breaker, "_load", broken)
+    assert circuit_breaker.allow(ENDPOINT, now=0)
+    assert circuit_breaker.record(ENDPOINT, False, now=0) == circuit_breaker.CLOSED
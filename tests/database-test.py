@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+import database
+
+def event(value, timestamp="2024-06-01T08:00:00"):
+    return {"timestamp": timestamp, "source_module": "test", "event_type": "test_event", "value": value}
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    return path
+
+def test_query_cache_is_invalidated_by_writes(db_path, tmp_path):
+    database.insert_events(db_path, [event(1)])
+    cache = database.QueryCache(db_path, persistent_path=str(tmp_path / "cache.db"))
+    try:
+        query = "SELECT COUNT(*) AS n FROM events WHERE event_type = ?"
+        assert cache.query(query, ("test_event",)) == [{"n": 1}]
+        assert cache.query("SELECT  COUNT(*) AS n\n FROM events WHERE event_type = ?;", ("test_event",)) == [{"n": 1}]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # Die Metriken eines Modul-Laufs lassen den Cache gültig
+        database.insert_run(db_path, {"started_at": "2024-06-01T08:00:00", "source_module": "test"})
+        assert cache.query(query, ("test_event",)) == [{"n": 1}]
+        assert (cache.hits, cache.misses) == (2, 1)
+
+        database.insert_events(db_path, [event(2)])
+        assert cache.query(query, ("test_event",)) == [{"n": 2}]
+        assert (cache.hits, cache.misses) == (2, 2)
+    finally:
+        cache.close()
+
+    restarted = database.QueryCache(db_path, persistent_path=str(tmp_path / "cache.db"))
+    try:
+        assert restarted.query(query, ("test_event",)) == [{"n": 2}]
+        assert (restarted.persistent_hits, restarted.misses) == (1, 0)
+        with pytest.raises(sqlite3.OperationalError):
+            restarted.query("SELECT * FROM missing_table")
+    finally:
+        restarted.close()
+
+def test_normalize_query_keeps_string_literals():
+    assert database.normalize_query("SELECT  'a   b'\n FROM t ;") == "SELECT 'a   b' FROM t"
+
+def test_upsert_by_natural_key_records_revisions(db_path):
+    def forecast(temperature, precipitation):
+        value = {"location": "Ulm", "forecast": {"time": "2024-06-01T12:00", "temperature_celsius": temperature,
+                                                 "precipitation_probability_percent": precipitation}}
+        data = {"timestamp": "2024-06-01T08:00:00", "source_module": "weather_tracker",
+                "event_type": "weather_forecast", "value": value}
+        data["natural_key"] = database.natural_key(data, ["value.location", "value.forecast.time"])
+        return data
+
+    database.insert_events(db_path, [forecast(14.0, 30)])
+    database.insert_events(db_path, [forecast(14.0, 30)])
+    database.insert_events(db_path, [dict(forecast(15.5, None), timestamp="2024-06-01T09:00:00")])
+
+    events = database.get_all_events(db_path)
+    assert len(events) == 1 and events[0]["timestamp"] == "2024-06-01T09:00:00"
+    assert events[0]["value"]["forecast"]["temperature_celsius"] == 15.5
+    history = database.get_event_revisions(db_path, events[0]["id"])
+    assert [(revision["timestamp"], revision["value"]) for revision in history] == [
+        ("2024-06-01T08:00:00", forecast(14.0, 30)["value"])]
+    assert database.get_event_revisions(db_path, 999) == []
+
+def test_merge_patch_delta_round_trips():
+    old = {"a": 1, "b": {"c": 2, "d": 3}, "e": [1]}
+    new = {"a": 1, "b": {"c": 5}, "f": None}
+    delta = database.merge_patch_delta(new, old)
+    assert delta == {"b": {"c": 2, "d": 3}, "e": [1], "f": None}
+    assert database.apply_merge_patch(new, delta) == old
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+
+import database
+import instrumentation
+import main
+import registry
+from event import Event
+
+def test_event_behaves_like_the_legacy_dict(tmp_path):
+    event = Event("test_event", {"n": 1}, datetime(2024, 6, 1, 8), source_module="test")
+    assert event.timestamp == "2024-06-01T08:00:00"
+    assert event.get("value") == {"n": 1} and event.get("natural_key", "-") == "-" and event.get("other") is None
+    assert "source_module" in event and "natural_key" not in event
+    assert Event.from_dict(event.to_dict()) == event
+    with pytest.raises(AttributeError):
+        event.extra = 1
+
+    db_path = str(tmp_path / "test.db")
+    database.init_db(db_path)
+    database.insert_events(db_path, [event, {"timestamp": "2024-06-01T09:00:00", "event_type": "test_event", "value": 2}])
+    assert [(e["source_module"], e["value"]) for e in database.get_all_events(db_path)] == [
+        ("test", {"n": 1}), ("unknown", 2)]
+
+def test_prepare_event_completes_and_filters_events():
+    plugin = registry.PluginMetadata(name="pollen_tracker", source="local", location="pollen_tracker.py",
+                                     interval_seconds=3600,
+                                     natural_keys=(("pollen_forecast_daily", ("value.location", "value.date")),))
+    with instrumentation.measure_module(plugin.name) as metrics:
+        event = main.prepare_event(plugin, {"event_type": "pollen_forecast_daily",
+                                            "value": {"location": "Ulm", "date": "2024-06-01"}}, metrics)
+        assert event.source_module == "pollen_tracker"
+        assert event.natural_key == '["pollen_tracker", "pollen_forecast_daily", "Ulm", "2024-06-01"]'
+
+        failed = main.prepare_event(plugin, Event("pollen_fetch_failed", "Zeitüberschreitung"), metrics)
+        assert failed.event_type == "pollen_fetch_failed" and metrics.failures == 1
+        # Bei offenem Circuit Breaker wird der bekannte Ausfall nicht erneut gespeichert
+        metrics.record_skipped_open_circuit()
+        assert main.prepare_event(plugin, Event("pollen_fetch_failed", "Breaker offen"), metrics) is None
+        assert metrics.failures == 1
@@ -0,0 +1,61 @@
+import configparser
+import csv
+import json
+
+import pytest
+
+import database
+import export
+import settings
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "_config", configparser.ConfigParser(interpolation=None))
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    database.insert_events(path, [
+        {"timestamp": f"2024-06-{day:02d}T08:00:00", "source_module": "weather_tracker",
+         "event_type": "weather_forecast", "value": {"forecast": {"temperature_celsius": day}}}
+        for day in range(1, 11)
+    ] + [{"timestamp": "2024-06-03T09:00:00", "source_module": "youtube_tracker",
+          "event_type": "youtube_video_watched", "value": "Python Tutorial"}])
+    return path
+
+def test_ndjson_and_csv_exports_stream_all_events(db_path, tmp_path):
+    output = str(tmp_path / "events.ndjson")
+    assert export.export_events(db_path, output, chunk_size=2, slice_days=3) == 11
+    with open(output, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["timestamp"][:10] for line in lines][:4] == ["2024-06-01", "2024-06-02", "2024-06-03", "2024-06-03"]
+    assert lines[2]["value"] == {"forecast": {"temperature_celsius": 3}}
+    assert lines[3]["value"] == "Python Tutorial"
+
+    output = str(tmp_path / "weather.csv")
+    assert export.export_events(db_path, output, fmt="csv", event_types=["weather_forecast"], start="2024-06-09") == 2
+    with open(output, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["timestamp"], row["temperature_celsius"]) for row in rows] == [
+        ("2024-06-09T08:00:00", "9"), ("2024-06-10T08:00:00", "10")]
+
+def test_interrupted_export_resumes_after_last_slice(db_path, tmp_path, monkeypatch):
+    output = str(tmp_path / "events.ndjson")
+    export_slice = export.export_slice
+    exported = []
+
+    def failing_slice(db_path, part_path, start, end, *args):
+        if start == "2024-06-07":
+            raise OSError("Datenträger voll")
+        exported.append(start)
+        return export_slice(db_path, part_path, start, end, *args)
+
+    monkeypatch.setattr(export, "export_slice", failing_slice)
+    with pytest.raises(OSError):
+        export.export_events(db_path, output, slice_days=3)
+    assert exported == ["2024-06-01", "2024-06-04"]
+
+    monkeypatch.setattr(export, "export_slice", lambda *args: exported.append(args[2]) or export_slice(*args))
+    assert export.export_events(db_path, output, slice_days=3) == 11
+    assert exported == ["2024-06-01", "2024-06-04", "2024-06-07", "2024-06-10"]
+    with open(output, encoding="utf-8") as f:
+        assert len(f.readlines()) == 11
+    assert export.export_events(db_path, output, fmt="xml") is None
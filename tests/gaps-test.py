@@ -0,0 +1,77 @@
+import configparser
+from datetime import datetime
+
+import pytest
+
+import backfill
+import database
+import gaps
+import registry
+import settings
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"Backfill": {"locations": "Ulm: 48.4011, 9.9876; Berlin: 52.52, 13.41", "workers": "1",
+                                   "requests_per_second": "0"}})
+    monkeypatch.setattr(settings, "_config", config)
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    gaps.init_coverage_store(path)
+    backfill.init_backfill_store(path)
+    return path
+
+def make_plugin(name, interval_seconds=3600):
+    return registry.PluginMetadata(name=name, source="local", location=f"{name}.py", interval_seconds=interval_seconds)
+
+def test_find_gaps_ignores_time_before_first_coverage(db_path):
+    gaps.record_coverage(db_path, "weather_tracker", ["2024-06-01T10", "2024-06-01T12"])
+    missing = gaps.find_gaps(db_path, "weather_tracker", 3600, datetime(2024, 6, 1, 8), datetime(2024, 6, 1, 14))
+    assert missing == ["2024-06-01T11", "2024-06-01T13"]
+    assert gaps.find_gaps(db_path, "pollen_tracker", 3600, datetime(2024, 6, 1), datetime(2024, 6, 2)) == []
+
+def test_repair_gaps_loads_missing_days_only_for_sources(db_path, monkeypatch):
+    tasks, locations = [], []
+
+    def fetch_tasks(db_path, new_tasks, **kwargs):
+        tasks.extend(new_tasks)
+        locations.extend(kwargs["locations"])
+
+    monkeypatch.setattr(backfill, "fetch_tasks", fetch_tasks)
+    gaps.record_days(db_path, "weather_tracker", 3600, [datetime(2024, 6, 1).date(), datetime(2024, 6, 3).date()])
+    gaps.record_coverage(db_path, "shopping_list_tracker", ["2024-06-01T00"])
+
+    found = gaps.repair_gaps(db_path, [make_plugin("weather_tracker"), make_plugin("shopping_list_tracker")],
+                             lookback_days=3, now=datetime(2024, 6, 4, 0, 30))
+    assert found == {"weather_tracker": 24, "shopping_list_tracker": 71}
+    # Nur der Ort des Moduls, nicht auch Berlin aus [Backfill]
+    assert tasks == [("weather", "Ulm", "2024-06-02", "2024-06-02")]
+    assert locations == [("Ulm", 48.4011, 9.9876)]
+
+def test_repair_runs_in_background_once_per_interval(db_path, monkeypatch):
+    repaired = []
+    monkeypatch.setattr(gaps, "repair_gaps", lambda db_path, plugins, lookback_days: repaired.append(plugins) or {})
+    plugins = [make_plugin("weather_tracker")]
+    thread = gaps.start_background(db_path, plugins, {})
+    thread.join(timeout=5)
+    assert repaired == [plugins]
+
+    last_runs = database.get_last_run_times(db_path)
+    assert gaps.RUN_NAME in last_runs
+    assert gaps.start_background(db_path, plugins, last_runs) is None
+
+def test_backfill_keeps_existing_live_events(db_path, monkeypatch):
+    def live(temperature, precipitation):
+        return {"timestamp": "2024-06-02T08:00:00", "event_type": "weather_forecast",
+                "value": {"location": "Ulm", "forecast": {"temperature_celsius": temperature,
+                                                          "precipitation_probability_percent": precipitation}}}
+
+    database.insert_events(db_path, backfill._prepare("weather", [live(14.0, 30)]))
+    later = dict(live(15.0, None), timestamp="2024-06-02T14:00:00")
+    monkeypatch.setattr(backfill, "_fetch_chunk", lambda *args: [live(13.5, None), later])
+
+    summary = backfill.fetch_tasks(db_path, [("weather", "Ulm", "2024-06-02", "2024-06-02")])
+    assert summary["done"] == 1
+    values = [e["value"]["forecast"] for e in database.get_all_events(db_path)]
+    assert values == [{"temperature_celsius": 14.0, "precipitation_probability_percent": 30},
+                      {"temperature_celsius": 15.0, "precipitation_probability_percent": None}]
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import geocoder
+
+def build(tmp_path, places):
+    csv_path = tmp_path / "places.csv"
+    csv_path.write_text("name,latitude,longitude\n" + "".join(f"{name},{lat},{lon}\n" for name, lat, lon in places),
+                        encoding="utf-8")
+    bin_path = str(tmp_path / "places.bin")
+    assert geocoder.build_gazetteer(str(csv_path), bin_path) == len(places)
+    return bin_path
+
+def test_nearest_matches_brute_force(tmp_path):
+    rng = random.Random(42)
+    places = [(f"Ort{i}", round(rng.uniform(-90, 90), 4), round(rng.uniform(-180, 180), 4)) for i in range(500)]
+    gazetteer = geocoder.Gazetteer(build(tmp_path, places), cache_decimals=6)
+    try:
+        records = [gazetteer._record(index) for index in range(len(gazetteer))]
+        for _ in range(200):
+            lat, lon = round(rng.uniform(-90, 90), 6), round(rng.uniform(-180, 180), 6)
+            query = geocoder._unit_vector(lat, lon)
+            best = min(sum((record[axis] - query[axis]) ** 2 for axis in range(3)) for record in records)
+            result = gazetteer.nearest(lat, lon)
+            assert result["distance_meters"] == pytest.approx(geocoder._chord_to_meters(best ** 0.5))
+    finally:
+        gazetteer.close()
+
+def test_nearest_many_looks_up_rounded_points_once_and_returns_copies(tmp_path):
+    gazetteer = geocoder.Gazetteer(build(tmp_path, [("Ulm", 48.4011, 9.9876), ("Berlin", 52.52, 13.41)]))
+    try:
+        results = gazetteer.nearest_many([(48.40111, 9.98761), (52.5, 13.4), (48.40112, 9.98759)])
+        assert [result["name"] for result in results] == ["Ulm", "Berlin", "Ulm"]
+        assert gazetteer._cached_lookup.cache_info().misses == 2
+
+        # Änderungen am Ergebnis erreichen weder den Cache noch die anderen Einträge
+        results[0]["name"] = "geändert"
+        assert results[2]["name"] == "Ulm"
+        gazetteer.nearest(48.4011, 9.9876)["name"] = "geändert"
+        assert gazetteer.nearest(48.4011, 9.9876)["name"] == "Ulm"
+    finally:
+        gazetteer.close()
+
+def test_invalid_and_empty_files(tmp_path):
+    invalid = tmp_path / "invalid.bin"
+    invalid.write_bytes(b"XXXX" + bytes(16))
+    with pytest.raises(ValueError):
+        geocoder.Gazetteer(str(invalid))
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(b"ST")
+    with pytest.raises(ValueError):
+        geocoder.Gazetteer(str(truncated))
+    empty_file = tmp_path / "empty_file.bin"
+    empty_file.write_bytes(b"")
+    with pytest.raises(ValueError):
+        geocoder.Gazetteer(str(empty_file))
+
+    empty = geocoder.Gazetteer(build(tmp_path, []))
+    try:
+        assert len(empty) == 0
+        assert empty.nearest(48.4, 9.98) is None
+        assert empty.nearest_many([(48.4, 9.98)]) == [None]
+    finally:
+        empty.close()
@@ -0,0 +1,94 @@
+import configparser
+import json
+import sqlite3
+from datetime import date
+
+import database
+import ingest
+import partitions
+import settings
+
+def make_queue(tmp_path, **kwargs):
+    db_path = str(tmp_path / "test.db")
+    database.init_db(db_path)
+    return ingest.IngestQueue(db_path, str(tmp_path / "ingest.spool"), **kwargs)
+
+def event(value, timestamp="2024-06-01T08:00:00"):
+    return {"timestamp": timestamp, "source_module": "test", "event_type": "test_event", "value": value}
+
+def test_events_are_written_and_replayed_after_restart(tmp_path):
+    queue = make_queue(tmp_path).start()
+    queue.put_many([event(1), event({"day": date(2024, 6, 1)})])
+    assert queue.close(timeout=5)
+    assert [e["value"] for e in database.get_all_events(queue.db_path)] == [1, {"day": "2024-06-01"}]
+
+    # Abbruch vor dem Schreiben: Die Events stehen nur in der Spool-Datei
+    with open(queue.spool_path, "ab") as f:
+        payload = b'{"timestamp": "2024-06-02T08:00:00", "event_type": "test_event", "value": 3}'
+        f.write(ingest._LENGTH.pack(len(payload)) + payload)
+    restarted = ingest.IngestQueue(queue.db_path, queue.spool_path).start()
+    assert restarted.close(timeout=5)
+    assert [e["value"] for e in database.get_all_events(queue.db_path)] == [1, {"day": "2024-06-01"}, 3]
+
+def test_failing_event_is_moved_to_dead_letter_file(tmp_path, monkeypatch):
+    insert_events = partitions.insert_events
+
+    def failing_insert(db_path, events, checkpoint=None, raise_errors=False):
+        if any(e["value"] == "bad" for e in events):
+            raise sqlite3.IntegrityError("constraint failed")
+        return insert_events(db_path, events, checkpoint, raise_errors)
+
+    monkeypatch.setattr(partitions, "insert_events", failing_insert)
+    queue = make_queue(tmp_path, batch_size=10).start()
+    queue.put_many([event(1), event("bad"), event(3)])
+    assert queue.close(timeout=5)
+
+    assert [e["value"] for e in database.get_all_events(queue.db_path)] == [1, 3]
+    assert queue.dead_lettered == 1
+    assert [e["value"] for _, e in ingest.read_spool(queue.dead_letter_path)] == ["bad"]
+
+def test_locked_database_is_retried(tmp_path, monkeypatch):
+    insert_events = partitions.insert_events
+    calls = []
+
+    def locked_once(db_path, events, checkpoint=None, raise_errors=False):
+        calls.append(len(events))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return insert_events(db_path, events, checkpoint, raise_errors)
+
+    monkeypatch.setattr(partitions, "insert_events", locked_once)
+    queue = make_queue(tmp_path).start()
+    queue.put(event(1))
+    assert queue.close(timeout=5)
+    assert calls == [1, 1]
+    assert queue.dead_lettered == 0
+    assert [e["value"] for e in database.get_all_events(queue.db_path)] == [1]
+
+def test_checkpoint_is_written_per_partition_group(tmp_path, monkeypatch):
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"Partitions": {"enabled": "yes", "directory": str(tmp_path / "partitions")}})
+    monkeypatch.setattr(settings, "_config", config)
+    monkeypatch.setattr(partitions, "_attach_limit", lambda conn: 2)
+    insert_events = partitions.insert_events
+    calls = []
+
+    def recording_insert(db_path, events, checkpoint=None, raise_errors=False):
+        calls.append(([e["value"] for e in events], checkpoint[1]))
+        return insert_events(db_path, events, checkpoint, raise_errors)
+
+    monkeypatch.setattr(partitions, "insert_events", recording_insert)
+    queue = make_queue(tmp_path, batch_size=10)
+    partitions.init_catalog(queue.db_path)
+    # Ein Block aus der Spool-Datei mit fünf Monaten, bei höchstens zwei angehängten Partitionen
+    with open(queue.spool_path, "wb") as f:
+        for month in range(1, 6):
+            payload = json.dumps(event(month, f"2024-{month:02d}-01T08:00:00")).encode("utf-8")
+            f.write(ingest._LENGTH.pack(len(payload)) + payload)
+    assert queue.start().close(timeout=5)
+
+    assert [values for values, _ in calls] == [[1, 2], [3, 4], [5]]
+    offsets = [offset for offset, _ in ingest.read_spool(queue.spool_path)]
+    assert [checkpoint for _, checkpoint in calls] == [offsets[1], offsets[3], offsets[4]]
+    assert int(database.get_meta(queue.db_path, ingest.CHECKPOINT_KEY)) == offsets[4]
+    assert [e["value"] for e in partitions.get_events(queue.db_path)] == [1, 2, 3, 4, 5]
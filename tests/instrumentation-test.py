@@ -0,0 +1,46 @@
+import json
+import threading
+
+import database
+import instrumentation
+
+def event(value):
+    return {"timestamp": "2024-06-01T08:00:00", "source_module": "test", "event_type": "test_event", "value": value}
+
+def test_writes_are_attributed_to_the_measured_module_and_exported(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    database.init_db(db_path)
+    with instrumentation.measure_module("weather_tracker") as metrics:
+        metrics.event_count = database.insert_events(db_path, [event(1), event(2)])
+        instrumentation.record_http(0.5, 1024)
+        # Ein anderer Thread misst nicht mit
+        other = threading.Thread(target=instrumentation.record_http, args=(1.0, 1))
+        other.start()
+        other.join()
+    assert instrumentation.current_metrics() is None
+    assert (metrics.db_writes, metrics.http_requests, metrics.http_bytes) == (2, 1, 1024)
+    database.insert_run(db_path, metrics.as_dict())
+
+    with instrumentation.measure_module("weather_tracker") as metrics:
+        metrics.record_failure("Zeitüberschreitung")
+    database.insert_run(db_path, metrics.as_dict())
+
+    prometheus_path = str(tmp_path / "metrics.prom")
+    instrumentation.export_metrics(db_path, prometheus_path)
+    with open(prometheus_path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert 'stat_tracker_module_runs_total{module="weather_tracker"} 2' in lines
+    assert 'stat_tracker_module_failures_total{module="weather_tracker"} 1' in lines
+    assert 'stat_tracker_module_events{module="weather_tracker"} 0' in lines
+
+    json_path = str(tmp_path / "metrics.json")
+    instrumentation.export_metrics(db_path, json_path, fmt="json")
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f)["modules"]["weather_tracker"]["last_run"]["error"] == "Zeitüberschreitung"
+
+def test_unknown_export_format_writes_nothing(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    database.init_db(db_path)
+    output_path = tmp_path / "metrics.txt"
+    instrumentation.export_metrics(db_path, str(output_path), fmt="xml")
+    assert not output_path.exists()
@@ -1,9 +1,23 @@
+import configparser
+
 import pytest
 
+from datetime import date
+
+import database
+import settings
+from modules import location_tracker
 from modules.location_tracker import (
     LocationTracker,
     LocationNotFoundError,
-    InvalidLocationError
+    InvalidLocationError,
+    TraceSimplifier,
+    geohash_encode,
+    init_location_store,
+    ingest_trace,
+    read_trace_file,
+    get_points_on_date,
+    find_visits_within_radius,
 )
 
 def test_initialization_with_valid_location():
@@ -53,4 +67,108 @@ def test_reset_history():
 def test_repr_and_str():
     tracker = LocationTracker("Rome")
     assert "Rome" in repr(tracker)
-    assert "Rome" in str(tracker)
\ No newline at end of file
+    assert "Rome" in str(tracker)
+
+def test_find_location_returns_first_occurrence():
+    tracker = LocationTracker("Ulm")
+    tracker.update_location("Berlin")
+    tracker.update_location("Ulm")
+    assert tracker.find_location_in_history("Ulm") == 0
+    assert tracker.get_location_history() == ["Ulm", "Berlin", "Ulm"]
+
+def test_find_location_after_reset_raises():
+    tracker = LocationTracker("Ulm")
+    tracker.reset_history()
+    with pytest.raises(LocationNotFoundError):
+        tracker.find_location_in_history("Ulm")
+
+def test_flush_events_only_returns_new_entries():
+    tracker = LocationTracker("Ulm", timestamp=0)
+    tracker.update_location("Berlin", timestamp=60)
+    events = tracker.flush_events(batch_size=1)
+    assert [e["value"]["locations"] for e in events] == [["Ulm"], ["Berlin"]]
+    assert all(e["event_type"] == "location_history_batch" for e in events)
+    tracker.update_location("Hamburg", timestamp=120)
+    events = tracker.flush_events()
+    assert len(events) == 1
+    assert events[0]["value"]["locations"] == ["Hamburg"]
+    assert tracker.flush_events() == []
+
+def test_geohash_encode_known_value():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+def test_trace_simplifier_drops_stationary_pings():
+    simplifier = TraceSimplifier(min_distance_meters=25, max_interval_seconds=300)
+    # 60 Sekunden-Pings am selben Ort, danach ein Sprung um ca. 1 km
+    points = [(float(t), 48.4, 9.98) for t in range(60)] + [(60.0, 48.409, 9.98)]
+    kept = list(simplifier.simplify(points))
+    assert kept == [(0.0, 48.4, 9.98), (60.0, 48.409, 9.98)]
+
+def test_ingest_csv_and_query_by_radius_and_date(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    init_location_store(db_path)
+    csv_path = tmp_path / "trace.csv"
+    csv_path.write_text(
+        "timestamp,lat,lon\n"
+        "2024-06-01T08:00:00,48.4011,9.9876\n"
+        "2024-06-01T08:00:01,48.4011,9.9876\n"
+        "2024-06-01T09:00:00,48.1374,11.5755\n"
+        "2024-06-02T10:00:00,48.4012,9.9877\n"
+    )
+    stats = ingest_trace(db_path, read_trace_file(str(csv_path)),
+                         TraceSimplifier(min_distance_meters=25, max_interval_seconds=300))
+    assert stats["raw_points"] == 4
+    assert stats["stored_points"] == 3
+
+    assert len(get_points_on_date(db_path, date(2024, 6, 1))) == 2
+
+    visits = find_visits_within_radius(db_path, 48.4011, 9.9876, 500)
+    assert [v["start"][:10] for v in visits] == ["2024-06-01", "2024-06-02"]
+
+def test_track_with_drop_file_and_configured_location(tmp_path, monkeypatch):
+    drop_dir = tmp_path / "drop"
+    drop_dir.mkdir()
+    (drop_dir / "trace.csv").write_text(
+        "timestamp,lat,lon\n"
+        "2024-06-01T08:00:00,48.4011,9.9876\n"
+        "2024-06-01T09:00:00,48.1374,11.5755\n"
+    )
+    database.init_db(str(tmp_path / "test.db"))
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({
+        "Database": {"path": str(tmp_path / "test.db")},
+        "LocationTracker": {"drop_directory": str(drop_dir), "location": "Ulm"},
+    })
+    monkeypatch.setattr(settings, "_config", config)
+    monkeypatch.setattr(location_tracker, "_tracker", None)
+
+    events = list(location_tracker.track())
+    event_types = [e.get("event_type") for e in events]
+    assert event_types == ["location_trace_ingested", "location_history_batch"]
+    # Der konfigurierte Ort ist der zuletzt erfasste
+    assert events[1].get("value")["locations"][-1] == "Ulm"
+    assert (drop_dir / "processed" / "trace.csv").exists()
+
+def test_track_skips_unchanged_location_after_module_reload(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "test.db")
+    database.init_db(db_path)
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"Database": {"path": db_path}, "LocationTracker": {"location": "Ulm"}})
+    monkeypatch.setattr(settings, "_config", config)
+    monkeypatch.setattr(location_tracker, "_tracker", None)
+    assert [e.get("value")["locations"] for e in location_tracker.track()] == [["Ulm"]]
+
+    # registry.py lädt das Modul pro Lauf neu
+    location_tracker._tracker = None
+    assert list(location_tracker.track()) == []
+
+    location_tracker._tracker = None
+    config.set("LocationTracker", "location", "Berlin")
+    assert [e.get("value")["locations"] for e in location_tracker.track()] == [["Berlin"]]
+
+def test_ingest_names_places_from_gazetteer(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    init_location_store(db_path)
+    points = [(0.0, 48.4011, 9.9876), (3600.0, 48.1374, 11.5755)]
+    stats = ingest_trace(db_path, points, TraceSimplifier())
+    assert stats["places"] == ["Ulm", "München"]
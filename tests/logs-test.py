@@ -0,0 +1,42 @@
+import logging
+import queue
+
+import logs
+
+def make_record(msg, *args, level=logging.ERROR, **extra):
+    record = logging.LogRecord("database", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_rate_limit_filter_counts_suppressed_messages(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logs.time, "monotonic", lambda: now[0])
+    rate_limit = logs.RateLimitFilter(interval_seconds=60)
+
+    assert rate_limit.filter(make_record("Fehler beim Speichern von %s", 1))
+    assert not rate_limit.filter(make_record("Fehler beim Speichern von %s", 2))
+    assert not rate_limit.filter(make_record("Fehler beim Speichern von %s", 3))
+    assert rate_limit.filter(make_record("Anderer Fehler"))
+    assert rate_limit.filter(make_record("Fehler beim Speichern von %s", 4, level=logging.INFO))
+
+    now[0] += 61
+    record = make_record("Fehler beim Speichern von %s", 5)
+    assert rate_limit.filter(record)
+    assert record.suppressed == 2
+
+def test_rate_limit_can_be_disabled_per_message():
+    rate_limit = logs.RateLimitFilter(interval_seconds=60)
+    assert rate_limit.filter(make_record("Datenbank gesperrt"))
+    assert rate_limit.filter(make_record("Datenbank gesperrt", rate_limit=False))
+    assert not rate_limit.filter(make_record("Datenbank gesperrt"))
+
+def test_queued_record_keeps_arguments_as_logged():
+    log_queue = queue.SimpleQueue()
+    handler = logs._DeferredQueueHandler(log_queue)
+    events = [{"value": 1}]
+    handler.handle(make_record("%s Events: %r (%d)", len(events), events, 7))
+    handler.handle(make_record("%(events)s", {"events": events}))
+    events.append({"value": 2})
+
+    assert log_queue.get().getMessage() == "1 Events: [{'value': 1}] (7)"
+    assert log_queue.get().getMessage() == "[{'value': 1}]"
@@ -0,0 +1,69 @@
+import sqlite3
+import time
+
+import pytest
+
+import database
+import main
+import registry
+
+def make_plugin(name, timeout_seconds=None):
+    return registry.PluginMetadata(name=name, source="entry_point", location=f"{name}:track",
+                                   interval_seconds=3600, timeout_seconds=timeout_seconds)
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    monkeypatch.setattr(main, "DB_PATH", path)
+    monkeypatch.setattr(main, "INGEST_QUEUE", None)
+    monkeypatch.setattr(main.settings.get_config(), "getint",
+                        lambda section, option, fallback=None: 1 if option == "max_io_workers" else fallback)
+    return path
+
+def failures_by_module(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT source_module, failures FROM runs").fetchall())
+    finally:
+        conn.close()
+
+def test_timeout_counts_from_start_not_from_submission(db_path, monkeypatch):
+    def slow():
+        time.sleep(0.6)
+        return [{"event_type": "slow_event", "value": 1}]
+
+    def fast():
+        return [{"event_type": "fast_event", "value": 2}]
+
+    tracks = {"slow": slow, "fast": fast}
+    monkeypatch.setattr(main.registry, "load_plugin", lambda plugin: tracks[plugin.name])
+    # Nur ein Worker: 'fast' wartet länger als sein Zeitlimit auf den Start
+    main.run_plugins([make_plugin("slow", timeout_seconds=5), make_plugin("fast", timeout_seconds=0.4)])
+
+    assert failures_by_module(db_path) == {"slow": 0, "fast": 0}
+    assert {e["event_type"] for e in database.get_all_events(db_path)} == {"slow_event", "fast_event"}
+
+def test_timed_out_plugin_stops_feeding_the_sink(db_path, monkeypatch):
+    def endless():
+        while True:
+            time.sleep(0.05)
+            yield {"event_type": "tick", "value": 1}
+
+    received = []
+
+    def sink(events):
+        received.extend(events)
+        return len(events)
+
+    monkeypatch.setattr(main.registry, "load_plugin", lambda plugin: endless)
+    monkeypatch.setattr(main, "enqueue_events", sink)
+    monkeypatch.setattr(main, "INGEST_QUEUE", object())
+    plugin = registry.PluginMetadata(name="endless", source="entry_point", location="endless:track",
+                                     interval_seconds=3600, timeout_seconds=0.5, batch_size=1)
+    main.run_plugins([plugin])
+
+    assert failures_by_module(db_path) == {"endless": 1}
+    count = len(received)
+    time.sleep(0.3)
+    assert len(received) == count
@@ -0,0 +1,36 @@
+import os
+
+import module_manifest
+
+def write_module(path, source):
+    path.write_text(source, encoding="utf-8")
+    return str(path)
+
+def test_manifest_reparses_only_changed_modules(tmp_path, monkeypatch):
+    weather = write_module(tmp_path / "weather.py", "MODULE_INFO = {'interval_seconds': 3600}\ndef track():\n    pass\n")
+    helper = write_module(tmp_path / "helper.py", "import os\n")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    modules = module_manifest.build_manifest([weather, helper], manifest_path)
+    assert modules[weather]["has_track"] and modules[weather]["info"] == {"interval_seconds": 3600}
+    assert not modules[helper]["has_track"]
+
+    parsed = []
+    read_module_info = module_manifest.read_module_info
+    monkeypatch.setattr(module_manifest, "read_module_info", lambda path: parsed.append(path) or read_module_info(path))
+    assert module_manifest.build_manifest([weather, helper], manifest_path) == modules
+    assert parsed == []
+
+    write_module(tmp_path / "weather.py", "MODULE_INFO = {'interval_seconds': 60}\ndef track():\n    pass\n")
+    os.utime(weather, ns=(0, 0))
+    modules = module_manifest.build_manifest([weather, helper], manifest_path)
+    assert parsed == [weather]
+    assert modules[weather]["info"] == {"interval_seconds": 60}
+
+def test_broken_modules_are_skipped(tmp_path):
+    broken = write_module(tmp_path / "broken.py", "def track(:\n")
+    dynamic = write_module(tmp_path / "dynamic.py", "MODULE_INFO = dict(interval_seconds=60)\ndef track():\n    pass\n")
+    modules = module_manifest.build_manifest([broken, dynamic, str(tmp_path / "missing.py")],
+                                             str(tmp_path / "manifest.json"))
+    assert list(modules) == [dynamic]
+    assert modules[dynamic]["info"] == {}
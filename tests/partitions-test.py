@@ -0,0 +1,162 @@
+import configparser
+import os
+import sqlite3
+
+import pytest
+
+import database
+import partitions
+import settings
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"Partitions": {
+        "enabled": "yes",
+        "directory": str(tmp_path / "partitions"),
+        "archive_directory": str(tmp_path / "archive"),
+    }})
+    monkeypatch.setattr(settings, "_config", config)
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    partitions.init_catalog(path)
+    return path
+
+def event(timestamp, value):
+    return {"timestamp": timestamp, "source_module": "test", "event_type": "test_event", "value": value}
+
+def test_events_are_routed_to_monthly_partitions(db_path):
+    written = partitions.insert_events(db_path, [event("2024-01-15T08:00:00", 1), event("2024-02-01T08:00:00", 2)])
+    assert written == 2
+    catalog = {entry["name"]: entry for entry in partitions.list_partitions(db_path)}
+    assert sorted(catalog) == ["events_2024_01", "events_2024_02"]
+    assert catalog["events_2024_01"]["min_timestamp"] == "2024-01-15T08:00:00"
+
+    events = partitions.get_events(db_path)
+    assert [(e["value"], e["partition"]) for e in events] == [(1, "events_2024_01"), (2, "events_2024_02")]
+    assert [e["value"] for e in partitions.get_events(db_path, start="2024-02-01")] == [2]
+
+def test_frozen_partition_takes_late_events_and_restores_from_archive(db_path):
+    keyed = dict(event("2024-01-15T08:00:00", 1), natural_key="a")
+    partitions.insert_events(db_path, [keyed])
+    assert partitions.freeze_partition(db_path, "events_2024_01")
+    path = partitions.list_partitions(db_path)[0]["path"]
+    assert partitions.insert_events(db_path, [event("2024-01-20T08:00:00", 2), dict(keyed, value=3)]) == 2
+    assert [(e["value"], e["partition"]) for e in partitions.get_events(db_path)] == [
+        (3, "events_2024_01"), (2, "events_2024_01")]
+    assert partitions.list_partitions(db_path)[0]["event_count"] == 2
+    assert not os.stat(path).st_mode & 0o222
+
+    archive_path = partitions.archive_partition(db_path, "events_2024_01")
+    assert os.path.exists(archive_path)
+    assert partitions.insert_events(db_path, [event("2024-01-25T08:00:00", 4), dict(keyed, value=5)]) == 1
+    assert [(e["value"], e["partition"]) for e in partitions.get_events(db_path)] == [(4, "main")]
+    assert partitions.restore_partition(db_path, "events_2024_01")
+    assert [e["value"] for e in partitions.get_events(db_path)] == [3, 2, 4]
+
+def test_invalid_timestamps_are_written_to_main(db_path):
+    assert partitions.partition_name("yesterday") is None
+    assert partitions.partition_name("2024-13-01T08:00:00") is None
+    written = partitions.insert_events(db_path, [event("yesterday", 1), event("2024-01-15T08:00:00", 2)])
+    assert written == 2
+    assert [entry["name"] for entry in partitions.list_partitions(db_path)] == ["events_2024_01"]
+    assert sorted((e["value"], e["partition"]) for e in partitions.get_events(db_path)) == [
+        (1, "main"), (2, "events_2024_01")]
+
+def test_archiving_requires_frozen_partition(db_path):
+    partitions.insert_events(db_path, [event("2024-01-15T08:00:00", 1)])
+    assert partitions.archive_partition(db_path, "events_2024_01") is None
+    with pytest.raises(KeyError):
+        partitions.freeze_partition(db_path, "events_1999_01")
+
+def test_reads_more_partitions_than_sqlite_can_attach(db_path, monkeypatch):
+    monkeypatch.setattr(partitions, "_attach_limit", lambda conn: 2)
+    events = [event(f"2024-{month:02d}-01T08:00:00", month) for month in range(1, 8)]
+    # Ein Aufruf schreibt in einer Transaktion und ist daher auf zwei Monate begrenzt
+    assert partitions.insert_events(db_path, events) == 0
+    with pytest.raises(ValueError):
+        partitions.insert_events(db_path, events, raise_errors=True)
+    assert partitions.get_events(db_path) == []
+    groups = partitions.group_events(events)
+    assert [[e["value"] for e in group] for group in groups] == [[1, 2], [3, 4], [5, 6], [7]]
+    assert sum(partitions.insert_events(db_path, group) for group in groups) == 7
+    database.insert_events(db_path, [event("2023-12-31T08:00:00", 0)])
+
+    assert [e["value"] for e in partitions.get_events(db_path)] == list(range(8))
+    with pytest.raises(ValueError):
+        partitions.connect_events(db_path)
+
+    forecasts = [{"timestamp": f"2024-{month:02d}-02T08:00:00", "source_module": "weather_tracker",
+                  "event_type": "weather_forecast", "value": {"forecast": {"temperature_celsius": month % 5}}}
+                 for month in range(1, 8)]
+    for group in partitions.group_events(forecasts):
+        partitions.insert_events(db_path, group)
+    warmest = partitions.query_events(db_path, "weather_forecast", [("weather_temperature", ">=", 2)],
+                                      order_by="weather_temperature", descending=True, limit=2)
+    assert [(e["weather_temperature"], e["timestamp"][:7]) for e in warmest] == [
+        (4, "2024-04"), (3, "2024-03")]
+
+def test_readers_include_partitioned_events(db_path, tmp_path):
+    from datetime import datetime
+
+    import export
+    import retention
+    import search
+    from modules.weather_tracker import WeatherTracker
+
+    search.init_search_index(db_path)
+    retention.init_retention_store(db_path)
+    partitions.insert_events(db_path, [
+        {"timestamp": "2024-01-15T08:00:00", "source_module": "youtube_tracker",
+         "event_type": "youtube_video_watched", "value": "Python Tutorial"},
+        {"timestamp": "2024-02-01T08:00:00", "source_module": "weather_tracker",
+         "event_type": "weather_forecast", "value": {"forecast": {"temperature_celsius": 4.5}}},
+    ])
+    database.insert_events(db_path, [event("2023-12-31T08:00:00", 0)])
+
+    assert [e["timestamp"][:7] for e in database.get_all_events(db_path)] == ["2023-12", "2024-01", "2024-02"]
+    hits = search.search_events(db_path, "tutorial")
+    assert [(hit["value"], hit["partition"]) for hit in hits] == [("Python Tutorial", "events_2024_01")]
+    assert WeatherTracker.from_database(db_path).get_max_temperature() == 4.5
+
+    output = str(tmp_path / "events.ndjson")
+    assert export.export_events(db_path, output) == 3
+
+    deleted = retention.apply_retention(db_path, {"default": {"days": 30, "rollup": False}},
+                                        now=datetime(2024, 2, 20))
+    assert deleted == {("test", "test_event"): 1, ("youtube_tracker", "youtube_video_watched"): 1}
+    assert search.search_events(db_path, "tutorial") == []
+    assert [e["event_type"] for e in database.get_all_events(db_path)] == ["weather_forecast"]
+
+def test_query_events_filters_on_value_columns(db_path):
+    def pollen(day, birch, location="Ulm"):
+        return {"timestamp": f"2024-04-{day:02d}T06:00:00", "source_module": "pollen_tracker",
+                "event_type": "pollen_forecast_daily",
+                "value": {"location": location, "date": f"2024-04-{day:02d}",
+                          "pollen_types": {"birch": {"level_numeric": birch}}}}
+
+    partitions.insert_events(db_path, [pollen(1, 3), pollen(2, 1), pollen(3, 2)])
+    database.insert_events(db_path, [pollen(4, 3), event("2024-04-05T06:00:00", "kein JSON")])
+
+    strong = partitions.query_events(db_path, "pollen_forecast_daily", [("pollen_birch", ">=", 2)])
+    assert [(e["pollen_date"], e["pollen_birch"]) for e in strong] == [
+        ("2024-04-01", 3), ("2024-04-03", 2), ("2024-04-04", 3)]
+    chosen = partitions.query_events(db_path, "pollen_forecast_daily",
+                                     [("pollen_date", "in", ["2024-04-02", "2024-04-04"])],
+                                     order_by="pollen_birch", descending=True)
+    assert [e["value"]["date"] for e in chosen] == ["2024-04-04", "2024-04-02"]
+
+    conn = sqlite3.connect(db_path)
+    try:
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM events "
+                            "WHERE event_type = 'pollen_forecast_daily' AND pollen_birch >= 2").fetchall()
+    finally:
+        conn.close()
+    assert any("pollen_birch" in row[-1] for row in plan)
+
+    with pytest.raises(ValueError):
+        partitions.query_events(db_path, "pollen_forecast_daily", [("pollen_oak", ">=", 2)])
+    with pytest.raises(ValueError):
+        partitions.query_events(db_path, "pollen_forecast_daily", [("pollen_birch", "~", 2)])
+    with pytest.raises(ValueError):
+        partitions.query_events(db_path, "test_event")
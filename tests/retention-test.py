@@ -0,0 +1,61 @@
+import configparser
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import database
+import retention
+import settings
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "_config", configparser.ConfigParser(interpolation=None))
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    retention.init_retention_store(path)
+    return path
+
+def forecast(timestamp, temperature):
+    return {"timestamp": timestamp, "source_module": "weather_tracker", "event_type": "weather_forecast",
+            "value": {"location": "Ulm", "forecast": {"temperature_celsius": temperature}}}
+
+def test_policies_prefer_event_type_over_module():
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({"Retention": {"default": "365", "weather_tracker": "30, rollup",
+                                    "weather_tracker.weather_warning": "7", "pollen_tracker": "viele",
+                                    "batch_size": "100"}})
+    policies = retention.load_policies(config)
+    assert "pollen_tracker" not in policies and "batch_size" not in policies
+    assert retention.resolve_policy(policies, "weather_tracker", "weather_warning") == {"days": 7, "rollup": False}
+    assert retention.resolve_policy(policies, "weather_tracker", "weather_forecast") == {"days": 30, "rollup": True}
+    assert retention.resolve_policy(policies, "pollen_tracker", "pollen") == {"days": 365, "rollup": False}
+
+def test_expired_events_are_rolled_up_before_purge(db_path):
+    database.insert_events(db_path, [
+        forecast("2024-01-01T08:00:00", 2.0), forecast("2024-01-01T14:00:00", 6.0),
+        forecast("2024-01-02T08:00:00", -1.5), forecast("2024-06-01T08:00:00", 20.0),
+        {"timestamp": "2024-01-01T09:00:00", "source_module": "youtube_tracker",
+         "event_type": "youtube_video_watched", "value": "Python Tutorial"},
+    ])
+    policies = {"default": {"days": 0, "rollup": False}, "weather_tracker": {"days": 30, "rollup": True}}
+
+    deleted = retention.apply_retention(db_path, policies, now=datetime(2024, 6, 10), pause_seconds=0, batch_size=2)
+    assert deleted == {("weather_tracker", "weather_forecast"): 3}
+    assert sorted(e["timestamp"] for e in database.get_all_events(db_path)) == [
+        "2024-01-01T09:00:00", "2024-06-01T08:00:00"]
+
+    conn = sqlite3.connect(db_path)
+    try:
+        # Wie in analytics.py ohne die Anführungszeichen, die json_tree je nach SQLite-Version setzt
+        rollups = conn.execute('''
+            SELECT day, replace(path, '"', ''), count, sum, min, max FROM daily_rollups ORDER BY day, path
+        ''').fetchall()
+    finally:
+        conn.close()
+    assert rollups == [
+        ("2024-01-01", "", 2, None, None, None),
+        ("2024-01-01", "$.forecast.temperature_celsius", 2, 8.0, 2.0, 6.0),
+        ("2024-01-02", "", 1, None, None, None),
+        ("2024-01-02", "$.forecast.temperature_celsius", 1, -1.5, -1.5, -1.5),
+    ]
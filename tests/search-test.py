@@ -0,0 +1,51 @@
+import configparser
+import sqlite3
+
+import pytest
+
+import database
+import search
+import settings
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "_config", configparser.ConfigParser(interpolation=None))
+    path = str(tmp_path / "test.db")
+    database.init_db(path)
+    return path
+
+def test_triggers_keep_index_in_sync(db_path):
+    database.insert_events(db_path, [{"timestamp": "2024-06-01T08:00:00", "source_module": "youtube_tracker",
+                                      "event_type": "youtube_video_watched", "value": "Python Tutorial"}])
+    # Bereits vorhandene Events werden beim Anlegen indexiert
+    search.init_search_index(db_path)
+    database.insert_events(db_path, [
+        {"timestamp": "2024-06-02T08:00:00", "source_module": "shopping_list_tracker",
+         "event_type": "shopping_list_processed", "value": {"items": ["Milch", "Brötchen"]}},
+        {"timestamp": "2024-06-03T08:00:00", "source_module": "holiday_and_appointment_tracker",
+         "event_type": "weekly_holiday_reminder", "value": {"local_name": "Fronleichnam", "name": "Corpus Christi"}},
+    ])
+
+    assert [hit["value"] for hit in search.search_events(db_path, "python")] == ["Python Tutorial"]
+    assert [hit["value"]["items"] for hit in search.search_events(db_path, "Brotchen")] == [["Milch", "Brötchen"]]
+    assert [hit["event_type"] for hit in search.search_events(db_path, "Mil* OR corpus", raw=True,
+                                                              order_by="recent")] == [
+        "weekly_holiday_reminder", "shopping_list_processed"]
+    assert search.search_events(db_path, "christi", start="2024-06-04") == []
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("DELETE FROM events WHERE event_type = 'youtube_video_watched'")
+        conn.execute("UPDATE events SET value = '{\"items\": [\"Brot\"]}' WHERE event_type = 'shopping_list_processed'")
+        conn.commit()
+    finally:
+        conn.close()
+    assert search.search_events(db_path, "python") == []
+    assert search.search_events(db_path, "milch") == []
+    assert search.search_events(db_path, "brot")[0]["snippet"] == "[Brot]"
+
+def test_invalid_queries_return_no_hits(db_path):
+    search.init_search_index(db_path)
+    assert search.build_match_query('sag "hallo" Mil*') == '"sag" """hallo""" "Mil"*'
+    assert search.search_events(db_path, "  * ") == []
+    assert search.search_events(db_path, "milch AND", raw=True) == []
@@ -1,6 +1,6 @@
 import pytest
 
-from modules.weather_tracker import WeatherTracker
+from modules.weather_tracker import WeatherTracker, check_for_warnings, compile_warning_rules, evaluate_warnings
 
 def test_initialization():
     wt = WeatherTracker()
@@ -46,4 +46,88 @@ def test_add_record_invalid_date():
 def test_add_record_invalid_temperature():
     wt = WeatherTracker()
     with pytest.raises(TypeError):
-        wt.add_record('2024-06-01', 'hot')
\ No newline at end of file
+        wt.add_record('2024-06-01', 'hot')
+
+def test_window_statistics():
+    wt = WeatherTracker(window_days=2)
+    wt.add_record('2024-06-01', 30)
+    wt.add_record('2024-06-02', 10)
+    wt.add_record('2024-06-03', 20)
+    assert wt.get_window_max_temperature() == 20
+    assert wt.get_window_min_temperature() == 10
+    assert wt.get_window_average_temperature() == 15
+    assert wt.get_max_temperature() == 30
+
+def test_from_database(tmp_path):
+    import json
+    import sqlite3
+    db_path = str(tmp_path / "test.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, timestamp TEXT, source_module TEXT, event_type TEXT, value TEXT)")
+    for ts, temp in [("2024-06-01T08:00:00", 12.5), ("2024-06-01T14:00:00", 21.0), ("2024-06-02T08:00:00", 14.0)]:
+        conn.execute("INSERT INTO events (timestamp, source_module, event_type, value) VALUES (?, ?, ?, ?)",
+                     (ts, "weather_tracker", "weather_forecast", json.dumps({"forecast": {"temperature_celsius": temp}})))
+    conn.execute("INSERT INTO events (timestamp, source_module, event_type, value) VALUES (?, ?, ?, ?)",
+                 ("2024-06-02T09:00:00", "weather_tracker", "weather_fetch_failed", "no_data_available"))
+    conn.commit()
+    conn.close()
+
+    wt = WeatherTracker.from_database(db_path, start_date='2024-06-01', end_date='2024-06-01')
+    assert len(wt.records) == 2
+    assert wt.records[1] == {'date': '2024-06-01', 'temperature': 21.0}
+    assert wt.get_max_temperature() == 21.0
+
+def test_compile_warning_rules_rejects_invalid_rules():
+    with pytest.raises(ValueError):
+        compile_warning_rules({"wind": "wind_speed_10m >= 40"})
+    with pytest.raises(ValueError):
+        compile_warning_rules({"wind": "wind_speed_10m ~ 40 | Wind"})
+
+def test_evaluate_warnings_over_columns():
+    rules = compile_warning_rules({
+        "wind": "wind_speed_10m >= 40 | Wind {wind_speed_10m}",
+        "rain": "precipitation_probability >= 70 and weather_code in 61-67, 80-82 | Regen",
+        "fog": "weather_code in 45, 48 | Nebel",
+    })
+    warnings = evaluate_warnings({
+        "weather_code": [0, 63, 45, 95, None],
+        "wind_speed_10m": [45, 10, 10, 10, None],
+        "precipitation_probability": [90, 80, 10, 90, 90],
+    }, rules)
+    assert warnings == [["Wind 45"], ["Regen"], ["Nebel"], [], []]
+
+def test_check_for_warnings_uses_weather_codes():
+    assert "Gewitterwarnung: Gewitter erwartet." in check_for_warnings({"weather_code": 96})
+    assert check_for_warnings({"weather_code": 0, "wind_speed_10m": 5}) == []
+
+def test_check_for_warnings_handles_empty_and_non_numeric_values():
+    assert check_for_warnings({}) == []
+    assert check_for_warnings({"weather_code": "61", "wind_speed_10m": None}) == []
+
+def test_recent_past_days_use_forecast_api_instead_of_archive(monkeypatch):
+    from datetime import date, timedelta
+
+    from modules import weather_tracker
+
+    requested = []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"hourly": {"time": []}}
+
+    def fake_get(url, params=None, archive=None):
+        requested.append((url, params))
+        return Response()
+
+    monkeypatch.setattr(weather_tracker.http_client, "get", fake_get)
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    weather_tracker.get_weather_data(48.4, 9.98, start_date=yesterday, end_date=yesterday)
+    weather_tracker.get_weather_data(48.4, 9.98, start_date="2020-01-01", end_date="2020-01-31")
+
+    assert requested[0][0] == weather_tracker.FORECAST_URL
+    assert "precipitation_probability" in requested[0][1]["hourly"]
+    assert requested[0][1]["start_date"] == yesterday and "forecast_days" not in requested[0][1]
+    assert requested[1][0] == weather_tracker.ARCHIVE_URL